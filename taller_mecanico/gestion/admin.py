@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Cliente, Empleado, Servicio, Vehiculo, Reparacion, Agenda, Registro, UserProfile
+from .models import Cliente, Empleado, Servicio, Vehiculo, Reparacion, Agenda, Registro, UserProfile, Recordatorio, Notificacion, InspeccionVehiculo, LineaReparacion, NotaReparacion, ReparacionEvento, ReparacionArchivada, TareaArchivada, EliminacionCliente
+from .purga import eliminar_cliente
 
 # Configuración personalizada para UserProfile
 class UserProfileInline(admin.StackedInline):
@@ -19,10 +20,19 @@ class CustomUserAdmin(UserAdmin):
 
 # Configuración para modelos del taller
 class ClienteAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'apellido', 'telefono', 'correo_electronico', 'fecha_registro')
-    search_fields = ('nombre', 'apellido', 'telefono', 'correo_electronico')
+    list_display = ('nombre', 'apellido', 'telefono', 'correo_electronico', 'fecha_registro',
+                    'num_vehiculos', 'num_reparaciones', 'total_facturado', 'ultima_visita')
+    search_fields = ('nombre', 'apellido', 'telefono', 'correo_electronico', 'telegram_chat_id')
     list_filter = ('fecha_registro',)
-    readonly_fields = ('fecha_registro',)
+    readonly_fields = ('fecha_registro',) + Cliente.CONTADORES
+
+    # Como en la web: se oculta y los datos se borran en segundo plano (purgar_clientes)
+    def delete_model(self, request, obj):
+        eliminar_cliente(obj, request.user)
+
+    def delete_queryset(self, request, queryset):
+        for cliente in queryset:
+            eliminar_cliente(cliente, request.user)
     date_hierarchy = 'fecha_registro'
 
 class EmpleadoAdmin(admin.ModelAdmin):
@@ -71,13 +81,57 @@ class VehiculoAdmin(admin.ModelAdmin):
     get_cliente_email.short_description = 'Email Cliente'
     get_cliente_email.admin_order_field = 'cliente__correo_electronico'
 
+class InspeccionVehiculoInline(admin.TabularInline):
+    model = InspeccionVehiculo
+    fields = ('fecha', 'kilometraje', 'nivel_combustible', 'observaciones')
+    extra = 0
+
+class LineaReparacionInline(admin.TabularInline):
+    # El subtotal lo calcula la línea; el total de la reparación lo suman los signals
+    model = LineaReparacion
+    fields = ('tipo', 'servicio', 'descripcion', 'cantidad', 'precio_unitario', 'subtotal')
+    readonly_fields = ('subtotal',)
+    extra = 0
+
+class NotaReparacionInline(admin.TabularInline):
+    # Solo se agregan notas: las existentes no se editan ni se borran
+    model = NotaReparacion
+    fields = ('creada', 'tipo', 'autor', 'texto')
+    readonly_fields = ('creada', 'autor')
+    extra = 0
+    can_delete = False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ReparacionEventoInline(admin.TabularInline):
+    # Los escribe el signal registrar_evento_estado: solo lectura
+    model = ReparacionEvento
+    fields = ('fecha', 'estado_anterior', 'estado_nuevo', 'origen', 'usuario')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 class ReparacionAdmin(admin.ModelAdmin):
-    list_display = ('vehiculo', 'servicio', 'fecha_ingreso', 'fecha_salida', 'estado_reparacion', 'condicion_vehiculo')
+    list_display = ('vehiculo', 'servicio', 'fecha_ingreso', 'fecha_salida', 'estado_reparacion', 'condicion_vehiculo', 'total')
     search_fields = ('vehiculo__marca', 'vehiculo__modelo', 'estado_reparacion', 'condicion_vehiculo')
     list_filter = ('estado_reparacion', 'condicion_vehiculo', 'fecha_ingreso')
     list_editable = ('estado_reparacion', 'condicion_vehiculo')
     list_select_related = ('vehiculo', 'servicio')
     date_hierarchy = 'fecha_ingreso'
+    readonly_fields = ('notas', 'total')  # histórico; las notas nuevas van en el historial
+    inlines = (LineaReparacionInline, NotaReparacionInline, InspeccionVehiculoInline, ReparacionEventoInline)
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is NotaReparacion:
+            for nota in formset.save(commit=False):
+                nota.autor = request.user
+                nota.save()
+        else:
+            formset.save()
 
 class AgendaAdmin(admin.ModelAdmin):
     list_display = ('cliente', 'servicio', 'fecha', 'hora')
@@ -90,6 +144,55 @@ class RegistroAdmin(admin.ModelAdmin):
     search_fields = ('cliente__nombre', 'empleado__nombre', 'servicio__nombre_servicio')
     list_filter = ('fecha', 'servicio')
 
+class RecordatorioAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'objeto_id', 'fecha_evento', 'chat_id', 'estado', 'intentos', 'fecha_envio')
+    list_filter = ('estado', 'tipo', 'fecha_evento')
+    search_fields = ('chat_id', 'error')
+
+class InspeccionVehiculoAdmin(admin.ModelAdmin):
+    list_display = ('vehiculo', 'reparacion', 'fecha', 'kilometraje', 'nivel_combustible')
+    search_fields = ('vehiculo__placa', 'observaciones')
+    list_select_related = ('vehiculo', 'reparacion__servicio', 'reparacion__vehiculo')
+    date_hierarchy = 'fecha'
+
+class ArchivoAdmin(admin.ModelAdmin):
+    # Las escribe archivar_reparaciones: solo lectura
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ReparacionArchivadaAdmin(ArchivoAdmin):
+    list_display = ('id', 'placa', 'nombre_servicio', 'costo', 'fecha_ingreso', 'fecha_salida', 'estado_reparacion', 'archivada')
+    search_fields = ('placa', 'nombre_servicio')
+    list_filter = ('estado_reparacion',)
+    date_hierarchy = 'fecha_ingreso'
+
+class TareaArchivadaAdmin(ArchivoAdmin):
+    list_display = ('titulo', 'estado', 'prioridad', 'reparacion', 'fecha_creacion', 'archivada')
+    search_fields = ('titulo', 'descripcion')
+    list_filter = ('estado', 'prioridad')
+
+class EliminacionClienteAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'estado', 'progreso_porcentaje', 'procesados', 'total', 'solicitada', 'terminada', 'error')
+    list_filter = ('estado',)
+    search_fields = ('nombre',)
+    readonly_fields = ('cliente', 'nombre', 'solicitada_por', 'solicitada', 'iniciada', 'terminada',
+                       'estado', 'total', 'procesados', 'error')
+
+    def progreso_porcentaje(self, obj):
+        return f'{obj.progreso}%'
+    progreso_porcentaje.short_description = 'Avance'
+
+    def has_add_permission(self, request):
+        return False
+
+class NotificacionAdmin(admin.ModelAdmin):
+    list_display = ('clave', 'canal', 'destino', 'estado', 'intentos', 'proximo_intento', 'enviada')
+    list_filter = ('estado', 'canal')
+    search_fields = ('clave', 'destino', 'error')
+
 # Registrar modelos con configuraciones personalizadas
 admin.site.unregister(User)  # Desregistrar el UserAdmin por defecto
 admin.site.register(User, CustomUserAdmin)  # Registrar con nuestra configuración personalizada
@@ -101,3 +204,9 @@ admin.site.register(Reparacion, ReparacionAdmin)
 admin.site.register(Agenda, AgendaAdmin)
 admin.site.register(Registro, RegistroAdmin)
 admin.site.register(UserProfile)
+admin.site.register(Recordatorio, RecordatorioAdmin)
+admin.site.register(Notificacion, NotificacionAdmin)
+admin.site.register(EliminacionCliente, EliminacionClienteAdmin)
+admin.site.register(InspeccionVehiculo, InspeccionVehiculoAdmin)
+admin.site.register(ReparacionArchivada, ReparacionArchivadaAdmin)
+admin.site.register(TareaArchivada, TareaArchivadaAdmin)
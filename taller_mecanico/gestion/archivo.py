@@ -0,0 +1,262 @@
+"""
+Archivo de reparaciones y tareas cerradas
+
+Las reparaciones completadas o canceladas que salieron hace más de
+ARCHIVO_HORIZONTE_DIAS (o ingresaron, si no tienen fecha de salida) pasan a
+ReparacionArchivada junto con sus tareas y el historial de cada tarea. Las
+notas, inspecciones y líneas cobradas de la reparación se guardan como JSON
+en ReparacionArchivada.historial; los eventos de estado pasan a
+ReparacionEventoArchivado, que los reportes de tiempos consultan junto con
+ReparacionEvento. Las tareas completadas sin reparación pasan a
+TareaArchivada con el mismo horizonte.
+
+Cada lote se mueve en su propia transacción: se copia al archivo y se borra
+de las tablas vivas (el borrado en cascada elimina notas, inspecciones,
+eventos y avisos ya enviados). Una reparación con avisos pendientes de envío
+espera a la siguiente pasada.
+
+Los reportes de ingresos suman Reparacion.total y ReparacionArchivada.costo
+(ingresos_por_mes), sin unir con Servicio; los de los paneles
+(reparaciones_por_estado, servicios_mas_solicitados, duracion_promedio)
+también cuentan el archivo. Las dos tablas dejan afuera a los clientes
+eliminados que esperan la purga (managers por defecto).
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .contadores import contadores_pausados
+from .models import (
+    InspeccionVehiculo, LineaReparacion, NotaReparacion, Reparacion, ReparacionArchivada, ReparacionEvento,
+    ReparacionEventoArchivado, Tarea, TareaArchivada, TareaHistorial, TareaHistorialArchivada,
+)
+
+ESTADOS_CERRADOS = ('completada', 'cancelada')
+
+CAMPOS_REPARACION = ('id', 'vehiculo_id', 'servicio_id', 'mecanico_asignado_id', 'fecha_ingreso', 'fecha_salida',
+                     'fecha_programada', 'hora_programada', 'condicion_vehiculo', 'estado_reparacion', 'notas')
+CAMPOS_TAREA = ('id', 'titulo', 'descripcion', 'estado', 'prioridad', 'fecha_creacion', 'fecha_actualizacion',
+                'fecha_limite', 'etiqueta', 'reparacion_id', 'creada_por_id', 'actualizada_por_id', 'asignada_a_id')
+CAMPOS_HISTORIAL_TAREA = ('tarea_id', 'usuario_id', 'fecha_cambio', 'accion', 'descripcion')
+CAMPOS_EVENTO = ('reparacion_id', 'estado_anterior', 'estado_nuevo', 'origen', 'usuario_id', 'fecha')
+# Lo que se guarda en ReparacionArchivada.historial
+CAMPOS_HISTORIAL = {
+    'lineas': (LineaReparacion, ('tipo', 'descripcion', 'servicio_id', 'cantidad', 'precio_unitario', 'subtotal')),
+    'notas': (NotaReparacion, ('tipo', 'texto', 'autor_id', 'creada')),
+    'inspecciones': (InspeccionVehiculo, ('kilometraje', 'nivel_combustible', 'observaciones', 'fecha')),
+}
+
+
+def fecha_limite(horizonte_dias=None):
+    if horizonte_dias is None:
+        horizonte_dias = settings.ARCHIVO_HORIZONTE_DIAS
+    return timezone.now() - timedelta(days=horizonte_dias)
+
+
+def reparaciones_a_archivar(limite):
+    """Reparaciones cerradas antes de limite, sin avisos pendientes."""
+    return (Reparacion.objects
+            .filter(estado_reparacion__in=ESTADOS_CERRADOS)
+            .filter(Q(fecha_salida__lt=limite) | Q(fecha_salida__isnull=True, fecha_ingreso__lt=limite))
+            .exclude(notificaciones__estado__in=['pendiente', 'enviando']))
+
+
+def tareas_a_archivar(limite):
+    """Tareas completadas sin reparación y sin cambios desde limite."""
+    return Tarea.objects.filter(reparacion__isnull=True, estado='completada', fecha_actualizacion__lt=limite)
+
+
+def _historial_de(modelo, campos, reparacion_ids):
+    por_reparacion = defaultdict(list)
+    filas = (modelo.objects.filter(reparacion_id__in=reparacion_ids)
+             .order_by('reparacion_id', 'pk').values('reparacion_id', *campos))
+    for fila in filas:
+        por_reparacion[fila.pop('reparacion_id')].append(fila)
+    return por_reparacion
+
+
+def _copiar_tareas(tareas):
+    """Copia tareas (dicts de CAMPOS_TAREA) y su historial al archivo."""
+    archivada = timezone.now()
+    TareaArchivada.objects.bulk_create([TareaArchivada(archivada=archivada, **tarea) for tarea in tareas])
+    historial = TareaHistorial.objects.filter(tarea_id__in=[tarea['id'] for tarea in tareas]).values(*CAMPOS_HISTORIAL_TAREA)
+    TareaHistorialArchivada.objects.bulk_create([TareaHistorialArchivada(**fila) for fila in historial])
+
+
+def archivar_lote(ids, limite):
+    """
+    Mueve al archivo las reparaciones de ids que siguen cumpliendo las
+    condiciones, con sus tareas e historial, en una transacción.
+
+    Returns:
+        (reparaciones, tareas) archivadas
+    """
+    with transaction.atomic():
+        reparaciones = list(
+            reparaciones_a_archivar(limite).filter(pk__in=ids)
+            .select_for_update(of=('self',))
+            .values(*CAMPOS_REPARACION, 'vehiculo__placa', 'servicio__nombre_servicio', 'total')
+        )
+        if not reparaciones:
+            return 0, 0
+        ids = [reparacion['id'] for reparacion in reparaciones]
+        historiales = {clave: _historial_de(modelo, campos, ids) for clave, (modelo, campos) in CAMPOS_HISTORIAL.items()}
+
+        archivada = timezone.now()
+        ReparacionArchivada.objects.bulk_create([
+            ReparacionArchivada(
+                placa=reparacion.pop('vehiculo__placa'),
+                nombre_servicio=reparacion.pop('servicio__nombre_servicio'),
+                costo=reparacion.pop('total'),
+                historial={clave: historial.get(reparacion['id'], []) for clave, historial in historiales.items()},
+                archivada=archivada,
+                **reparacion,
+            )
+            for reparacion in reparaciones
+        ])
+        eventos = ReparacionEvento.objects.filter(reparacion_id__in=ids).order_by('reparacion_id', 'fecha', 'id')
+        ReparacionEventoArchivado.objects.bulk_create(
+            [ReparacionEventoArchivado(**evento) for evento in eventos.values(*CAMPOS_EVENTO)]
+        )
+        tareas = list(Tarea.objects.filter(reparacion_id__in=ids).values(*CAMPOS_TAREA))
+        _copiar_tareas(tareas)
+
+        # El borrado en cascada se lleva líneas, tareas, historial de tareas, notas, inspecciones y eventos;
+        # los contadores de los clientes siguen contando las reparaciones archivadas
+        with contadores_pausados():
+            Reparacion.objects.filter(pk__in=ids).delete()
+    return len(reparaciones), len(tareas)
+
+
+def archivar_lote_tareas(ids, limite):
+    """Mueve al archivo las tareas sueltas de ids. Devuelve cuántas."""
+    with transaction.atomic():
+        tareas = list(tareas_a_archivar(limite).filter(pk__in=ids).select_for_update().values(*CAMPOS_TAREA))
+        if not tareas:
+            return 0
+        _copiar_tareas(tareas)
+        Tarea.objects.filter(pk__in=[tarea['id'] for tarea in tareas]).delete()
+    return len(tareas)
+
+
+def _lotes(queryset, tamaño_lote):
+    """Ids de queryset en lotes, recorridos por clave primaria."""
+    ultimo = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:tamaño_lote])
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+def archivar(horizonte_dias=None, tamaño_lote=None, simular=False, progreso=None):
+    """
+    Archiva todo lo que superó el horizonte, por lotes.
+
+    Args:
+        horizonte_dias: por defecto ARCHIVO_HORIZONTE_DIAS
+        tamaño_lote: reparaciones (o tareas) por transacción; por defecto ARCHIVO_TAMAÑO_LOTE
+        simular: solo cuenta lo que se archivaría
+        progreso: función llamada con el total acumulado tras cada lote
+
+    Returns:
+        dict {reparaciones, tareas}
+    """
+    limite = fecha_limite(horizonte_dias)
+    tamaño_lote = tamaño_lote or settings.ARCHIVO_TAMAÑO_LOTE
+    if simular:
+        reparaciones = reparaciones_a_archivar(limite)
+        return {
+            'reparaciones': reparaciones.count(),
+            'tareas': (Tarea.objects.filter(reparacion__in=reparaciones).count()
+                       + tareas_a_archivar(limite).count()),
+        }
+
+    total = {'reparaciones': 0, 'tareas': 0}
+    for ids in _lotes(reparaciones_a_archivar(limite), tamaño_lote):
+        reparaciones, tareas = archivar_lote(ids, limite)
+        total['reparaciones'] += reparaciones
+        total['tareas'] += tareas
+        if progreso:
+            progreso(total)
+    for ids in _lotes(tareas_a_archivar(limite), tamaño_lote):
+        total['tareas'] += archivar_lote_tareas(ids, limite)
+        if progreso:
+            progreso(total)
+    return total
+
+
+# ========== REPORTES ==========
+
+def ingresos_por_mes(**filtros):
+    """
+    Ingresos y cantidad de reparaciones por mes, vivas y archivadas.
+
+    Args:
+        filtros: filtros de fecha_ingreso (se aplican a las dos tablas)
+
+    Returns:
+        lista de dicts {m, total, cantidad} ordenada por mes
+    """
+    vivas = (Reparacion.objects.filter(**filtros)
+             .annotate(m=TruncMonth('fecha_ingreso')).values('m')
+             .annotate(total=Sum('total'), cantidad=Count('id')).order_by())
+    archivadas = (ReparacionArchivada.objects.filter(**filtros)
+                  .annotate(m=TruncMonth('fecha_ingreso')).values('m')
+                  .annotate(total=Sum('costo'), cantidad=Count('id')).order_by())
+    meses = {}
+    for fila in chain(vivas, archivadas):
+        mes = meses.setdefault(fila['m'], {'m': fila['m'], 'total': None, 'cantidad': 0})
+        if fila['total'] is not None:
+            mes['total'] = (mes['total'] or 0) + fila['total']
+        mes['cantidad'] += fila['cantidad']
+    return [meses[m] for m in sorted(meses)]
+
+
+def ingresos_totales():
+    """Suma de los totales de todas las reparaciones, vivas y archivadas."""
+    vivas = Reparacion.objects.aggregate(suma=Sum('total'))['suma'] or 0
+    archivadas = ReparacionArchivada.objects.aggregate(total=Sum('costo'))['total'] or 0
+    return vivas + archivadas
+
+
+def reparaciones_por_estado():
+    """Cantidad de reparaciones por estado, vivas y archivadas: {estado: total}."""
+    totales = defaultdict(int)
+    for modelo in (Reparacion, ReparacionArchivada):
+        for fila in modelo.objects.values('estado_reparacion').annotate(total=Count('id')).order_by():
+            totales[fila['estado_reparacion']] += fila['total']
+    return dict(totales)
+
+
+def servicios_mas_solicitados(limite=5):
+    """Servicios con más reparaciones, vivas y archivadas: [{servicio_id, total}]."""
+    totales = defaultdict(int)
+    for modelo in (Reparacion, ReparacionArchivada):
+        for fila in modelo.objects.values('servicio_id').annotate(total=Count('id')).order_by():
+            totales[fila['servicio_id']] += fila['total']
+    mas_solicitados = sorted(totales.items(), key=lambda item: (-item[1], item[0]))[:limite]
+    return [{'servicio_id': servicio_id, 'total': total} for servicio_id, total in mas_solicitados]
+
+
+def duracion_promedio():
+    """
+    Tiempo promedio entre ingreso y salida de las reparaciones que ya salieron,
+    vivas y archivadas (timedelta, o None si no hay ninguna).
+    """
+    duracion = ExpressionWrapper(F('fecha_salida') - F('fecha_ingreso'), output_field=DurationField())
+    suma, cantidad = timedelta(0), 0
+    for modelo in (Reparacion, ReparacionArchivada):
+        fila = modelo.objects.filter(fecha_salida__isnull=False).aggregate(suma=Sum(duracion), cantidad=Count('id'))
+        if fila['cantidad']:
+            suma += fila['suma']
+            cantidad += fila['cantidad']
+    return suma / cantidad if cantidad else None
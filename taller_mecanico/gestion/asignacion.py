@@ -0,0 +1,198 @@
+"""
+Asignación automática y balanceada de reparaciones pendientes
+
+Reparte las reparaciones 'pendiente' sin mecánico entre los mecánicos del
+taller según su carga de trabajo abierta (en horas, sumando
+Servicio.duracion de sus reparaciones activas).
+
+Criterios:
+- Prioridad: primero las que tienen fecha programada más próxima, luego
+  las de peor condición del vehículo (crítico > malo > ...) y por último
+  las más antiguas
+- Para reparaciones programadas se prefiere al mecánico con menos carga
+  ese mismo día; a igualdad, el de menor carga total
+
+Se usa de dos formas:
+- Incremental: al crear una reparación pendiente (signal en models.py,
+  activada con ASIGNACION_AUTOMATICA_REPARACIONES en settings)
+- En lote: python manage.py asignar_reparaciones
+
+El cálculo se hace en memoria con un número fijo de consultas (mecánicos,
+carga actual, pendientes y un UPDATE por mecánico), por lo que escala a
+miles de reparaciones abiertas.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from .calendario import invalidar_calendarios
+from .models import Empleado, Reparacion
+
+# Máximo de ids por UPDATE (límite de parámetros de SQLite)
+TAMANO_LOTE_UPDATE = 500
+
+# Estados en los que una reparación cuenta como carga del mecánico
+ESTADOS_CARGA = ['pendiente', 'en_progreso', 'en_espera', 'revision']
+
+# Orden de prioridad según la condición del vehículo (menor = más urgente)
+PRIORIDAD_CONDICION = {
+    'critico': 0,
+    'malo': 1,
+    'regular': 2,
+    'bueno': 3,
+    'excelente': 4,
+}
+
+
+def asignacion_automatica_activa():
+    return getattr(settings, 'ASIGNACION_AUTOMATICA_REPARACIONES', False)
+
+
+def mecanicos():
+    """Empleados que pueden recibir reparaciones (por puesto o por perfil)."""
+    return (Empleado.objects
+            .filter(Q(puesto__iregex=r'^mec[aá]nico') | Q(userprofile__es_mecanico=True))
+            .distinct()
+            .order_by('id'))
+
+
+def _cargas(ids_mecanicos):
+    """
+    Carga abierta de cada mecánico en minutos: total y por fecha programada.
+
+    Una sola consulta agrupada por (mecánico, fecha_programada).
+    """
+    carga_total = {mecanico_id: 0 for mecanico_id in ids_mecanicos}
+    carga_dia = defaultdict(int)
+    filas = (Reparacion.objects
+             .filter(mecanico_asignado_id__in=ids_mecanicos, estado_reparacion__in=ESTADOS_CARGA)
+             .values('mecanico_asignado_id', 'fecha_programada')
+             .annotate(minutos=Sum('servicio__duracion'))
+             .order_by())
+    for fila in filas:
+        minutos = fila['minutos'] or 0
+        carga_total[fila['mecanico_asignado_id']] += minutos
+        if fila['fecha_programada']:
+            carga_dia[(fila['mecanico_asignado_id'], fila['fecha_programada'])] += minutos
+    return carga_total, carga_dia
+
+
+def clave_prioridad(fila):
+    """Clave de orden para una fila de reparación pendiente (ver docstring del módulo)."""
+    return (
+        fila['fecha_programada'] or date.max,
+        PRIORIDAD_CONDICION.get(fila['condicion_vehiculo'], len(PRIORIDAD_CONDICION)),
+        fila['fecha_ingreso'],
+        fila['id'],
+    )
+
+
+def planificar(pendientes, ids_mecanicos, carga_total, carga_dia):
+    """
+    Calcula el plan de asignación en memoria.
+
+    Args:
+        pendientes: filas (dict) con id, fecha_programada, condicion_vehiculo,
+            fecha_ingreso y duracion (minutos)
+        ids_mecanicos: ids de los mecánicos disponibles
+        carga_total / carga_dia: carga actual (se actualizan en el lugar)
+
+    Returns:
+        dict {mecanico_id: [reparacion_id, ...]}
+    """
+    plan = defaultdict(list)
+    if not ids_mecanicos:
+        return plan
+    for fila in sorted(pendientes, key=clave_prioridad):
+        fecha = fila['fecha_programada']
+        elegido = min(
+            ids_mecanicos,
+            key=lambda m: (carga_dia[(m, fecha)] if fecha else 0, carga_total[m], m)
+        )
+        duracion = fila['duracion'] or 0
+        carga_total[elegido] += duracion
+        if fecha:
+            carga_dia[(elegido, fecha)] += duracion
+        plan[elegido].append(fila['id'])
+    return plan
+
+
+def asignar_pendientes(reparaciones=None, limite=None, aplicar=True):
+    """
+    Asigna reparaciones pendientes sin mecánico de forma balanceada.
+
+    Args:
+        reparaciones: queryset opcional para restringir qué pendientes asignar
+        limite: máximo de reparaciones a asignar
+        aplicar: si es False solo calcula el plan (simulación)
+
+    Returns:
+        dict {mecanico_id: [reparacion_id, ...]} con lo efectivamente asignado
+    """
+    ids_mecanicos = list(mecanicos().values_list('id', flat=True))
+    if not ids_mecanicos:
+        return {}
+
+    queryset = reparaciones if reparaciones is not None else Reparacion.objects.all()
+    pendientes = list(queryset
+                      .filter(estado_reparacion='pendiente', mecanico_asignado__isnull=True)
+                      .values('id', 'fecha_programada', 'condicion_vehiculo', 'fecha_ingreso',
+                              duracion=F('servicio__duracion'))
+                      .order_by())
+    if limite is not None:
+        pendientes = sorted(pendientes, key=clave_prioridad)[:limite]
+    if not pendientes:
+        return {}
+
+    carga_total, carga_dia = _cargas(ids_mecanicos)
+    plan = planificar(pendientes, ids_mecanicos, carga_total, carga_dia)
+    if not aplicar:
+        return dict(plan)
+
+    asignadas = {}
+    for mecanico_id, ids in plan.items():
+        for inicio in range(0, len(ids), TAMANO_LOTE_UPDATE):
+            efectivas = _asignar_lote(ids[inicio:inicio + TAMANO_LOTE_UPDATE], mecanico_id)
+            if efectivas:
+                asignadas.setdefault(mecanico_id, []).extend(efectivas)
+
+    # update() no dispara signals: renovar los feeds de calendario manualmente
+    invalidar_calendarios()
+    return asignadas
+
+
+def _asignar_lote(ids, mecanico_id):
+    """
+    Asigna al mecánico las reparaciones de ids que siguen pendientes y sin
+    mecánico (otro proceso o un mecánico pudo tomarlas mientras se calculaba
+    el plan). Las bloquea antes del UPDATE para saber cuáles cambió.
+
+    Returns:
+        ids efectivamente asignados
+    """
+    with transaction.atomic():
+        libres = list(Reparacion.objects.select_for_update(of=('self',))
+                      .filter(id__in=ids, estado_reparacion='pendiente', mecanico_asignado__isnull=True)
+                      .values_list('id', flat=True))
+        if libres:
+            Reparacion.todos.filter(id__in=libres).update(mecanico_asignado_id=mecanico_id)
+    return libres
+
+
+def asignar_reparacion(reparacion):
+    """
+    Asignación incremental de una única reparación recién creada.
+
+    Solo cambia la instancia si esta llamada la asignó; si ya la había
+    tomado otro, devuelve None.
+    """
+    plan = asignar_pendientes(Reparacion.objects.filter(pk=reparacion.pk))
+    for mecanico_id, ids in plan.items():
+        if reparacion.pk in ids:
+            reparacion.mecanico_asignado_id = mecanico_id
+            return mecanico_id
+    return None
@@ -0,0 +1,6 @@
+"""
+Utilidades compartidas del bot de Telegram del taller.
+
+El bot en sí se ejecuta con el comando run_telegram_bot; aquí viven las
+piezas reutilizables (cliente de la Bot API, servidor local para pruebas).
+"""
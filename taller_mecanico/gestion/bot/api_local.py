@@ -0,0 +1,278 @@
+"""
+Servidor local que imita la Bot API de Telegram
+
+Sirve para probar el bot y los envíos (recordatorios, notificaciones) sin
+conectarse a api.telegram.org. Se levanta en un hilo en 127.0.0.1 y se
+apunta el bot a él con TELEGRAM_BOT_API_URL o con base_url:
+
+    with ServidorBotAPI() as servidor:
+        bot = Bot('123:ABC', base_url=servidor.base_url)
+        ...
+        servidor.mensajes()  # mensajes recibidos
+
+Registra todas las llamadas y permite simular errores por chat:
+bloqueos (403) y límites de envío (429 con retry_after).
+
+actualizacion_mensaje(), actualizacion_boton() y actualizacion_contacto()
+generan actualizaciones de ejemplo para enviarlas al webhook o encolarlas
+para getUpdates.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USUARIO = {
+    'id': 1000,
+    'is_bot': True,
+    'first_name': 'Taller Mecánico',
+    'username': 'taller_mecanico_bot',
+}
+
+
+def _parsear_cuerpo(cabeceras, cuerpo):
+    """Parámetros de la petición: la Bot API acepta JSON o formulario."""
+    if not cuerpo:
+        return {}
+    if 'application/json' in cabeceras.get('Content-Type', ''):
+        return json.loads(cuerpo)
+    parametros = {}
+    for clave, valores in parse_qs(cuerpo.decode()).items():
+        valor = valores[0]
+        try:
+            # python-telegram-bot codifica en JSON los valores no triviales
+            parametros[clave] = json.loads(valor)
+        except ValueError:
+            parametros[clave] = valor
+    return parametros
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    servidor_api = None  # se asigna en ServidorBotAPI.iniciar()
+
+    def do_POST(self):
+        partes = self.path.strip('/').split('/')
+        if len(partes) != 2 or not partes[0].startswith('bot'):
+            self._responder(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+            return
+        longitud = int(self.headers.get('Content-Length') or 0)
+        parametros = _parsear_cuerpo(self.headers, self.rfile.read(longitud))
+        codigo, respuesta = self.servidor_api.atender(partes[1], parametros)
+        self._responder(codigo, respuesta)
+
+    do_GET = do_POST
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos).encode()
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Servidor(ThreadingHTTPServer):
+    # Cola de conexiones amplia: con la de por defecto (5) las pruebas de
+    # carga pierden conexiones y esperan el reintento de TCP (1 s)
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class ServidorBotAPI:
+    """
+    Bot API falsa en un hilo.
+
+    Args:
+        latencia: segundos de espera simulada por petición
+    """
+
+    def __init__(self, latencia=0):
+        self.latencia = latencia
+        self._registro = []  # (método, parámetros, aceptada)
+        self.bloqueados = set()
+        self.limitados = {}
+        self.actualizaciones = []
+        self._lock = threading.Lock()
+        self._siguiente_mensaje = 1
+        self._servidor = None
+        self._hilo = None
+
+    # ---- ciclo de vida ----
+
+    def iniciar(self):
+        manejador = type('Manejador', (_Manejador,), {'servidor_api': self})
+        self._servidor = _Servidor(('127.0.0.1', 0), manejador)
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address
+        return f'http://{host}:{puerto}'
+
+    @property
+    def base_url(self):
+        """Valor para Bot(base_url=...) o TELEGRAM_BOT_API_URL."""
+        return f'{self.url}/bot'
+
+    # ---- simulación de errores ----
+
+    def bloquear(self, chat_id):
+        """El chat responde 403 (el usuario bloqueó al bot)."""
+        self.bloqueados.add(str(chat_id))
+
+    def limitar(self, chat_id, veces=1, retry_after=1):
+        """Las próximas `veces` peticiones a ese chat responden 429."""
+        self.limitados[str(chat_id)] = [veces, retry_after]
+
+    # ---- consultas ----
+
+    def llamadas(self, metodo=None):
+        """Parámetros de todas las peticiones recibidas (opcionalmente de un método)."""
+        with self._lock:
+            return [parametros for nombre, parametros, _ in self._registro if metodo in (None, nombre)]
+
+    def mensajes(self, chat_id=None):
+        """Parámetros de los sendMessage aceptados (opcionalmente de un chat)."""
+        with self._lock:
+            return [
+                parametros for nombre, parametros, aceptada in self._registro
+                if nombre == 'sendMessage' and aceptada
+                and (chat_id is None or str(parametros.get('chat_id')) == str(chat_id))
+            ]
+
+    def botones(self, chat_id):
+        """callback_data de los botones del último mensaje enviado o editado en el chat."""
+        with self._lock:
+            for nombre, parametros, aceptada in reversed(self._registro):
+                if (nombre in ('sendMessage', 'editMessageText') and aceptada
+                        and str(parametros.get('chat_id')) == str(chat_id)):
+                    teclado = (parametros.get('reply_markup') or {}).get('inline_keyboard', [])
+                    return [boton['callback_data'] for fila in teclado for boton in fila if 'callback_data' in boton]
+        return []
+
+    # ---- atención de peticiones ----
+
+    def atender(self, metodo, parametros):
+        if self.latencia:
+            time.sleep(self.latencia)
+        chat_id = str(parametros.get('chat_id', ''))
+        with self._lock:
+            error = self._error_simulado(chat_id)
+            self._registro.append((metodo, parametros, error is None))
+            if error:
+                return error
+            resultado = self._resultado(metodo, parametros)
+        return 200, {'ok': True, 'result': resultado}
+
+    def _error_simulado(self, chat_id):
+        if not chat_id:
+            return None
+        if chat_id in self.bloqueados:
+            return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+        limite = self.limitados.get(chat_id)
+        if limite and limite[0] > 0:
+            limite[0] -= 1
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': f'Too Many Requests: retry after {limite[1]}',
+                'parameters': {'retry_after': limite[1]},
+            }
+        return None
+
+    def _resultado(self, metodo, parametros):
+        if metodo == 'getMe':
+            return BOT_USUARIO
+        if metodo in ('sendMessage', 'editMessageText'):
+            mensaje_id = parametros.get('message_id') or self._siguiente_mensaje
+            self._siguiente_mensaje += 1
+            return {
+                'message_id': int(mensaje_id),
+                'date': int(time.time()),
+                'chat': {'id': int(parametros.get('chat_id') or 0), 'type': 'private'},
+                'from': BOT_USUARIO,
+                'text': parametros.get('text', ''),
+            }
+        if metodo == 'getUpdates':
+            actualizaciones, self.actualizaciones = self.actualizaciones, []
+            return actualizaciones
+        return True
+
+
+# ---- actualizaciones de ejemplo (lo que Telegram envía al bot) ----
+
+_contador_actualizaciones = iter(range(1, 10 ** 9))
+
+
+def _usuario(chat_id):
+    return {'id': int(chat_id), 'is_bot': False, 'first_name': f'Cliente{chat_id}'}
+
+
+def actualizacion_mensaje(chat_id, texto):
+    """Update de un mensaje de texto (los que empiezan con / son comandos)."""
+    mensaje = {
+        'message_id': next(_contador_actualizaciones),
+        'date': int(time.time()),
+        'chat': {'id': int(chat_id), 'type': 'private'},
+        'from': _usuario(chat_id),
+        'text': texto,
+    }
+    if texto.startswith('/'):
+        mensaje['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(texto.split()[0])}]
+    return {'update_id': next(_contador_actualizaciones), 'message': mensaje}
+
+
+def actualizacion_boton(chat_id, datos):
+    """Update de un botón inline pulsado (callback_query)."""
+    return {
+        'update_id': next(_contador_actualizaciones),
+        'callback_query': {
+            'id': str(next(_contador_actualizaciones)),
+            'from': _usuario(chat_id),
+            'chat_instance': str(chat_id),
+            'data': datos,
+            'message': {
+                'message_id': next(_contador_actualizaciones),
+                'date': int(time.time()),
+                'chat': {'id': int(chat_id), 'type': 'private'},
+                'from': BOT_USUARIO,
+                'text': '...',
+            },
+        },
+    }
+
+
+def actualizacion_contacto(chat_id, telefono, user_id=None):
+    """Update de un contacto compartido (por defecto, el del propio usuario)."""
+    return {
+        'update_id': next(_contador_actualizaciones),
+        'message': {
+            'message_id': next(_contador_actualizaciones),
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'from': _usuario(chat_id),
+            'contact': {
+                'phone_number': telefono,
+                'first_name': f'Cliente{chat_id}',
+                'user_id': int(user_id if user_id is not None else chat_id),
+            },
+        },
+    }
@@ -0,0 +1,157 @@
+"""
+Acceso a la base de datos del bot de Telegram
+
+El bot corre durante días. Con sync_to_async las consultas se hacen en
+hilos que abren conexiones y nunca pasan por close_old_connections(), que
+Django solo llama al empezar y terminar cada petición web: con MySQL o
+PostgreSQL las conexiones quedan caídas o abiertas indefinidamente.
+
+en_bd(funcion) reemplaza a sync_to_async en el código del bot:
+
+- Las llamadas corren en un pool de TELEGRAM_BOT_BD_HILOS hilos, así que el
+  bot nunca tiene más conexiones abiertas que hilos
+- Antes y después de cada llamada se ejecuta close_old_connections(), que
+  respeta CONN_MAX_AGE y descarta las conexiones con errores (con
+  CONN_MAX_AGE=0 cada llamada abre y cierra su conexión)
+- Una conexión con más de TELEGRAM_BOT_BD_EDAD_MAXIMA segundos se cierra y
+  se abre otra (reciclaje periódico)
+- Una conexión sin uso durante más de TELEGRAM_BOT_BD_VERIFICAR_TRAS
+  segundos se verifica (is_usable) antes de volver a usarla
+- Al detener el ejecutor se cierran las conexiones de todos los hilos
+
+Lo inician el comando run_telegram_bot y la aplicación ASGI (modo webhook).
+Si no se inició (por ejemplo en las pruebas), en_bd equivale a sync_to_async.
+"""
+
+import functools
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_HILOS = 'bot-bd'
+
+
+def _marcar_apertura(connection, **kwargs):
+    connection.bot_abierta = connection.bot_ultimo_uso = time.monotonic()
+
+
+connection_created.connect(_marcar_apertura, dispatch_uid='bot_bd_apertura')
+
+
+class EjecutorBD:
+    """
+    Pool de hilos para las consultas del bot con conexiones administradas.
+
+    Args:
+        hilos: máximo de hilos (y de conexiones abiertas por base)
+        edad_maxima: segundos tras los que se recicla una conexión
+        verificar_tras: segundos sin uso tras los que se verifica la conexión
+    """
+
+    def __init__(self, hilos, edad_maxima, verificar_tras):
+        self.hilos = hilos
+        self.edad_maxima = edad_maxima
+        self.verificar_tras = verificar_tras
+        self.estadisticas = Counter()  # llamadas, recicladas, descartadas
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def iniciar(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix=PREFIJO_HILOS)
+        return self
+
+    def detener(self):
+        """Cierra las conexiones de cada hilo y termina el pool."""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        # Las conexiones son por hilo: cada tarea espera a las demás para
+        # que todas corran en hilos distintos
+        barrera = threading.Barrier(self.hilos)
+
+        def cerrar():
+            connections.close_all()
+            try:
+                barrera.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+
+        for futuro in [pool.submit(cerrar) for _ in range(self.hilos)]:
+            futuro.result()
+        pool.shutdown(wait=True)
+
+    def _contar(self, clave):
+        with self._lock:
+            self.estadisticas[clave] += 1
+
+    def _preparar(self):
+        close_old_connections()
+        ahora = time.monotonic()
+        for conexion in connections.all(initialized_only=True):
+            if conexion.connection is None or conexion.in_atomic_block:
+                continue
+            if ahora - getattr(conexion, 'bot_abierta', ahora) >= self.edad_maxima:
+                conexion.close()
+                self._contar('recicladas')
+            elif ahora - getattr(conexion, 'bot_ultimo_uso', ahora) >= self.verificar_tras and not conexion.is_usable():
+                logger.warning('Conexión %s del bot caída, se abre otra', conexion.alias)
+                conexion.close()
+                self._contar('descartadas')
+
+    def _terminar(self):
+        ahora = time.monotonic()
+        for conexion in connections.all(initialized_only=True):
+            if conexion.connection is not None:
+                conexion.bot_ultimo_uso = ahora
+        close_old_connections()
+
+    def envolver(self, funcion):
+        """Versión asíncrona de `funcion` que corre en el pool."""
+        @functools.wraps(funcion)
+        def administrada(*args, **kwargs):
+            self._contar('llamadas')
+            self._preparar()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self._terminar()
+
+        return sync_to_async(administrada, thread_sensitive=False, executor=self._pool)
+
+
+_ejecutor = None
+
+
+def iniciar_ejecutor_bd():
+    """Inicia el ejecutor del proceso con la configuración de settings (una sola vez)."""
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = EjecutorBD(
+            settings.TELEGRAM_BOT_BD_HILOS,
+            settings.TELEGRAM_BOT_BD_EDAD_MAXIMA,
+            settings.TELEGRAM_BOT_BD_VERIFICAR_TRAS,
+        ).iniciar()
+    return _ejecutor
+
+
+def detener_ejecutor_bd():
+    global _ejecutor
+    ejecutor, _ejecutor = _ejecutor, None
+    if ejecutor is not None:
+        ejecutor.detener()
+
+
+def en_bd(funcion):
+    """Como sync_to_async(funcion), pero en el ejecutor del bot si está iniciado."""
+    if _ejecutor is None:
+        return sync_to_async(funcion)
+    return _ejecutor.envolver(funcion)
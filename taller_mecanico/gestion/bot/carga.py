@@ -0,0 +1,112 @@
+"""
+Prueba de carga del bot de Telegram contra la Bot API local
+
+Simula N usuarios que recorren a la vez la conversación completa de
+reserva: /start, teléfono, nombre, marca, modelo, año, placa, servicio,
+fecha, hora y confirmación. Cada usuario pulsa los botones que el bot le
+envió realmente (leídos de ServidorBotAPI), así que el recorrido pasa por
+los mismos manejadores, consultas y reservas que en producción.
+
+Las actualizaciones se entregan al procesador de la Application igual que
+lo hace python-telegram-bot al leer su cola, y se mide cuánto tarda cada
+una en procesarse. Lo usa el comando benchmark_bot.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+
+from telegram import Update
+
+from .api_local import actualizacion_boton, actualizacion_mensaje
+
+# Pasos de texto de la conversación (el paso de la placa ofrece los servicios)
+PASOS_TEXTO = ['start', 'telefono', 'nombre', 'marca', 'modelo', 'año', 'placa']
+
+
+def percentiles(valores):
+    """p50 y p95 (en las mismas unidades que los valores)."""
+    if not valores:
+        return 0, 0
+    if len(valores) == 1:
+        return valores[0], valores[0]
+    return statistics.median(valores), statistics.quantiles(valores, n=20)[18]
+
+
+class SimulacionCarga:
+    """
+    Args:
+        aplicacion: Application ya inicializada (build_application)
+        servidor: ServidorBotAPI al que apunta la aplicación
+    """
+
+    def __init__(self, aplicacion, servidor):
+        self.aplicacion = aplicacion
+        self.servidor = servidor
+        self.latencias = defaultdict(list)  # paso -> ms
+        self.resultados = defaultdict(int)  # reservada / ocupado / sin_lugar / error
+
+    async def _enviar(self, paso, datos):
+        actualizacion = Update.de_json(datos, self.aplicacion.bot)
+        comienzo = time.perf_counter()
+        # Lo mismo que hace Application con cada actualización de la cola
+        await self.aplicacion.update_processor.process_update(
+            actualizacion, self.aplicacion.process_update(actualizacion)
+        )
+        self.latencias[paso].append((time.perf_counter() - comienzo) * 1000)
+
+    async def _pulsar(self, paso, chat_id, prefijo, eleccion=0):
+        botones = [datos for datos in self.servidor.botones(chat_id) if datos.startswith(prefijo)]
+        if not botones:
+            return False
+        await self._enviar(paso, actualizacion_boton(chat_id, botones[eleccion % len(botones)]))
+        return True
+
+    async def usuario(self, chat_id):
+        """Recorre la conversación completa como el usuario `chat_id`."""
+        textos = ['/start', f'09{chat_id:07d}', f'Cliente {chat_id}', 'Ford', 'Ka', '2015', f'CG{chat_id:06d}']
+        for paso, texto in zip(PASOS_TEXTO, textos):
+            await self._enviar(paso, actualizacion_mensaje(chat_id, texto))
+
+        # Se reparten los usuarios entre fechas y horas para que no elijan todos el mismo turno
+        if not (await self._pulsar('servicio', chat_id, 'service_')
+                and await self._pulsar('fecha', chat_id, 'date_', chat_id)
+                and await self._pulsar('hora', chat_id, 'time_', chat_id // 7)):
+            self.resultados['sin_lugar'] += 1
+            return
+        await self._pulsar('confirmacion', chat_id, 'confirm_yes')
+
+        # La confirmación responde editando el mensaje de los botones
+        respuesta = [
+            llamada['text'] for llamada in self.servidor.llamadas('editMessageText')
+            if str(llamada.get('chat_id')) == str(chat_id)
+        ][-1]
+        if 'CREADA CON ÉXITO' in respuesta:
+            self.resultados['reservada'] += 1
+        elif 'NO DISPONIBLE' in respuesta:
+            self.resultados['ocupado'] += 1
+        else:
+            self.resultados['error'] += 1
+
+    async def ejecutar(self, usuarios, primer_chat=1):
+        """
+        Lanza `usuarios` conversaciones simultáneas.
+
+        Returns:
+            dict con usuarios, duracion (s), actualizaciones, resultados y
+            latencias por paso {paso: (p50, p95)} en ms
+        """
+        comienzo = time.perf_counter()
+        await asyncio.gather(*(self.usuario(chat_id) for chat_id in range(primer_chat, primer_chat + usuarios)))
+        duracion = time.perf_counter() - comienzo
+
+        todas = [valor for valores in self.latencias.values() for valor in valores]
+        return {
+            'usuarios': usuarios,
+            'duracion': duracion,
+            'actualizaciones': len(todas),
+            'resultados': dict(self.resultados),
+            'latencias': {paso: percentiles(valores) for paso, valores in self.latencias.items()},
+            'latencia_total': percentiles(todas),
+        }
@@ -0,0 +1,22 @@
+"""
+Creación del cliente de la Bot API a partir de settings.
+"""
+
+from django.conf import settings
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+
+def crear_bot(conexiones=8, token=None):
+    """
+    Bot de python-telegram-bot apuntando a TELEGRAM_BOT_API_URL.
+
+    Args:
+        conexiones: tamaño del pool HTTP (limita los envíos simultáneos)
+        token: por defecto TELEGRAM_BOT_TOKEN
+    """
+    return Bot(
+        token or settings.TELEGRAM_BOT_TOKEN,
+        base_url=settings.TELEGRAM_BOT_API_URL,
+        request=HTTPXRequest(connection_pool_size=conexiones),
+    )
@@ -0,0 +1,86 @@
+"""
+Procesamiento concurrente de actualizaciones del bot de Telegram
+
+Por defecto python-telegram-bot procesa las actualizaciones de a una: si
+un manejador espera a la base de datos o a la API de Telegram, todos los
+demás chats esperan. ProcesadorPorChat permite atender hasta
+TELEGRAM_BOT_CONCURRENCIA chats a la vez manteniendo el orden dentro de
+cada chat, que es lo que necesita ConversationHandler (cada mensaje
+depende del paso en que quedó el anterior).
+
+- Cada chat activo ocupa un lugar del grupo, sin importar cuántos
+  mensajes tenga pendientes
+- Si llega un mensaje de un chat que ya se está procesando, se encola
+  detrás de los anteriores y se libera el lugar: un usuario que envía
+  muchos mensajes seguidos no bloquea a los demás
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ProcesadorPorChat(BaseUpdateProcessor):
+    """
+    Args:
+        max_concurrent_updates: chats que se procesan al mismo tiempo
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # Chats en proceso -> actualizaciones que esperan su turno
+        self._chats = {}
+        self._sin_pendientes = asyncio.Event()
+        self._sin_pendientes.set()
+
+    @staticmethod
+    def clave_chat(update):
+        chat = getattr(update, 'effective_chat', None)
+        return chat.id if chat is not None else None
+
+    async def do_process_update(self, update, coroutine):
+        clave = self.clave_chat(update)
+        if clave is None:
+            await coroutine
+            return
+
+        pendientes = self._chats.get(clave)
+        if pendientes is not None:
+            # Lo procesará, en orden, la tarea que ya atiende este chat
+            pendientes.append(coroutine)
+            return
+
+        pendientes = self._chats[clave] = deque([coroutine])
+        self._sin_pendientes.clear()
+        try:
+            while pendientes:
+                try:
+                    await pendientes.popleft()
+                except Exception:
+                    # Application.process_update ya maneja los errores de los
+                    # manejadores; esto solo evita cortar la cola del chat
+                    logger.exception('Error al procesar una actualización del chat %s', clave)
+        finally:
+            for restante in pendientes:
+                restante.close()
+            del self._chats[clave]
+            if not self._chats:
+                self._sin_pendientes.set()
+
+    async def esperar(self):
+        """Espera a que terminen todas las actualizaciones aceptadas (pruebas y apagado)."""
+        await self._sin_pendientes.wait()
+
+    @property
+    def chats_activos(self):
+        return len(self._chats)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,92 @@
+"""
+Consulta del estado de las reparaciones desde el bot de Telegram (/estado)
+
+El cliente se identifica por el chat (telegram_chat_id, guardado al
+reservar o al compartir el contacto) o por el teléfono del contacto que
+comparte en Telegram, que es un número verificado por Telegram. Ambas
+búsquedas usan índices (telegram_chat_id y telefono_normalizado).
+
+La respuesta se guarda en la caché durante TELEGRAM_BOT_ESTADO_CACHE_SEGUNDOS
+para que los clientes que repiten /estado no consulten la base cada vez.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from gestion.models import Cliente, Reparacion, normalizar_telefono
+
+# Estados en los que la reparación ya no está en curso
+ESTADOS_CERRADOS = ['completada', 'cancelada']
+
+
+def _clave_cache(chat_id):
+    return f'bot:estado:{chat_id}'
+
+
+def cliente_por_chat(chat_id):
+    return Cliente.objects.filter(telegram_chat_id=str(chat_id)).order_by('id').first()
+
+
+def vincular_por_telefono(telefono, chat_id):
+    """
+    Busca al cliente por el teléfono del contacto compartido (verificado por
+    Telegram, con código de país) y le asocia el chat. El número debe
+    coincidir completo.
+
+    Returns:
+        el Cliente o None si el teléfono no está registrado
+    """
+    normalizado = normalizar_telefono(telefono, internacional=True)
+    if not normalizado:
+        return None
+    cliente = Cliente.objects.filter(telefono_normalizado=normalizado).order_by('id').first()
+    if cliente is not None and cliente.telegram_chat_id != str(chat_id):
+        cliente.telegram_chat_id = str(chat_id)
+        cliente.save(update_fields=['telegram_chat_id'])
+        cache.delete(_clave_cache(chat_id))
+    return cliente
+
+
+def texto_estado(cliente):
+    """Reparaciones en curso del cliente (una consulta)."""
+    reparaciones = (Reparacion.objects
+                    .filter(vehiculo__cliente=cliente)
+                    .exclude(estado_reparacion__in=ESTADOS_CERRADOS)
+                    .select_related('vehiculo', 'servicio')
+                    .order_by('fecha_programada', 'hora_programada', 'id'))
+    lineas = [
+        f"🚗 {r.vehiculo.marca} {r.vehiculo.modelo} ({r.vehiculo.placa}) - {r.servicio.nombre_servicio}\n"
+        f"   Estado: {r.get_estado_reparacion_display()}\n"
+        f"   Programada: {_fecha_programada(r)}"
+        for r in reparaciones
+    ]
+    if not lineas:
+        return f"👋 Hola {cliente.nombre}, no tienes reparaciones en curso."
+    return f"🔧 Reparaciones en curso de {cliente.nombre}:\n\n" + '\n\n'.join(lineas)
+
+
+def _fecha_programada(reparacion):
+    if reparacion.fecha_programada is None:
+        return 'sin fecha'
+    texto = reparacion.fecha_programada.strftime('%d/%m/%Y')
+    if reparacion.hora_programada is not None:
+        texto += f" {reparacion.hora_programada.strftime('%H:%M')}"
+    return texto
+
+
+def estado_para_chat(chat_id):
+    """
+    Respuesta de /estado para un chat (desde la caché si es reciente).
+
+    Returns:
+        el texto, o None si el chat no está asociado a ningún cliente
+    """
+    clave = _clave_cache(chat_id)
+    texto = cache.get(clave)
+    if texto is None:
+        cliente = cliente_por_chat(chat_id)
+        if cliente is None:
+            return None
+        texto = texto_estado(cliente)
+        cache.set(clave, texto, settings.TELEGRAM_BOT_ESTADO_CACHE_SEGUNDOS)
+    return texto
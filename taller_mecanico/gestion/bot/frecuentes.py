@@ -0,0 +1,68 @@
+"""
+Clientes que vuelven a reservar desde el bot de Telegram
+
+Si el chat ya está asociado a un cliente (o el cliente comparte su
+contacto, un teléfono verificado por Telegram), el bot ofrece sus
+vehículos como botones y salta directo a la elección del servicio: no se
+vuelven a pedir teléfono, nombre, marca, modelo, año ni placa, y al
+confirmar solo se inserta la reparación (reservas.reservar_vehiculo_desde_bot).
+
+Un teléfono escrito a mano no se usa para mostrar vehículos: cualquiera
+podría escribir el número de otro cliente.
+
+Los datos se devuelven como dicts simples porque se guardan en user_data,
+que la persistencia del bot serializa en JSON.
+"""
+
+from gestion.models import Vehiculo
+
+from .estado import vincular_por_telefono
+
+# Vehículos que se ofrecen como botones (los más recientes)
+MAX_VEHICULOS = 8
+
+
+def _datos_cliente(vehiculos):
+    """Agrupa el resultado de la consulta; None si no hay vehículos."""
+    if not vehiculos:
+        return None
+    cliente = vehiculos[0].cliente
+    return {
+        'cliente_id': cliente.id,
+        'nombre': f'{cliente.nombre} {cliente.apellido}'.strip(),
+        'telefono': cliente.telefono,
+        'vehiculos': [
+            {'id': v.id, 'marca': v.marca, 'modelo': v.modelo, 'año': v.año, 'placa': v.placa}
+            # Si hay chats o teléfonos repetidos se usa el cliente más antiguo
+            for v in vehiculos if v.cliente_id == cliente.id
+        ],
+    }
+
+
+def _vehiculos(**filtro):
+    return list(Vehiculo.objects
+                .filter(**filtro)
+                .select_related('cliente')
+                .order_by('cliente_id', '-id')[:MAX_VEHICULOS])
+
+
+def cliente_frecuente_por_chat(chat_id):
+    """
+    Cliente y vehículos del chat, en una consulta.
+
+    Returns:
+        dict con cliente_id, nombre, telefono y vehiculos, o None si el
+        chat no tiene un cliente con vehículos
+    """
+    return _datos_cliente(_vehiculos(cliente__telegram_chat_id=str(chat_id)))
+
+
+def cliente_frecuente_por_contacto(telefono, chat_id):
+    """
+    Igual que cliente_frecuente_por_chat a partir del contacto compartido;
+    además asocia el chat al cliente.
+    """
+    cliente = vincular_por_telefono(telefono, chat_id)
+    if cliente is None:
+        return None
+    return _datos_cliente(_vehiculos(cliente=cliente))
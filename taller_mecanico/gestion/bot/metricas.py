@@ -0,0 +1,245 @@
+"""
+Métricas de los manejadores del bot de Telegram
+
+Cada manejador de run_telegram_bot se envuelve (instrumentar_conversacion)
+para medir, en memoria y con un costo mínimo por actualización:
+
+- Latencia: histograma por manejador con cubetas fijas en milisegundos
+- Base de datos: tiempo y cantidad de consultas que hizo cada manejador
+  (un execute_wrapper de Django suma solo mientras corre un manejador)
+- Errores: excepciones que salieron del manejador
+- Embudo: cuántas veces se llegó a cada paso de la conversación y las
+  transiciones entre pasos, para ver dónde se abandona la reserva
+- Contadores de resultado (reservas creadas, horarios ocupados...)
+
+Se consultan en /telegram/metricas/ (jefe o encargado). En modo webhook el
+bot corre dentro del proceso web y la vista lee la memoria; en modo
+polling el bot guarda una copia cada TELEGRAM_BOT_METRICAS_INTERVALO
+segundos en TELEGRAM_BOT_METRICAS_ARCHIVO y la vista lee ese archivo.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de las cubetas del histograma de latencia (ms)
+CUBETAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# [tiempo en ms, consultas] del manejador en curso; asgiref copia el
+# contexto a los hilos de sync_to_async, así que las consultas se suman aquí
+_medicion_bd = contextvars.ContextVar('medicion_bd_bot', default=None)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion_bd.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    comienzo = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion[0] += (time.perf_counter() - comienzo) * 1000
+        medicion[1] += 1
+
+
+def _instalar_en_conexion(connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+# Las conexiones son por hilo: se instala en cada una al abrirse, también en
+# los hilos de sync_to_async que todavía no existen
+connection_created.connect(_instalar_en_conexion, dispatch_uid='metricas_bot')
+
+
+def activar_medicion_bd():
+    """Instala la medición en las conexiones ya abiertas por este hilo."""
+    for conexion in connections.all(initialized_only=True):
+        _instalar_en_conexion(conexion)
+
+
+class Histograma:
+    def __init__(self):
+        self.cuentas = [0] * (len(CUBETAS_MS) + 1)
+        self.total = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        indice = 0
+        while indice < len(CUBETAS_MS) and valor > CUBETAS_MS[indice]:
+            indice += 1
+        self.cuentas[indice] += 1
+        self.total += 1
+        self.suma += valor
+
+    def percentil(self, fraccion):
+        """Estimación por cubetas: límite superior de la cubeta que contiene el percentil."""
+        if not self.total:
+            return None
+        acumulado = 0
+        for indice, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= fraccion * self.total:
+                return CUBETAS_MS[indice] if indice < len(CUBETAS_MS) else None
+        return None
+
+    def como_dict(self):
+        etiquetas = [str(limite) for limite in CUBETAS_MS] + ['+Inf']
+        return {
+            'cubetas_ms': dict(zip(etiquetas, self.cuentas)),
+            'cuenta': self.total,
+            'promedio_ms': round(self.suma / self.total, 2) if self.total else None,
+            'p50_ms': self.percentil(0.5),
+            'p95_ms': self.percentil(0.95),
+        }
+
+
+class MetricasBot:
+    """Acumulador en memoria; seguro para leer desde otros hilos (vista web)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ultimo_guardado = time.monotonic()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.desde = timezone.now()
+            self.latencias = defaultdict(Histograma)
+            self.bd = defaultdict(lambda: {'ms': 0.0, 'consultas': 0})
+            self.errores = Counter()
+            self.embudo = Counter()
+            self.transiciones = Counter()
+            self.contadores = Counter()
+
+    def registrar(self, manejador, ms, bd_ms, consultas, error, origen, destino):
+        with self._lock:
+            self.latencias[manejador].observar(ms)
+            self.bd[manejador]['ms'] += bd_ms
+            self.bd[manejador]['consultas'] += consultas
+            if error:
+                self.errores[manejador] += 1
+            elif destino != origen:
+                self.embudo[destino] += 1
+                self.transiciones[f'{origen} -> {destino}'] += 1
+        self.guardar_si_corresponde()
+
+    def contar(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] += cantidad
+
+    @property
+    def vacia(self):
+        return not self.latencias and not self.contadores
+
+    def instantanea(self):
+        with self._lock:
+            manejadores = {}
+            for nombre, histograma in self.latencias.items():
+                bd = self.bd[nombre]
+                manejadores[nombre] = {
+                    'latencia': histograma.como_dict(),
+                    'bd_ms_total': round(bd['ms'], 2),
+                    'bd_ms_promedio': round(bd['ms'] / histograma.total, 2),
+                    'consultas_promedio': round(bd['consultas'] / histograma.total, 2),
+                    'errores': self.errores[nombre],
+                }
+            return {
+                'desde': self.desde.isoformat(),
+                'generado': timezone.now().isoformat(),
+                'manejadores': manejadores,
+                'embudo': dict(self.embudo),
+                'transiciones': dict(self.transiciones),
+                'contadores': dict(self.contadores),
+            }
+
+    # ---- archivo (modo polling) ----
+
+    def guardar(self, archivo=None):
+        archivo = archivo or settings.TELEGRAM_BOT_METRICAS_ARCHIVO
+        if not archivo:
+            return
+        temporal = f'{archivo}.tmp'
+        try:
+            with open(temporal, 'w', encoding='utf-8') as salida:
+                json.dump(self.instantanea(), salida, ensure_ascii=False)
+            os.replace(temporal, archivo)  # quien lee nunca ve un archivo a medias
+        except OSError:
+            logger.exception('No se pudieron guardar las métricas del bot en %s', archivo)
+
+    def guardar_si_corresponde(self):
+        if not settings.TELEGRAM_BOT_METRICAS_ARCHIVO:
+            return
+        ahora = time.monotonic()
+        if ahora - self._ultimo_guardado >= settings.TELEGRAM_BOT_METRICAS_INTERVALO:
+            self._ultimo_guardado = ahora
+            self.guardar()
+
+
+metricas = MetricasBot()
+
+
+def leer_metricas():
+    """Métricas de este proceso o, si el bot corre aparte (polling), las del archivo."""
+    archivo = settings.TELEGRAM_BOT_METRICAS_ARCHIVO
+    if metricas.vacia and archivo and os.path.exists(archivo):
+        with open(archivo, encoding='utf-8') as entrada:
+            return json.load(entrada)
+    return metricas.instantanea()
+
+
+def instrumentar(manejador, origen, nombres_estados):
+    """Envuelve el callback de un manejador de python-telegram-bot."""
+    callback = manejador.callback
+    nombre = callback.__name__
+
+    @functools.wraps(callback)
+    async def medido(update, context):
+        medicion = [0.0, 0]
+        token = _medicion_bd.set(medicion)
+        comienzo = time.perf_counter()
+        destino, error = None, False
+        try:
+            destino = await callback(update, context)
+            return destino
+        except Exception:
+            error = True
+            raise
+        finally:
+            _medicion_bd.reset(token)
+            metricas.registrar(
+                nombre, (time.perf_counter() - comienzo) * 1000, medicion[0], medicion[1], error,
+                origen, origen if destino is None else nombres_estados.get(destino, str(destino)),
+            )
+
+    manejador.callback = medido
+
+
+def instrumentar_conversacion(conversacion, nombres_estados):
+    """
+    Instrumenta todos los manejadores de un ConversationHandler.
+
+    Args:
+        nombres_estados: {valor del estado: nombre legible}; debe incluir
+            ConversationHandler.END
+    """
+    activar_medicion_bd()
+    for manejador in conversacion.entry_points:
+        instrumentar(manejador, 'inicio', nombres_estados)
+    for estado, manejadores in conversacion.states.items():
+        for manejador in manejadores:
+            instrumentar(manejador, nombres_estados.get(estado, str(estado)), nombres_estados)
+    for manejador in conversacion.fallbacks:
+        instrumentar(manejador, 'cualquiera', nombres_estados)
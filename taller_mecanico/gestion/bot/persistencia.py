@@ -0,0 +1,269 @@
+"""
+Persistencia del bot de Telegram en la base de datos de Django
+
+Implementa BasePersistence de python-telegram-bot sobre el modelo
+EstadoBot, para que las conversaciones (paso actual y context.user_data)
+sobrevivan a un reinicio del bot y puedan compartirse entre varios
+procesos (por ejemplo varios workers ASGI en modo webhook).
+
+- Escrituras agrupadas: python-telegram-bot entrega los cambios cada
+  update_interval segundos; se acumulan y se guardan en una sola
+  transacción con un upsert masivo (bulk_create con update_conflicts)
+- Sincronización entre procesos: antes de procesar cada actualización se
+  cargan de la base de datos, en una consulta, el paso de la conversación
+  y los datos del usuario y del chat (manejador en el grupo -1)
+- Limpieza: las conversaciones sin actividad durante más de
+  TELEGRAM_BOT_ESTADO_TTL_HORAS se eliminan periódicamente (y con el
+  comando limpiar_estado_bot)
+
+Los datos se guardan como JSON: en user_data solo deben ponerse valores
+serializables (ids, textos, números).
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from telegram.ext import BasePersistence, PersistenceInput
+
+from gestion.models import EstadoBot
+
+from .bd import en_bd
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se borran (como mucho) los estados vencidos
+INTERVALO_LIMPIEZA = 60 * 60
+
+
+def ttl_estado():
+    return timedelta(hours=settings.TELEGRAM_BOT_ESTADO_TTL_HORAS)
+
+
+def clave_conversacion(clave):
+    """Las claves de conversación son tuplas de ids: se guardan como JSON."""
+    return json.dumps(list(clave))
+
+
+def limpiar_estados_vencidos(ttl=None):
+    """
+    Borra conversaciones y datos de usuario/chat sin actividad.
+
+    Returns:
+        cantidad de registros eliminados
+    """
+    limite = timezone.now() - (ttl or ttl_estado())
+    eliminados, _ = EstadoBot.objects.filter(actualizado__lt=limite).exclude(tipo='bot').delete()
+    return eliminados
+
+
+class PersistenciaDjango(BasePersistence):
+    """
+    Args:
+        update_interval: segundos entre escrituras agrupadas
+    """
+
+    def __init__(self, update_interval=None):
+        super().__init__(
+            store_data=PersistenceInput(callback_data=False),
+            update_interval=update_interval if update_interval is not None
+            else settings.TELEGRAM_BOT_PERSISTENCIA_INTERVALO,
+        )
+        self._pendientes = {}
+        self._escritura = None
+        self._ultima_limpieza = 0
+        self._conversaciones = []
+        # Última vez que este proceso atendió cada conversación/usuario/chat
+        self._uso_local = {}
+        # Fecha de la última escritura propia de cada estado: una fila con esa
+        # fecha (o anterior) no trae nada más nuevo que lo que hay en memoria
+        self._escrito = {}
+        # Datos más nuevos que los de memoria, leídos por sincronizar() y
+        # aplicados por refresh_*_data() en la misma actualización
+        self._recientes = {}
+
+    # ---- lectura inicial ----
+
+    def _leer(self, tipo, nombre=''):
+        limite = timezone.now() - ttl_estado()
+        filas = EstadoBot.objects.filter(tipo=tipo, nombre=nombre)
+        if tipo != 'bot':
+            filas = filas.filter(actualizado__gte=limite)
+        return [(clave, datos) for clave, datos in filas.values_list('clave', 'datos') if datos is not None]
+
+    async def get_user_data(self):
+        return {int(clave): datos or {} for clave, datos in await en_bd(self._leer)('usuario')}
+
+    async def get_chat_data(self):
+        return {int(clave): datos or {} for clave, datos in await en_bd(self._leer)('chat')}
+
+    async def get_bot_data(self):
+        filas = await en_bd(self._leer)('bot')
+        return filas[0][1] if filas else {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        filas = await en_bd(self._leer)('conversacion', name)
+        return {tuple(json.loads(clave)): estado for clave, estado in filas}
+
+    # ---- escrituras agrupadas ----
+
+    def _encolar(self, tipo, nombre, clave, datos):
+        self._pendientes[(tipo, nombre, str(clave))] = datos
+        if self._escritura is None or self._escritura.done():
+            # Se ejecuta cuando terminan todas las llamadas update_* de esta ronda
+            self._escritura = asyncio.create_task(self._escribir())
+
+    async def _escribir(self):
+        # Lo que llegue mientras se guarda un lote va en el siguiente
+        while self._pendientes:
+            lote, self._pendientes = self._pendientes, {}
+            limpiar = time.monotonic() - self._ultima_limpieza > INTERVALO_LIMPIEZA
+            if limpiar:
+                self._ultima_limpieza = time.monotonic()
+                limite = timezone.now() - ttl_estado()
+                self._uso_local = {k: v for k, v in self._uso_local.items() if v > limite}
+                self._escrito = {k: v for k, v in self._escrito.items() if v > limite}
+            try:
+                escrito = await en_bd(self._guardar)(lote, limpiar)
+            except Exception:
+                logger.exception('Error al guardar el estado del bot; se reintentará')
+                lote.update(self._pendientes)
+                self._pendientes = lote
+                return
+            self._escrito.update(dict.fromkeys(lote, escrito))
+
+    @staticmethod
+    def _guardar(lote, limpiar=False):
+        # Todo es upsert: None (conversación terminada, datos borrados) también
+        # se guarda para que los demás procesos vean el cambio
+        ahora = timezone.now()
+        with transaction.atomic():
+            EstadoBot.objects.bulk_create(
+                [
+                    EstadoBot(tipo=tipo, nombre=nombre, clave=clave, datos=datos, actualizado=ahora)
+                    for (tipo, nombre, clave), datos in lote.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['tipo', 'nombre', 'clave'],
+                update_fields=['datos', 'actualizado'],
+            )
+        if limpiar:
+            limpiar_estados_vencidos()
+        return ahora
+
+    async def update_conversation(self, name, key, new_state):
+        # None = la conversación terminó
+        self._encolar('conversacion', name, clave_conversacion(key), new_state)
+
+    async def update_user_data(self, user_id, data):
+        self._encolar('usuario', '', user_id, dict(data))
+
+    async def update_chat_data(self, chat_id, data):
+        self._encolar('chat', '', chat_id, dict(data))
+
+    async def update_bot_data(self, data):
+        self._encolar('bot', '', '', dict(data))
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_user_data(self, user_id):
+        self._encolar('usuario', '', user_id, None)
+
+    async def drop_chat_data(self, chat_id):
+        self._encolar('chat', '', chat_id, None)
+
+    async def flush(self):
+        """Al apagar: espera la escritura en curso y guarda lo que quede."""
+        if self._escritura is not None:
+            await self._escritura
+        await self._escribir()
+
+    # ---- sincronización entre procesos ----
+
+    def registrar_conversacion(self, manejador):
+        """ConversationHandler persistente cuyo estado se sincroniza por actualización."""
+        self._conversaciones.append(manejador)
+
+    def _leer_actualizacion(self, ids):
+        condicion = Q(pk__in=[])
+        for tipo, nombre, clave in ids:
+            condicion |= Q(tipo=tipo, nombre=nombre, clave=clave)
+        limite = timezone.now() - ttl_estado()
+        return list(EstadoBot.objects
+                    .filter(condicion, actualizado__gte=limite)
+                    .values_list('tipo', 'nombre', 'clave', 'datos', 'actualizado'))
+
+    async def sincronizar(self, update, context):
+        """
+        Manejador del grupo -1: carga el estado de este chat escrito por
+        otros procesos antes de que lo vean los manejadores del grupo 0.
+
+        Solo se aplica lo que otro proceso guardó después de la última vez
+        que este atendió al chat; si no, lo que hay en memoria es más nuevo.
+        Las filas escritas por este mismo proceso se ignoran: pueden ser una
+        foto tomada antes del último cambio que todavía no se guardó.
+        """
+        chat = update.effective_chat
+        usuario = update.effective_user
+        if chat is None or usuario is None:
+            return
+
+        # _get_key/_conversations son internos de ConversationHandler, pero no
+        # hay API pública para reemplazar el estado de una conversación
+        claves = {
+            manejador.name: ('conversacion', manejador.name, clave_conversacion(manejador._get_key(update)))
+            for manejador in self._conversaciones
+        }
+        ids = [*claves.values(), ('usuario', '', str(usuario.id)), ('chat', '', str(chat.id))]
+        ahora = timezone.now()
+        filas = await en_bd(self._leer_actualizacion)(ids)
+
+        for id_estado in ids:
+            self._recientes.pop(id_estado, None)
+        for tipo, nombre, clave, datos, actualizado in filas:
+            id_estado = (tipo, nombre, clave)
+            usado = self._uso_local.get(id_estado)
+            propio = self._escrito.get(id_estado)
+            if (id_estado not in self._pendientes
+                    and (usado is None or actualizado > usado)
+                    and (propio is None or actualizado > propio)):
+                self._recientes[id_estado] = datos
+        for id_estado in ids:
+            self._uso_local[id_estado] = ahora
+
+        for manejador in self._conversaciones:
+            clave = manejador._get_key(update)
+            if claves[manejador.name] not in self._recientes:
+                continue
+            estado = self._recientes.pop(claves[manejador.name])
+            # Se escribe sin marcar como modificado para no generar otra escritura
+            if estado is None:
+                manejador._conversations.data.pop(clave, None)
+            else:
+                manejador._conversations.update_no_track({clave: estado})
+
+    async def refresh_user_data(self, user_id, user_data):
+        self._refrescar(('usuario', '', str(user_id)), user_data)
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        self._refrescar(('chat', '', str(chat_id)), chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    def _refrescar(self, id_estado, datos):
+        if id_estado in self._recientes:
+            nuevos = self._recientes.pop(id_estado) or {}
+            if nuevos != datos:
+                datos.clear()
+                datos.update(nuevos)
@@ -0,0 +1,116 @@
+"""
+Modo webhook del bot de Telegram servido desde la aplicación ASGI de Django
+
+Telegram envía cada actualización por POST a /telegram/webhook/ (vista
+telegram_webhook en views.py). La vista:
+1. Valida la cabecera X-Telegram-Bot-Api-Secret-Token contra
+   TELEGRAM_BOT_WEBHOOK_SECRET
+2. Encola la actualización en la update_queue de la Application de
+   python-telegram-bot y responde 200 de inmediato
+3. Si la cola (TELEGRAM_BOT_WEBHOOK_COLA) está llena responde 503 y
+   Telegram reintenta más tarde
+
+La Application se crea y arranca con la primera actualización dentro del
+event loop del servidor ASGI (uvicorn, daphne...), por lo que este modo
+necesita un servidor ASGI: con runserver (WSGI) cada petición tiene su
+propio event loop.
+
+Para probarlo en local basta con hacer POST de actualizaciones de ejemplo
+(gestion/bot/api_local.py) con la cabecera del secreto.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+
+from django.conf import settings
+from telegram import Update
+
+from .cliente import crear_bot
+from .concurrencia import ProcesadorPorChat
+
+logger = logging.getLogger(__name__)
+
+CABECERA_SECRETO = 'X-Telegram-Bot-Api-Secret-Token'
+
+# Application en ejecución y el event loop al que pertenece
+_estado = {'aplicacion': None, 'bucle': None, 'lock': None}
+
+
+def secreto_valido(secreto):
+    """Compara el secreto recibido en tiempo constante; sin secreto configurado se rechaza todo."""
+    esperado = settings.TELEGRAM_BOT_WEBHOOK_SECRET
+    return bool(esperado) and hmac.compare_digest((secreto or '').encode(), esperado.encode())
+
+
+async def obtener_aplicacion():
+    """Application iniciada para el event loop actual (se crea la primera vez)."""
+    bucle = asyncio.get_running_loop()
+    if _estado['bucle'] is not bucle:
+        _estado.update(aplicacion=None, bucle=bucle, lock=asyncio.Lock())
+
+    async with _estado['lock']:
+        if _estado['aplicacion'] is None:
+            from gestion.management.commands.run_telegram_bot import build_application
+
+            aplicacion = build_application(
+                update_queue=asyncio.Queue(maxsize=settings.TELEGRAM_BOT_WEBHOOK_COLA)
+            )
+            await aplicacion.initialize()
+            await aplicacion.start()
+            _estado['aplicacion'] = aplicacion
+            logger.info('🤖 Bot de Telegram iniciado (webhook)')
+    return _estado['aplicacion']
+
+
+async def recibir_actualizacion(cuerpo, secreto):
+    """
+    Encola una actualización recibida por el webhook.
+
+    Returns:
+        código HTTP para responder a Telegram
+    """
+    if not secreto_valido(secreto):
+        return 403
+    try:
+        datos = json.loads(cuerpo)
+    except ValueError:
+        return 400
+
+    aplicacion = await obtener_aplicacion()
+    try:
+        aplicacion.update_queue.put_nowait(Update.de_json(datos, aplicacion.bot))
+    except asyncio.QueueFull:
+        logger.warning('Cola del webhook llena, se pide a Telegram que reintente')
+        return 503
+    return 200
+
+
+async def esperar_procesamiento():
+    """Espera a que se procesen todas las actualizaciones encoladas (pruebas)."""
+    aplicacion = _estado['aplicacion']
+    if aplicacion is not None:
+        await aplicacion.update_queue.join()
+        if isinstance(aplicacion.update_processor, ProcesadorPorChat):
+            await aplicacion.update_processor.esperar()
+
+
+async def detener_aplicacion():
+    """Detiene la Application (al apagar el servidor o al terminar una prueba)."""
+    aplicacion = _estado['aplicacion']
+    if aplicacion is None:
+        return
+    _estado['aplicacion'] = None
+    await aplicacion.stop()
+    await aplicacion.shutdown()
+
+
+async def registrar_webhook():
+    """Registra TELEGRAM_BOT_WEBHOOK_URL (con el secreto) en Telegram."""
+    async with crear_bot() as bot:
+        await bot.set_webhook(
+            url=settings.TELEGRAM_BOT_WEBHOOK_URL,
+            secret_token=settings.TELEGRAM_BOT_WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES,
+        )
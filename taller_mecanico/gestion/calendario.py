@@ -0,0 +1,224 @@
+"""
+Feeds iCalendar (.ics) de la agenda del taller
+
+Permite suscribir la agenda desde el calendario del teléfono:
+- agenda: todas las citas (Agenda) y reparaciones programadas
+- mecanico:<id>: reparaciones programadas asignadas a un mecánico
+- cliente:<id>: citas y reparaciones programadas de un cliente
+
+Los feeds se protegen con un token firmado (django.core.signing) que
+codifica el alcance, por lo que no requieren sesión iniciada.
+
+Las aplicaciones de calendario consultan el feed cada pocos minutos, así
+que las respuestas son casi gratuitas:
+- Una "versión" global (VersionCalendario, una fila) se incrementa al
+  confirmar cada cambio en Agenda, Reparacion o Servicio (ver signals en
+  models.py). Está en la base para que la vean todos los procesos: el bot,
+  los comandos y cada worker web
+- ETag y Last-Modified se derivan de esa versión: si nada cambió la vista
+  responde 304 con una sola consulta (la de la versión)
+- El .ics generado se guarda en la caché con la versión en la clave; con
+  la caché local de cada proceso cada worker lo genera una vez por versión
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Agenda, Reparacion, VersionCalendario
+
+SALT_TOKEN = 'gestion.calendario'
+DURACION_CACHE_FEED = 60 * 60 * 24  # segundos
+DIAS_HISTORIAL = 30  # días hacia atrás que se incluyen en el feed
+DOMINIO_UID = 'taller-mecanico'
+
+ALCANCES = ('agenda', 'mecanico', 'cliente')
+
+
+# ========== TOKENS ==========
+
+def generar_token(tipo, objeto_id=None):
+    """Genera el token firmado para un alcance ('agenda', 'mecanico', 'cliente')."""
+    if tipo not in ALCANCES:
+        raise ValueError(f'Alcance de calendario desconocido: {tipo}')
+    alcance = tipo if objeto_id is None else f'{tipo}:{objeto_id}'
+    return signing.dumps(alcance, salt=SALT_TOKEN, compress=True)
+
+
+def leer_token(token):
+    """Devuelve (tipo, objeto_id) del token o None si la firma no es válida."""
+    try:
+        alcance = signing.loads(token, salt=SALT_TOKEN)
+    except signing.BadSignature:
+        return None
+    tipo, _, objeto_id = alcance.partition(':')
+    if tipo not in ALCANCES or (tipo != 'agenda' and not objeto_id.isdigit()):
+        return None
+    return tipo, int(objeto_id) if objeto_id else None
+
+
+def url_feed(tipo, objeto_id=None):
+    """Ruta relativa del feed .ics para un alcance."""
+    return reverse('calendario_ics', kwargs={'token': generar_token(tipo, objeto_id)})
+
+
+# ========== VERSIÓN E INVALIDACIÓN ==========
+
+def version_actual():
+    """VersionCalendario vigente (numero, modificada); se crea si no existe."""
+    version = VersionCalendario.objects.filter(pk=1).first()
+    if version is None:
+        version, _ = VersionCalendario.objects.get_or_create(pk=1)
+    return version
+
+
+def _incrementar_version():
+    if not VersionCalendario.objects.filter(pk=1).update(numero=F('numero') + 1, modificada=timezone.now()):
+        VersionCalendario.objects.get_or_create(pk=1)
+
+
+def invalidar_calendarios():
+    """
+    Marca todos los feeds como modificados (llamado desde signals).
+
+    Se incrementa al confirmar la transacción: así la fila no queda bloqueada
+    mientras dura cada reserva y nadie ve la versión nueva con los datos viejos.
+    Si el incremento falla (por ejemplo un bloqueo), el cambio ya está
+    guardado: se registra el error sin propagarlo a quien hizo el cambio (una
+    reserva confirmada no debe reintentarse).
+    """
+    transaction.on_commit(_incrementar_version, robust=True)
+
+
+def etag_feed(tipo, objeto_id, version=None):
+    version = version or version_actual()
+    return hashlib.md5(f'{tipo}:{objeto_id}:{version.numero}'.encode()).hexdigest()
+
+
+def ultima_modificacion(tipo, objeto_id, version=None):
+    return (version or version_actual()).modificada
+
+
+# ========== GENERACIÓN DEL ICS ==========
+
+def _escapar(texto):
+    return (str(texto or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def _plegar(linea):
+    """Pliega líneas de más de 75 octetos según RFC 5545."""
+    datos = linea.encode('utf-8')
+    if len(datos) <= 75:
+        return linea
+    partes = []
+    actual = ''
+    limite = 75
+    for caracter in linea:
+        if len((actual + caracter).encode('utf-8')) > limite:
+            partes.append(actual)
+            actual = caracter
+            limite = 74  # las líneas de continuación empiezan con un espacio
+        else:
+            actual += caracter
+    partes.append(actual)
+    return '\r\n '.join(partes)
+
+
+def _fecha_utc(fecha, hora):
+    inicio = timezone.make_aware(datetime.combine(fecha, hora))
+    return inicio.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _evento(uid, fecha, hora, duracion_minutos, resumen, descripcion, dtstamp):
+    inicio = datetime.combine(fecha, hora)
+    fin = inicio + timedelta(minutes=duracion_minutos or 60)
+    return [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{DOMINIO_UID}',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART:{_fecha_utc(fecha, hora)}',
+        f'DTEND:{_fecha_utc(fin.date(), fin.time())}',
+        f'SUMMARY:{_escapar(resumen)}',
+        f'DESCRIPTION:{_escapar(descripcion)}',
+        'END:VEVENT',
+    ]
+
+
+def _consultas(tipo, objeto_id):
+    """Querysets de citas y reparaciones programadas para un alcance."""
+    desde = timezone.now().date() - timedelta(days=DIAS_HISTORIAL)
+    citas = (Agenda.objects
+             .filter(fecha__gte=desde)
+             .select_related('cliente', 'servicio')
+             .order_by('fecha', 'hora'))
+    reparaciones = (Reparacion.objects
+                    .filter(fecha_programada__gte=desde, hora_programada__isnull=False)
+                    .exclude(estado_reparacion='cancelada')
+                    .select_related('vehiculo__cliente', 'servicio', 'mecanico_asignado')
+                    .order_by('fecha_programada', 'hora_programada'))
+
+    if tipo == 'mecanico':
+        citas = citas.none()
+        reparaciones = reparaciones.filter(mecanico_asignado_id=objeto_id)
+    elif tipo == 'cliente':
+        citas = citas.filter(cliente_id=objeto_id)
+        reparaciones = reparaciones.filter(vehiculo__cliente_id=objeto_id)
+    return citas, reparaciones
+
+
+def generar_ics(tipo, objeto_id=None, version=None):
+    """Genera el contenido .ics (str) para un alcance."""
+    modificada = (version or version_actual()).modificada
+    dtstamp = modificada.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    citas, reparaciones = _consultas(tipo, objeto_id)
+
+    lineas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Taller Mecanico//Agenda//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Taller Mecánico',
+        'X-PUBLISHED-TTL:PT15M',
+    ]
+    for cita in citas:
+        lineas += _evento(
+            f'cita-{cita.id}', cita.fecha, cita.hora, cita.servicio.duracion,
+            f'Cita: {cita.servicio} - {cita.cliente}',
+            f'Cliente: {cita.cliente}\nServicio: {cita.servicio}',
+            dtstamp,
+        )
+    for reparacion in reparaciones:
+        mecanico = reparacion.mecanico_asignado or 'Sin asignar'
+        lineas += _evento(
+            f'reparacion-{reparacion.id}', reparacion.fecha_programada, reparacion.hora_programada,
+            reparacion.servicio.duracion,
+            f'Reparación: {reparacion.servicio} - {reparacion.vehiculo}',
+            (f'Cliente: {reparacion.vehiculo.cliente}\n'
+             f'Estado: {reparacion.get_estado_reparacion_display()}\n'
+             f'Mecánico: {mecanico}'),
+            dtstamp,
+        )
+    lineas.append('END:VCALENDAR')
+    return '\r\n'.join(_plegar(linea) for linea in lineas) + '\r\n'
+
+
+def obtener_ics(tipo, objeto_id=None, version=None):
+    """Devuelve el .ics desde la caché (clave por versión) o lo genera."""
+    version = version or version_actual()
+    clave = f'calendario:{tipo}:{objeto_id}:{version.numero}'
+    contenido = cache.get(clave)
+    if contenido is None:
+        contenido = generar_ics(tipo, objeto_id, version)
+        cache.set(clave, contenido, DURACION_CACHE_FEED)
+    return contenido
@@ -0,0 +1,105 @@
+"""
+Catálogo de servicios en memoria
+
+Servicio es una tabla chica que casi no cambia, pero se lee en cada
+conversación del bot, en cada formulario de reparación o cita y en los
+reportes. Cada proceso la carga una vez y la reutiliza mientras no cambie
+la versión del catálogo:
+
+- La versión es un valor en la caché de Django (compartida si la caché lo es)
+- Guardar o eliminar un Servicio la renueva (signals en models.py), al
+  momento y otra vez al confirmar la transacción
+- Si la versión no cambió, leer el catálogo no consulta la base de datos
+
+Los cambios hechos sin pasar por save()/delete() (QuerySet.update, SQL
+directo) no renuevan la versión: llamar a invalidar_catalogo() en ese caso.
+Con la caché local por proceso (LocMem), los otros procesos recargan a lo
+sumo cada CATALOGO_SERVICIOS_SEGUNDOS.
+
+Los objetos devueltos se comparten entre peticiones: no modificarlos.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Servicio
+
+CLAVE_VERSION = 'catalogo:servicios:version'
+
+_lock = threading.Lock()
+_catalogo = None
+
+
+class _Catalogo:
+    def __init__(self, version, servicios):
+        self.version = version
+        self.cargado = time.monotonic()
+        self.servicios = tuple(servicios)
+        self.por_id = {servicio.id: servicio for servicio in self.servicios}
+
+    def vigente(self, version):
+        return (self.version == version
+                and time.monotonic() - self.cargado < settings.CATALOGO_SERVICIOS_SEGUNDOS)
+
+
+def invalidar_catalogo():
+    """Renueva la versión: todos los procesos recargan en su próxima lectura."""
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex, None)
+
+
+def _version():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Caché vacía (arranque o caché borrada): la primera versión la fija quien llegue antes
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _obtener():
+    global _catalogo
+    version = _version()
+    catalogo = _catalogo
+    if catalogo is None or not catalogo.vigente(version):
+        with _lock:
+            catalogo = _catalogo
+            if catalogo is None or not catalogo.vigente(version):
+                catalogo = _catalogo = _Catalogo(version, Servicio.objects.order_by('nombre_servicio', 'id'))
+    return catalogo
+
+
+def servicios():
+    """Servicios ordenados por nombre."""
+    return list(_obtener().servicios)
+
+
+def obtener_servicio(servicio_id):
+    """
+    Servicio por id.
+
+    Raises:
+        Servicio.DoesNotExist: igual que Servicio.objects.get()
+    """
+    try:
+        return _obtener().por_id[int(servicio_id)]
+    except (KeyError, TypeError, ValueError):
+        raise Servicio.DoesNotExist(f'No existe el servicio {servicio_id!r}')
+
+
+def nombres_servicios():
+    """{id: nombre} para armar reportes sin unir la tabla de servicios."""
+    return {servicio.id: servicio.nombre_servicio for servicio in _obtener().servicios}
+
+
+def opciones_servicio(campo):
+    """
+    Carga las opciones de un ModelChoiceField de servicios desde el catálogo,
+    para que mostrar el formulario no consulte la tabla.
+    """
+    opciones = [('', campo.empty_label)] if campo.empty_label is not None else []
+    opciones += [(servicio.pk, campo.label_from_instance(servicio)) for servicio in servicios()]
+    campo.choices = opciones
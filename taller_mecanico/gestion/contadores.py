@@ -0,0 +1,227 @@
+"""
+Contadores de cada cliente
+
+Cliente guarda num_vehiculos, num_reparaciones, total_facturado (total de
+las reparaciones completadas) y ultima_visita (último ingreso) para que los
+listados no tengan que recorrer vehículos y reparaciones. Incluyen las
+reparaciones archivadas.
+
+Los signals de models.py los mantienen con UPDATE ... SET campo = campo + n
+(F()), sin leer el valor antes, así dos cambios simultáneos no se pisan:
+
+- alta o baja de un vehículo, o cambio de dueño (este se recalcula)
+- alta o baja de una reparación, o cambio de vehículo o estado
+- alta, cambio o baja de una línea (Reparacion.total y, si la reparación
+  está completada, total_facturado)
+
+Lo que no pasa por los signals (QuerySet.update(), SQL directo) se corrige
+con python manage.py verificar_contadores_clientes, que revisa también
+Reparacion.total contra la suma de sus líneas.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Cliente, LineaReparacion, Reparacion, ReparacionArchivada, Vehiculo
+
+ESTADO_FACTURADO = 'completada'
+
+_pausados = ContextVar('contadores_clientes_pausados', default=False)
+
+
+@contextmanager
+def contadores_pausados():
+    """Los borrados dentro del bloque no descuentan (archivo y purga de clientes)."""
+    token = _pausados.set(True)
+    try:
+        yield
+    finally:
+        _pausados.reset(token)
+
+
+def pausados():
+    return _pausados.get()
+
+
+def _cliente_de(vehiculo_id):
+    return Vehiculo.todos.filter(pk=vehiculo_id).values_list('cliente_id', flat=True).first()
+
+
+def _facturado(estado, reparacion_id):
+    if estado != ESTADO_FACTURADO:
+        return 0
+    return Reparacion.todos.filter(pk=reparacion_id).values_list('total', flat=True).first() or 0
+
+
+def sumar(cliente_id, vehiculos=0, reparaciones=0, facturado=0, visita=None):
+    """Suma (o resta, con valores negativos) a los contadores del cliente en un UPDATE."""
+    cambios = {}
+    if vehiculos:
+        cambios['num_vehiculos'] = F('num_vehiculos') + vehiculos
+    if reparaciones:
+        cambios['num_reparaciones'] = F('num_reparaciones') + reparaciones
+    if facturado:
+        cambios['total_facturado'] = F('total_facturado') + facturado
+    if visita is not None:
+        cambios['ultima_visita'] = Greatest(Coalesce('ultima_visita', Value(visita)), Value(visita))
+    if cliente_id and cambios:
+        Cliente.objects.filter(pk=cliente_id).update(**cambios)
+
+
+def reparacion_agregada(reparacion):
+    # Nace sin líneas: lo facturado lo suman las líneas (sumar_al_total)
+    sumar(reparacion.vehiculo.cliente_id, reparaciones=1, visita=reparacion.fecha_ingreso)
+
+
+def reparacion_modificada(anterior, reparacion):
+    """
+    Mueve el aporte de la reparación según lo que cambió.
+
+    anterior es (vehiculo_id, estado) al cargarla; si alguno no se cargó
+    (campo diferido) se recalculan los clientes afectados.
+    """
+    vehiculo_id, estado = anterior
+    if None in anterior:
+        recalcular([cliente for cliente in (_cliente_de(vehiculo_id), reparacion.vehiculo.cliente_id) if cliente])
+        return
+    cliente_anterior = _cliente_de(vehiculo_id) if vehiculo_id != reparacion.vehiculo_id else reparacion.vehiculo.cliente_id
+    cliente_nuevo = reparacion.vehiculo.cliente_id
+    facturado_anterior = _facturado(estado, reparacion.pk)
+    facturado_nuevo = _facturado(reparacion.estado_reparacion, reparacion.pk)
+    if cliente_anterior == cliente_nuevo:
+        sumar(cliente_nuevo, facturado=facturado_nuevo - facturado_anterior)
+    else:
+        sumar(cliente_anterior, reparaciones=-1, facturado=-facturado_anterior)
+        _quitar_visita(cliente_anterior, reparacion.fecha_ingreso)
+        sumar(cliente_nuevo, reparaciones=1, facturado=facturado_nuevo, visita=reparacion.fecha_ingreso)
+
+
+def reparacion_eliminada(reparacion):
+    # Lo facturado ya lo restaron las líneas, borradas antes en la cascada
+    cliente_id = _cliente_de(reparacion.vehiculo_id)
+    if cliente_id is None:
+        return
+    sumar(cliente_id, reparaciones=-1)
+    _quitar_visita(cliente_id, reparacion.fecha_ingreso)
+
+
+def sumar_al_total(reparacion_id, diferencia):
+    """Suma la diferencia de una línea a Reparacion.total y, si está completada, al cliente."""
+    if not diferencia or pausados():
+        return
+    reparacion = (Reparacion.todos.filter(pk=reparacion_id)
+                  .values('estado_reparacion', 'vehiculo__cliente_id').first())
+    if reparacion is None:
+        return
+    Reparacion.todos.filter(pk=reparacion_id).update(total=F('total') + diferencia)
+    if reparacion['estado_reparacion'] == ESTADO_FACTURADO:
+        sumar(reparacion['vehiculo__cliente_id'], facturado=diferencia)
+
+
+def _quitar_visita(cliente_id, fecha):
+    """La última visita no se puede restar: se recalcula si era la de la reparación que sale."""
+    Cliente.objects.filter(pk=cliente_id, ultima_visita=fecha).update(ultima_visita=valores_reales()['ultima_visita'])
+
+
+# ========== VERIFICACIÓN ==========
+
+def _por_cliente(queryset, campo_cliente, expresion):
+    """Subconsulta con expresion agregada por cliente."""
+    return Subquery(
+        queryset.filter(**{campo_cliente: OuterRef('pk')}).order_by()
+        .values(campo_cliente).annotate(valor=expresion).values('valor')
+    )
+
+
+def valores_reales():
+    """Expresiones que calculan cada contador desde vehículos y reparaciones (vivas y archivadas)."""
+    dinero = DecimalField(max_digits=12, decimal_places=2)
+    cero = Value(0, output_field=dinero)
+    vivas = Reparacion.objects.all()
+    archivadas = ReparacionArchivada.objects.all()
+    ultima_viva = _por_cliente(vivas, 'vehiculo__cliente', Max('fecha_ingreso'))
+    ultima_archivada = _por_cliente(archivadas, 'vehiculo__cliente', Max('fecha_ingreso'))
+    return {
+        'num_vehiculos': Coalesce(_por_cliente(Vehiculo.objects.all(), 'cliente', Count('pk')), 0),
+        'num_reparaciones': (Coalesce(_por_cliente(vivas, 'vehiculo__cliente', Count('pk')), 0)
+                             + Coalesce(_por_cliente(archivadas, 'vehiculo__cliente', Count('pk')), 0)),
+        'total_facturado': (
+            Coalesce(_por_cliente(vivas.filter(estado_reparacion=ESTADO_FACTURADO), 'vehiculo__cliente',
+                                  Sum('total')), cero, output_field=dinero)
+            + Coalesce(_por_cliente(archivadas.filter(estado_reparacion=ESTADO_FACTURADO), 'vehiculo__cliente',
+                                    Sum('costo')), cero, output_field=dinero)
+        ),
+        # GREATEST con NULL da NULL en SQLite y no en PostgreSQL: se evita el NULL
+        'ultima_visita': Greatest(Coalesce(ultima_viva, ultima_archivada), Coalesce(ultima_archivada, ultima_viva)),
+    }
+
+
+def recalcular(cliente_ids):
+    """Recalcula desde cero los contadores de estos clientes en un UPDATE."""
+    if cliente_ids:
+        Cliente.objects.filter(pk__in=cliente_ids).update(**valores_reales())
+
+
+def verificar(reparar=False, tamaño_lote=500):
+    """
+    Compara los contadores guardados con los reales, por lotes de clientes.
+
+    Returns:
+        lista de (cliente_id, {campo: (guardado, real)}) con diferencias;
+        con reparar=True además se corrigen
+    """
+    reales = {f'real_{campo}': expresion for campo, expresion in valores_reales().items()}
+    diferencias = []
+    ultimo = 0
+    while True:
+        lote = list(Cliente.objects.filter(pk__gt=ultimo).order_by('pk')
+                    .annotate(**reales).values('pk', *Cliente.CONTADORES, *reales)[:tamaño_lote])
+        if not lote:
+            return diferencias
+        ultimo = lote[-1]['pk']
+        con_error = []
+        for fila in lote:
+            campos = {campo: (fila[campo], fila[f'real_{campo}']) for campo in Cliente.CONTADORES
+                      if fila[campo] != fila[f'real_{campo}']}
+            if campos:
+                diferencias.append((fila['pk'], campos))
+                con_error.append(fila['pk'])
+        if reparar:
+            recalcular(con_error)
+
+
+def total_real():
+    """Expresión con la suma de los subtotales de las líneas de la reparación."""
+    dinero = DecimalField(max_digits=12, decimal_places=2)
+    suma = Subquery(
+        LineaReparacion.objects.filter(reparacion=OuterRef('pk')).order_by()
+        .values('reparacion').annotate(suma=Sum('subtotal')).values('suma')
+    )
+    return Coalesce(suma, Value(0, output_field=dinero), output_field=dinero)
+
+
+def verificar_totales(reparar=False, tamaño_lote=500):
+    """
+    Compara Reparacion.total con la suma de sus líneas, por lotes de reparaciones.
+
+    Returns:
+        lista de (reparacion_id, guardado, real) con diferencias; con
+        reparar=True además se corrigen los totales y los contadores de
+        los clientes afectados
+    """
+    diferencias = []
+    ultimo = 0
+    while True:
+        lote = list(Reparacion.todos.filter(pk__gt=ultimo).order_by('pk')
+                    .annotate(real=total_real()).values('pk', 'total', 'real', 'vehiculo__cliente_id')[:tamaño_lote])
+        if not lote:
+            return diferencias
+        ultimo = lote[-1]['pk']
+        con_error = [fila for fila in lote if fila['total'] != fila['real']]
+        diferencias.extend((fila['pk'], fila['total'], fila['real']) for fila in con_error)
+        if reparar and con_error:
+            Reparacion.todos.filter(pk__in=[fila['pk'] for fila in con_error]).update(total=total_real())
+            recalcular({fila['vehiculo__cliente_id'] for fila in con_error})
@@ -0,0 +1,110 @@
+"""
+Disponibilidad de horarios del taller
+
+Calcula qué horarios quedan libres por día a partir de las citas (Agenda)
+y de las reparaciones programadas que ocupan horario. Todos los horarios
+ocupados de un rango de fechas se obtienen en UNA sola consulta (UNION de
+ambas tablas), y el resto se calcula en memoria.
+
+Lo usan:
+- La API de disponibilidad mensual y la de horas de un día (views.py)
+- CitaForm, para ofrecer solo horas reservables
+- El bot de Telegram, para ofrecer solo fechas y horas con lugar
+"""
+
+import calendar
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Agenda, Reparacion
+
+# Horario de atención del taller
+HORA_APERTURA = time(8, 0)
+HORA_CIERRE = time(18, 0)  # último turno que se puede reservar
+INTERVALO_MINUTOS = 30
+
+
+def horarios_del_dia(intervalo=INTERVALO_MINUTOS):
+    """Lista de turnos (time) entre la apertura y el cierre."""
+    horarios = []
+    actual = datetime.combine(datetime.min.date(), HORA_APERTURA)
+    fin = datetime.combine(datetime.min.date(), HORA_CIERRE)
+    while actual <= fin:
+        horarios.append(actual.time())
+        actual += timedelta(minutes=intervalo)
+    return horarios
+
+
+def horarios_ocupados(desde, hasta, excluir_cita=None):
+    """
+    Horarios ocupados entre dos fechas (inclusive), en una sola consulta.
+
+    Returns:
+        dict {fecha: set(time)}
+    """
+    citas = Agenda.objects.filter(fecha__range=(desde, hasta))
+    if excluir_cita:
+        citas = citas.exclude(pk=excluir_cita)
+    reparaciones = Reparacion.objects.filter(
+        fecha_programada__range=(desde, hasta),
+        hora_programada__isnull=False,
+        estado_reparacion__in=Reparacion.ESTADOS_OCUPAN_HORARIO,
+    )
+    consulta = citas.values_list('fecha', 'hora').order_by().union(
+        reparaciones.values_list('fecha_programada', 'hora_programada').order_by(),
+        all=True,
+    )
+    ocupados = defaultdict(set)
+    for fecha, hora in consulta:
+        ocupados[fecha].add(hora.replace(second=0, microsecond=0))
+    return ocupados
+
+
+def disponibilidad_rango(desde, hasta, intervalo=INTERVALO_MINUTOS, excluir_cita=None):
+    """
+    Turnos libres por día entre dos fechas (inclusive).
+
+    Los días pasados y los turnos de hoy que ya pasaron no se ofrecen.
+
+    Returns:
+        list de dicts {'fecha': date, 'libres': int, 'horas': [time, ...]}
+    """
+    ahora = timezone.localtime()
+    hoy = ahora.date()
+    desde = max(desde, hoy)
+    if desde > hasta:
+        return []
+
+    turnos = horarios_del_dia(intervalo)
+    ocupados = horarios_ocupados(desde, hasta, excluir_cita=excluir_cita)
+    dias = []
+    fecha = desde
+    while fecha <= hasta:
+        tomados = ocupados.get(fecha, set())
+        libres = [h for h in turnos if h not in tomados and (fecha > hoy or h > ahora.time())]
+        dias.append({'fecha': fecha, 'libres': len(libres), 'horas': libres})
+        fecha += timedelta(days=1)
+    return dias
+
+
+def disponibilidad_mes(año, mes, intervalo=INTERVALO_MINUTOS):
+    """Turnos libres por día de un mes completo (ver disponibilidad_rango)."""
+    ultimo_dia = calendar.monthrange(año, mes)[1]
+    inicio = datetime(año, mes, 1).date()
+    fin = datetime(año, mes, ultimo_dia).date()
+    return disponibilidad_rango(inicio, fin, intervalo)
+
+
+def horas_libres(fecha, intervalo=INTERVALO_MINUTOS, excluir_cita=None):
+    """Turnos libres de un día concreto."""
+    dias = disponibilidad_rango(fecha, fecha, intervalo, excluir_cita=excluir_cita)
+    return dias[0]['horas'] if dias else []
+
+
+def fechas_con_lugar(dias_adelante, intervalo=INTERVALO_MINUTOS, desde=None):
+    """Próximos días (a partir de mañana por defecto) que tienen al menos un turno libre."""
+    desde = desde or timezone.localdate() + timedelta(days=1)
+    hasta = desde + timedelta(days=dias_adelante - 1)
+    return [dia for dia in disponibilidad_rango(desde, hasta, intervalo) if dia['libres']]
@@ -0,0 +1,64 @@
+"""
+Origen de los cambios de estado de las reparaciones
+
+El signal registrar_evento_estado (models.py) no recibe la petición: el
+origen ('web', 'admin', 'api', 'bot') y el usuario de cada ReparacionEvento
+salen de una variable de contexto que fijan:
+
+- OrigenCambiosMiddleware, durante cada petición (según la ruta)
+- origen_cambios('bot'), alrededor de las reservas del bot
+
+Las variables de contexto pasan a los hilos de sync_to_async, así que el
+origen se conserva también en las consultas del bot. Fuera de estos
+contextos (comandos, shell) el origen es 'sistema'.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ORIGEN_SISTEMA = 'sistema'
+
+_origen = ContextVar('origen_cambios_reparacion', default=None)
+
+
+@contextmanager
+def origen_cambios(origen, usuario=None):
+    """Los cambios de estado dentro del bloque se registran con este origen y usuario."""
+    token = _origen.set((origen, usuario))
+    try:
+        yield
+    finally:
+        _origen.reset(token)
+
+
+def origen_actual():
+    """(origen, usuario o None) del contexto actual."""
+    valor = _origen.get()
+    if valor is None:
+        return ORIGEN_SISTEMA, None
+    origen, usuario = valor
+    if hasattr(usuario, 'user'):
+        # Petición en curso: el usuario se lee al guardar (DRF lo autentica después del middleware)
+        usuario = usuario.user
+    if usuario is None or not usuario.is_authenticated:
+        return origen, None
+    return origen, usuario
+
+
+def origen_de_ruta(ruta):
+    if ruta.startswith('/admin/'):
+        return 'admin'
+    if '/api/' in ruta:
+        return 'api'
+    return 'web'
+
+
+class OrigenCambiosMiddleware:
+    """Registra como origen de los cambios la petición en curso."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with origen_cambios(origen_de_ruta(request.path_info), request):
+            return self.get_response(request)
@@ -17,11 +17,17 @@ Cada formulario incluye:
 - Widgets personalizados según el tipo de dato
 """
 
+from datetime import datetime
+
 from django import forms
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from .models import Cliente, Empleado, Servicio, Vehiculo, Reparacion, Agenda, Tarea
+from .models import Cliente, Empleado, Servicio, Vehiculo, Reparacion, LineaReparacion, Agenda, Tarea, NotaReparacion
+from .catalogo import opciones_servicio
+from .disponibilidad import horas_libres
+from .purga import MENSAJE_PLACA_EN_PURGA, placa_en_purga
+from .reservas import horario_tomado
 
 class ClienteForm(forms.ModelForm):
     """
@@ -215,6 +221,13 @@ class VehiculoForm(forms.ModelForm):
             }),
         }
 
+    def clean_placa(self):
+        """La placa de un vehículo oculto (cliente eliminado) sigue ocupada hasta la purga."""
+        placa = self.cleaned_data.get('placa')
+        if placa and placa_en_purga(placa, self.instance):
+            raise ValidationError(MENSAJE_PLACA_EN_PURGA, code='unique')
+        return placa
+
 
 class ReparacionForm(forms.ModelForm):
     """
@@ -259,6 +272,18 @@ class ReparacionForm(forms.ModelForm):
             'title': 'Seleccione el estado de la reparación'
         })
     )
+
+    # No es el campo del modelo: cada nota se agrega como NotaReparacion
+    notas = forms.CharField(
+        required=False,
+        label='Agregar Nota',
+        help_text='La nota se agrega al historial de la reparación.',
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 3,
+            'placeholder': 'Ingrese notas adicionales sobre la reparación...'
+        })
+    )
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -268,16 +293,19 @@ class ReparacionForm(forms.ModelForm):
             self.initial['condicion_vehiculo'] = 'regular'
             self.initial['estado_reparacion'] = 'pendiente'
         
-        # Personalizar el campo de notas
-        self.fields['notas'].widget = forms.Textarea(attrs={
-            'class': 'form-control',
-            'rows': 3,
-            'placeholder': 'Ingrese notas adicionales sobre la reparación...'
-        })
+        # Servicios desde el catálogo en memoria (sin consultar la tabla)
+        opciones_servicio(self.fields['servicio'])
+
+    def guardar_nota(self, autor):
+        """Agrega la nota escrita (si hay) al historial de la reparación guardada."""
+        texto = self.cleaned_data.get('notas', '').strip()
+        if texto:
+            return NotaReparacion.objects.create(reparacion=self.instance, autor=autor, tipo='observacion', texto=texto)
+        return None
 
     class Meta:
         model = Reparacion
-        fields = ['vehiculo', 'servicio', 'fecha_salida', 'condicion_vehiculo', 'estado_reparacion', 'notas']
+        fields = ['vehiculo', 'servicio', 'fecha_salida', 'condicion_vehiculo', 'estado_reparacion']
         
         # Labels personalizados
         labels = {
@@ -286,7 +314,6 @@ class ReparacionForm(forms.ModelForm):
             'fecha_salida': 'Fecha de Salida (opcional)',
             'condicion_vehiculo': 'Condición del Vehículo',
             'estado_reparacion': 'Estado de la Reparación',
-            'notas': 'Notas Adicionales'
         }
         
         # Widgets personalizados
@@ -308,7 +335,29 @@ class ReparacionForm(forms.ModelForm):
         help_texts = {
             'condicion_vehiculo': 'Seleccione la condición actual del vehículo.',
             'estado_reparacion': 'Seleccione el estado actual de la reparación.',
-            'notas': 'Puede agregar notas adicionales sobre la reparación.'
+        }
+
+
+class LineaReparacionForm(forms.ModelForm):
+    """
+    Línea (servicio o repuesto) de una reparación, para el formset de edición.
+
+    Sin precio, una línea de servicio toma el costo actual del servicio.
+    """
+
+    class Meta:
+        model = LineaReparacion
+        fields = ['tipo', 'servicio', 'descripcion', 'cantidad', 'precio_unitario']
+        labels = {
+            'descripcion': 'Descripción',
+            'precio_unitario': 'Precio unitario',
+        }
+        widgets = {
+            'tipo': forms.Select(attrs={'class': 'form-select'}),
+            'servicio': forms.Select(attrs={'class': 'form-select'}),
+            'descripcion': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: Pastillas de freno'}),
+            'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
+            'precio_unitario': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
         }
 
 
@@ -451,27 +500,44 @@ class CitaForm(forms.ModelForm):
                 'required': True
             })
         }
-    
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        opciones_servicio(self.fields['servicio'])
+        # Al mostrar el formulario solo se ofrecen las horas libres del día
+        # elegido. Con datos enviados se dejan todas: la restricción única da
+        # un mensaje más claro si el horario se ocupó mientras tanto.
+        if not self.is_bound:
+            fecha = self.initial.get('fecha') or self.instance.fecha
+            if fecha:
+                self.fields['hora'].choices = self.opciones_hora(fecha)
+
+    def opciones_hora(self, fecha):
+        """Opciones de hora reservables para la fecha (incluye la hora actual de la cita)."""
+        if isinstance(fecha, str):
+            try:
+                fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
+            except ValueError:
+                return self.HORAS_CHOICES
+        libres = {h.strftime('%H:%M') for h in horas_libres(fecha, excluir_cita=self.instance.pk)}
+        if self.instance.pk and self.instance.hora:
+            libres.add(self.instance.hora.strftime('%H:%M'))
+        return [(valor, etiqueta) for valor, etiqueta in self.HORAS_CHOICES if valor in libres]
+
     def clean_fecha(self):
         """Valida que la fecha no sea pasada"""
         fecha = self.cleaned_data.get('fecha')
         if fecha and fecha < timezone.now().date():
             raise ValidationError('No se pueden agendar citas en fechas pasadas.')
         return fecha
-    
-    def clean(self):
-        """Valida que no exista otra cita en la misma fecha y hora"""
-        cleaned_data = super().clean()
-        fecha = cleaned_data.get('fecha')
-        hora = cleaned_data.get('hora')
-        
+
+    def clean_hora(self):
+        """Valida que el turno no esté tomado por otra cita ni por una reparación programada."""
+        hora = self.cleaned_data.get('hora')
+        fecha = self.cleaned_data.get('fecha')
         if fecha and hora:
-            # Si estamos editando una cita, excluirla de la validación
-            if self.instance and self.instance.pk:
-                if Agenda.objects.filter(fecha=fecha, hora=hora).exclude(pk=self.instance.pk).exists():
-                    raise ValidationError('Ya existe una cita programada para esta fecha y hora.')
-            # Si es una cita nueva
-            elif Agenda.objects.filter(fecha=fecha, hora=hora).exists():
-                raise ValidationError('Ya existe una cita programada para esta fecha y hora.')
-        
-        return cleaned_data
+            if isinstance(hora, str):
+                hora = datetime.strptime(hora, '%H:%M').time()
+            if horario_tomado(fecha, hora, cita=self.instance):
+                raise ValidationError('El horario seleccionado ya está reservado.', code='horario_ocupado')
+        return self.cleaned_data.get('hora')
@@ -0,0 +1,38 @@
+"""
+Comando para mover al archivo las reparaciones cerradas y tareas antiguas.
+
+Pasa las reparaciones completadas o canceladas, sus tareas e historial, y
+las tareas completadas sueltas que superan el horizonte a las tablas de
+archivo, por lotes (ver gestion/archivo.py). Pensado para cron.
+
+Uso:
+    python manage.py archivar_reparaciones
+    python manage.py archivar_reparaciones --dias 730 --lote 200
+    python manage.py archivar_reparaciones --simular
+"""
+from django.core.management.base import BaseCommand
+
+from gestion.archivo import archivar
+
+
+class Command(BaseCommand):
+    help = 'Mueve al archivo las reparaciones cerradas y las tareas completadas más antiguas que el horizonte'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Antigüedad mínima en días (por defecto ARCHIVO_HORIZONTE_DIAS)')
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Reparaciones por transacción (por defecto ARCHIVO_TAMAÑO_LOTE)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo cuenta lo que se archivaría')
+
+    def handle(self, *args, **options):
+        def progreso(total):
+            self.stdout.write(f"  {total['reparaciones']} reparación(es), {total['tareas']} tarea(s)...")
+
+        total = archivar(options['dias'], options['lote'], simular=options['simular'],
+                         progreso=progreso if options['verbosity'] else None)
+        accion = 'se archivarían' if options['simular'] else 'archivadas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{total['reparaciones']} reparación(es) y {total['tareas']} tarea(s) {accion}"
+        ))
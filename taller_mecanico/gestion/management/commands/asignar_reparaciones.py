@@ -0,0 +1,44 @@
+"""
+Comando para asignar en lote las reparaciones pendientes sin mecánico.
+
+Reparte las reparaciones según la carga de trabajo abierta de cada mecánico
+(ver gestion/asignacion.py).
+
+Uso:
+    python manage.py asignar_reparaciones
+    python manage.py asignar_reparaciones --simular
+    python manage.py asignar_reparaciones --limite 50
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion.asignacion import asignar_pendientes
+from gestion.models import Empleado
+
+
+class Command(BaseCommand):
+    help = 'Asigna las reparaciones pendientes a los mecánicos con menor carga de trabajo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo muestra el plan de asignación sin guardarlo')
+        parser.add_argument('--limite', type=int, default=None,
+                            help='Máximo de reparaciones a asignar (las de mayor prioridad)')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        plan = asignar_pendientes(limite=options['limite'], aplicar=not options['simular'])
+        duracion = (time.perf_counter() - inicio) * 1000
+
+        if not plan:
+            self.stdout.write(self.style.WARNING('No hay reparaciones pendientes para asignar (o no hay mecánicos).'))
+            return
+
+        nombres = dict(Empleado.objects.filter(id__in=plan.keys()).values_list('id', 'nombre'))
+        total = sum(len(ids) for ids in plan.values())
+        titulo = 'PLAN DE ASIGNACIÓN (simulación)' if options['simular'] else 'REPARACIONES ASIGNADAS'
+        self.stdout.write(self.style.SUCCESS(f'\n=== {titulo} ===\n'))
+        for mecanico_id, ids in sorted(plan.items(), key=lambda item: -len(item[1])):
+            self.stdout.write(f'  • {nombres.get(mecanico_id, mecanico_id)}: {len(ids)} reparación(es)')
+        self.stdout.write(self.style.SUCCESS(f'\nTotal: {total} reparaciones en {duracion:.0f} ms\n'))
@@ -0,0 +1,96 @@
+"""
+Comando para medir cuántas reservas simultáneas soporta el bot de Telegram.
+
+Levanta una Bot API falsa en local (gestion/bot/api_local.py) y simula N
+usuarios que recorren a la vez la conversación completa, desde /start
+hasta la confirmación (ver gestion/bot/carga.py). Informa la latencia por
+paso (p50/p95), las consultas a la base de datos y el rendimiento.
+
+Todo se ejecuta dentro de una transacción que se revierte al final: no
+quedan clientes, vehículos, reparaciones ni estado del bot en la base.
+
+Uso:
+    python manage.py benchmark_bot
+    python manage.py benchmark_bot --usuarios 200 --latencia 50
+    python manage.py benchmark_bot --concurrencia 1   # de a una actualización
+"""
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from gestion.bot.api_local import ServidorBotAPI
+from gestion.bot.carga import PASOS_TEXTO, SimulacionCarga
+from gestion.management.commands.run_telegram_bot import build_application
+from gestion.models import Servicio
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga del bot de Telegram contra una Bot API local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=50,
+                            help='Usuarios simultáneos (por defecto 50)')
+        parser.add_argument('--latencia', type=float, default=0,
+                            help='Latencia simulada de la Bot API en milisegundos')
+        parser.add_argument('--concurrencia', type=int, default=None,
+                            help='Chats procesados a la vez (por defecto TELEGRAM_BOT_CONCURRENCIA)')
+        parser.add_argument('--sin-persistencia', action='store_true',
+                            help='No guarda el estado de las conversaciones en la base de datos')
+
+    def handle(self, *args, **options):
+        if options['usuarios'] < 1:
+            raise CommandError('--usuarios debe ser mayor que cero')
+        concurrencia = options['concurrencia'] or settings.TELEGRAM_BOT_CONCURRENCIA
+
+        with ServidorBotAPI(latencia=options['latencia'] / 1000) as servidor, override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC',
+            TELEGRAM_BOT_API_URL=servidor.base_url,
+            TELEGRAM_BOT_CONCURRENCIA=concurrencia,
+            TELEGRAM_BOT_PERSISTENCIA=not options['sin_persistencia'],
+        ):
+            with transaction.atomic():
+                if not Servicio.objects.exists():
+                    Servicio.objects.create(nombre_servicio='Benchmark bot', costo=0, duracion=60)
+                with CaptureQueriesContext(connection) as consultas:
+                    resultado = async_to_sync(self._simular)(servidor, options['usuarios'])
+                transaction.set_rollback(True)
+
+        self._informar(resultado, len(consultas), concurrencia)
+
+    @staticmethod
+    async def _simular(servidor, usuarios):
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        await aplicacion.start()
+        try:
+            return await SimulacionCarga(aplicacion, servidor).ejecutar(usuarios)
+        finally:
+            await aplicacion.stop()
+            await aplicacion.shutdown()
+
+    def _informar(self, resultado, consultas, concurrencia):
+        usuarios = resultado['usuarios']
+        duracion = resultado['duracion']
+        self.stdout.write(f'Usuarios: {usuarios}  concurrencia: {concurrencia}  duración: {duracion:.2f} s')
+        self.stdout.write('')
+        self.stdout.write(f'{"paso":<14}{"p50 (ms)":>10}{"p95 (ms)":>10}')
+        for paso in [*PASOS_TEXTO, 'servicio', 'fecha', 'hora', 'confirmacion']:
+            if paso in resultado['latencias']:
+                p50, p95 = resultado['latencias'][paso]
+                self.stdout.write(f'{paso:<14}{p50:>10.2f}{p95:>10.2f}')
+        p50, p95 = resultado['latencia_total']
+        self.stdout.write(f'{"total":<14}{p50:>10.2f}{p95:>10.2f}')
+        self.stdout.write('')
+        self.stdout.write(
+            f'Consultas: {consultas} ({consultas / usuarios:.1f} por usuario, '
+            f'{consultas / max(resultado["actualizaciones"], 1):.1f} por actualización)'
+        )
+        self.stdout.write(
+            f'Rendimiento: {resultado["actualizaciones"] / duracion:.1f} actualizaciones/s, '
+            f'{resultado["resultados"].get("reservada", 0) / duracion:.1f} reservas/s'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Resultados: ' + ', '.join(f'{clave}={valor}' for clave, valor in sorted(resultado['resultados'].items()))
+        ))
@@ -0,0 +1,122 @@
+"""
+Comando para medir cuánto tarda el bot de Telegram en guardar una solicitud.
+
+Compara el camino anterior (un sync_to_async por cada consulta: cliente,
+vehículo y reparación por separado) con reservar_desde_bot (una única
+llamada dentro de una transacción). Todo se ejecuta dentro de una
+transacción que se revierte al final: no queda ningún dato en la base.
+
+Uso:
+    python manage.py benchmark_reserva_bot
+    python manage.py benchmark_reserva_bot --reservas 500
+"""
+import statistics
+import time
+import uuid
+from datetime import time as hora, timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from gestion.models import Cliente, Servicio, Vehiculo
+from gestion.reservas import reservar_desde_bot, reservar_reparacion
+
+
+async def camino_anterior(datos):
+    """Versión anterior de create_repair_in_db: hasta seis sync_to_async por reserva."""
+    nombre = datos['nombre_completo'].split()
+    try:
+        cliente = await sync_to_async(Cliente.objects.get)(telefono=datos['telefono'])
+        if cliente.nombre != nombre[0] or cliente.telegram_chat_id != datos['chat_id']:
+            cliente.nombre = nombre[0]
+            cliente.apellido = ' '.join(nombre[1:])
+            cliente.telegram_chat_id = datos['chat_id']
+            await sync_to_async(cliente.save)()
+    except Cliente.DoesNotExist:
+        cliente = await sync_to_async(Cliente.objects.create)(
+            correo_electronico=f"telegram_{datos['telefono']}_{uuid.uuid4().hex[:8]}@bot.local",
+            nombre=nombre[0],
+            apellido=' '.join(nombre[1:]),
+            telefono=datos['telefono'],
+            direccion='Cliente Telegram',
+            telegram_chat_id=datos['chat_id'],
+        )
+    try:
+        vehiculo = await sync_to_async(Vehiculo.objects.get)(cliente=cliente, placa=datos['placa'])
+        if (vehiculo.marca, vehiculo.modelo, vehiculo.año) != (datos['marca'], datos['modelo'], datos['año']):
+            vehiculo.marca, vehiculo.modelo, vehiculo.año = datos['marca'], datos['modelo'], datos['año']
+            await sync_to_async(vehiculo.save)()
+    except Vehiculo.DoesNotExist:
+        vehiculo = await sync_to_async(Vehiculo.objects.create)(
+            cliente=cliente, marca=datos['marca'], modelo=datos['modelo'],
+            año=datos['año'], placa=datos['placa'],
+        )
+    return await sync_to_async(reservar_reparacion)(
+        vehiculo=vehiculo,
+        servicio_id=datos['servicio_id'],
+        condicion_vehiculo='regular',
+        estado_reparacion='pendiente',
+        fecha_programada=datos['fecha'],
+        hora_programada=datos['hora'],
+    )
+
+
+async def camino_nuevo(datos):
+    return await sync_to_async(reservar_desde_bot)(**datos)
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia por reserva del bot de Telegram (camino anterior vs. una sola transacción)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=200,
+                            help='Reservas a crear con cada camino (por defecto 200)')
+
+    def handle(self, *args, **options):
+        cantidad = options['reservas']
+        if cantidad < 1:
+            raise CommandError('--reservas debe ser mayor que cero')
+
+        with transaction.atomic():
+            servicio = Servicio.objects.create(nombre_servicio='Benchmark bot', costo=0, duracion=60)
+            # Fechas lejanas para no chocar con reservas reales
+            inicio = timezone.now().date() + timedelta(days=3650)
+            for indice, (nombre, camino) in enumerate([('anterior', camino_anterior), ('nuevo', camino_nuevo)]):
+                solicitudes = [
+                    {
+                        'nombre_completo': 'Cliente Benchmark',
+                        'telefono': f'bench-{indice}-{i}',
+                        'chat_id': str(i),
+                        'marca': 'Ford',
+                        'modelo': 'Ka',
+                        'año': 2015,
+                        'placa': f'BN{indice}{i:05d}',
+                        'servicio_id': servicio.id,
+                        'fecha': inicio + timedelta(days=indice * cantidad + i),
+                        'hora': hora(9, 0),
+                    }
+                    for i in range(cantidad)
+                ]
+                with CaptureQueriesContext(connection) as consultas:
+                    tiempos = async_to_sync(self._medir)(camino, solicitudes)
+                self._informar(nombre, tiempos, len(consultas) / cantidad)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    async def _medir(camino, solicitudes):
+        tiempos = []
+        for datos in solicitudes:
+            comienzo = time.perf_counter()
+            await camino(datos)
+            tiempos.append((time.perf_counter() - comienzo) * 1000)
+        return tiempos
+
+    def _informar(self, nombre, tiempos, consultas_por_reserva):
+        percentiles = statistics.quantiles(tiempos, n=20) if len(tiempos) > 1 else tiempos * 19
+        self.stdout.write(
+            f'{nombre:<9} p50={statistics.median(tiempos):.2f} ms  p95={percentiles[18]:.2f} ms  '
+            f'consultas/reserva={consultas_por_reserva:.1f}'
+        )
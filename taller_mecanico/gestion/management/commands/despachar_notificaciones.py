@@ -0,0 +1,58 @@
+"""
+Comando para enviar los avisos pendientes de la bandeja de salida.
+
+Envía por Telegram o por correo los avisos que encolan los cambios de
+estado de las reparaciones y reintenta los fallidos (ver
+gestion/notificaciones.py). Puede ejecutarse desde cron cada minuto o
+quedar corriendo con --continuo.
+
+Uso:
+    python manage.py despachar_notificaciones
+    python manage.py despachar_notificaciones --continuo --intervalo 5
+    python manage.py despachar_notificaciones --simular
+"""
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.models import Notificacion
+from gestion.notificaciones import TAMAÑO_LOTE, despachar_notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Envía los avisos pendientes a los clientes (Telegram o correo) con reintentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true',
+                            help='Sigue esperando avisos nuevos en lugar de terminar')
+        parser.add_argument('--intervalo', type=float, default=10,
+                            help='Segundos entre consultas en modo continuo')
+        parser.add_argument('--lote', type=int, default=TAMAÑO_LOTE,
+                            help='Avisos por lote')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo muestra cuántos avisos hay pendientes')
+
+    def handle(self, *args, **options):
+        pendientes = Notificacion.objects.filter(estado__in=['pendiente', 'enviando'])
+        if options['simular']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{pendientes.filter(canal='telegram').count()} aviso(s) pendientes por Telegram, "
+                f"{pendientes.filter(canal='email').count()} por correo"
+            ))
+            return
+
+        if not settings.TELEGRAM_BOT_TOKEN and pendientes.filter(canal='telegram').exists():
+            raise CommandError('No se encontró TELEGRAM_BOT_TOKEN en settings.py')
+
+        try:
+            resumen = async_to_sync(despachar_notificaciones)(
+                continuo=options['continuo'], intervalo=options['intervalo'], tamaño_lote=options['lote'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Despacho detenido.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Notificaciones: {resumen['enviadas']} enviadas, "
+            f"{resumen['fallidas']} con error ({resumen['avisos']} avisos)"
+        ))
@@ -0,0 +1,57 @@
+"""
+Comando para enviar por Telegram los recordatorios del día siguiente.
+
+Pensado para ejecutarse una vez al día (cron). No repite recordatorios ya
+enviados y reintenta los fallidos (ver gestion/recordatorios.py).
+
+Uso:
+    python manage.py enviar_recordatorios
+    python manage.py enviar_recordatorios --fecha 2025-03-15
+    python manage.py enviar_recordatorios --simular
+"""
+from datetime import datetime, timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion.recordatorios import agrupar_por_chat, despachar_recordatorios, recordatorios_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Envía por Telegram los recordatorios de citas y reparaciones del día siguiente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=str, default=None,
+                            help='Fecha de los eventos a recordar (YYYY-MM-DD, por defecto mañana)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo muestra cuántos recordatorios se enviarían')
+        parser.add_argument('--por-segundo', type=float, default=None,
+                            help='Máximo de mensajes por segundo')
+
+    def handle(self, *args, **options):
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido, use YYYY-MM-DD')
+        else:
+            fecha = timezone.localdate() + timedelta(days=1)
+
+        if options['simular']:
+            pendientes = recordatorios_pendientes(fecha)
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(pendientes)} evento(s) pendientes de recordar para {fecha} '
+                f'en {len(agrupar_por_chat(pendientes))} chat(s)'
+            ))
+            return
+
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError('No se encontró TELEGRAM_BOT_TOKEN en settings.py')
+
+        resumen = async_to_sync(despachar_recordatorios)(fecha, por_segundo=options['por_segundo'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recordatorios para {fecha}: {resumen['enviados']} enviados, "
+            f"{resumen['fallidos']} fallidos ({resumen['eventos']} eventos)"
+        ))
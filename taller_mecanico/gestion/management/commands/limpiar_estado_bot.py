@@ -0,0 +1,28 @@
+"""
+Comando para borrar el estado de conversaciones abandonadas del bot de Telegram.
+
+El bot ya lo hace periódicamente mientras se ejecuta; este comando sirve
+para programarlo con cron (ver gestion/bot/persistencia.py).
+
+Uso:
+    python manage.py limpiar_estado_bot
+    python manage.py limpiar_estado_bot --horas 6
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from gestion.bot.persistencia import limpiar_estados_vencidos
+
+
+class Command(BaseCommand):
+    help = 'Elimina el estado guardado de las conversaciones del bot sin actividad reciente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=None,
+                            help='Horas sin actividad (por defecto TELEGRAM_BOT_ESTADO_TTL_HORAS)')
+
+    def handle(self, *args, **options):
+        ttl = timedelta(hours=options['horas']) if options['horas'] else None
+        eliminados = limpiar_estados_vencidos(ttl)
+        self.stdout.write(self.style.SUCCESS(f'{eliminados} registro(s) de estado del bot eliminados'))
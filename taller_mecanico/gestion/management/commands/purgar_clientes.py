@@ -0,0 +1,40 @@
+"""
+Comando para borrar los datos de los clientes eliminados.
+
+Al eliminar un cliente solo se oculta; este comando borra por lotes sus
+reparaciones, citas y vehículos y registra el avance de cada eliminación
+(ver gestion/purga.py). Pensado para cron cada pocos minutos.
+
+Uso:
+    python manage.py purgar_clientes
+    python manage.py purgar_clientes --lote 500
+    python manage.py purgar_clientes --simular
+"""
+from django.core.management.base import BaseCommand
+
+from gestion.models import EliminacionCliente
+from gestion.purga import purgar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Borra por lotes los datos de los clientes eliminados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Filas por transacción (por defecto CLIENTES_PURGA_TAMAÑO_LOTE)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo muestra las eliminaciones pendientes')
+
+    def handle(self, *args, **options):
+        if options['simular']:
+            for eliminacion in EliminacionCliente.objects.exclude(estado='completada'):
+                self.stdout.write(str(eliminacion))
+            return
+
+        def progreso(eliminacion):
+            self.stdout.write(f'  {eliminacion.nombre}: {eliminacion.procesados}/{eliminacion.total}')
+
+        resumen = purgar_pendientes(options['lote'], progreso if options['verbosity'] else None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Clientes purgados: {resumen['completadas']} ({resumen['fallidas']} con error)"
+        ))
@@ -6,41 +6,161 @@ Este comando inicia el bot que permite a los clientes:
 - Ser guiados paso a paso para solicitar reparaciones
 - Seleccionar servicios con botones
 - Ingresar información de vehículo y contacto
+- Si ya son clientes, elegir uno de sus vehículos y pasar directo al servicio
 - Seleccionar fecha y hora programada
 - Confirmar y guardar la solicitud como reparación disponible para mecánicos
+- Consultar el estado de sus reparaciones en curso (/estado)
 
 Uso:
-    python manage.py run_telegram_bot
-
-El bot se ejecutará en modo polling (ideal para desarrollo).
-Para producción, considerar cambiar a webhooks.
+    python manage.py run_telegram_bot                  # modo de TELEGRAM_BOT_MODO
+    python manage.py run_telegram_bot --modo polling   # desarrollo
+    python manage.py run_telegram_bot --modo webhook   # producción
+
+En modo polling el bot consulta a Telegram en este proceso. En modo webhook
+Telegram envía las actualizaciones al endpoint /telegram/webhook/ de la
+aplicación ASGI de Django (ver gestion/bot/webhook.py); este comando solo
+registra el webhook y, si uvicorn está instalado, sirve la aplicación en
+TELEGRAM_BOT_WEBHOOK_PORT.
 """
 
 import os
 import logging
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from asgiref.sync import sync_to_async
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, filters, ContextTypes
-from gestion.models import Cliente, Vehiculo, Servicio, Reparacion
-
-# Configurar logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, TypeHandler, filters, ContextTypes
+from gestion.catalogo import obtener_servicio, servicios as catalogo_servicios
+from gestion.reservas import HorarioNoDisponible, reservar_desde_bot, reservar_vehiculo_desde_bot
+from gestion.disponibilidad import fechas_con_lugar, horas_libres
+from gestion.bot.bd import detener_ejecutor_bd, en_bd, iniciar_ejecutor_bd
+from gestion.bot.concurrencia import ProcesadorPorChat
+from gestion.bot.estado import estado_para_chat, texto_estado, vincular_por_telefono
+from gestion.bot.frecuentes import cliente_frecuente_por_chat, cliente_frecuente_por_contacto
+from gestion.bot.metricas import instrumentar, instrumentar_conversacion, metricas
+from gestion.bot.persistencia import PersistenciaDjango
+
 logger = logging.getLogger(__name__)
 
 # Estados de la conversación
-START, PHONE, NAME, VEHICLE_BRAND, VEHICLE_MODEL, VEHICLE_YEAR, VEHICLE_PLATE, SERVICE_SELECT, DATE_SELECT, TIME_SELECT, CONFIRMATION = range(11)
+START, PHONE, NAME, VEHICLE_BRAND, VEHICLE_MODEL, VEHICLE_YEAR, VEHICLE_PLATE, SERVICE_SELECT, DATE_SELECT, TIME_SELECT, CONFIRMATION, VEHICLE_SELECT = range(12)
+
+# Nombre de cada estado en las métricas: lo que el bot espera del cliente
+NOMBRES_ESTADOS = {
+    START: 'telefono',
+    PHONE: 'nombre',
+    NAME: 'marca',
+    VEHICLE_BRAND: 'modelo',
+    VEHICLE_MODEL: 'año',
+    VEHICLE_YEAR: 'placa',
+    VEHICLE_PLATE: 'servicio',
+    SERVICE_SELECT: 'servicio',
+    DATE_SELECT: 'fecha',
+    TIME_SELECT: 'hora',
+    CONFIRMATION: 'confirmacion',
+    VEHICLE_SELECT: 'vehiculo',
+    ConversationHandler.END: 'fin',
+}
+
+# Reservas desde el bot: turnos de 1 hora en los próximos 7 días
+DIAS_RESERVA = 7
+INTERVALO_BOT_MINUTOS = 60
+
+
+def build_application(token=None, persistencia=None, **opciones):
+    """
+    Crea la Application de python-telegram-bot con todos los manejadores.
+
+    La usan el modo polling (este comando) y el modo webhook
+    (gestion/bot/webhook.py).
+
+    Args:
+        token: por defecto TELEGRAM_BOT_TOKEN
+        persistencia: por defecto PersistenciaDjango si TELEGRAM_BOT_PERSISTENCIA
+        opciones: métodos extra del ApplicationBuilder, p. ej. update_queue=...
+                  o concurrent_updates=False para procesar de a una
+    """
+    if persistencia is None and settings.TELEGRAM_BOT_PERSISTENCIA:
+        persistencia = PersistenciaDjango()
+
+    builder = (Application.builder()
+               .token(token or settings.TELEGRAM_BOT_TOKEN)
+               .base_url(settings.TELEGRAM_BOT_API_URL))
+    if persistencia is not None:
+        builder = builder.persistence(persistencia)
+    if settings.TELEGRAM_BOT_CONCURRENCIA > 1:
+        # Varios chats a la vez, cada uno en orden (ver gestion/bot/concurrencia.py)
+        builder = builder.concurrent_updates(ProcesadorPorChat(settings.TELEGRAM_BOT_CONCURRENCIA))
+    for metodo, valor in opciones.items():
+        builder = getattr(builder, metodo)(valor)
+    application = builder.build()
+
+    # Crear manejador de conversación
+    conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('start', start_command)],
+        states={
+            START: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, get_phone),
+                MessageHandler(filters.CONTACT, get_contact),
+            ],
+            VEHICLE_SELECT: [CallbackQueryHandler(select_vehicle, pattern=r'^vehicle_')],
+            PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_name)],
+            NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_brand)],
+            VEHICLE_BRAND: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_model)],
+            VEHICLE_MODEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_year)],
+            VEHICLE_YEAR: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_plate)],
+            VEHICLE_PLATE: [CallbackQueryHandler(select_service)],
+            SERVICE_SELECT: [CallbackQueryHandler(select_service)],
+            DATE_SELECT: [CallbackQueryHandler(select_date)],
+            TIME_SELECT: [CallbackQueryHandler(select_time)],
+            CONFIRMATION: [CallbackQueryHandler(confirm_appointment)],
+        },
+        fallbacks=[CommandHandler('cancel', cancel_command)],
+        per_user=False,
+        per_chat=True,
+        allow_reentry=True,
+        name='reserva',
+        persistent=persistencia is not None
+    )
+
+    otros_handlers = [
+        CommandHandler('help', help_command),
+        CommandHandler('estado', estado_command),
+        MessageHandler(filters.CONTACT, estado_contacto),
+    ]
+    if settings.TELEGRAM_BOT_METRICAS:
+        # Latencia, tiempo de base de datos, errores y embudo (gestion/bot/metricas.py)
+        instrumentar_conversacion(conv_handler, NOMBRES_ESTADOS)
+        for handler in otros_handlers:
+            instrumentar(handler, 'fuera_de_reserva', NOMBRES_ESTADOS)
+
+    # Agregar manejadores
+    application.add_handler(conv_handler)
+    application.add_handlers(otros_handlers)
+
+    if persistencia is not None:
+        # Antes de cada actualización, cargar el estado guardado por otros procesos
+        persistencia.registrar_conversacion(conv_handler)
+        application.add_handler(TypeHandler(Update, persistencia.sincronizar), group=-1)
+    return application
 
 
 class Command(BaseCommand):
     help = 'Ejecuta el bot de Telegram para el taller mecánico'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', choices=['polling', 'webhook'], default=None,
+                            help='Forma de recibir actualizaciones (por defecto TELEGRAM_BOT_MODO)')
+        parser.add_argument('--solo-registrar', action='store_true',
+                            help='En modo webhook, solo registra la URL en Telegram y termina')
+
     def handle(self, *args, **options):
         """Inicia el bot de Telegram"""
+        # Configurar logging (solo al ejecutar el comando: el módulo también
+        # se importa desde la aplicación web en modo webhook)
+        logging.basicConfig(
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            level=logging.INFO
+        )
         
         # Obtener token del bot (debería estar en settings.py o variables de entorno)
         bot_token = getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
@@ -49,41 +169,50 @@ class Command(BaseCommand):
                 self.style.ERROR('❌ ERROR: No se encontró TELEGRAM_BOT_TOKEN en settings.py')
             )
             return
-        
-        # Crear aplicación del bot
-        application = Application.builder().token(bot_token).build()
-        
-        # Crear manejador de conversación
-        conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('start', start_command)],
-            states={
-                START: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_phone)],
-                PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_name)],
-                NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_brand)],
-                VEHICLE_BRAND: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_model)],
-                VEHICLE_MODEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_year)],
-                VEHICLE_YEAR: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_vehicle_plate)],
-                VEHICLE_PLATE: [CallbackQueryHandler(select_service)],
-                SERVICE_SELECT: [CallbackQueryHandler(select_service)],
-                DATE_SELECT: [CallbackQueryHandler(select_date)],
-                TIME_SELECT: [CallbackQueryHandler(select_time)],
-                CONFIRMATION: [CallbackQueryHandler(confirm_appointment)],
-            },
-            fallbacks=[CommandHandler('cancel', cancel_command)],
-            per_user=False,
-            per_chat=True,
-            allow_reentry=True
-        )
 
-        # Agregar manejadores
-        application.add_handler(conv_handler)
-        application.add_handler(CommandHandler('help', help_command))
+        # Consultas del bot en un pool acotado con conexiones administradas
+        iniciar_ejecutor_bd()
+
+        modo = options['modo'] or settings.TELEGRAM_BOT_MODO
+        if modo == 'webhook':
+            self.iniciar_webhook(options['solo_registrar'])
+            return
+
+        # Crear aplicación del bot
+        application = build_application(bot_token)
         
         # Mensaje de inicio
-        self.stdout.write(self.style.SUCCESS('🤖 Bot de Telegram iniciado...'))
+        self.stdout.write(self.style.SUCCESS('🤖 Bot de Telegram iniciado (polling)...'))
         
-        # Iniciar el bot
+        # Iniciar el bot (run_polling elimina el webhook si estaba registrado)
         application.run_polling(allowed_updates=Update.ALL_TYPES)
+        metricas.guardar()
+        detener_ejecutor_bd()
+
+    def iniciar_webhook(self, solo_registrar):
+        """Registra el webhook en Telegram y sirve la aplicación ASGI."""
+        from asgiref.sync import async_to_sync
+        from gestion.bot.webhook import registrar_webhook
+
+        if not settings.TELEGRAM_BOT_WEBHOOK_URL:
+            raise CommandError('Configure TELEGRAM_BOT_WEBHOOK_URL para usar el modo webhook')
+
+        async_to_sync(registrar_webhook)()
+        self.stdout.write(self.style.SUCCESS(f'🔗 Webhook registrado en {settings.TELEGRAM_BOT_WEBHOOK_URL}'))
+        if solo_registrar:
+            return
+
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError(
+                'uvicorn no está instalado. Sirva la aplicación con cualquier servidor ASGI, p. ej.:\n'
+                f'  uvicorn taller_mecanico.asgi:application --port {settings.TELEGRAM_BOT_WEBHOOK_PORT}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'🤖 Bot de Telegram iniciado (webhook) en el puerto {settings.TELEGRAM_BOT_WEBHOOK_PORT}...'
+        ))
+        uvicorn.run('taller_mecanico.asgi:application', host='0.0.0.0', port=settings.TELEGRAM_BOT_WEBHOOK_PORT)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -93,6 +222,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 📋 *Comandos disponibles:*
 /start - Iniciar solicitud de reparación
+/estado - Ver el estado de tus reparaciones
 /cancel - Cancelar proceso actual
 /help - Mostrar esta ayuda
 
@@ -104,6 +234,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 5. Selecciona fecha y hora 📅🕐
 6. Confirma solicitud ✅
 
+🔁 *¿Ya eres cliente?* Elige tu vehículo y ve directo al paso 4.
+
 📱 *Una vez confirmada, tu solicitud aparecerá*
 *inmediatamente en Reparaciones Disponibles*
 *para que los mecánicos puedan tomarla.*
@@ -113,9 +245,65 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
 
+async def estado_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Muestra las reparaciones en curso del cliente de este chat"""
+    texto = await en_bd(estado_para_chat)(update.effective_chat.id)
+    if texto is not None:
+        await update.message.reply_text(texto)
+        return
+
+    # Chat sin cliente asociado: se pide el contacto (teléfono verificado por Telegram)
+    teclado = ReplyKeyboardMarkup(
+        [[KeyboardButton("📱 Compartir mi teléfono", request_contact=True)]],
+        one_time_keyboard=True,
+        resize_keyboard=True,
+    )
+    await update.message.reply_text(
+        "🔎 Para consultar tus reparaciones necesito tu teléfono.\n"
+        "Toca el botón para compartirlo.",
+        reply_markup=teclado
+    )
+
+
+async def estado_contacto(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Recibe el contacto compartido tras /estado y muestra las reparaciones"""
+    contacto = update.message.contact
+    if contacto.user_id != update.effective_user.id:
+        await update.message.reply_text(
+            "❌ Comparte tu propio contacto con el botón de /estado.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        return
+
+    def consultar():
+        cliente = vincular_por_telefono(contacto.phone_number, update.effective_chat.id)
+        return texto_estado(cliente) if cliente is not None else None
+
+    texto = await en_bd(consultar)()
+    await update.message.reply_text(
+        texto or "❌ No encontramos reparaciones asociadas a tu teléfono.\n"
+                 "Usa /start para solicitar una reparación.",
+        reply_markup=ReplyKeyboardRemove()
+    )
+
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Inicia la conversación para solicitar reparación"""
     user = update.effective_user
+    # Cada solicitud empieza de cero (user_data persiste entre conversaciones)
+    context.user_data.clear()
+
+    # Cliente conocido: se ofrecen sus vehículos (una consulta)
+    frecuente = await en_bd(cliente_frecuente_por_chat)(update.effective_chat.id)
+    if frecuente is not None:
+        context.user_data['frecuente'] = frecuente
+        await update.message.reply_text(
+            f"🔧 *¡Hola de nuevo, {frecuente['nombre']}!* 👋\n\n"
+            "🚗 *¿Para qué vehículo es la reparación?*",
+            parse_mode='Markdown',
+            reply_markup=teclado_vehiculos(frecuente['vehiculos'])
+        )
+        return VEHICLE_SELECT
     
     # Mensaje de bienvenida
     welcome_message = f"""
@@ -135,13 +323,117 @@ Soy el asistente virtual y te ayudaré a solicitar tu reparación.
 🤖 *Tu solicitud aparecerá inmediatamente* 
 *en Reparaciones Disponibles para nuestros mecánicos.*
 
-📞 *Por favor, ingresa tu número de teléfono:*
+📞 *Por favor, ingresa tu número de teléfono*
+*o compártelo con el botón:*
     """
     
-    await update.message.reply_text(welcome_message, parse_mode='Markdown')
+    await update.message.reply_text(welcome_message, parse_mode='Markdown', reply_markup=teclado_contacto())
     return START
 
 
+def teclado_contacto():
+    """Botón para compartir el teléfono (verificado por Telegram)"""
+    return ReplyKeyboardMarkup(
+        [[KeyboardButton("📱 Compartir mi teléfono", request_contact=True)]],
+        one_time_keyboard=True,
+        resize_keyboard=True,
+    )
+
+
+def teclado_vehiculos(vehiculos):
+    """Botones con los vehículos del cliente y uno para registrar otro"""
+    keyboard = [
+        [InlineKeyboardButton(f"🚗 {v['marca']} {v['modelo']} ({v['placa']})", callback_data=f"vehicle_{v['id']}")]
+        for v in vehiculos
+    ]
+    keyboard.append([InlineKeyboardButton("➕ Otro vehículo", callback_data="vehicle_new")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def get_contact(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Recibe el contacto compartido en lugar del teléfono escrito"""
+    contacto = update.message.contact
+    if contacto.user_id != update.effective_user.id:
+        await update.message.reply_text(
+            "❌ Comparte tu propio contacto o escribe tu teléfono:",
+            reply_markup=teclado_contacto()
+        )
+        return START
+
+    frecuente = await en_bd(cliente_frecuente_por_contacto)(
+        contacto.phone_number, update.effective_chat.id
+    )
+    if frecuente is None:
+        # Cliente nuevo: se sigue como si hubiera escrito el teléfono
+        context.user_data['phone'] = contacto.phone_number
+        await update.message.reply_text(
+            f"✅ Teléfono guardado: {contacto.phone_number}\n\n"
+            "📝 Ahora, por favor ingresa tu nombre completo:",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        return PHONE
+
+    context.user_data['frecuente'] = frecuente
+    await update.message.reply_text(f"✅ ¡Hola de nuevo, {frecuente['nombre']}!", reply_markup=ReplyKeyboardRemove())
+    await update.message.reply_text(
+        "🚗 *¿Para qué vehículo es la reparación?*",
+        parse_mode='Markdown',
+        reply_markup=teclado_vehiculos(frecuente['vehiculos'])
+    )
+    return VEHICLE_SELECT
+
+
+async def select_vehicle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Vehículo elegido por un cliente que vuelve: salta directo al servicio"""
+    query = update.callback_query
+    await query.answer()
+
+    frecuente = context.user_data['frecuente']
+    context.user_data['name'] = frecuente['nombre']
+    context.user_data['phone'] = frecuente['telefono']
+
+    if query.data == 'vehicle_new':
+        await query.edit_message_text(
+            "🚗 Registremos tu otro vehículo.\n\n"
+            "📋 *Marca del vehículo:* (Ej: Toyota, Ford, BMW)",
+            parse_mode='Markdown'
+        )
+        return NAME
+
+    # Solo se aceptan los vehículos ofrecidos (callback_data lo envía el cliente)
+    vehiculo = next((v for v in frecuente['vehiculos'] if f"vehicle_{v['id']}" == query.data), None)
+    if vehiculo is None:
+        await query.edit_message_text(
+            "❌ Vehículo no válido. Elige uno de la lista:",
+            reply_markup=teclado_vehiculos(frecuente['vehiculos'])
+        )
+        return VEHICLE_SELECT
+
+    context.user_data.update({
+        'vehicle_id': vehiculo['id'],
+        'vehicle_brand': vehiculo['marca'],
+        'vehicle_model': vehiculo['modelo'],
+        'vehicle_year': vehiculo['año'],
+        'vehicle_plate': vehiculo['placa'],
+    })
+
+    reply_markup = await teclado_servicios()
+    if reply_markup is None:
+        await query.edit_message_text(
+            "❌ No hay servicios disponibles en este momento.\n"
+            "Por favor, contacta al taller directamente."
+        )
+        return ConversationHandler.END
+
+    await query.edit_message_text(
+        f"✅ Vehículo: {vehiculo['marca']} {vehiculo['modelo']} ({vehiculo['placa']})\n\n"
+        "🔧 *Selecciona el servicio que necesitas:*\n",
+        parse_mode='Markdown',
+        reply_markup=reply_markup
+    )
+    return SERVICE_SELECT
+
+
 async def get_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Obtiene el número de teléfono del cliente"""
     phone = update.message.text.strip()
@@ -158,7 +450,8 @@ async def get_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     await update.message.reply_text(
         f"✅ Teléfono guardado: {phone}\n\n"
-        "📝 Ahora, por favor ingresa tu nombre completo:"
+        "📝 Ahora, por favor ingresa tu nombre completo:",
+        reply_markup=ReplyKeyboardRemove()
     )
     
     return PHONE
@@ -269,25 +562,15 @@ async def get_vehicle_plate(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Obtener servicios disponibles
     try:
-        servicios = await sync_to_async(list)(Servicio.objects.all())
+        reply_markup = await teclado_servicios()
         
-        if not servicios:
+        if reply_markup is None:
             await update.message.reply_text(
                 "❌ No hay servicios disponibles en este momento.\n"
                 "Por favor, contacta al taller directamente."
             )
             return ConversationHandler.END
         
-        # Crear botones para servicios
-        keyboard = []
-        for servicio in servicios:
-            keyboard.append([InlineKeyboardButton(
-                f"{servicio.nombre_servicio} - ${servicio.costo}",
-                callback_data=f"service_{servicio.id}"
-            )])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         service_message = f"✅ Placa: {plate}\n\n🔧 *Selecciona el servicio que necesitas:*\n"
         
         await update.message.reply_text(
@@ -306,6 +589,18 @@ async def get_vehicle_plate(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
 
 
+async def teclado_servicios():
+    """Botones con los servicios del taller, o None si no hay ninguno"""
+    # Catálogo en memoria: solo consulta la base si cambió (ver gestion/catalogo.py)
+    servicios = await en_bd(catalogo_servicios)()
+    if not servicios:
+        return None
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(f"{servicio.nombre_servicio} - ${servicio.costo}", callback_data=f"service_{servicio.id}")]
+        for servicio in servicios
+    ])
+
+
 async def select_service(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Maneja la selección del servicio y va a selección de fecha"""
     query = update.callback_query
@@ -314,8 +609,14 @@ async def select_service(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     service_id = query.data.split('_')[1]
     
     try:
-        servicio = await sync_to_async(Servicio.objects.get)(id=service_id)
-        context.user_data['service'] = servicio
+        servicio = await en_bd(obtener_servicio)(service_id)
+        # Solo valores serializables: user_data se guarda como JSON (ver gestion/bot/persistencia.py)
+        context.user_data['service'] = {
+            'id': servicio.id,
+            'nombre_servicio': servicio.nombre_servicio,
+            'costo': str(servicio.costo),
+            'duracion': servicio.duracion,
+        }
         
         # Preparar mensaje y mostrar calendario
         service_message = (
@@ -326,10 +627,18 @@ async def select_service(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             f"📅 *Ahora selecciona la fecha para llevar tu vehículo:*\n"
         )
         
+        date_keyboard = await create_date_keyboard()
+        if date_keyboard is None:
+            await query.edit_message_text(
+                "❌ No hay horarios disponibles en los próximos días.\n"
+                "Por favor, intenta más tarde o contacta al taller."
+            )
+            return ConversationHandler.END
+
         await query.edit_message_text(
             service_message,
             parse_mode='Markdown',
-            reply_markup=create_date_keyboard()
+            reply_markup=date_keyboard
         )
         
         return DATE_SELECT
@@ -342,23 +651,26 @@ async def select_service(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return VEHICLE_PLATE
 
 
-def create_date_keyboard():
-    """Crea un teclado con las próximas fechas disponibles"""
-    from datetime import datetime, timedelta
-    
+async def create_date_keyboard():
+    """
+    Crea un teclado con las próximas fechas que tienen horas libres.
+
+    La disponibilidad de toda la semana se obtiene en una sola consulta
+    (ver gestion/disponibilidad.py). Devuelve None si no hay lugar.
+    """
+    dias = await en_bd(fechas_con_lugar)(DIAS_RESERVA, intervalo=INTERVALO_BOT_MINUTOS)
+    if not dias:
+        return None
+
     keyboard = []
-    current_date = datetime.now()
-    
-    # Mostrar próximos 7 días
-    for i in range(1, 8):
-        date = current_date + timedelta(days=i)
-        date_str = date.strftime("%Y-%m-%d")
-        display_str = date.strftime("%d/%m/%Y (%A)")
+    for dia in dias:
+        date_str = dia['fecha'].strftime("%Y-%m-%d")
+        display_str = f"{dia['fecha'].strftime('%d/%m/%Y (%A)')} · {dia['libres']} libres"
         keyboard.append([InlineKeyboardButton(
             display_str,
             callback_data=f"date_{date_str}"
         )])
-    
+
     return InlineKeyboardMarkup(keyboard)
 
 
@@ -419,34 +731,15 @@ async def select_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
 
 
 async def get_available_hours(date_str):
-    """Obtiene horas disponibles para una fecha específica"""
-    # Horas de trabajo (8:00 AM - 6:00 PM)
-    work_hours = []
-    for hour in range(8, 19):  # 8 AM a 6 PM
-        work_hours.append(f"{hour:02d}:00")
-    
-    # Obtener horas ya ocupadas en esa fecha
+    """Obtiene horas disponibles (citas y reparaciones programadas) para una fecha específica"""
+    from datetime import datetime
     try:
-        # Función síncrona para obtener horas ocupadas
-        def get_occupied_hours_sync():
-            return list(Reparacion.objects.filter(
-                fecha_programada=date_str,
-                estado_reparacion__in=['pendiente', 'en_progreso']
-            ).values_list('hora_programada', flat=True))
-        
-        occupied_hours = await sync_to_async(get_occupied_hours_sync)()
-        
-        # Convertir a string para comparación
-        occupied_str = [str(h) for h in occupied_hours if h is not None]
-        
-        # Filtrar horas disponibles
-        available = [h for h in work_hours if h not in occupied_str]
-        
-        return available
-        
+        fecha = datetime.strptime(date_str, "%Y-%m-%d").date()
+        horas = await en_bd(horas_libres)(fecha, intervalo=INTERVALO_BOT_MINUTOS)
+        return [h.strftime('%H:%M') for h in horas]
     except Exception as e:
-        logger.error(f"Error al obtener horas ocupadas: {e}")
-        return work_hours  # Devolver todas si hay error
+        logger.error(f"Error al obtener horas disponibles: {e}")
+        return []
 
 
 async def select_time(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -465,9 +758,9 @@ async def select_time(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         f"📱 *Teléfono:* {context.user_data['phone']}\n\n"
         f"🚗 *Vehículo:* {context.user_data['vehicle_brand']} {context.user_data['vehicle_model']} ({context.user_data['vehicle_year']})\n"
         f"🔢 *Placa:* {context.user_data['vehicle_plate']}\n\n"
-        f"🔧 *Servicio:* {service.nombre_servicio}\n"
-        f"💰 *Costo:* ${service.costo}\n"
-        f"⏱️ *Duración:* {service.duracion} minutos\n\n"
+        f"🔧 *Servicio:* {service['nombre_servicio']}\n"
+        f"💰 *Costo:* ${service['costo']}\n"
+        f"⏱️ *Duración:* {service['duracion']} minutos\n\n"
         f"📅 *Fecha programada:* {context.user_data['date']}\n"
         f"🕐 *Hora:* {time_str}\n\n"
         f"🤖 *Esta reparación aparecerá en Reparaciones Disponibles*\n"
@@ -508,12 +801,28 @@ async def confirm_appointment(update: Update, context: ContextTypes.DEFAULT_TYPE
             'vehicle_plate': context.user_data['vehicle_plate'],
             'service': context.user_data['service'],
             'date': context.user_data['date'],
-            'time': context.user_data['time']
+            'time': context.user_data['time'],
+            'chat_id': str(update.effective_chat.id),
+            # Cliente que vuelve con un vehículo ya registrado
+            'vehicle_id': context.user_data.get('vehicle_id'),
         }
         
         # Crear la reparación (await correctamente)
-        success = await create_repair_in_db(repair_data)
+        try:
+            success = await create_repair_in_db(repair_data)
+        except HorarioNoDisponible:
+            metricas.contar('horario_ocupado')
+            await query.edit_message_text(
+                "⚠️ *HORARIO NO DISPONIBLE*\n\n"
+                f"El {context.user_data['date']} a las {context.user_data['time']}\n"
+                "acaba de ser reservado por otro cliente.\n\n"
+                "Por favor, inicia nuevamente con /start\n"
+                "y elige otro horario.",
+                parse_mode='Markdown'
+            )
+            return ConversationHandler.END
         
+        metricas.contar('reservas_creadas' if success else 'reservas_fallidas')
         if success:
             await query.edit_message_text(
                 "✅ *¡SOLICITUD CREADA CON ÉXITO!*\n\n"
@@ -534,6 +843,7 @@ async def confirm_appointment(update: Update, context: ContextTypes.DEFAULT_TYPE
                 "o contacta directamente al taller."
             )
     else:  # confirm_no
+        metricas.contar('reservas_canceladas')
         await query.edit_message_text(
             "❌ *SOLICITUD CANCELADA*\n\n"
             "No te preocupes, puedes solicitar tu reparación\n"
@@ -544,70 +854,41 @@ async def confirm_appointment(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 
 async def create_repair_in_db(data):
-    """Crea la reparación en la base de datos para que aparezca en Reparaciones Disponibles"""
+    """
+    Crea la reparación en la base de datos para que aparezca en Reparaciones Disponibles.
+
+    Cliente, vehículo y reparación se guardan en una sola transacción y en un
+    único acceso a la base (ver gestion/reservas.py: reservar_desde_bot). Si el
+    cliente eligió uno de sus vehículos solo se inserta la reparación.
+    """
+    from datetime import datetime
     try:
-        # Obtener o crear cliente usando teléfono como identificador único
-        try:
-            cliente = await sync_to_async(Cliente.objects.get)(telefono=data['phone'])
-            # Actualizar nombre si es diferente
-            if cliente.nombre != data['name'].split()[0]:
-                cliente.nombre = data['name'].split()[0]
-                cliente.apellido = ' '.join(data['name'].split()[1:]) if len(data['name'].split()) > 1 else ''
-                await sync_to_async(cliente.save)()
-        except Cliente.DoesNotExist:
-            # Crear nuevo cliente con email temporal único
-            import uuid
-            temp_email = f"telegram_{data['phone']}_{uuid.uuid4().hex[:8]}@bot.local"
-            cliente = await sync_to_async(Cliente.objects.create)(
-                correo_electronico=temp_email,
-                nombre=data['name'].split()[0],
-                apellido=' '.join(data['name'].split()[1:]) if len(data['name'].split()) > 1 else '',
-                telefono=data['phone'],
-                direccion='Cliente Telegram'
-            )
-        
-        # Verificar si el vehículo ya existe para este cliente
-        try:
-            vehiculo = await sync_to_async(Vehiculo.objects.get)(
-                cliente=cliente,
-                placa=data['vehicle_plate']
+        if data.get('vehicle_id'):
+            reparacion = await en_bd(reservar_vehiculo_desde_bot)(
+                vehiculo_id=data['vehicle_id'],
+                servicio_id=data['service']['id'],
+                fecha=data['date'],
+                hora=datetime.strptime(data['time'], "%H:%M").time(),
             )
-            # Actualizar datos del vehículo si son diferentes
-            if (vehiculo.marca != data['vehicle_brand'] or 
-                vehiculo.modelo != data['vehicle_model'] or 
-                vehiculo.año != data['vehicle_year']):
-                vehiculo.marca = data['vehicle_brand']
-                vehiculo.modelo = data['vehicle_model']
-                vehiculo.año = data['vehicle_year']
-                await sync_to_async(vehiculo.save)()
-        except Vehiculo.DoesNotExist:
-            # Crear nuevo vehículo
-            vehiculo = await sync_to_async(Vehiculo.objects.create)(
-                cliente=cliente,
+        else:
+            reparacion = await en_bd(reservar_desde_bot)(
+                nombre_completo=data['name'],
+                telefono=data['phone'],
+                chat_id=data['chat_id'],
                 marca=data['vehicle_brand'],
                 modelo=data['vehicle_model'],
                 año=data['vehicle_year'],
-                placa=data['vehicle_plate']
+                placa=data['vehicle_plate'],
+                servicio_id=data['service']['id'],
+                fecha=data['date'],  # Fecha programada por el cliente
+                hora=datetime.strptime(data['time'], "%H:%M").time(),  # Hora programada por el cliente
             )
-        
-        # Convertir hora string a time object
-        from datetime import datetime
-        time_obj = datetime.strptime(data['time'], "%H:%M").time()
-        
-        # Crear reparación directamente para que aparezca en Reparaciones Disponibles
-        reparacion = await sync_to_async(Reparacion.objects.create)(
-            vehiculo=vehiculo,
-            servicio=data['service'],
-            mecanico_asignado=None,  # Sin asignar para que aparezca como disponible
-            condicion_vehiculo='regular',  # Condición por defecto
-            estado_reparacion='pendiente',  # Estado pendiente para que los mecánicos puedan tomarla
-            fecha_programada=data['date'],  # Fecha programada por el cliente
-            hora_programada=time_obj  # Hora programada por el cliente
-        )
-        
-        logger.info(f"✅ Reparación creada exitosamente: Cliente {cliente.nombre} ({cliente.telefono}), Vehículo {vehiculo.marca} {vehiculo.modelo} ({vehiculo.placa}), Reparación ID {reparacion.id}, Programada para {data['date']} a las {data['time']}")
+        logger.info(f"✅ Reparación creada exitosamente: Cliente {data['name']} ({data['phone']}), Vehículo {data['vehicle_brand']} {data['vehicle_model']} ({data['vehicle_plate']}), Reparación ID {reparacion.id}, Programada para {data['date']} a las {data['time']}")
         return True
-        
+
+    except HorarioNoDisponible:
+        logger.info(f"⚠️ Horario {data['date']} {data['time']} ya reservado")
+        raise
     except Exception as e:
         logger.error(f"❌ Error al crear reparación en BD: {e}")
         import traceback
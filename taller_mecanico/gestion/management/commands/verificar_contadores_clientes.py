@@ -0,0 +1,49 @@
+"""
+Comando para verificar los contadores guardados en cada cliente.
+
+Recalcula num_vehiculos, num_reparaciones, total_facturado y ultima_visita
+desde los vehículos y las reparaciones (vivas y archivadas) y muestra los
+clientes cuyos valores no coinciden (ver gestion/contadores.py). Antes
+compara el total de cada reparación con la suma de sus líneas.
+
+Uso:
+    python manage.py verificar_contadores_clientes
+    python manage.py verificar_contadores_clientes --reparar
+"""
+from django.core.management.base import BaseCommand
+
+from gestion.contadores import verificar, verificar_totales
+
+
+class Command(BaseCommand):
+    help = 'Compara los contadores de los clientes con los valores reales y opcionalmente los corrige'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help='Corrige los contadores con diferencias')
+        parser.add_argument('--lote', type=int, default=500, help='Clientes o reparaciones por consulta')
+
+    def handle(self, *args, **options):
+        # Primero los totales: total_facturado se calcula con ellos
+        totales = verificar_totales(reparar=options['reparar'], tamaño_lote=options['lote'])
+        for reparacion_id, guardado, real in totales:
+            self.stdout.write(f'Reparación {reparacion_id}: total: {guardado} -> {real}')
+        if totales:
+            if options['reparar']:
+                self.stdout.write(self.style.SUCCESS(f'{len(totales)} reparación(es) corregidas'))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'{len(totales)} reparación(es) con un total distinto de sus líneas (usar --reparar para corregirlas)'
+                ))
+
+        diferencias = verificar(reparar=options['reparar'], tamaño_lote=options['lote'])
+        for cliente_id, campos in diferencias:
+            detalle = ', '.join(f'{campo}: {guardado} -> {real}' for campo, (guardado, real) in campos.items())
+            self.stdout.write(f'Cliente {cliente_id}: {detalle}')
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Los contadores de todos los clientes son correctos'))
+        elif options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f'{len(diferencias)} cliente(s) corregidos'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} cliente(s) con diferencias (usar --reparar para corregirlos)'
+            ))
@@ -18,11 +18,14 @@ class Migration(migrations.Migration):
             preserve_default=False,
         ),
         
-        # Agregar campo apellido al modelo Cliente existente
-        migrations.AddField(
-            model_name='cliente',
-            name='apellido',
-            field=models.CharField(max_length=100, default=''),
-            preserve_default=False,
-        ),
+        # apellido ya lo crea 0001_initial: solo el estado (en PostgreSQL la columna
+        # repetida falla; SQLite rehace la tabla y no lo notaba)
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AddField(
+                model_name='cliente',
+                name='apellido',
+                field=models.CharField(max_length=100, default=''),
+                preserve_default=False,
+            ),
+        ]),
     ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_reparacion_fecha_programada_and_more'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='agenda',
+            constraint=models.UniqueConstraint(fields=('fecha', 'hora'), name='agenda_horario_unico', violation_error_message='Ya existe una cita programada para esta fecha y hora.'),
+        ),
+        migrations.AddConstraint(
+            model_name='reparacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado_reparacion__in', ['pendiente', 'en_progreso'])), fields=('fecha_programada', 'hora_programada'), name='reparacion_horario_unico', violation_error_message='Ya hay una reparación programada para esa fecha y hora.'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0014_reserva_horario_unica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='telegram_chat_id',
+            field=models.CharField(blank=True, help_text='ID de chat de Telegram para notificaciones', max_length=50, null=True, verbose_name='Telegram Chat ID'),
+        ),
+        migrations.CreateModel(
+            name='Recordatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cita', 'Cita'), ('reparacion', 'Reparación')], max_length=20)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('fecha_evento', models.DateField()),
+                ('chat_id', models.CharField(max_length=50)),
+                ('estado', models.CharField(choices=[('enviado', 'Enviado'), ('fallido', 'Fallido')], max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=1)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('fecha_envio', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Recordatorio',
+                'verbose_name_plural': 'Recordatorios',
+                'ordering': ['-fecha_envio'],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id', 'fecha_evento'), name='recordatorio_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0015_recordatorios_telegram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoBot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('conversacion', 'Conversación'), ('usuario', 'Datos de usuario'), ('chat', 'Datos de chat'), ('bot', 'Datos del bot')], max_length=20)),
+                ('nombre', models.CharField(blank=True, max_length=50)),
+                ('clave', models.CharField(max_length=100)),
+                ('datos', models.JSONField(null=True)),
+                ('actualizado', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Estado del bot',
+                'verbose_name_plural': 'Estados del bot',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'nombre', 'clave'), name='estado_bot_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+DIGITOS_TELEFONO = 8
+
+
+def normalizar_telefonos(apps, schema_editor):
+    Cliente = apps.get_model('gestion', 'Cliente')
+    lote = []
+    for cliente in Cliente.objects.only('id', 'telefono').iterator(chunk_size=500):
+        cliente.telefono_normalizado = ''.join(c for c in cliente.telefono if c.isdigit())[-DIGITOS_TELEFONO:]
+        lote.append(cliente)
+        if len(lote) == 500:
+            Cliente.objects.bulk_update(lote, ['telefono_normalizado'])
+            lote = []
+    Cliente.objects.bulk_update(lote, ['telefono_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0016_estado_bot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='telefono_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='telegram_chat_id',
+            field=models.CharField(blank=True, db_index=True, help_text='ID de chat de Telegram para notificaciones', max_length=50, null=True, verbose_name='Telegram Chat ID'),
+        ),
+        migrations.RunPython(normalizar_telefonos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0017_cliente_telefono_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('canal', models.CharField(choices=[('telegram', 'Telegram'), ('email', 'Correo electrónico')], max_length=20)),
+                ('destino', models.CharField(max_length=254)),
+                ('asunto', models.CharField(blank=True, max_length=200)),
+                ('mensaje', models.TextField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviada', 'Enviada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('creada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('enviada', models.DateTimeField(blank=True, null=True)),
+                ('reparacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to='gestion.reparacion')),
+            ],
+            options={
+                'verbose_name': 'Notificación',
+                'verbose_name_plural': 'Notificaciones',
+                'ordering': ['-creada'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='notificacion_pendiente_idx')],
+            },
+        ),
+    ]
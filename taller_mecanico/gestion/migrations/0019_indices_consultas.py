@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0018_notificaciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reparacion',
+            index=models.Index(fields=['estado_reparacion', 'fecha_ingreso'], name='reparacion_estado_ingreso_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reparacion',
+            index=models.Index(fields=['mecanico_asignado', 'estado_reparacion', 'fecha_salida'], name='reparacion_mecanico_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reparacion',
+            index=models.Index(fields=['fecha_ingreso'], name='reparacion_ingreso_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['asignada_a', 'estado', 'fecha_actualizacion'], name='tarea_asignada_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='tarea_estado_creacion_idx'),
+        ),
+        # Los índices simples de las FK se quitan después de crear los compuestos que los cubren
+        migrations.AlterField(
+            model_name='reparacion',
+            name='mecanico_asignado',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Mecánico responsable de la reparación', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reparaciones_asignadas', to='gestion.empleado', verbose_name='Mecánico Asignado'),
+        ),
+        migrations.AlterField(
+            model_name='tarea',
+            name='asignada_a',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas_asignadas', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:10
+
+import re
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# Formato con el que gestionar_reparacion_mecanico escribía en Reparacion.notas
+ENCABEZADO = re.compile(r'^--- Actualización (\d{2}/\d{2}/\d{4} \d{2}:\d{2}) ---$')
+KILOMETRAJE = 'Kilometraje:'
+COMBUSTIBLE = 'Nivel de combustible:'
+OBSERVACIONES = 'Observaciones del vehículo:'
+NIVELES = {'Vacío', '1/4', '1/2', '3/4', 'Lleno'}
+TAMAÑO_LOTE = 500
+
+
+def _bloques(notas, fecha_ingreso):
+    """Divide las notas en (fecha, líneas) por cada encabezado de actualización."""
+    fecha, lineas = fecha_ingreso, []
+    for linea in notas.splitlines():
+        encabezado = ENCABEZADO.match(linea.strip())
+        if encabezado:
+            yield fecha, lineas
+            # La hora del encabezado se escribía con timezone.now() (UTC)
+            fecha = datetime.strptime(encabezado.group(1), '%d/%m/%Y %H:%M').replace(tzinfo=timezone.utc)
+            lineas = []
+        else:
+            lineas.append(linea.strip())
+    yield fecha, lineas
+
+
+def datos_inspeccion(lineas):
+    """
+    Kilometraje, nivel de combustible y observaciones de las líneas de un
+    bloque, o None si el bloque no tiene ninguno.
+    """
+    kilometraje, combustible, observaciones = None, '', []
+    en_observaciones = False
+    for linea in lineas:
+        if linea.startswith(KILOMETRAJE):
+            digitos = ''.join(c for c in linea[len(KILOMETRAJE):] if c.isdigit())
+            kilometraje = int(digitos) if digitos else kilometraje
+            en_observaciones = False
+        elif linea.startswith(COMBUSTIBLE):
+            valor = linea[len(COMBUSTIBLE):].strip()
+            combustible = valor if valor in NIVELES else combustible
+            en_observaciones = False
+        elif linea.startswith(OBSERVACIONES):
+            observaciones = [linea[len(OBSERVACIONES):].strip()]
+            en_observaciones = True
+        elif en_observaciones and linea and not linea.startswith('---'):
+            # Observaciones de varias líneas: siguen hasta una línea vacía o el informe
+            observaciones.append(linea)
+        else:
+            en_observaciones = False
+    observaciones = '\n'.join(observaciones).strip()
+    if kilometraje is None and not combustible and not observaciones:
+        return None
+    return {'kilometraje': kilometraje, 'nivel_combustible': combustible, 'observaciones': observaciones}
+
+
+def extraer_inspecciones(apps, schema_editor):
+    Reparacion = apps.get_model('gestion', 'Reparacion')
+    InspeccionVehiculo = apps.get_model('gestion', 'InspeccionVehiculo')
+    con_datos = (models.Q(notas__contains=KILOMETRAJE) | models.Q(notas__contains=COMBUSTIBLE)
+                 | models.Q(notas__contains=OBSERVACIONES))
+    reparaciones = (Reparacion.objects.filter(con_datos)
+                    .only('id', 'vehiculo_id', 'fecha_ingreso', 'notas').order_by('id'))
+    lote = []
+    for reparacion in reparaciones.iterator(chunk_size=TAMAÑO_LOTE):
+        for fecha, lineas in _bloques(reparacion.notas, reparacion.fecha_ingreso):
+            datos = datos_inspeccion(lineas)
+            if datos:
+                lote.append(InspeccionVehiculo(
+                    reparacion_id=reparacion.id, vehiculo_id=reparacion.vehiculo_id, fecha=fecha, **datos
+                ))
+        if len(lote) >= TAMAÑO_LOTE:
+            InspeccionVehiculo.objects.bulk_create(lote)
+            lote = []
+    InspeccionVehiculo.objects.bulk_create(lote)
+
+
+def borrar_inspecciones(apps, schema_editor):
+    # Las notas no se modifican al migrar: volver atrás solo borra las inspecciones
+    apps.get_model('gestion', 'InspeccionVehiculo').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0019_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspeccionVehiculo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kilometraje', models.PositiveIntegerField(blank=True, null=True)),
+                ('nivel_combustible', models.CharField(blank=True, choices=[('Vacío', 'Vacío'), ('1/4', '1/4'), ('1/2', '1/2'), ('3/4', '3/4'), ('Lleno', 'Lleno')], max_length=10)),
+                ('observaciones', models.TextField(blank=True)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reparacion', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inspecciones', to='gestion.reparacion')),
+                ('vehiculo', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inspecciones', to='gestion.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Inspección de vehículo',
+                'verbose_name_plural': 'Inspecciones de vehículos',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['reparacion', '-fecha'], name='inspeccion_reparacion_idx'), models.Index(fields=['vehiculo', '-fecha'], name='inspeccion_vehiculo_idx')],
+            },
+        ),
+        migrations.RunPython(extraer_inspecciones, borrar_inspecciones),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:12
+
+import re
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Formato con el que gestionar_reparacion_mecanico concatenaba en Reparacion.notas
+ENCABEZADO = re.compile(r'^--- Actualización (\d{2}/\d{2}/\d{4} \d{2}:\d{2}) ---$')
+INFORME = '--- INFORME DE REPARACIÓN ---'
+TAMAÑO_LOTE = 500
+
+
+def notas_de(reparacion):
+    """Una nota por bloque del texto: el primero con la fecha de ingreso, los demás con la de su encabezado."""
+    fecha, lineas = reparacion.fecha_ingreso, []
+    for linea in reparacion.notas.splitlines() + [None]:
+        encabezado = ENCABEZADO.match(linea.strip()) if linea is not None else None
+        if linea is not None and not encabezado:
+            lineas.append(linea)
+            continue
+        texto = '\n'.join(lineas).strip()
+        if texto:
+            yield fecha, ('informe' if INFORME in texto else 'observacion'), texto
+        if encabezado:
+            # La hora del encabezado se escribía con timezone.now() (UTC)
+            fecha = datetime.strptime(encabezado.group(1), '%d/%m/%Y %H:%M').replace(tzinfo=timezone.utc)
+            lineas = []
+
+
+def copiar_notas(apps, schema_editor):
+    Reparacion = apps.get_model('gestion', 'Reparacion')
+    NotaReparacion = apps.get_model('gestion', 'NotaReparacion')
+    reparaciones = (Reparacion.objects.exclude(notas__isnull=True).exclude(notas='')
+                    .only('id', 'fecha_ingreso', 'notas').order_by('id'))
+    lote = []
+    for reparacion in reparaciones.iterator(chunk_size=TAMAÑO_LOTE):
+        lote += [NotaReparacion(reparacion_id=reparacion.id, creada=fecha, tipo=tipo, texto=texto)
+                 for fecha, tipo, texto in notas_de(reparacion)]
+        if len(lote) >= TAMAÑO_LOTE:
+            NotaReparacion.objects.bulk_create(lote)
+            lote = []
+    NotaReparacion.objects.bulk_create(lote)
+
+
+def borrar_notas(apps, schema_editor):
+    # Reparacion.notas no se modifica al migrar: volver atrás solo borra las copias
+    apps.get_model('gestion', 'NotaReparacion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0020_inspeccion_vehiculo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotaReparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('informe', 'Informe de reparación'), ('observacion', 'Observación'), ('vin', 'Cambio de VIN')], default='observacion', max_length=20)),
+                ('texto', models.TextField()),
+                ('creada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('autor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notas_reparacion', to=settings.AUTH_USER_MODEL)),
+                ('reparacion', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historial_notas', to='gestion.reparacion')),
+            ],
+            options={
+                'verbose_name': 'Nota de reparación',
+                'verbose_name_plural': 'Notas de reparación',
+                'ordering': ['-creada', '-id'],
+                'indexes': [models.Index(fields=['reparacion', '-creada'], name='notareparacion_reparacion_idx')],
+            },
+        ),
+        migrations.RunPython(copiar_notas, borrar_notas),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+ESTADOS_CERRADOS = ('completada', 'cancelada')
+TAMAÑO_LOTE = 500
+
+
+def eventos_iniciales(apps, schema_editor):
+    """
+    Un evento por reparación existente con su estado actual: al ingresar, o
+    al salir si ya está cerrada. El historial anterior no se conoce.
+    """
+    Reparacion = apps.get_model('gestion', 'Reparacion')
+    ReparacionEvento = apps.get_model('gestion', 'ReparacionEvento')
+    filas = Reparacion.objects.values_list('id', 'estado_reparacion', 'fecha_ingreso', 'fecha_salida').order_by('id')
+    lote = []
+    for reparacion_id, estado, fecha_ingreso, fecha_salida in filas.iterator(chunk_size=TAMAÑO_LOTE):
+        fecha = fecha_salida if estado in ESTADOS_CERRADOS and fecha_salida else fecha_ingreso
+        lote.append(ReparacionEvento(
+            reparacion_id=reparacion_id, estado_nuevo=estado, fecha=fecha, origen='migracion'
+        ))
+        if len(lote) == TAMAÑO_LOTE:
+            ReparacionEvento.objects.bulk_create(lote)
+            lote = []
+    ReparacionEvento.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0021_notas_reparacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReparacionEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, choices=[('pendiente', '🟡 Pendiente'), ('en_progreso', '🔵 En Progreso'), ('en_espera', '🟠 En Espera de Repuestos'), ('revision', '🟣 Lista para Revisión'), ('completada', '🟢 Completada'), ('cancelada', '🔴 Cancelada')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('pendiente', '🟡 Pendiente'), ('en_progreso', '🔵 En Progreso'), ('en_espera', '🟠 En Espera de Repuestos'), ('revision', '🟣 Lista para Revisión'), ('completada', '🟢 Completada'), ('cancelada', '🔴 Cancelada')], max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('origen', models.CharField(choices=[('web', 'Web'), ('admin', 'Administración'), ('api', 'API'), ('bot', 'Bot de Telegram'), ('sistema', 'Sistema'), ('migracion', 'Migración de datos')], default='sistema', max_length=20)),
+                ('reparacion', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='gestion.reparacion')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_reparacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Evento de reparación',
+                'verbose_name_plural': 'Eventos de reparación',
+                'ordering': ['fecha', 'id'],
+                'indexes': [models.Index(fields=['reparacion', 'fecha'], name='evento_reparacion_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(eventos_iniciales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:23
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0022_eventos_reparacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReparacionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('placa', models.CharField(max_length=10)),
+                ('nombre_servicio', models.CharField(max_length=100)),
+                ('costo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha_ingreso', models.DateTimeField()),
+                ('fecha_salida', models.DateTimeField(blank=True, null=True)),
+                ('fecha_programada', models.DateField(blank=True, null=True)),
+                ('hora_programada', models.TimeField(blank=True, null=True)),
+                ('condicion_vehiculo', models.CharField(choices=[('excelente', 'Excelente - Vehículo como nuevo, solo mantenimiento preventivo'), ('bueno', 'Bueno - Desgaste leve, puede necesitar ajustes menores'), ('regular', 'Regular - Desgaste notable, necesita reparaciones moderadas'), ('malo', 'Malo - Desgastado, necesita reparaciones extensas'), ('critico', 'Crítico - Daño estructural, posible pérdida total')], max_length=20)),
+                ('estado_reparacion', models.CharField(choices=[('pendiente', '🟡 Pendiente'), ('en_progreso', '🔵 En Progreso'), ('en_espera', '🟠 En Espera de Repuestos'), ('revision', '🟣 Lista para Revisión'), ('completada', '🟢 Completada'), ('cancelada', '🔴 Cancelada')], max_length=20)),
+                ('notas', models.TextField(blank=True, null=True)),
+                ('historial', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archivada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('mecanico_asignado', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='gestion.empleado')),
+                ('servicio', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='gestion.servicio')),
+                ('vehiculo', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reparaciones_archivadas', to='gestion.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Reparación archivada',
+                'verbose_name_plural': 'Reparaciones archivadas',
+                'ordering': ['-fecha_ingreso'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TareaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('por_hacer', 'Por Hacer'), ('en_progreso', 'En Progreso'), ('completada', 'Completada')], max_length=20)),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('media', 'Media'), ('alta', 'Alta')], max_length=10)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_actualizacion', models.DateTimeField()),
+                ('fecha_limite', models.DateField(blank=True, null=True)),
+                ('etiqueta', models.CharField(blank=True, max_length=50, null=True)),
+                ('archivada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actualizada_por', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('asignada_a', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('creada_por', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('reparacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tareas', to='gestion.reparacionarchivada')),
+            ],
+            options={
+                'verbose_name': 'Tarea archivada',
+                'verbose_name_plural': 'Tareas archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TareaHistorialArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_cambio', models.DateTimeField()),
+                ('accion', models.CharField(max_length=50)),
+                ('descripcion', models.TextField()),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='gestion.tareaarchivada')),
+                ('usuario', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Historial de tarea archivada',
+                'verbose_name_plural': 'Historial de tareas archivadas',
+                'ordering': ['-fecha_cambio'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reparacionarchivada',
+            index=models.Index(fields=['fecha_ingreso'], name='rep_archivada_ingreso_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:27
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+TAMAÑO_LOTE = 500
+
+
+def calcular_contadores(apps, schema_editor):
+    """Contadores iniciales de cada cliente, por lotes (incluye las reparaciones archivadas)."""
+    Cliente = apps.get_model('gestion', 'Cliente')
+    Vehiculo = apps.get_model('gestion', 'Vehiculo')
+    Reparacion = apps.get_model('gestion', 'Reparacion')
+    ReparacionArchivada = apps.get_model('gestion', 'ReparacionArchivada')
+    ids = list(Cliente.objects.order_by('id').values_list('id', flat=True))
+    for inicio in range(0, len(ids), TAMAÑO_LOTE):
+        lote = ids[inicio:inicio + TAMAÑO_LOTE]
+        clientes = Cliente.objects.in_bulk(lote)
+        for cliente in clientes.values():
+            cliente.num_vehiculos = cliente.num_reparaciones = cliente.total_facturado = 0
+            cliente.ultima_visita = None
+        vehiculos = Vehiculo.objects.filter(cliente_id__in=lote).values('cliente_id').annotate(n=Count('id'))
+        for fila in vehiculos.order_by():
+            clientes[fila['cliente_id']].num_vehiculos = fila['n']
+        for modelo, costo in ((Reparacion, 'servicio__costo'), (ReparacionArchivada, 'costo')):
+            filas = (modelo.objects.filter(vehiculo__cliente_id__in=lote).values('vehiculo__cliente_id')
+                     .annotate(n=Count('id'), ultima=Max('fecha_ingreso'),
+                               facturado=Sum(costo, filter=models.Q(estado_reparacion='completada'))))
+            for fila in filas.order_by():
+                cliente = clientes[fila['vehiculo__cliente_id']]
+                cliente.num_reparaciones += fila['n']
+                cliente.total_facturado += fila['facturado'] or 0
+                if cliente.ultima_visita is None or fila['ultima'] > cliente.ultima_visita:
+                    cliente.ultima_visita = fila['ultima']
+        Cliente.objects.bulk_update(
+            clientes.values(), ['num_vehiculos', 'num_reparaciones', 'total_facturado', 'ultima_visita']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0023_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='num_reparaciones',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='num_vehiculos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='total_facturado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultima_visita',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0024_contadores_cliente'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EliminacionCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=201)),
+                ('solicitada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('procesados', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Eliminación de cliente',
+                'verbose_name_plural': 'Eliminaciones de clientes',
+                'ordering': ['-solicitada'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='eliminado',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='correo_electronico',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(condition=models.Q(('eliminado__isnull', True)), fields=('correo_electronico',), name='cliente_correo_unico', violation_error_message='Ya existe un cliente con este correo electrónico.'),
+        ),
+        migrations.AddField(
+            model_name='eliminacioncliente',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion.cliente'),
+        ),
+        migrations.AddField(
+            model_name='eliminacioncliente',
+            name='solicitada_por',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='eliminacioncliente',
+            index=models.Index(fields=['estado', 'solicitada'], name='eliminacion_estado_idx'),
+        ),
+    ]
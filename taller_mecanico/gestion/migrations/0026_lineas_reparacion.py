@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+TAMAÑO_LOTE = 500
+
+
+def crear_lineas(apps, schema_editor):
+    """
+    Una línea por reparación existente con el costo actual de su servicio
+    (no hay otro precio guardado) y el total igual a ese costo, por lotes.
+    """
+    Reparacion = apps.get_model('gestion', 'Reparacion')
+    LineaReparacion = apps.get_model('gestion', 'LineaReparacion')
+    ultimo = 0
+    while True:
+        lote = list(Reparacion.objects.filter(pk__gt=ultimo).order_by('pk')
+                    .values('id', 'servicio_id', 'servicio__costo', 'servicio__nombre_servicio', 'fecha_ingreso')
+                    [:TAMAÑO_LOTE])
+        if not lote:
+            return
+        ultimo = lote[-1]['id']
+        LineaReparacion.objects.bulk_create([
+            LineaReparacion(
+                reparacion_id=fila['id'], tipo='servicio', servicio_id=fila['servicio_id'],
+                descripcion=fila['servicio__nombre_servicio'], cantidad=1,
+                precio_unitario=fila['servicio__costo'], subtotal=fila['servicio__costo'],
+                creada=fila['fecha_ingreso'],
+            )
+            for fila in lote
+        ])
+        Reparacion.objects.bulk_update(
+            [Reparacion(id=fila['id'], total=fila['servicio__costo']) for fila in lote], ['total']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0025_eliminacion_clientes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reparacion',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='reparacionarchivada',
+            name='costo',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='LineaReparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('servicio', 'Servicio'), ('repuesto', 'Repuesto')], default='servicio', max_length=20)),
+                ('descripcion', models.CharField(blank=True, max_length=200)),
+                ('cantidad', models.DecimalField(decimal_places=2, default=1, max_digits=8)),
+                ('precio_unitario', models.DecimalField(blank=True, decimal_places=2, help_text='Vacío: el costo actual del servicio', max_digits=10, null=True)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12)),
+                ('creada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reparacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas', to='gestion.reparacion')),
+                ('servicio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion.servicio')),
+            ],
+            options={
+                'verbose_name': 'Línea de reparación',
+                'verbose_name_plural': 'Líneas de reparación',
+                'ordering': ['creada', 'id'],
+            },
+        ),
+        migrations.RunPython(crear_lineas, migrations.RunPython.noop),
+    ]
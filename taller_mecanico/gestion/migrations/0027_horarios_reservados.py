@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TAMAÑO_LOTE = 500
+ESTADOS_OCUPAN_HORARIO = ['pendiente', 'en_progreso']
+
+
+def _lotes(queryset):
+    ultimo = 0
+    while True:
+        lote = list(queryset.filter(pk__gt=ultimo).order_by('pk')[:TAMAÑO_LOTE])
+        if not lote:
+            return
+        yield lote
+        ultimo = lote[-1]['pk']
+
+
+def tomar_turnos(apps, schema_editor):
+    """
+    Turnos de las citas y de las reparaciones programadas que ocupan horario.
+    Si ya había una cita y una reparación en el mismo turno, queda la cita
+    (la otra se ve igual en los listados; solo no reserva).
+    """
+    Agenda = apps.get_model('gestion', 'Agenda')
+    Reparacion = apps.get_model('gestion', 'Reparacion')
+    HorarioReservado = apps.get_model('gestion', 'HorarioReservado')
+    sin_segundos = lambda hora: hora.replace(second=0, microsecond=0)
+    for lote in _lotes(Agenda.objects.values('pk', 'fecha', 'hora')):
+        HorarioReservado.objects.bulk_create([
+            HorarioReservado(cita_id=fila['pk'], fecha=fila['fecha'], hora=sin_segundos(fila['hora']))
+            for fila in lote
+        ], ignore_conflicts=True)
+    programadas = Reparacion.objects.filter(
+        estado_reparacion__in=ESTADOS_OCUPAN_HORARIO, fecha_programada__isnull=False, hora_programada__isnull=False,
+    ).values('pk', 'fecha_programada', 'hora_programada')
+    for lote in _lotes(programadas):
+        HorarioReservado.objects.bulk_create([
+            HorarioReservado(reparacion_id=fila['pk'], fecha=fila['fecha_programada'],
+                             hora=sin_segundos(fila['hora_programada']))
+            for fila in lote
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0026_lineas_reparacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioReservado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('cita', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='horario_reservado', to='gestion.agenda')),
+                ('reparacion', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='horario_reservado', to='gestion.reparacion')),
+            ],
+            options={
+                'verbose_name': 'Horario reservado',
+                'verbose_name_plural': 'Horarios reservados',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'hora'), name='horario_reservado_unico'), models.CheckConstraint(condition=models.Q(models.Q(('cita__isnull', False), ('reparacion__isnull', True)), models.Q(('cita__isnull', True), ('reparacion__isnull', False)), _connector='OR'), name='horario_reservado_un_duenio')],
+            },
+        ),
+        migrations.RunPython(tomar_turnos, migrations.RunPython.noop),
+    ]
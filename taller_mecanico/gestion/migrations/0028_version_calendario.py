@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0027_horarios_reservados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveBigIntegerField(default=1)),
+                ('modificada', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Versión de los calendarios',
+            },
+        ),
+    ]
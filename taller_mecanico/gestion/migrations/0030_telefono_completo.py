@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+
+TAMAÑO_LOTE = 500
+
+
+def normalizar(telefono):
+    telefono = (telefono or '').strip()
+    digitos = ''.join(c for c in telefono if c.isdigit())
+    if not digitos or telefono.startswith('+'):
+        return digitos
+    if digitos.startswith('00'):
+        return digitos[2:]
+    if digitos.startswith('0'):
+        digitos = digitos[1:]
+    return settings.TELEFONO_CODIGO_PAIS + digitos
+
+
+def telefonos_completos(apps, schema_editor):
+    """Recalcula telefono_normalizado con el número completo (antes: los últimos 8 dígitos)."""
+    Cliente = apps.get_model('gestion', 'Cliente')
+    ultimo_id = 0
+    while True:
+        lote = list(Cliente.objects.filter(pk__gt=ultimo_id).order_by('pk').only('id', 'telefono')[:TAMAÑO_LOTE])
+        if not lote:
+            break
+        for cliente in lote:
+            cliente.telefono_normalizado = normalizar(cliente.telefono)
+        Cliente.objects.bulk_update(lote, ['telefono_normalizado'])
+        ultimo_id = lote[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0029_recordatorio_reclamo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='telefono_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(telefonos_completos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+TAMAÑO_LOTE = 500
+
+
+def eventos_a_tabla(apps, schema_editor):
+    """Pasa los eventos guardados en ReparacionArchivada.historial['eventos'] a su tabla."""
+    ReparacionArchivada = apps.get_model('gestion', 'ReparacionArchivada')
+    ReparacionEventoArchivado = apps.get_model('gestion', 'ReparacionEventoArchivado')
+    ultimo_id = 0
+    while True:
+        lote = list(ReparacionArchivada.objects.filter(pk__gt=ultimo_id).order_by('pk').only('id', 'historial')
+                    [:TAMAÑO_LOTE])
+        if not lote:
+            break
+        eventos = []
+        for archivada in lote:
+            for evento in archivada.historial.pop('eventos', []):
+                eventos.append(ReparacionEventoArchivado(
+                    reparacion_id=archivada.id,
+                    estado_anterior=evento.get('estado_anterior') or '',
+                    estado_nuevo=evento['estado_nuevo'],
+                    origen=evento.get('origen') or 'sistema',
+                    usuario_id=evento.get('usuario_id'),
+                    fecha=parse_datetime(evento['fecha']),
+                ))
+        ReparacionEventoArchivado.objects.bulk_create(eventos)
+        ReparacionArchivada.objects.bulk_update(lote, ['historial'])
+        ultimo_id = lote[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0030_telefono_completo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReparacionEventoArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, choices=[('pendiente', '🟡 Pendiente'), ('en_progreso', '🔵 En Progreso'), ('en_espera', '🟠 En Espera de Repuestos'), ('revision', '🟣 Lista para Revisión'), ('completada', '🟢 Completada'), ('cancelada', '🔴 Cancelada')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('pendiente', '🟡 Pendiente'), ('en_progreso', '🔵 En Progreso'), ('en_espera', '🟠 En Espera de Repuestos'), ('revision', '🟣 Lista para Revisión'), ('completada', '🟢 Completada'), ('cancelada', '🔴 Cancelada')], max_length=20)),
+                ('fecha', models.DateTimeField()),
+                ('origen', models.CharField(choices=[('web', 'Web'), ('admin', 'Administración'), ('api', 'API'), ('bot', 'Bot de Telegram'), ('sistema', 'Sistema'), ('migracion', 'Migración de datos')], default='sistema', max_length=20)),
+                ('reparacion', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='gestion.reparacionarchivada')),
+                ('usuario', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Evento de reparación archivada',
+                'verbose_name_plural': 'Eventos de reparaciones archivadas',
+                'ordering': ['fecha', 'id'],
+                'indexes': [models.Index(fields=['reparacion', 'fecha'], name='evento_archivado_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(eventos_a_tabla, migrations.RunPython.noop),
+    ]
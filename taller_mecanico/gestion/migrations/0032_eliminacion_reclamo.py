@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0031_eventos_archivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eliminacioncliente',
+            name='actualizada',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
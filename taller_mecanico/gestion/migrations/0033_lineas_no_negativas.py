@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:42
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0032_eliminacion_reclamo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lineareparacion',
+            name='cantidad',
+            field=models.DecimalField(decimal_places=2, default=1, max_digits=8, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='lineareparacion',
+            name='precio_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Vacío: el costo actual del servicio', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0033_lineas_no_negativas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('eliminado__isnull', False)), fields=['eliminado'], name='cliente_eliminado_idx'),
+        ),
+    ]
@@ -10,13 +10,18 @@ Este archivo define todos los modelos de datos utilizados en el sistema:
 - Reparacion: Registro de reparaciones realizadas
 - Agenda: Sistema de citas y agendamiento
 - Registro: Historial de servicios realizados
+- Notificacion: Avisos pendientes de envío a los clientes
+- ReparacionArchivada, TareaArchivada: reparaciones y tareas cerradas antiguas
 
 Cada modelo incluye métodos __str__ para representación legible y métodos
 personalizados para operaciones específicas del negocio.
 """
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
@@ -60,18 +65,121 @@ class UserProfile(models.Model):
 
 # ========== MODELOS PRINCIPALES DEL NEGOCIO ==========
 
+# Largo máximo del teléfono normalizado (E.164 admite 15 dígitos; margen
+# para números nacionales mal escritos a los que se antepone el código de país)
+LARGO_TELEFONO_NORMALIZADO = 20
+
+
+def normalizar_telefono(telefono, internacional=False):
+    """
+    Número completo, solo dígitos y con el código de país (E.164 sin '+').
+
+    Un número con '+' o '00' ya trae el código de país; uno nacional
+    (099 123 456) recibe settings.TELEFONO_CODIGO_PAIS en lugar del 0 inicial.
+    Los contactos de Telegram siempre traen el código de país, aunque lleguen
+    sin '+' (internacional=True). Dos números solo coinciden si son iguales.
+    """
+    telefono = (telefono or '').strip()
+    digitos = ''.join(c for c in telefono if c.isdigit())
+    if not digitos or internacional or telefono.startswith('+'):
+        return digitos
+    if digitos.startswith('00'):
+        return digitos[2:]
+    if digitos.startswith('0'):
+        digitos = digitos[1:]
+    return settings.TELEFONO_CODIGO_PAIS + digitos
+
+
+class ClienteManager(models.Manager):
+    """Oculta los clientes eliminados que esperan la purga (ver gestion/purga.py)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminado__isnull=True)
+
+
+class DeClienteActivoManager(models.Manager):
+    """
+    Oculta los registros de clientes eliminados que esperan la purga.
+
+    Filtra con NOT IN (subconsulta) en vez de unir con Cliente: los
+    eliminados son pocos (índice cliente_eliminado_idx) y la consulta
+    principal sigue usando sus propios índices.
+
+    La ruta va en atributos de clase: Django crea los managers de las
+    relaciones inversas (vehiculo.reparaciones) llamando __init__() sin
+    argumentos.
+    """
+    campo = 'cliente'  # FK del modelo
+    eliminado = 'eliminado'  # desde el modelo de esa FK hasta Cliente.eliminado
+
+    def get_queryset(self):
+        relacionado = self.model._meta.get_field(self.campo).related_model
+        eliminados = relacionado._base_manager.filter(**{f'{self.eliminado}__isnull': False}).values('pk')
+        return super().get_queryset().exclude(**{f'{self.campo}__in': eliminados})
+
+
+class ReparacionManager(DeClienteActivoManager):
+    """Reparaciones (vivas y archivadas): el cliente está en su vehículo."""
+    campo, eliminado = 'vehiculo', 'cliente__eliminado'
+
+
 class Cliente(models.Model):
     """
     Modelo que representa a los clientes del taller mecánico.
 
     Contiene información básica de contacto y permite relacionar múltiples vehículos.
+    Al eliminarlo solo se marca (eliminado) y deja de verse; sus datos se
+    borran después en segundo plano (python manage.py purgar_clientes).
     """
     nombre = models.CharField(max_length=100)
     apellido = models.CharField(max_length=100)  # Campo agregado en migración
     telefono = models.CharField(max_length=15)
     direccion = models.CharField(max_length=255)
-    correo_electronico = models.EmailField(unique=True)
+    correo_electronico = models.EmailField()  # único entre los clientes no eliminados
     fecha_registro = models.DateTimeField(default=timezone.now, verbose_name='Fecha de registro')
+    telegram_chat_id = models.CharField(
+        max_length=50,
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name='Telegram Chat ID',
+        help_text='ID de chat de Telegram para notificaciones'
+    )
+    # Búsqueda por teléfono sin recorrer la tabla (bot de Telegram)
+    telefono_normalizado = models.CharField(max_length=LARGO_TELEFONO_NORMALIZADO, blank=True, db_index=True,
+                                            editable=False)
+    # Contadores que mantienen los signals (ver gestion/contadores.py)
+    num_vehiculos = models.PositiveIntegerField(default=0, editable=False)
+    num_reparaciones = models.PositiveIntegerField(default=0, editable=False)
+    total_facturado = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    ultima_visita = models.DateTimeField(null=True, blank=True, editable=False)
+    eliminado = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ClienteManager()  # sin los eliminados
+    todos = models.Manager()
+
+    CONTADORES = ('num_vehiculos', 'num_reparaciones', 'total_facturado', 'ultima_visita')
+
+    def save(self, *args, **kwargs):
+        self.telefono_normalizado = normalizar_telefono(self.telefono)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'telefono' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'telefono_normalizado'}
+        elif update_fields is None and not self._state.adding:
+            # Los contadores solo se cambian con F(): guardar el cliente no los pisa
+            diferidos = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CONTADORES and campo.attname not in diferidos
+            ]
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        super().clean()
+        # cliente_correo_unico tiene condición y los formularios no la validan (eliminado no es un campo editable)
+        otros = Cliente.objects.filter(correo_electronico=self.correo_electronico).exclude(pk=self.pk)
+        if self.correo_electronico and otros.exists():
+            raise ValidationError({'correo_electronico': 'Ya existe un cliente con este correo electrónico.'})
 
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
@@ -79,6 +187,20 @@ class Cliente(models.Model):
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
+        constraints = [
+            # Un cliente eliminado no bloquea el correo mientras espera la purga
+            models.UniqueConstraint(
+                fields=['correo_electronico'],
+                condition=models.Q(eliminado__isnull=True),
+                name='cliente_correo_unico',
+                violation_error_message='Ya existe un cliente con este correo electrónico.',
+            ),
+        ]
+        indexes = [
+            # Solo los eliminados (pocos): los managers de vehículos, reparaciones y citas los excluyen
+            models.Index(fields=['eliminado'], name='cliente_eliminado_idx',
+                         condition=models.Q(eliminado__isnull=False)),
+        ]
 
 class Empleado(models.Model):
     """
@@ -129,6 +251,9 @@ class Vehiculo(models.Model):
     placa = models.CharField(max_length=10, unique=True)  # Placa única del vehículo
     vin = models.CharField(max_length=17, blank=True, null=True, verbose_name='VIN', help_text='Número de Identificación del Vehículo (17 caracteres)')
 
+    objects = DeClienteActivoManager()  # sin los de clientes eliminados
+    todos = models.Manager()
+
     def __str__(self):
         return f"{self.marca} {self.modelo} ({self.placa})"
 
@@ -161,6 +286,9 @@ class Reparacion(models.Model):
         ('completada', '🟢 Completada'),
         ('cancelada', '🔴 Cancelada'),
     ]
+
+    # Estados en los que una reparación programada ocupa su horario
+    ESTADOS_OCUPAN_HORARIO = ['pendiente', 'en_progreso']
     
     vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='reparaciones')
     servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE)
@@ -170,6 +298,7 @@ class Reparacion(models.Model):
         null=True, 
         blank=True,
         related_name='reparaciones_asignadas',
+        db_index=False,  # cubierto por reparacion_mecanico_estado_idx
         verbose_name='Mecánico Asignado',
         help_text='Mecánico responsable de la reparación'
     )
@@ -201,14 +330,248 @@ class Reparacion(models.Model):
         verbose_name='Estado de la Reparación',
         help_text="Estado actual de la reparación"
     )
+    # Histórico: las notas nuevas se guardan en NotaReparacion (los listados lo difieren)
     notas = models.TextField(blank=True, null=True, help_text="Notas adicionales sobre la reparación")
+    # Suma de las líneas (LineaReparacion); la mantienen los signals
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+
+    objects = ReparacionManager()  # sin las de clientes eliminados
+    todos = models.Manager()
 
     def __str__(self):
         return f"Reparación de {self.vehiculo} - {self.servicio}"
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            # El total solo se cambia con F() desde las líneas: guardar la reparación no lo pisa
+            diferidos = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'total' and campo.attname not in diferidos
+            ]
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        # Valores que comparan los signals al guardar (de una carga parcial, solo los recargados)
+        if fields is None:
+            recordar_estado_reparacion(Reparacion, self)
+        elif 'estado_reparacion' in fields:
+            self._estado_guardado = self.estado_reparacion
+
     class Meta:
         verbose_name = "Reparación"
         verbose_name_plural = "Reparaciones"
+        constraints = [
+            # Evita reservar dos veces el mismo horario (web y bot de Telegram)
+            models.UniqueConstraint(
+                fields=['fecha_programada', 'hora_programada'],
+                condition=models.Q(estado_reparacion__in=['pendiente', 'en_progreso']),
+                name='reparacion_horario_unico',
+                violation_error_message='Ya hay una reparación programada para esa fecha y hora.',
+            ),
+        ]
+        # Índices según las consultas de los paneles, reportes y asignación
+        # (tests_indices.py verifica con EXPLAIN que se usan)
+        indexes = [
+            # Conteos por estado y listados por estado ordenados por ingreso (incluye
+            # las disponibles para tomar: pendientes sin mecánico)
+            models.Index(fields=['estado_reparacion', 'fecha_ingreso'], name='reparacion_estado_ingreso_idx'),
+            # Panel del mecánico (asignadas, completadas del mes) y cargas de asignación;
+            # reemplaza al índice simple de mecanico_asignado
+            models.Index(
+                fields=['mecanico_asignado', 'estado_reparacion', 'fecha_salida'],
+                name='reparacion_mecanico_estado_idx',
+            ),
+            # Rangos de fechas de los reportes y reparaciones recientes
+            models.Index(fields=['fecha_ingreso'], name='reparacion_ingreso_idx'),
+        ]
+
+class LineaReparacion(models.Model):
+    """
+    Servicio o repuesto cobrado en una reparación.
+
+    El precio se copia al crear la línea: cambiar después el costo de un
+    Servicio no cambia lo ya cobrado. Reparacion.total es la suma de los
+    subtotales (ver signals). La línea del servicio principal se crea sola
+    al registrar la reparación.
+    """
+    TIPOS = [
+        ('servicio', 'Servicio'),
+        ('repuesto', 'Repuesto'),
+    ]
+
+    reparacion = models.ForeignKey(Reparacion, on_delete=models.CASCADE, related_name='lineas')
+    tipo = models.CharField(max_length=20, choices=TIPOS, default='servicio')
+    servicio = models.ForeignKey(Servicio, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    descripcion = models.CharField(max_length=200, blank=True)
+    cantidad = models.DecimalField(max_digits=8, decimal_places=2, default=1, validators=[MinValueValidator(0)])
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                          validators=[MinValueValidator(0)],
+                                          help_text='Vacío: el costo actual del servicio')
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    creada = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Línea de reparación'
+        verbose_name_plural = 'Líneas de reparación'
+        ordering = ['creada', 'id']
+
+    def clean(self):
+        if self.servicio_id is None and (self.precio_unitario is None or not self.descripcion):
+            raise ValidationError('Un repuesto necesita descripción y precio.')
+
+    def save(self, *args, **kwargs):
+        if self.servicio_id is not None:
+            if self.precio_unitario is None:
+                self.precio_unitario = self.servicio.costo
+            if not self.descripcion:
+                self.descripcion = self.servicio.nombre_servicio
+        self.subtotal = self.cantidad * (self.precio_unitario or 0)
+        with transaction.atomic():
+            if not self._state.adding:
+                # El signal suma la diferencia con lo guardado, no con lo que se leyó
+                # (la fila pudo cambiar después, p. ej. al cambiar el servicio principal)
+                self._subtotal_guardado = self._subtotal_en_base(self._subtotal_guardado)
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.subtotal = self._subtotal_en_base(self.subtotal)
+            return super().delete(*args, **kwargs)
+
+    def _subtotal_en_base(self, defecto):
+        guardado = (LineaReparacion.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('subtotal', flat=True).first())
+        return defecto if guardado is None else guardado
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.descripcion} (${self.precio_unitario})"
+
+class ReparacionEvento(models.Model):
+    """
+    Cambio de estado de una reparación, para medir cuánto tiempo pasa en
+    cada estado (ver gestion/tiempos.py).
+
+    Lo escribe el signal registrar_evento_estado en cada save() que cambia
+    estado_reparacion, venga de la web, el admin, la API o el bot. Solo se
+    agregan filas.
+    """
+    ORIGENES = [
+        ('web', 'Web'),
+        ('admin', 'Administración'),
+        ('api', 'API'),
+        ('bot', 'Bot de Telegram'),
+        ('sistema', 'Sistema'),
+        ('migracion', 'Migración de datos'),
+    ]
+
+    # El índice simple de la FK está cubierto por evento_reparacion_fecha_idx
+    reparacion = models.ForeignKey(Reparacion, on_delete=models.CASCADE, related_name='eventos', db_index=False)
+    estado_anterior = models.CharField(max_length=20, choices=Reparacion.ESTADO_REPARACION, blank=True)
+    estado_nuevo = models.CharField(max_length=20, choices=Reparacion.ESTADO_REPARACION)
+    fecha = models.DateTimeField(default=timezone.now)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='eventos_reparacion')
+    origen = models.CharField(max_length=20, choices=ORIGENES, default='sistema')
+
+    class Meta:
+        verbose_name = 'Evento de reparación'
+        verbose_name_plural = 'Eventos de reparación'
+        ordering = ['fecha', 'id']
+        indexes = [
+            # Ventanas por reparación ordenadas por fecha (PARTITION BY / ORDER BY)
+            models.Index(fields=['reparacion', 'fecha'], name='evento_reparacion_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reparación #{self.reparacion_id}: {self.estado_anterior or '-'} → {self.estado_nuevo}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Los eventos de reparación no se modifican.')
+        super().save(*args, **kwargs)
+
+
+class NotaReparacion(models.Model):
+    """
+    Nota del historial de una reparación (informe, observación, cambio de VIN).
+
+    Solo se agregan: cada nota es una fila nueva en lugar de concatenar texto
+    en Reparacion.notas, que queda como histórico de solo lectura.
+    """
+    TIPOS = [
+        ('informe', 'Informe de reparación'),
+        ('observacion', 'Observación'),
+        ('vin', 'Cambio de VIN'),
+    ]
+
+    # El índice simple de la FK está cubierto por notareparacion_reparacion_idx
+    reparacion = models.ForeignKey(Reparacion, on_delete=models.CASCADE, related_name='historial_notas', db_index=False)
+    autor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='notas_reparacion')
+    tipo = models.CharField(max_length=20, choices=TIPOS, default='observacion')
+    texto = models.TextField()
+    creada = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Nota de reparación'
+        verbose_name_plural = 'Notas de reparación'
+        ordering = ['-creada', '-id']
+        indexes = [
+            # Páginas del historial de notas de una reparación
+            models.Index(fields=['reparacion', '-creada'], name='notareparacion_reparacion_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - Reparación #{self.reparacion_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Las notas de reparación no se modifican: agregar una nota nueva.')
+        super().save(*args, **kwargs)
+
+
+class InspeccionVehiculo(models.Model):
+    """
+    Datos del vehículo registrados por el mecánico en cada actualización de
+    una reparación: kilometraje, nivel de combustible y observaciones.
+
+    Reemplaza a las líneas "Kilometraje: ..." que se agregaban a
+    Reparacion.notas; la última inspección de la reparación es la vigente y
+    las de un vehículo forman su historial de kilometraje.
+    """
+    NIVELES_COMBUSTIBLE = [
+        ('Vacío', 'Vacío'),
+        ('1/4', '1/4'),
+        ('1/2', '1/2'),
+        ('3/4', '3/4'),
+        ('Lleno', 'Lleno'),
+    ]
+
+    # Los índices simples de las FK están cubiertos por los compuestos de Meta
+    reparacion = models.ForeignKey(Reparacion, on_delete=models.CASCADE, related_name='inspecciones', db_index=False)
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='inspecciones', db_index=False)
+    kilometraje = models.PositiveIntegerField(null=True, blank=True)
+    nivel_combustible = models.CharField(max_length=10, choices=NIVELES_COMBUSTIBLE, blank=True)
+    observaciones = models.TextField(blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Inspección de vehículo'
+        verbose_name_plural = 'Inspecciones de vehículos'
+        ordering = ['-fecha', '-id']
+        indexes = [
+            # Última inspección de una reparación
+            models.Index(fields=['reparacion', '-fecha'], name='inspeccion_reparacion_idx'),
+            # Historial de kilometraje del vehículo
+            models.Index(fields=['vehiculo', '-fecha'], name='inspeccion_vehiculo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Inspección de {self.vehiculo} ({self.fecha:%d/%m/%Y})"
+
+    def mismos_datos(self, kilometraje, nivel_combustible, observaciones):
+        return (self.kilometraje, self.nivel_combustible, self.observaciones) == (
+            kilometraje, nivel_combustible, observaciones)
 
 class Agenda(models.Model):
     """
@@ -221,6 +584,9 @@ class Agenda(models.Model):
     fecha = models.DateField()
     hora = models.TimeField()
 
+    objects = DeClienteActivoManager()  # sin las de clientes eliminados
+    todos = models.Manager()
+
     def __str__(self):
         return f"Cita para {self.cliente} - {self.servicio} el {self.fecha} a las {self.hora}"
 
@@ -228,24 +594,86 @@ class Agenda(models.Model):
         """
         Método personalizado para programar citas con validaciones.
 
-        Verifica que la fecha no sea pasada y que no haya conflictos de horario.
+        Verifica que la fecha no sea pasada y reserva el horario de forma
+        atómica: la restricción única (fecha, hora) impide citas duplicadas
+        aunque lleguen dos solicitudes al mismo tiempo.
         """
-        # Validación: no se pueden programar citas en fechas pasadas
-        if fecha < timezone.now().date():
-            raise ValidationError("No se puede programar citas en fechas pasadas.")
-
-        # Validación: no debe haber citas en el mismo horario
-        if Agenda.objects.filter(fecha=fecha, hora=hora).exists():
-            raise ValidationError("Ya existe una cita para esa fecha y hora.")
-
-        # Crear y guardar la nueva cita
-        cita = Agenda(cliente=cliente, servicio=servicio, fecha=fecha, hora=hora)
-        cita.save()
-        return cita
+        from .reservas import reservar_cita
+        return reservar_cita(cliente, servicio, fecha, hora)
 
     class Meta:
         verbose_name = "Cita"
         verbose_name_plural = "Agenda"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'hora'],
+                name='agenda_horario_unico',
+                violation_error_message='Ya existe una cita programada para esta fecha y hora.',
+            ),
+        ]
+
+class HorarioReservado(models.Model):
+    """
+    Turno del taller tomado por una cita o por una reparación programada.
+
+    Las dos tablas reservan los mismos turnos: la restricción única de esta
+    tabla es la que impide que una cita web y una reparación del bot tomen el
+    mismo horario a la vez. La mantienen los signals de Agenda y Reparacion
+    dentro de la transacción de cada reserva (ver gestion/reservas.py).
+    """
+    fecha = models.DateField()
+    hora = models.TimeField()
+    cita = models.OneToOneField(Agenda, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='horario_reservado')
+    reparacion = models.OneToOneField('Reparacion', on_delete=models.CASCADE, null=True, blank=True,
+                                      related_name='horario_reservado')
+
+    class Meta:
+        verbose_name = 'Horario reservado'
+        verbose_name_plural = 'Horarios reservados'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'hora'], name='horario_reservado_unico'),
+            # Cada turno es de una cita o de una reparación, no de las dos
+            models.CheckConstraint(
+                condition=(models.Q(cita__isnull=False, reparacion__isnull=True)
+                           | models.Q(cita__isnull=True, reparacion__isnull=False)),
+                name='horario_reservado_un_duenio',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.hora:%H:%M}"
+
+    @staticmethod
+    def turno(hora):
+        """Hora del turno sin segundos (así se comparan citas y reparaciones)."""
+        return hora.replace(second=0, microsecond=0)
+
+    @classmethod
+    def tomar(cls, fecha, hora, **duenio):
+        """
+        Reserva (o mueve) el turno de la cita o reparación de duenio.
+
+        Raises:
+            IntegrityError: si el turno es de otra cita o reparación
+        """
+        hora = cls.turno(hora)
+        if not cls.objects.filter(**duenio).update(fecha=fecha, hora=hora):
+            cls.objects.create(fecha=fecha, hora=hora, **duenio)
+
+class VersionCalendario(models.Model):
+    """
+    Versión de los datos de los feeds iCalendar (una sola fila).
+
+    Está en la base y no en la caché para que la vean todos los procesos
+    (web, bot, comandos): cualquiera que cambie citas, reparaciones o
+    servicios la incrementa y los ETag cambian en todos (ver gestion/calendario.py).
+    """
+    numero = models.PositiveBigIntegerField(default=1)
+    modificada = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Versión de los calendarios'
 
 class Registro(models.Model):
     """
@@ -311,7 +739,10 @@ class Tarea(models.Model):
     reparacion = models.ForeignKey('Reparacion', on_delete=models.CASCADE, related_name='tareas', null=True, blank=True)
     creada_por = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tareas_creadas')
     actualizada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas_actualizadas')
-    asignada_a = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas_asignadas')
+    asignada_a = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas_asignadas',
+        db_index=False,  # cubierto por tarea_asignada_estado_idx
+    )
     
     etiqueta = models.CharField(max_length=50, blank=True, null=True)
 
@@ -327,6 +758,12 @@ class Tarea(models.Model):
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Panel del mecánico: tareas propias por estado, completadas por fecha
+            models.Index(fields=['asignada_a', 'estado', 'fecha_actualizacion'], name='tarea_asignada_estado_idx'),
+            # Panel del encargado: últimas tareas de cada estado
+            models.Index(fields=['estado', 'fecha_creacion'], name='tarea_estado_creacion_idx'),
+        ]
 
 
 class TareaHistorial(models.Model):
@@ -347,11 +784,293 @@ class TareaHistorial(models.Model):
     def __str__(self):
         return f"{self.tarea.titulo} - {self.accion} por {self.usuario.username if self.usuario else 'Sistema'}"
 
+class Recordatorio(models.Model):
+    """
+    Estado de entrega de los recordatorios enviados por Telegram.
+
+    Hay un registro por cita o reparación y fecha del evento; evita enviar
+    dos veces el mismo recordatorio (ver gestion/recordatorios.py).
+    """
+    TIPOS = [
+        ('cita', 'Cita'),
+        ('reparacion', 'Reparación'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    objeto_id = models.PositiveIntegerField()
+    fecha_evento = models.DateField()
+    chat_id = models.CharField(max_length=50)
+    estado = models.CharField(max_length=20, choices=ESTADOS)
+    intentos = models.PositiveSmallIntegerField(default=1)
+    error = models.CharField(max_length=255, blank=True)
+    fecha_envio = models.DateTimeField(default=timezone.now)
+    # Envío que reclamó el registro (estado 'enviando'); evita que dos procesos lo manden
+    envio = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Recordatorio'
+        verbose_name_plural = 'Recordatorios'
+        ordering = ['-fecha_envio']
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id', 'fecha_evento'], name='recordatorio_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.objeto_id} ({self.fecha_evento}) - {self.estado}"
+
+class EstadoBot(models.Model):
+    """
+    Estado persistente del bot de Telegram (ver gestion/bot/persistencia.py).
+
+    Guarda el paso de cada conversación y los datos de usuario/chat de
+    python-telegram-bot para que un reinicio o varios procesos del bot no
+    pierdan las reservas en curso.
+    """
+    TIPOS = [
+        ('conversacion', 'Conversación'),
+        ('usuario', 'Datos de usuario'),
+        ('chat', 'Datos de chat'),
+        ('bot', 'Datos del bot'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    nombre = models.CharField(max_length=50, blank=True)  # nombre de la conversación
+    clave = models.CharField(max_length=100)  # id de usuario/chat o clave de conversación
+    datos = models.JSONField(null=True)
+    actualizado = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'Estado del bot'
+        verbose_name_plural = 'Estados del bot'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'nombre', 'clave'], name='estado_bot_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.nombre} {self.clave}".replace('  ', ' ')
+
+class Notificacion(models.Model):
+    """
+    Bandeja de salida de avisos al cliente (ver gestion/notificaciones.py).
+
+    Se escribe en la misma transacción que el cambio que la origina y un
+    proceso aparte la envía por Telegram o por correo, con reintentos.
+    La clave evita encolar dos veces el mismo aviso y el reclamo (estado
+    'enviando' con el uuid del despacho) que dos despachadores lo envíen.
+    """
+    CANALES = [
+        ('telegram', 'Telegram'),
+        ('email', 'Correo electrónico'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviada', 'Enviada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    clave = models.CharField(max_length=100, unique=True)  # p. ej. reparacion-15-completada
+    reparacion = models.ForeignKey(Reparacion, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='notificaciones')
+    canal = models.CharField(max_length=20, choices=CANALES)
+    destino = models.CharField(max_length=254)  # chat_id o correo
+    asunto = models.CharField(max_length=200, blank=True)
+    mensaje = models.TextField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)  # enviando: vence el reclamo
+    error = models.CharField(max_length=255, blank=True)
+    creada = models.DateTimeField(default=timezone.now)
+    enviada = models.DateTimeField(null=True, blank=True)
+    # Despacho que la reclamó (ver notificaciones.reclamar_avisos)
+    envio = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Notificación'
+        verbose_name_plural = 'Notificaciones'
+        ordering = ['-creada']
+        indexes = [
+            # Lo que consulta el despachador en cada vuelta
+            models.Index(fields=['estado', 'proximo_intento'], name='notificacion_pendiente_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} ({self.get_canal_display()}) - {self.estado}"
+
+class EliminacionCliente(models.Model):
+    """
+    Purga pendiente o en curso de un cliente eliminado.
+
+    La crea eliminar_cliente() y la procesa purgar_clientes por lotes
+    (ver gestion/purga.py); procesados / total es el avance.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    nombre = models.CharField(max_length=201)  # el cliente se borra al terminar
+    solicitada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    solicitada = models.DateTimeField(default=timezone.now)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    total = models.PositiveIntegerField(default=0)  # filas a borrar (reparaciones, citas, vehículos...)
+    procesados = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    # Último avance del proceso que la tiene tomada (ver purga._reclamar)
+    actualizada = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Eliminación de cliente'
+        verbose_name_plural = 'Eliminaciones de clientes'
+        ordering = ['-solicitada']
+        indexes = [
+            models.Index(fields=['estado', 'solicitada'], name='eliminacion_estado_idx'),
+        ]
+
+    @property
+    def progreso(self):
+        """Porcentaje borrado."""
+        if self.estado == 'completada':
+            return 100
+        return min(99, int(self.procesados * 100 / self.total)) if self.total else 0
+
+    def __str__(self):
+        return f"Eliminación de {self.nombre} ({self.get_estado_display()}, {self.progreso}%)"
+
+# ========== ARCHIVO ==========
+
+class ReparacionArchivada(models.Model):
+    """
+    Reparación cerrada (completada o cancelada) movida fuera de la tabla viva.
+
+    La mueve archivar_reparaciones (ver gestion/archivo.py) cuando supera el
+    horizonte de ARCHIVO_HORIZONTE_DIAS. Conserva el id original; el costo y
+    los nombres se copian para no depender de filas que pueden borrarse. Las
+    líneas, notas e inspecciones se guardan en historial (JSON); los eventos
+    de estado, en ReparacionEventoArchivado para que los reportes de tiempos
+    los sigan consultando.
+    """
+    id = models.BigIntegerField(primary_key=True)  # id de la Reparacion original
+    # Sin restricción en la base: el vehículo o el servicio pueden borrarse después
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.DO_NOTHING, db_constraint=False,
+                                 related_name='reparaciones_archivadas')
+    servicio = models.ForeignKey(Servicio, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    mecanico_asignado = models.ForeignKey('Empleado', on_delete=models.DO_NOTHING, db_constraint=False,
+                                          null=True, blank=True, related_name='+')
+    placa = models.CharField(max_length=10)
+    nombre_servicio = models.CharField(max_length=100)
+    costo = models.DecimalField(max_digits=12, decimal_places=2)  # Reparacion.total al archivar
+    fecha_ingreso = models.DateTimeField()
+    fecha_salida = models.DateTimeField(null=True, blank=True)
+    fecha_programada = models.DateField(null=True, blank=True)
+    hora_programada = models.TimeField(null=True, blank=True)
+    condicion_vehiculo = models.CharField(max_length=20, choices=Reparacion.CONDICION_OPCIONES)
+    estado_reparacion = models.CharField(max_length=20, choices=Reparacion.ESTADO_REPARACION)
+    notas = models.TextField(blank=True, null=True)
+    historial = models.JSONField(default=dict, encoder=DjangoJSONEncoder)  # {lineas, notas, inspecciones}
+    archivada = models.DateTimeField(default=timezone.now)
+
+    objects = ReparacionManager()  # sin las de clientes eliminados
+    todos = models.Manager()
+
+    class Meta:
+        verbose_name = 'Reparación archivada'
+        verbose_name_plural = 'Reparaciones archivadas'
+        ordering = ['-fecha_ingreso']
+        indexes = [
+            # Rangos de fechas de los reportes de ingresos
+            models.Index(fields=['fecha_ingreso'], name='rep_archivada_ingreso_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reparación {self.id} de {self.placa} - {self.nombre_servicio} (archivada)"
+
+
+class TareaArchivada(models.Model):
+    """Tarea completada movida fuera de la tabla viva (con su reparación o sola)."""
+    id = models.BigIntegerField(primary_key=True)  # id de la Tarea original
+    titulo = models.CharField(max_length=200)
+    descripcion = models.TextField(blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=Tarea.ESTADOS_TAREA)
+    prioridad = models.CharField(max_length=10, choices=Tarea.PRIORIDAD_CHOICES)
+    fecha_creacion = models.DateTimeField()
+    fecha_actualizacion = models.DateTimeField()
+    fecha_limite = models.DateField(null=True, blank=True)
+    etiqueta = models.CharField(max_length=50, blank=True, null=True)
+    reparacion = models.ForeignKey(ReparacionArchivada, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='tareas')
+    creada_por = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    actualizada_por = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                                        null=True, blank=True, related_name='+')
+    asignada_a = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                                   null=True, blank=True, related_name='+')
+    archivada = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Tarea archivada'
+        verbose_name_plural = 'Tareas archivadas'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return self.titulo
+
+
+class TareaHistorialArchivada(models.Model):
+    """Historial de una tarea archivada."""
+    tarea = models.ForeignKey(TareaArchivada, on_delete=models.CASCADE, related_name='historial')
+    usuario = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                                null=True, related_name='+')
+    fecha_cambio = models.DateTimeField()
+    accion = models.CharField(max_length=50)
+    descripcion = models.TextField()
+
+    class Meta:
+        verbose_name = 'Historial de tarea archivada'
+        verbose_name_plural = 'Historial de tareas archivadas'
+        ordering = ['-fecha_cambio']
+
+    def __str__(self):
+        return f"{self.tarea.titulo} - {self.accion}"
+
+
+class ReparacionEventoArchivado(models.Model):
+    """Cambio de estado de una reparación archivada (copia de ReparacionEvento, ver gestion/tiempos.py)."""
+    reparacion = models.ForeignKey(ReparacionArchivada, on_delete=models.CASCADE, related_name='eventos',
+                                   db_index=False)
+    estado_anterior = models.CharField(max_length=20, choices=Reparacion.ESTADO_REPARACION, blank=True)
+    estado_nuevo = models.CharField(max_length=20, choices=Reparacion.ESTADO_REPARACION)
+    fecha = models.DateTimeField()
+    usuario = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                                null=True, related_name='+')
+    origen = models.CharField(max_length=20, choices=ReparacionEvento.ORIGENES, default='sistema')
+
+    class Meta:
+        verbose_name = 'Evento de reparación archivada'
+        verbose_name_plural = 'Eventos de reparaciones archivadas'
+        ordering = ['fecha', 'id']
+        indexes = [
+            models.Index(fields=['reparacion', 'fecha'], name='evento_archivado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reparación #{self.reparacion_id} (archivada): {self.estado_anterior or '-'} → {self.estado_nuevo}"
+
 # ========== SIGNALS Y AUTOMATIZACIÓN ==========
 
 # Signal para crear Perfil automáticamente cuando se crea un usuario
 # Esto asegura que cada nuevo usuario tenga un Perfil asociado automáticamente
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
@@ -367,3 +1086,224 @@ def crear_perfil_usuario(sender, instance, created, **kwargs):
             telefono='',
             es_empleado=False
         )
+
+
+@receiver(post_save, sender=Agenda)
+@receiver(post_delete, sender=Agenda)
+@receiver(post_save, sender=Reparacion)
+@receiver(post_delete, sender=Reparacion)
+@receiver(post_save, sender=Servicio)
+@receiver(post_delete, sender=Servicio)
+def invalidar_feeds_calendario(sender, **kwargs):
+    """
+    Signal que renueva la versión de los feeds iCalendar.
+
+    Cualquier cambio en citas, reparaciones o servicios cambia el ETag de
+    los feeds, de modo que los calendarios suscritos reciben los datos nuevos.
+    """
+    from .calendario import invalidar_calendarios
+    invalidar_calendarios()
+
+
+@receiver(post_save, sender=Agenda)
+def reservar_turno_cita(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Signal que toma (o mueve) en HorarioReservado el turno de la cita."""
+    if raw or (update_fields is not None and not {'fecha', 'hora'} & set(update_fields)):
+        return
+    HorarioReservado.tomar(instance.fecha, instance.hora, cita=instance)
+
+
+@receiver(post_save, sender=Reparacion)
+def asignar_reparacion_nueva(sender, instance, created, raw=False, **kwargs):
+    """
+    Signal que asigna automáticamente las reparaciones pendientes nuevas.
+
+    Solo actúa si ASIGNACION_AUTOMATICA_REPARACIONES está activo. La
+    asignación se ejecuta al confirmar la transacción para no alargar la
+    reserva del horario.
+    """
+    from django.db import transaction
+    from .asignacion import asignacion_automatica_activa, asignar_reparacion
+
+    if raw or not created or not asignacion_automatica_activa():
+        return
+    if instance.estado_reparacion != 'pendiente' or instance.mecanico_asignado_id:
+        return
+    transaction.on_commit(lambda: asignar_reparacion(instance))
+
+
+# Lo que define si una reparación ocupa un turno y cuál
+CAMPOS_TURNO = ('estado_reparacion', 'fecha_programada', 'hora_programada')
+
+# Lo que define el aporte de una reparación a los contadores del cliente
+CAMPOS_APORTE = ('vehiculo_id', 'estado_reparacion')
+
+
+@receiver(post_init, sender=Reparacion)
+def recordar_estado_reparacion(sender, instance, **kwargs):
+    """Guarda el estado con el que se cargó la reparación (sin consultar si el campo está diferido)."""
+    instance._estado_guardado = instance.__dict__.get('estado_reparacion')
+    instance._aporte_guardado = tuple(instance.__dict__.get(campo) for campo in CAMPOS_APORTE)
+    instance._servicio_guardado = instance.__dict__.get('servicio_id')
+    instance._turno_guardado = tuple(instance.__dict__.get(campo) for campo in CAMPOS_TURNO)
+
+
+@receiver(post_save, sender=Reparacion)
+def reservar_turno_reparacion(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Signal que toma en HorarioReservado el turno de una reparación programada
+    mientras está en un estado que lo ocupa, y lo libera al salir de él.
+    """
+    if raw or (update_fields is not None and not set(CAMPOS_TURNO) & set(update_fields)):
+        return
+    actual = tuple(instance.__dict__.get(campo) for campo in CAMPOS_TURNO)
+    if not created and actual == instance._turno_guardado:
+        return
+    instance._turno_guardado = actual
+    if (instance.estado_reparacion in Reparacion.ESTADOS_OCUPAN_HORARIO
+            and instance.fecha_programada and instance.hora_programada):
+        HorarioReservado.tomar(instance.fecha_programada, instance.hora_programada, reparacion=instance)
+    elif not created:
+        HorarioReservado.objects.filter(reparacion=instance).delete()
+
+
+@receiver(post_save, sender=Reparacion)
+def registrar_evento_estado(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Signal que agrega un ReparacionEvento cuando cambia estado_reparacion.
+
+    El origen y el usuario salen del contexto actual (gestion/eventos.py):
+    la petición web, admin o API en curso, o el bot.
+    """
+    from .eventos import origen_actual
+
+    if raw or (update_fields is not None and 'estado_reparacion' not in update_fields):
+        return
+    anterior = '' if created else (instance._estado_guardado or '')
+    if anterior == instance.estado_reparacion:
+        return
+    origen, usuario = origen_actual()
+    ReparacionEvento.objects.create(
+        reparacion=instance, estado_anterior=anterior, estado_nuevo=instance.estado_reparacion,
+        origen=origen, usuario=usuario,
+    )
+    instance._estado_guardado = instance.estado_reparacion
+
+
+@receiver(post_save, sender=Reparacion)
+def contar_reparacion(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Signal que actualiza los contadores del cliente al crear o cambiar una reparación."""
+    from . import contadores
+
+    campos = {'vehiculo', 'estado_reparacion'}
+    if raw or (update_fields is not None and not campos & set(update_fields)):
+        return
+    # Sin consultar los campos diferidos: si falta alguno, contadores recalcula el cliente
+    actual = tuple(instance.__dict__.get(campo) for campo in CAMPOS_APORTE)
+    if created:
+        contadores.reparacion_agregada(instance)
+    elif instance._aporte_guardado != actual:
+        contadores.reparacion_modificada(instance._aporte_guardado, instance)
+    instance._aporte_guardado = actual
+
+
+@receiver(post_save, sender=Reparacion)
+def linea_servicio_principal(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Signal que crea la línea del servicio principal, o la cambia si cambia el servicio.
+
+    Va después de contar_reparacion: los contadores ven primero el cambio de
+    estado con el total anterior y después la diferencia de la línea.
+    """
+    if raw or (update_fields is not None and 'servicio' not in update_fields and 'servicio_id' not in update_fields):
+        return
+    anterior, instance._servicio_guardado = instance._servicio_guardado, instance.__dict__.get('servicio_id')
+    if created:
+        LineaReparacion.objects.create(reparacion=instance, servicio=instance.servicio)
+        return
+    if anterior is None or anterior == instance.servicio_id:
+        return
+    for linea in instance.lineas.filter(tipo='servicio', servicio_id=anterior)[:1]:
+        linea.servicio = instance.servicio
+        linea.descripcion = ''
+        linea.precio_unitario = None  # el precio actual del servicio nuevo
+        linea.save()
+
+
+@receiver(post_delete, sender=Reparacion)
+def descontar_reparacion(sender, instance, **kwargs):
+    """Signal que descuenta la reparación borrada (no las que se archivan)."""
+    from . import contadores
+
+    if not contadores.pausados():
+        contadores.reparacion_eliminada(instance)
+
+
+@receiver(post_init, sender=LineaReparacion)
+def recordar_subtotal_linea(sender, instance, **kwargs):
+    instance._subtotal_guardado = instance.__dict__.get('subtotal') or 0
+
+
+@receiver(post_save, sender=LineaReparacion)
+def sumar_linea(sender, instance, created, raw=False, **kwargs):
+    """Signal que suma la diferencia del subtotal al total de la reparación."""
+    from . import contadores
+
+    if raw:
+        return
+    anterior = 0 if created else instance._subtotal_guardado
+    instance._subtotal_guardado = instance.subtotal
+    contadores.sumar_al_total(instance.reparacion_id, instance.subtotal - anterior)
+
+
+@receiver(post_delete, sender=LineaReparacion)
+def restar_linea(sender, instance, **kwargs):
+    """Signal que resta la línea borrada del total de la reparación."""
+    from . import contadores
+
+    contadores.sumar_al_total(instance.reparacion_id, -instance.subtotal)
+
+
+@receiver(post_init, sender=Vehiculo)
+def recordar_cliente_vehiculo(sender, instance, **kwargs):
+    instance._cliente_guardado = instance.__dict__.get('cliente_id')
+
+
+@receiver(post_save, sender=Vehiculo)
+def contar_vehiculo(sender, instance, created, raw=False, **kwargs):
+    """Signal que actualiza los contadores del cliente al agregar o mover un vehículo."""
+    from . import contadores
+
+    if raw:
+        return
+    if created:
+        contadores.sumar(instance.cliente_id, vehiculos=1)
+    elif instance._cliente_guardado != instance.cliente_id:
+        # Cambió de dueño: las reparaciones pasan con el vehículo
+        contadores.recalcular([c for c in (instance._cliente_guardado, instance.cliente_id) if c])
+    instance._cliente_guardado = instance.cliente_id
+
+
+@receiver(post_delete, sender=Vehiculo)
+def descontar_vehiculo(sender, instance, **kwargs):
+    """Signal que recalcula el cliente del vehículo borrado (también salen sus reparaciones archivadas)."""
+    from . import contadores
+
+    if not contadores.pausados():
+        contadores.recalcular([instance.cliente_id])
+
+
+@receiver(post_save, sender=Servicio)
+@receiver(post_delete, sender=Servicio)
+def invalidar_catalogo_servicios(sender, **kwargs):
+    """
+    Signal que renueva la versión del catálogo de servicios en memoria.
+
+    Se renueva al momento y otra vez al confirmar la transacción, para que
+    ningún proceso se quede con una lectura hecha antes del commit.
+    """
+    from django.db import transaction
+    from .catalogo import invalidar_catalogo
+
+    invalidar_catalogo()
+    transaction.on_commit(invalidar_catalogo)
@@ -0,0 +1,292 @@
+"""
+Avisos al cliente cuando cambia el estado de su reparación (bandeja de salida)
+
+Flujo:
+1. La vista que cambia el estado llama a encolar_aviso_estado() dentro de
+   la misma transacción: si el cambio se revierte, el aviso también. La
+   petición web solo inserta una fila, nunca espera a Telegram ni al correo
+2. python manage.py despachar_notificaciones (cron o --continuo) toma los
+   avisos pendientes en lotes y los envía: los de Telegram en paralelo con
+   el mismo límite de tasa que los recordatorios, los de correo por una
+   única conexión SMTP por lote
+3. Los fallos se reintentan con espera exponencial hasta MAX_INTENTOS; un
+   chat que bloqueó al bot (403) se marca como fallido sin reintentar
+
+Cada lote se reclama en la base de datos antes de enviarlo (estado
+'enviando' con el uuid del despacho, como los recordatorios): si corren dos
+despachadores a la vez (--continuo y cron), cada aviso lo manda solo el que
+lo reclamó. Un reclamo abandonado vuelve a tomarse pasado DURACION_RECLAMO.
+
+Cada aviso tiene una clave única (reparacion-<id>-<estado>), así que
+guardar dos veces el mismo estado no encola dos avisos.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+from .bot.cliente import crear_bot
+from .models import Notificacion
+from .recordatorios import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Estados que se avisan al cliente: (asunto, texto)
+AVISOS_ESTADO = {
+    'revision': (
+        'Su vehículo está en revisión',
+        'la reparación de su {vehiculo} ({servicio}) terminó y está en revisión final. '
+        'Le avisaremos cuando pueda retirarlo.',
+    ),
+    'completada': (
+        'Su vehículo está listo',
+        'la reparación de su {vehiculo} ({servicio}) está completada. '
+        'Ya puede pasar a retirarlo por el taller.',
+    ),
+}
+
+# Dominio de los correos provisorios de los clientes creados desde el bot
+DOMINIO_CORREO_BOT = '@bot.local'
+
+MAX_INTENTOS = 5
+ESPERA_BASE = 30  # segundos; se duplica en cada intento
+ESPERA_MAXIMA = 60 * 60
+TAMAÑO_LOTE = 100
+
+# Pasado este tiempo, un lote reclamado sin resultado se considera abandonado
+DURACION_RECLAMO = timedelta(minutes=5)
+
+
+def canal_del_cliente(cliente):
+    """(canal, destino) preferido del cliente, o None si no hay cómo avisarle."""
+    if cliente.telegram_chat_id:
+        return 'telegram', cliente.telegram_chat_id
+    correo = cliente.correo_electronico
+    if correo and not correo.endswith(DOMINIO_CORREO_BOT):
+        return 'email', correo
+    return None
+
+
+def encolar_aviso_estado(reparacion):
+    """
+    Encola el aviso del estado actual de la reparación.
+
+    Debe llamarse dentro de la transacción que guarda el cambio de estado.
+
+    Returns:
+        la Notificacion creada, o None si el estado no se avisa, el cliente
+        no tiene canal o el aviso ya estaba encolado
+    """
+    aviso = AVISOS_ESTADO.get(reparacion.estado_reparacion)
+    if aviso is None:
+        return None
+    vehiculo = reparacion.vehiculo
+    canal = canal_del_cliente(vehiculo.cliente)
+    if canal is None:
+        return None
+
+    asunto, texto = aviso
+    texto = texto.format(
+        vehiculo=f'{vehiculo.marca} {vehiculo.modelo} ({vehiculo.placa})',
+        servicio=reparacion.servicio.nombre_servicio,
+    )
+    notificacion, creada = Notificacion.objects.get_or_create(
+        clave=f'reparacion-{reparacion.id}-{reparacion.estado_reparacion}',
+        defaults={
+            'reparacion': reparacion,
+            'canal': canal[0],
+            'destino': canal[1],
+            'asunto': asunto,
+            'mensaje': f'Hola {vehiculo.cliente.nombre}, {texto}',
+        },
+    )
+    return notificacion if creada else None
+
+
+def reclamar_avisos(cantidad):
+    """
+    Reclama el próximo lote de avisos listos para enviar (usa notificacion_pendiente_idx).
+
+    Los pasa a 'enviando' con el uuid de este despacho y proximo_intento
+    como vencimiento del reclamo. El UPDATE es condicional: un aviso que
+    otro despachador reclamó en el medio no se devuelve.
+
+    Returns:
+        lista de Notificacion reclamadas por este despacho
+    """
+    ahora = timezone.now()
+    listos = Notificacion.objects.filter(estado__in=['pendiente', 'enviando'], proximo_intento__lte=ahora)
+    envio = uuid.uuid4()
+    with transaction.atomic():
+        ids = list(listos.select_for_update(skip_locked=True)
+                   .order_by('proximo_intento', 'id').values_list('id', flat=True)[:cantidad])
+        if not ids:
+            return []
+        listos.filter(id__in=ids).update(estado='enviando', envio=envio, proximo_intento=ahora + DURACION_RECLAMO)
+    return list(Notificacion.objects.filter(envio=envio, estado='enviando').order_by('id'))
+
+
+def espera_reintento(intentos):
+    """Segundos hasta el próximo intento tras `intentos` fallos."""
+    return min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA)
+
+
+def registrar_resultados(resultados):
+    """
+    Guarda el resultado de un lote con un único UPDATE por lotes.
+
+    Args:
+        resultados: lista de (notificacion, error, definitivo); error None = enviada
+    """
+    ahora = timezone.now()
+    for notificacion, error, definitivo in resultados:
+        notificacion.intentos += 1
+        if error is None:
+            notificacion.estado = 'enviada'
+            notificacion.enviada = ahora
+            notificacion.error = ''
+            continue
+        notificacion.error = error[:255]
+        if definitivo or notificacion.intentos >= MAX_INTENTOS:
+            notificacion.estado = 'fallida'
+        else:
+            notificacion.estado = 'pendiente'
+            notificacion.proximo_intento = ahora + timedelta(seconds=espera_reintento(notificacion.intentos))
+    Notificacion.objects.bulk_update(
+        [notificacion for notificacion, _, _ in resultados],
+        ['estado', 'intentos', 'proximo_intento', 'error', 'enviada'],
+    )
+
+
+def enviar_correos(notificaciones):
+    """
+    Envía los correos del lote por una sola conexión.
+
+    Returns:
+        lista de errores (str o None) en el mismo orden
+    """
+    try:
+        conexion = get_connection()
+        conexion.open()
+    except Exception as e:
+        return [f'Correo: {e}'] * len(notificaciones)
+    errores = []
+    try:
+        for notificacion in notificaciones:
+            try:
+                EmailMessage(notificacion.asunto, notificacion.mensaje, settings.DEFAULT_FROM_EMAIL,
+                             [notificacion.destino], connection=conexion).send()
+                errores.append(None)
+            except Exception as e:
+                errores.append(f'Correo: {e}')
+    finally:
+        conexion.close()
+    return errores
+
+
+async def _enviar_telegram(bot, notificacion, bucket, semaforo):
+    """Devuelve (error, definitivo); error None si se envió."""
+    async with semaforo:
+        await bucket.adquirir()
+        try:
+            await bot.send_message(chat_id=notificacion.destino, text=notificacion.mensaje)
+            return None, False
+        except Forbidden as e:
+            return f'Bloqueado: {e.message}', True
+        except RetryAfter as e:
+            # Se reintenta en la próxima vuelta; mientras tanto nadie más envía
+            bucket.pausar(e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after)
+            return 'Límite de envíos de Telegram', False
+        except TelegramError as e:
+            return str(e), False
+
+
+class Despachador:
+    """
+    Envía lotes de la bandeja de salida.
+
+    El bot se crea solo si hay avisos de Telegram; puede pasarse uno ya
+    inicializado (pruebas).
+    """
+
+    def __init__(self, bot=None, por_segundo=None, concurrencia=None):
+        self.concurrencia = concurrencia or settings.TELEGRAM_RECORDATORIOS_CONCURRENCIA
+        self.bucket = TokenBucket(por_segundo or settings.TELEGRAM_RECORDATORIOS_POR_SEGUNDO)
+        self.semaforo = asyncio.Semaphore(self.concurrencia)
+        self.bot = bot
+        self._bot_propio = False
+
+    async def _obtener_bot(self):
+        if self.bot is None:
+            self.bot = crear_bot(conexiones=self.concurrencia)
+            await self.bot.initialize()
+            self._bot_propio = True
+        return self.bot
+
+    async def cerrar(self):
+        if self._bot_propio:
+            await self.bot.shutdown()
+            self.bot, self._bot_propio = None, False
+
+    async def despachar_lote(self, cantidad=TAMAÑO_LOTE):
+        """
+        Envía un lote de avisos pendientes.
+
+        Returns:
+            dict con 'avisos', 'enviadas' y 'fallidas' (incluye las que se reintentarán)
+        """
+        lote = await sync_to_async(reclamar_avisos)(cantidad)
+        if not lote:
+            return {'avisos': 0, 'enviadas': 0, 'fallidas': 0}
+        telegram = [n for n in lote if n.canal == 'telegram']
+        correos = [n for n in lote if n.canal == 'email']
+
+        envios = []
+        if telegram:
+            bot = await self._obtener_bot()
+            envios.extend(_enviar_telegram(bot, n, self.bucket, self.semaforo) for n in telegram)
+        if correos:
+            # El SMTP bloquea: corre en un hilo aparte mientras salen los de Telegram
+            envios.append(sync_to_async(enviar_correos, thread_sensitive=False)(correos))
+        respuestas = await asyncio.gather(*envios)
+        errores_telegram = respuestas[:len(telegram)]
+        errores_correo = respuestas[len(telegram)] if correos else []
+
+        resultados = [(n, error, definitivo) for n, (error, definitivo) in zip(telegram, errores_telegram)]
+        resultados += [(n, error, False) for n, error in zip(correos, errores_correo)]
+        await sync_to_async(registrar_resultados)(resultados)
+
+        fallidas = sum(1 for _, error, _ in resultados if error)
+        return {'avisos': len(lote), 'enviadas': len(lote) - fallidas, 'fallidas': fallidas}
+
+
+async def despachar_notificaciones(continuo=False, intervalo=10, tamaño_lote=TAMAÑO_LOTE, **opciones):
+    """
+    Envía los avisos pendientes, lote tras lote, hasta vaciar la bandeja.
+
+    Con continuo=True sigue esperando avisos nuevos cada `intervalo` segundos.
+
+    Returns:
+        dict con los totales
+    """
+    totales = {'avisos': 0, 'enviadas': 0, 'fallidas': 0}
+    despachador = Despachador(**opciones)
+    try:
+        while True:
+            resumen = await despachador.despachar_lote(tamaño_lote)
+            for clave in totales:
+                totales[clave] += resumen[clave]
+            if resumen['avisos'] < tamaño_lote:
+                if not continuo:
+                    return totales
+                await asyncio.sleep(intervalo)
+    finally:
+        await despachador.cerrar()
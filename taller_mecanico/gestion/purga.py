@@ -0,0 +1,180 @@
+"""
+Eliminación de clientes en dos pasos
+
+Borrar un cliente con muchos vehículos arrastraba en cascada todas sus
+reparaciones, tareas e historial en una sola transacción dentro de la
+petición. Ahora:
+
+1. eliminar_cliente() solo marca Cliente.eliminado (los managers por
+   defecto dejan de mostrar el cliente, sus vehículos, reparaciones y citas),
+   cancela sus reparaciones abiertas y borra sus citas futuras para liberar
+   los turnos, y encola una EliminacionCliente. Es inmediato.
+2. python manage.py purgar_clientes (cron) borra los datos por lotes de
+   CLIENTES_PURGA_TAMAÑO_LOTE filas, cada lote en su transacción, y va
+   guardando el avance en la EliminacionCliente. Si se interrumpe, la
+   siguiente pasada sigue donde quedó. Cada eliminación la toma un solo
+   proceso a la vez (_reclamar), así que pueden correr varios.
+
+Orden: reparaciones (con sus tareas, notas, eventos, inspecciones y
+avisos), reparaciones archivadas, citas, registros, vehículos y por último
+el cliente.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .contadores import contadores_pausados
+from .models import Agenda, Cliente, EliminacionCliente, Registro, Reparacion, ReparacionArchivada, Vehiculo
+
+logger = logging.getLogger(__name__)
+
+# Sin avance en este tiempo, la eliminación tomada se da por abandonada
+DURACION_RECLAMO = timedelta(minutes=10)
+
+# Estados en los que una reparación todavía se puede cancelar
+ESTADOS_ABIERTOS = ['pendiente', 'en_progreso', 'en_espera', 'revision']
+
+MENSAJE_PLACA_EN_PURGA = 'La placa es de un vehículo de un cliente eliminado; se libera al terminar la purga.'
+
+
+def eliminar_cliente(cliente, usuario=None):
+    """Oculta el cliente al momento y encola la purga de sus datos."""
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+    with transaction.atomic():
+        # Los signals liberan el turno de cada reparación al cancelarla
+        for reparacion in Reparacion.objects.filter(vehiculo__cliente=cliente, estado_reparacion__in=ESTADOS_ABIERTOS):
+            reparacion.estado_reparacion = 'cancelada'
+            reparacion.save(update_fields=['estado_reparacion'])
+        Agenda.objects.filter(cliente=cliente, fecha__gte=timezone.localdate()).delete()
+        cliente.eliminado = timezone.now()
+        cliente.save(update_fields=['eliminado'])
+        return EliminacionCliente.objects.create(cliente=cliente, nombre=str(cliente), solicitada_por=usuario)
+
+
+def placa_en_purga(placa, vehiculo=None):
+    """True si la placa es de un vehículo (oculto) de un cliente eliminado sin purgar."""
+    vehiculos = Vehiculo.todos.filter(placa=placa, cliente__eliminado__isnull=False)
+    if vehiculo is not None and vehiculo.pk:
+        vehiculos = vehiculos.exclude(pk=vehiculo.pk)
+    return vehiculos.exists()
+
+
+def _pasos(cliente_id):
+    """Consultas a vaciar, en orden (con los managers que ven lo del cliente eliminado)."""
+    return [
+        Reparacion.todos.filter(vehiculo__cliente_id=cliente_id),
+        ReparacionArchivada.todos.filter(vehiculo__cliente_id=cliente_id),
+        Agenda.todos.filter(cliente_id=cliente_id),
+        Registro.objects.filter(cliente_id=cliente_id),
+        Vehiculo.todos.filter(cliente_id=cliente_id),
+    ]
+
+
+def _avanzar(eliminacion, cantidad):
+    # También renueva el reclamo del proceso
+    EliminacionCliente.objects.filter(pk=eliminacion.pk).update(
+        procesados=F('procesados') + cantidad, actualizada=timezone.now(),
+    )
+    eliminacion.procesados += cantidad
+
+
+def purgar_cliente(eliminacion, tamaño_lote=None, progreso=None):
+    """
+    Borra por lotes los datos del cliente de la eliminación y al final el cliente.
+
+    Args:
+        progreso: función llamada con la eliminación tras cada lote
+    """
+    tamaño_lote = tamaño_lote or settings.CLIENTES_PURGA_TAMAÑO_LOTE
+    cliente_id = eliminacion.cliente_id
+    pasos = _pasos(cliente_id)
+    if eliminacion.estado != 'en_curso':
+        eliminacion.estado = 'en_curso'
+        eliminacion.iniciada = eliminacion.iniciada or timezone.now()
+        # Lo que falta más el propio cliente (al reanudar se suma a lo ya borrado)
+        eliminacion.total = eliminacion.procesados + sum(consulta.count() for consulta in pasos) + 1
+        eliminacion.error = ''
+        eliminacion.save(update_fields=['estado', 'iniciada', 'total', 'error'])
+
+    # Los contadores del cliente no se actualizan: se borra
+    with contadores_pausados():
+        for consulta in pasos:
+            while True:
+                with transaction.atomic():
+                    ids = list(consulta.order_by('pk').values_list('pk', flat=True)[:tamaño_lote])
+                    if not ids:
+                        break
+                    consulta.model._base_manager.filter(pk__in=ids).delete()
+                    _avanzar(eliminacion, len(ids))
+                if progreso:
+                    progreso(eliminacion)
+
+        with transaction.atomic():
+            Cliente.todos.filter(pk=cliente_id).delete()
+            _avanzar(eliminacion, 1)
+            eliminacion.estado = 'completada'
+            eliminacion.terminada = timezone.now()
+            eliminacion.save(update_fields=['estado', 'terminada'])
+    if progreso:
+        progreso(eliminacion)
+
+
+def _libre():
+    """Eliminaciones sin terminar que ningún proceso está avanzando."""
+    return ~Q(estado='completada') & (
+        Q(actualizada__isnull=True) | Q(actualizada__lt=timezone.now() - DURACION_RECLAMO)
+    )
+
+
+def _reclamar(vistas):
+    """
+    Toma la siguiente eliminación libre para este proceso.
+
+    select_for_update(skip_locked) evita que dos procesos esperen por la
+    misma fila y el UPDATE condicional que la tomen los dos (SQLite no
+    bloquea filas).
+
+    Returns:
+        la EliminacionCliente tomada, o None si no queda ninguna
+    """
+    while True:
+        with transaction.atomic():
+            eliminacion = (EliminacionCliente.objects.select_for_update(skip_locked=True)
+                           .filter(_libre()).exclude(pk__in=vistas)
+                           .order_by('solicitada', 'id').first())
+            if eliminacion is None:
+                return None
+            vistas.add(eliminacion.pk)
+            if EliminacionCliente.objects.filter(_libre(), pk=eliminacion.pk).update(actualizada=timezone.now()):
+                return eliminacion
+
+
+def purgar_pendientes(tamaño_lote=None, progreso=None):
+    """
+    Procesa las eliminaciones sin terminar (también las interrumpidas o
+    fallidas) que no esté avanzando otro proceso.
+
+    Returns:
+        dict {completadas, fallidas}
+    """
+    resumen = {'completadas': 0, 'fallidas': 0}
+    vistas = set()
+    while True:
+        eliminacion = _reclamar(vistas)
+        if eliminacion is None:
+            return resumen
+        try:
+            purgar_cliente(eliminacion, tamaño_lote, progreso)
+            resumen['completadas'] += 1
+        except Exception as error:
+            logger.exception('Error al purgar el cliente %s', eliminacion.cliente_id)
+            EliminacionCliente.objects.filter(pk=eliminacion.pk).update(
+                estado='fallida', error=str(error)[:255], actualizada=None,
+            )
+            resumen['fallidas'] += 1
@@ -0,0 +1,307 @@
+"""
+Recordatorios por Telegram de las citas y reparaciones del día siguiente
+
+Flujo de un envío (python manage.py enviar_recordatorios):
+1. Una sola consulta (UNION) trae las citas (Agenda) y reparaciones
+   programadas de la fecha cuyos clientes tienen telegram_chat_id y que
+   todavía no tienen un recordatorio enviado
+2. Se agrupan por chat: cada cliente recibe un único mensaje con todo lo
+   que tiene ese día
+3. Los mensajes se envían en paralelo con asyncio, con un máximo de
+   envíos simultáneos y un token bucket que respeta el límite de mensajes
+   por segundo de Telegram (si Telegram responde 429 se pausa el bucket)
+4. El resultado se guarda en el modelo Recordatorio, que evita duplicados
+   en los siguientes envíos; los fallidos se reintentan hasta MAX_INTENTOS
+
+Antes de enviar, cada evento se reclama en la base de datos con un UPDATE
+condicional (estado 'enviando' y el uuid del envío): si dos procesos corren
+a la vez, cada recordatorio lo manda solo el que lo reclamó. Un reclamo
+abandonado (proceso caído) se puede volver a tomar pasado DURACION_RECLAMO.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import CharField, Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+from .bot.cliente import crear_bot
+from .models import Agenda, Recordatorio, Reparacion
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 3
+REINTENTOS_RETRY_AFTER = 3
+
+# Pasado este tiempo, un reclamo sin resultado se considera abandonado
+DURACION_RECLAMO = timedelta(minutes=15)
+
+
+class TokenBucket:
+    """
+    Limitador de tasa para corrutinas.
+
+    Se recargan `tasa` fichas por segundo hasta `capacidad`; cada envío
+    consume una ficha y espera si no hay.
+    """
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = tasa
+        self.capacidad = capacidad or tasa
+        self.fichas = self.capacidad
+        self.ultima_recarga = time.monotonic()
+        self.pausa_hasta = 0
+        self._lock = asyncio.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad, self.fichas + (ahora - self.ultima_recarga) * self.tasa)
+        self.ultima_recarga = ahora
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                if ahora < self.pausa_hasta:
+                    await asyncio.sleep(self.pausa_hasta - ahora)
+                    continue
+                self._recargar()
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.tasa)
+
+    def pausar(self, segundos):
+        """Detiene todos los envíos (respuesta 429 de Telegram)."""
+        self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + segundos)
+        self.fichas = 0
+
+
+def _sin_recordatorio_enviado(tipo, campo_fecha):
+    """Subconsulta: el evento no tiene un recordatorio enviado ni agotó los intentos."""
+    return ~Exists(Recordatorio.objects.filter(
+        Q(estado='enviado') | Q(intentos__gte=MAX_INTENTOS),
+        tipo=tipo,
+        objeto_id=OuterRef('pk'),
+        fecha_evento=OuterRef(campo_fecha),
+    ))
+
+
+def recordatorios_pendientes(fecha):
+    """
+    Citas y reparaciones de la fecha pendientes de recordar, en una consulta.
+
+    Returns:
+        lista de dicts con tipo, objeto_id, chat_id, nombre, hora, servicio, detalle
+    """
+    citas = (Agenda.objects
+             .filter(fecha=fecha, cliente__telegram_chat_id__gt='')
+             .filter(_sin_recordatorio_enviado('cita', 'fecha'))
+             .values(
+                 tipo=Value('cita', output_field=CharField()),
+                 objeto_id=F('id'),
+                 chat_id=F('cliente__telegram_chat_id'),
+                 nombre=F('cliente__nombre'),
+                 hora_evento=F('hora'),
+                 nombre_servicio=F('servicio__nombre_servicio'),
+                 detalle=Value('', output_field=CharField()),
+             ))
+    reparaciones = (Reparacion.objects
+                    .filter(fecha_programada=fecha,
+                            estado_reparacion__in=Reparacion.ESTADOS_OCUPAN_HORARIO,
+                            vehiculo__cliente__telegram_chat_id__gt='')
+                    .filter(_sin_recordatorio_enviado('reparacion', 'fecha_programada'))
+                    .values(
+                        tipo=Value('reparacion', output_field=CharField()),
+                        objeto_id=F('id'),
+                        chat_id=F('vehiculo__cliente__telegram_chat_id'),
+                        nombre=F('vehiculo__cliente__nombre'),
+                        hora_evento=F('hora_programada'),
+                        nombre_servicio=F('servicio__nombre_servicio'),
+                        detalle=Concat('vehiculo__marca', Value(' '), 'vehiculo__modelo',
+                                       Value(' ('), 'vehiculo__placa', Value(')'),
+                                       output_field=CharField()),
+                    ))
+    return list(citas.order_by().union(reparaciones.order_by(), all=True))
+
+
+def agrupar_por_chat(pendientes):
+    """{chat_id: [eventos ordenados por hora]}"""
+    por_chat = defaultdict(list)
+    for evento in pendientes:
+        por_chat[evento['chat_id']].append(evento)
+    for eventos in por_chat.values():
+        eventos.sort(key=lambda e: (e['hora_evento'] is None, e['hora_evento'] or 0))
+    return por_chat
+
+
+def texto_recordatorio(eventos, fecha):
+    lineas = [
+        '🔔 Recordatorio del Taller Mecánico',
+        '',
+        f"Hola {eventos[0]['nombre']}, te esperamos el {fecha.strftime('%d/%m/%Y')}:",
+    ]
+    for evento in eventos:
+        hora = evento['hora_evento'].strftime('%H:%M') if evento['hora_evento'] else 'Sin hora'
+        tipo = 'Cita' if evento['tipo'] == 'cita' else 'Reparación'
+        detalle = f" - {evento['detalle']}" if evento['detalle'] else ''
+        lineas.append(f"• {hora} {tipo}: {evento['nombre_servicio']}{detalle}")
+    lineas += ['', 'Si no puedes asistir, por favor avísanos para liberar el horario.']
+    return '\n'.join(lineas)
+
+
+def reclamar_eventos(pendientes, fecha):
+    """
+    Marca en la base de datos los eventos que va a enviar este proceso.
+
+    Crea los registros que faltan (estado 'pendiente') y los pasa a
+    'enviando' con un UPDATE condicional; solo se devuelven los que quedaron
+    con el uuid de este envío, así que un evento reclamado por otro proceso
+    no se manda dos veces.
+
+    Returns:
+        los eventos de pendientes reclamados por este proceso
+    """
+    if not pendientes:
+        return []
+    Recordatorio.objects.bulk_create(
+        [
+            Recordatorio(tipo=evento['tipo'], objeto_id=evento['objeto_id'], fecha_evento=fecha,
+                         chat_id=evento['chat_id'], estado='pendiente', intentos=0)
+            for evento in pendientes
+        ],
+        ignore_conflicts=True,
+    )
+    ids_por_tipo = defaultdict(set)
+    for evento in pendientes:
+        ids_por_tipo[evento['tipo']].add(evento['objeto_id'])
+    de_estos_eventos = Q()
+    for tipo, ids in ids_por_tipo.items():
+        de_estos_eventos |= Q(tipo=tipo, objeto_id__in=ids)
+
+    envio = uuid.uuid4()
+    ahora = timezone.now()
+    (Recordatorio.objects
+     .filter(de_estos_eventos, fecha_evento=fecha, intentos__lt=MAX_INTENTOS)
+     .filter(Q(estado__in=['pendiente', 'fallido'])
+             | Q(estado='enviando', fecha_envio__lt=ahora - DURACION_RECLAMO))
+     .update(estado='enviando', envio=envio, fecha_envio=ahora))
+    reclamados = set(Recordatorio.objects.filter(envio=envio).values_list('tipo', 'objeto_id'))
+    return [evento for evento in pendientes if (evento['tipo'], evento['objeto_id']) in reclamados]
+
+
+def registrar_entregas(resultados, fecha):
+    """
+    Guarda el estado de entrega de cada evento (una inserción/actualización masiva).
+
+    Args:
+        resultados: lista de (evento, chat_id, error o None)
+    """
+    if not resultados:
+        return
+    previos = {
+        (r.tipo, r.objeto_id): r.intentos
+        for r in Recordatorio.objects.filter(
+            fecha_evento=fecha, objeto_id__in={evento['objeto_id'] for evento, _, _ in resultados}
+        ).only('tipo', 'objeto_id', 'intentos')
+    }
+    ahora = timezone.now()
+    Recordatorio.objects.bulk_create(
+        [
+            Recordatorio(
+                tipo=evento['tipo'],
+                objeto_id=evento['objeto_id'],
+                fecha_evento=fecha,
+                chat_id=chat_id,
+                estado='fallido' if error else 'enviado',
+                intentos=previos.get((evento['tipo'], evento['objeto_id']), 0) + 1,
+                error=(error or '')[:255],
+                fecha_envio=ahora,
+            )
+            for evento, chat_id, error in resultados
+        ],
+        update_conflicts=True,
+        unique_fields=['tipo', 'objeto_id', 'fecha_evento'],
+        update_fields=['chat_id', 'estado', 'intentos', 'error', 'fecha_envio'],
+    )
+
+
+def _segundos(valor):
+    return valor.total_seconds() if isinstance(valor, timedelta) else float(valor)
+
+
+async def _enviar_a_chat(bot, chat_id, texto, bucket, semaforo):
+    """Envía un mensaje respetando el límite; devuelve el error (str) o None."""
+    async with semaforo:
+        for _ in range(REINTENTOS_RETRY_AFTER + 1):
+            await bucket.adquirir()
+            try:
+                await bot.send_message(chat_id=chat_id, text=texto)
+                return None
+            except RetryAfter as e:
+                espera = _segundos(e.retry_after)
+                logger.warning(f"Límite de Telegram alcanzado, pausa de {espera}s")
+                bucket.pausar(espera)
+            except Forbidden as e:
+                return f'Bloqueado: {e.message}'
+            except TelegramError as e:
+                return str(e)
+        return 'Límite de envíos de Telegram'
+
+
+async def enviar_recordatorios(bot, fecha=None, por_segundo=None, concurrencia=None):
+    """
+    Envía los recordatorios pendientes de una fecha (mañana por defecto).
+
+    Args:
+        bot: telegram.Bot ya inicializado
+        por_segundo / concurrencia: por defecto TELEGRAM_RECORDATORIOS_* de settings
+
+    Returns:
+        dict con 'chats', 'eventos', 'enviados' y 'fallidos'
+    """
+    fecha = fecha or timezone.localdate() + timedelta(days=1)
+    por_segundo = por_segundo or settings.TELEGRAM_RECORDATORIOS_POR_SEGUNDO
+    concurrencia = concurrencia or settings.TELEGRAM_RECORDATORIOS_CONCURRENCIA
+
+    pendientes = await sync_to_async(recordatorios_pendientes)(fecha)
+    pendientes = await sync_to_async(reclamar_eventos)(pendientes, fecha)
+    por_chat = agrupar_por_chat(pendientes)
+    bucket = TokenBucket(por_segundo)
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    chats = list(por_chat)
+    errores = await asyncio.gather(*(
+        _enviar_a_chat(bot, chat_id, texto_recordatorio(por_chat[chat_id], fecha), bucket, semaforo)
+        for chat_id in chats
+    ))
+
+    resultados = [
+        (evento, chat_id, error)
+        for chat_id, error in zip(chats, errores)
+        for evento in por_chat[chat_id]
+    ]
+    await sync_to_async(registrar_entregas)(resultados, fecha)
+
+    fallidos = sum(1 for error in errores if error)
+    return {
+        'chats': len(chats),
+        'eventos': len(pendientes),
+        'enviados': len(chats) - fallidos,
+        'fallidos': fallidos,
+    }
+
+
+async def despachar_recordatorios(fecha=None, **opciones):
+    """Crea el bot desde settings y envía los recordatorios."""
+    concurrencia = opciones.get('concurrencia') or settings.TELEGRAM_RECORDATORIOS_CONCURRENCIA
+    async with crear_bot(conexiones=concurrencia) as bot:
+        return await enviar_recordatorios(bot, fecha, **opciones)
@@ -0,0 +1,230 @@
+"""
+Reserva atómica de horarios del taller
+
+Este módulo centraliza la escritura de citas (Agenda) y de reparaciones
+programadas (Reparacion con fecha/hora) para que ningún horario pueda
+reservarse dos veces, aunque las solicitudes lleguen al mismo tiempo
+desde la web y desde el bot de Telegram.
+
+La garantía la da la base de datos: citas y reparaciones toman su turno
+en la misma tabla, HorarioReservado, que tiene una restricción única sobre
+(fecha, hora). Los signals de Agenda y Reparacion insertan el turno dentro
+de la transacción de la reserva, así una cita web y una reparación del bot
+no pueden quedarse con el mismo horario. (Agenda y Reparacion conservan
+además su propia restricción única.)
+
+Cada reserva se inserta dentro de transaction.atomic(). Si falla una
+restricción y el turno resulta estar tomado se lanza HorarioNoDisponible
+(un ValidationError con mensaje amigable); cualquier otro IntegrityError
+se propaga tal cual. Los bloqueos transitorios de la base de datos (por
+ejemplo "database is locked" en SQLite) se reintentan con una espera
+creciente.
+
+Las solicitudes del bot (reservar_desde_bot) registran cliente, vehículo
+y reparación en la misma transacción; las de clientes que vuelven con un
+vehículo ya registrado (reservar_vehiculo_desde_bot) solo la reparación.
+El teléfono escrito en el bot no está verificado: nunca se usa para
+encontrar un cliente existente (el chat solo se asocia a un cliente por
+el chat mismo o por el contacto compartido, ver bot/estado.py).
+"""
+
+import logging
+import random
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+
+from .eventos import origen_cambios
+from .models import Agenda, Cliente, HorarioReservado, Reparacion, Vehiculo
+
+logger = logging.getLogger(__name__)
+
+# Número de intentos ante bloqueos transitorios y espera inicial (segundos)
+REINTENTOS_RESERVA = 5
+ESPERA_INICIAL_RESERVA = 0.05
+
+MENSAJE_CITA_OCUPADA = 'Ya existe una cita programada para esta fecha y hora.'
+MENSAJE_REPARACION_OCUPADA = 'El horario seleccionado ya fue reservado por otro cliente.'
+
+
+class HorarioNoDisponible(ValidationError):
+    """El horario solicitado ya está reservado."""
+
+
+def horario_tomado(fecha, hora, cita=None, reparacion=None):
+    """¿El turno ya es de otra cita o reparación? (cita/reparacion: la que se está editando)"""
+    reservas = HorarioReservado.objects.filter(fecha=fecha, hora=HorarioReservado.turno(hora))
+    if cita is not None and cita.pk:
+        reservas = reservas.exclude(cita_id=cita.pk)
+    if reparacion is not None and reparacion.pk:
+        reservas = reservas.exclude(reparacion_id=reparacion.pk)
+    return reservas.exists()
+
+
+def _con_reintentos(operacion, mensaje_ocupado, fecha, hora, cita=None):
+    """
+    Ejecuta `operacion` dentro de una transacción, reintentando ante bloqueos.
+
+    - IntegrityError con el turno (fecha, hora) tomado -> HorarioNoDisponible;
+      cualquier otro (correo, placa...) se propaga
+    - OperationalError: bloqueo transitorio -> se reintenta con backoff
+    """
+    espera = ESPERA_INICIAL_RESERVA
+    for intento in range(1, REINTENTOS_RESERVA + 1):
+        try:
+            try:
+                with transaction.atomic():
+                    return operacion()
+            except IntegrityError as e:
+                # La transacción ya se revirtió: si el turno es de otro, fue la restricción del horario
+                if horario_tomado(fecha, hora, cita):
+                    raise HorarioNoDisponible(mensaje_ocupado, code='horario_ocupado') from e
+                raise
+        except OperationalError as e:
+            if intento == REINTENTOS_RESERVA:
+                raise
+            logger.warning(f'Bloqueo al reservar horario (intento {intento}): {e}')
+            # Con un poco de azar para que las reservas que chocaron no reintenten a la vez
+            time.sleep(espera * random.uniform(0.5, 1.5))
+            espera *= 2
+
+
+def reservar_cita(cliente, servicio, fecha, hora, cita=None):
+    """
+    Crea (o mueve, si se pasa `cita`) una cita en la Agenda de forma atómica.
+
+    Raises:
+        ValidationError: si la fecha es pasada
+        HorarioNoDisponible: si el horario ya está ocupado
+    """
+    if fecha < timezone.now().date():
+        raise ValidationError('No se puede programar citas en fechas pasadas.')
+
+    def operacion():
+        nueva = cita if cita is not None else Agenda()
+        nueva.cliente = cliente
+        nueva.servicio = servicio
+        nueva.fecha = fecha
+        nueva.hora = hora
+        nueva.save()
+        return nueva
+
+    return _con_reintentos(operacion, MENSAJE_CITA_OCUPADA, fecha, hora, cita)
+
+
+def guardar_formulario_cita(form):
+    """
+    Guarda un CitaForm válido reservando el horario de forma atómica.
+
+    Si otro usuario tomó el horario entre la validación y el guardado, el
+    error se agrega al formulario y se vuelve a lanzar HorarioNoDisponible.
+    """
+    cita = form.save(commit=False)
+    try:
+        return reservar_cita(cita.cliente, cita.servicio, cita.fecha, cita.hora, cita=cita)
+    except HorarioNoDisponible as e:
+        form.add_error('hora', e)
+        raise
+
+
+def reservar_reparacion(**campos):
+    """
+    Crea una Reparacion con fecha y hora programadas de forma atómica.
+
+    Raises:
+        HorarioNoDisponible: si ya hay una reparación activa en ese horario
+    """
+    return _con_reintentos(
+        lambda: Reparacion.objects.create(**campos),
+        MENSAJE_REPARACION_OCUPADA,
+        campos['fecha_programada'], campos['hora_programada'],
+    )
+
+
+def _separar_nombre(nombre_completo):
+    partes = nombre_completo.split()
+    return partes[0], ' '.join(partes[1:])
+
+
+def reservar_desde_bot(nombre_completo, telefono, chat_id, marca, modelo, año, placa,
+                       servicio_id, fecha, hora):
+    """
+    Registra una solicitud del bot de Telegram en una única transacción.
+
+    Usa el cliente ya asociado al chat o, si no hay, crea uno nuevo con los
+    datos escritos; un cliente existente nunca se modifica. Busca o crea el
+    vehículo (por placa) y reserva la reparación. Si algo falla, incluido que
+    el horario ya esté tomado, no queda ningún cliente ni vehículo a medias.
+
+    Pensada para llamarse con un solo sync_to_async desde el bot.
+
+    Raises:
+        HorarioNoDisponible: si el horario ya fue reservado
+        ValidationError: si la placa pertenece a otro cliente
+    """
+    nombre, apellido = _separar_nombre(nombre_completo)
+
+    def operacion():
+        cliente = Cliente.objects.filter(telegram_chat_id=str(chat_id)).order_by('id').first()
+        if cliente is None:
+            cliente = Cliente.objects.create(
+                # Email temporal único (el campo es obligatorio y único)
+                correo_electronico=f"telegram_{telefono}_{uuid.uuid4().hex[:8]}@bot.local",
+                nombre=nombre,
+                apellido=apellido,
+                telefono=telefono,
+                direccion='Cliente Telegram',
+                telegram_chat_id=chat_id,
+            )
+
+        vehiculo = Vehiculo.objects.filter(placa=placa).first()
+        if vehiculo is None:
+            try:
+                vehiculo = Vehiculo.objects.create(cliente=cliente, marca=marca, modelo=modelo, año=año, placa=placa)
+            except IntegrityError:
+                # Otra solicitud registró la misma placa al mismo tiempo
+                raise ValidationError('La placa ya está registrada para otro cliente.', code='placa_registrada')
+        elif vehiculo.cliente_id != cliente.id:
+            raise ValidationError('La placa ya está registrada para otro cliente.', code='placa_registrada')
+        elif (vehiculo.marca, vehiculo.modelo, vehiculo.año) != (marca, modelo, año):
+            vehiculo.marca, vehiculo.modelo, vehiculo.año = marca, modelo, año
+            vehiculo.save(update_fields=['marca', 'modelo', 'año'])
+
+        # Un IntegrityError aquí (horario tomado) revierte toda la transacción
+        # y _con_reintentos lo convierte en HorarioNoDisponible (el signal
+        # reservar_turno_reparacion toma el turno en HorarioReservado)
+        return Reparacion.objects.create(
+            vehiculo=vehiculo,
+            servicio_id=servicio_id,
+            condicion_vehiculo='regular',
+            estado_reparacion='pendiente',
+            fecha_programada=fecha,
+            hora_programada=hora,
+        )
+
+    with origen_cambios('bot'):
+        return _con_reintentos(operacion, MENSAJE_REPARACION_OCUPADA, fecha, hora)
+
+
+def reservar_vehiculo_desde_bot(vehiculo_id, servicio_id, fecha, hora):
+    """
+    Reserva desde el bot para un vehículo ya registrado (cliente que vuelve).
+
+    El cliente y el vehículo no se leen ni se modifican: solo se inserta la
+    reparación (ver gestion/bot/frecuentes.py).
+
+    Raises:
+        HorarioNoDisponible: si el horario ya fue reservado
+    """
+    with origen_cambios('bot'):
+        return _con_reintentos(lambda: Reparacion.objects.create(
+            vehiculo_id=vehiculo_id,
+            servicio_id=servicio_id,
+            condicion_vehiculo='regular',
+            estado_reparacion='pendiente',
+            fecha_programada=fecha,
+            hora_programada=hora,
+        ), MENSAJE_REPARACION_OCUPADA, fecha, hora)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import Cliente, Empleado, Servicio, Vehiculo, Reparacion, Agenda, Registro
+from .purga import MENSAJE_PLACA_EN_PURGA, placa_en_purga
+from .reservas import MENSAJE_REPARACION_OCUPADA, horario_tomado
 
 
 class ClienteSerializer(serializers.ModelSerializer):
@@ -22,11 +24,28 @@ class VehiculoSerializer(serializers.ModelSerializer):
         model = Vehiculo
         fields = '__all__'
 
+    def validate_placa(self, placa):
+        # Los vehículos de clientes eliminados no se ven pero la placa sigue tomada hasta la purga
+        if placa_en_purga(placa, self.instance):
+            raise serializers.ValidationError(MENSAJE_PLACA_EN_PURGA)
+        return placa
+
 class ReparacionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reparacion
         fields = '__all__'
 
+    def validate(self, attrs):
+        # El turno puede estar tomado por una cita (HorarioReservado es común a las dos tablas)
+        attrs = super().validate(attrs)
+        actual = lambda campo: attrs.get(campo, getattr(self.instance, campo, None))
+        fecha, hora = actual('fecha_programada'), actual('hora_programada')
+        estado = actual('estado_reparacion') or 'pendiente'
+        if (fecha and hora and estado in Reparacion.ESTADOS_OCUPAN_HORARIO
+                and horario_tomado(fecha, hora, reparacion=self.instance)):
+            raise serializers.ValidationError({'hora_programada': MENSAJE_REPARACION_OCUPADA})
+        return attrs
+
 
 # serializers para Agenda y Registro
 
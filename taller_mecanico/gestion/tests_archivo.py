@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import archivo, tiempos
+from gestion.models import (
+    Cliente, InspeccionVehiculo, NotaReparacion, Notificacion, Reparacion, ReparacionArchivada, ReparacionEvento,
+    Servicio, Tarea, TareaArchivada, TareaHistorial, Vehiculo,
+)
+from gestion.purga import eliminar_cliente
+
+User = get_user_model()
+
+
+class ArchivoTests(TestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com',
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Ford', modelo='Ka', año=2015, placa='ARC001')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.usuario = User.objects.create_user(username='jefe', password='secret')
+        self.hace_dos_años = timezone.now() - timedelta(days=730)
+
+    def _reparacion(self, estado, ingreso, salida=None):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion=estado)
+        Reparacion.objects.filter(pk=reparacion.pk).update(fecha_ingreso=ingreso, fecha_salida=salida)
+        return reparacion
+
+    def test_archiva_reparaciones_cerradas_con_tareas_e_historial(self):
+        vieja = self._reparacion('completada', self.hace_dos_años, self.hace_dos_años + timedelta(days=2))
+        cancelada = self._reparacion('cancelada', self.hace_dos_años)
+        reciente = self._reparacion('completada', timezone.now() - timedelta(days=10), timezone.now())
+        abierta = self._reparacion('en_espera', self.hace_dos_años)
+        con_aviso = self._reparacion('completada', self.hace_dos_años, self.hace_dos_años)
+        Notificacion.objects.create(clave='aviso', reparacion=con_aviso, canal='email', destino='ana@example.com',
+                                    mensaje='Lista')
+        NotaReparacion.objects.create(reparacion=vieja, texto='Pastillas', autor=self.usuario)
+        InspeccionVehiculo.objects.create(reparacion=vieja, vehiculo=self.vehiculo, kilometraje=120000)
+        tarea = Tarea.objects.create(titulo='Pedir repuesto', reparacion=vieja, creada_por=self.usuario)
+        TareaHistorial.objects.create(tarea=tarea, usuario=self.usuario, accion='creada', descripcion='Nueva')
+
+        avances = []
+        total = archivo.archivar(tamaño_lote=1, progreso=lambda t: avances.append(dict(t)))
+
+        self.assertEqual(total, {'reparaciones': 2, 'tareas': 1})
+        self.assertEqual(len(avances), 2)
+        self.assertEqual(set(Reparacion.objects.values_list('pk', flat=True)), {reciente.pk, abierta.pk, con_aviso.pk})
+        self.assertFalse(Tarea.objects.exists())
+        self.assertFalse(NotaReparacion.objects.exists())
+
+        archivada = ReparacionArchivada.objects.get(pk=vieja.pk)
+        self.assertEqual((archivada.placa, archivada.nombre_servicio, archivada.costo), ('ARC001', 'Frenos', 100))
+        self.assertEqual(archivada.fecha_ingreso, self.hace_dos_años)
+        self.assertEqual([nota['texto'] for nota in archivada.historial['notas']], ['Pastillas'])
+        self.assertEqual(archivada.historial['inspecciones'][0]['kilometraje'], 120000)
+        self.assertEqual(list(archivada.eventos.values_list('estado_nuevo', flat=True)), ['completada'])
+        self.assertFalse(ReparacionEvento.objects.filter(reparacion_id=vieja.pk).exists())
+        tarea_archivada = archivada.tareas.get()
+        self.assertEqual((tarea_archivada.pk, tarea_archivada.creada_por_id), (tarea.pk, self.usuario.pk))
+        self.assertEqual(list(tarea_archivada.historial.values_list('accion', flat=True)), ['creada'])
+        self.assertTrue(ReparacionArchivada.objects.filter(pk=cancelada.pk).exists())
+
+    def test_archiva_tareas_completadas_sueltas(self):
+        vieja = Tarea.objects.create(titulo='Ordenar depósito', estado='completada', creada_por=self.usuario)
+        pendiente = Tarea.objects.create(titulo='Inventario', creada_por=self.usuario)
+        Tarea.objects.update(fecha_actualizacion=self.hace_dos_años)
+
+        self.assertEqual(archivo.archivar(), {'reparaciones': 0, 'tareas': 1})
+        self.assertEqual(list(Tarea.objects.values_list('pk', flat=True)), [pendiente.pk])
+        self.assertIsNone(TareaArchivada.objects.get(pk=vieja.pk).reparacion)
+
+    def test_simular_no_mueve_nada(self):
+        self._reparacion('completada', self.hace_dos_años, self.hace_dos_años)
+        salida = StringIO()
+        call_command('archivar_reparaciones', '--simular', stdout=salida)
+        self.assertIn('1 reparación(es) y 0 tarea(s) se archivarían', salida.getvalue())
+        self.assertEqual(Reparacion.objects.count(), 1)
+
+        call_command('archivar_reparaciones', '--dias', '1000', stdout=salida)
+        self.assertEqual(Reparacion.objects.count(), 1)
+
+    def test_reportes_suman_vivas_y_archivadas(self):
+        mes = timezone.make_aware(datetime(2024, 5, 10, 12, 0))
+        self._reparacion('completada', mes, mes)
+        self._reparacion('completada', mes + timedelta(days=5), mes + timedelta(days=6))
+        archivo.archivar()
+        self._reparacion('en_progreso', mes + timedelta(days=1))
+        self.servicio.costo = 150  # ni el archivo ni las vivas cambian lo ya cobrado
+        self.servicio.save()
+
+        [fila] = archivo.ingresos_por_mes(fecha_ingreso__gte=mes - timedelta(days=9))
+        self.assertEqual((fila['total'], fila['cantidad']), (300, 3))
+        self.assertEqual(archivo.ingresos_totales(), 300)
+
+        self.client.login(username='jefe', password='secret')
+        respuesta = self.client.get(reverse('reportes_ingresos'), {'fecha_desde': '2024-05-01', 'fecha_hasta': '2024-05-31'})
+        self.assertEqual(respuesta.context['ingresos_totales'], 300.0)
+        self.assertEqual(respuesta.context['detalles'][0]['cantidad'], 3)
+
+    def test_panel_y_tiempos_cuentan_el_archivo(self):
+        vieja = self._reparacion('completada', self.hace_dos_años, self.hace_dos_años + timedelta(days=4))
+        ReparacionEvento.objects.filter(reparacion=vieja).delete()
+        ReparacionEvento.objects.bulk_create([
+            ReparacionEvento(reparacion=vieja, estado_nuevo='en_espera', fecha=self.hace_dos_años),
+            ReparacionEvento(reparacion=vieja, estado_nuevo='completada', fecha=self.hace_dos_años + timedelta(days=1)),
+        ])
+        archivo.archivar()
+        self._reparacion('completada', timezone.now() - timedelta(days=2), timezone.now())
+        self._reparacion('pendiente', timezone.now())
+        self.assertFalse(Reparacion.objects.filter(pk=vieja.pk).exists())
+
+        [espera] = [fila for fila in tiempos.tiempo_por_estado() if fila['estado'] == 'en_espera']
+        self.assertEqual((espera['tramos'], espera['promedio']), (1, timedelta(days=1)))
+
+        self.client.login(username='jefe', password='secret')
+        contexto = self.client.get(reverse('dashboard_jefe')).context
+        self.assertEqual((contexto['total_reparaciones'], contexto['reparaciones_completadas']), (3, 2))
+        self.assertIn({'estado': 'Completada', 'total': 2}, contexto['reparaciones_por_estado'])
+        self.assertEqual(contexto['tiempo_promedio'], timedelta(days=3))  # (4 días + 2 días) / 2
+
+    def test_panel_de_reparaciones_cuenta_el_archivo(self):
+        aceite = Servicio.objects.create(nombre_servicio='Aceite', costo=40, duracion=30)
+        self._reparacion('completada', self.hace_dos_años, self.hace_dos_años)
+        self._reparacion('completada', self.hace_dos_años, self.hace_dos_años)
+        vieja = self._reparacion('cancelada', self.hace_dos_años)
+        Reparacion.objects.filter(pk=vieja.pk).update(servicio=aceite)
+        archivo.archivar()
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=aceite)
+        self.assertEqual(Reparacion.objects.count(), 1)
+
+        self.client.login(username='jefe', password='secret')
+        contexto = self.client.get(reverse('dashboard_reparaciones')).context
+        self.assertEqual((contexto['total_reparaciones'], contexto['reparaciones_completadas'],
+                          contexto['reparaciones_pendientes']), (4, 2, 1))
+        self.assertEqual(contexto['reparaciones_por_estado']['Cancelada'], 1)
+        self.assertEqual(contexto['servicios_mas_solicitados'],
+                         [{'nombre': 'Frenos', 'total': 2}, {'nombre': 'Aceite', 'total': 2}])
+
+    def test_reportes_sin_clientes_eliminados(self):
+        self._reparacion('completada', self.hace_dos_años, self.hace_dos_años)
+        archivo.archivar()
+        self.assertEqual(archivo.ingresos_totales(), 100)
+
+        eliminar_cliente(self.vehiculo.cliente)
+
+        self.assertEqual(archivo.ingresos_totales(), 0)
+        self.assertEqual(archivo.reparaciones_por_estado(), {})
+        self.assertEqual(archivo.ingresos_por_mes(), [])
+        self.assertEqual(ReparacionArchivada.todos.count(), 1)
@@ -0,0 +1,97 @@
+from datetime import time, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from gestion.asignacion import asignar_pendientes, asignar_reparacion, planificar
+from gestion.models import Cliente, Empleado, Reparacion, Servicio, Vehiculo
+
+
+class AsignacionReparacionesTests(TestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='555', direccion='Calle 1', correo_electronico='ana@example.com'
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        self.corto = Servicio.objects.create(nombre_servicio='Aceite', costo=50, duracion=30)
+        self.largo = Servicio.objects.create(nombre_servicio='Motor', costo=900, duracion=480)
+        self.m1 = Empleado.objects.create(nombre='Carlos', puesto='Mecánico', telefono='1', correo_electronico='c@example.com')
+        self.m2 = Empleado.objects.create(nombre='Pedro', puesto='mecanico', telefono='2', correo_electronico='p@example.com')
+        Empleado.objects.create(nombre='Rosa', puesto='Recepcionista', telefono='3', correo_electronico='r@example.com')
+
+    def _pendiente(self, servicio, **extra):
+        return Reparacion.objects.create(vehiculo=self.vehiculo, servicio=servicio, **extra)
+
+    def test_balancea_por_horas_de_carga(self):
+        # m1 ya tiene 8 horas de trabajo abierto
+        self._pendiente(self.largo, mecanico_asignado=self.m1, estado_reparacion='en_progreso')
+        nuevas = [self._pendiente(self.corto) for _ in range(4)]
+        plan = asignar_pendientes()
+        self.assertEqual(plan, {self.m2.id: [r.id for r in nuevas]})
+        self.assertFalse(Reparacion.objects.filter(estado_reparacion='pendiente', mecanico_asignado__isnull=True).exists())
+
+    def test_prioriza_condicion_critica(self):
+        normal = self._pendiente(self.largo, condicion_vehiculo='bueno')
+        critica = self._pendiente(self.largo, condicion_vehiculo='critico')
+        plan = asignar_pendientes(limite=1)
+        self.assertEqual(list(plan.values()), [[critica.id]])
+        normal.refresh_from_db()
+        self.assertIsNone(normal.mecanico_asignado)
+
+    def test_reparte_por_dia_programado(self):
+        dia = timezone.now().date() + timedelta(days=1)
+        self._pendiente(self.corto, mecanico_asignado=self.m1, fecha_programada=dia, hora_programada=time(8, 0))
+        self._pendiente(self.largo, mecanico_asignado=self.m2)
+        nueva = self._pendiente(self.corto, fecha_programada=dia, hora_programada=time(9, 0))
+        plan = asignar_pendientes()
+        # m2 tiene más carga total, pero ninguna ese día
+        self.assertEqual(plan, {self.m2.id: [nueva.id]})
+
+    def test_simulacion_no_guarda(self):
+        reparacion = self._pendiente(self.corto)
+        plan = asignar_pendientes(aplicar=False)
+        self.assertEqual(sum(len(ids) for ids in plan.values()), 1)
+        reparacion.refresh_from_db()
+        self.assertIsNone(reparacion.mecanico_asignado)
+
+    def test_lote_grande_con_consultas_constantes(self):
+        Reparacion.objects.bulk_create([
+            Reparacion(vehiculo=self.vehiculo, servicio=self.corto if i % 2 else self.largo)
+            for i in range(2000)
+        ])
+        # mecánicos + pendientes + carga + (savepoint, SELECT, UPDATE, release) por lote de cada mecánico
+        with self.assertNumQueries(3 + 2 * 2 * 4):
+            plan = asignar_pendientes()
+        self.assertEqual(sum(len(ids) for ids in plan.values()), 2000)
+        self.assertEqual(abs(len(plan[self.m1.id]) - len(plan[self.m2.id])), 0)
+
+    @override_settings(ASIGNACION_AUTOMATICA_REPARACIONES=True)
+    def test_asignacion_incremental_al_crear(self):
+        self._pendiente(self.largo, mecanico_asignado=self.m1, estado_reparacion='en_progreso')
+        with self.captureOnCommitCallbacks(execute=True):
+            reparacion = self._pendiente(self.corto)
+        reparacion.refresh_from_db()
+        self.assertEqual(reparacion.mecanico_asignado, self.m2)
+
+    def test_no_informa_reparaciones_tomadas_por_otro(self):
+        tomada = self._pendiente(self.corto)
+        libre = self._pendiente(self.corto)
+
+        def planificar_y_competir(*args):
+            plan = planificar(*args)
+            # Otro proceso asigna la reparación entre el plan y el UPDATE
+            Reparacion.objects.filter(pk=tomada.pk).update(mecanico_asignado=self.m2)
+            return plan
+
+        with mock.patch('gestion.asignacion.planificar', side_effect=planificar_y_competir):
+            plan = asignar_pendientes()
+        self.assertEqual(sorted(sum(plan.values(), [])), [libre.id])
+        tomada.refresh_from_db()
+        self.assertEqual(tomada.mecanico_asignado, self.m2)
+
+        # La asignación incremental tampoco pisa la instancia
+        otra = self._pendiente(self.corto)
+        Reparacion.objects.filter(pk=otra.pk).update(estado_reparacion='en_progreso')
+        self.assertIsNone(asignar_reparacion(otra))
+        self.assertIsNone(otra.mecanico_asignado_id)
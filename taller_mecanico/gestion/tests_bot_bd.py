@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.db import connection, connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.test import TestCase, TransactionTestCase
+
+from gestion.bot import bd
+from gestion.bot.bd import EjecutorBD, en_bd
+from gestion.models import Servicio
+
+
+def _consultar():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return threading.current_thread().name
+
+
+class EjecutorBDTests(TransactionTestCase):
+    def setUp(self):
+        # SQLite en memoria ignora close() (borraría la base de las pruebas);
+        # aquí se cierra de verdad: la base compartida sigue abierta en este hilo
+        backend = type(connections['default'])
+        cerrar = mock.patch.object(backend, 'close', BaseDatabaseWrapper.close)
+        cerrar.start()
+        self.addCleanup(cerrar.stop)
+        self.backend = backend
+        # Conexiones persistentes, como con CONN_MAX_AGE en producción
+        ajustes = connections.settings['default']
+        anterior = ajustes['CONN_MAX_AGE']
+        ajustes['CONN_MAX_AGE'] = None
+        self.addCleanup(ajustes.__setitem__, 'CONN_MAX_AGE', anterior)
+
+    def _ejecutor(self, **opciones):
+        ejecutor = EjecutorBD(**{'hilos': 2, 'edad_maxima': 600, 'verificar_tras': 600, **opciones}).iniciar()
+        self.addCleanup(ejecutor.detener)
+        return ejecutor
+
+    def _conexiones_abiertas(self):
+        abiertas = []
+        receptor = lambda connection, **kwargs: abiertas.append(connection)  # noqa: E731
+        connection_created.connect(receptor)
+        self.addCleanup(connection_created.disconnect, receptor)
+        return abiertas
+
+    async def _varias(self, ejecutor, veces):
+        return await asyncio.gather(*(ejecutor.envolver(_consultar)() for _ in range(veces)))
+
+    def test_hilos_acotados(self):
+        ejecutor = self._ejecutor()
+        abiertas = self._conexiones_abiertas()
+        hilos = asyncio.run(self._varias(ejecutor, 20))
+        self.assertLessEqual(len(set(hilos)), 2)
+        self.assertTrue(all(nombre.startswith(bd.PREFIJO_HILOS) for nombre in hilos))
+        self.assertLessEqual(len(abiertas), 2)
+
+    def test_recicla_conexiones_viejas(self):
+        ejecutor = self._ejecutor(hilos=1, edad_maxima=0)
+        abiertas = self._conexiones_abiertas()
+        asyncio.run(self._varias(ejecutor, 3))
+        self.assertEqual(len(abiertas), 3)
+        self.assertEqual(ejecutor.estadisticas['recicladas'], 2)
+
+    def test_verifica_conexiones_inactivas(self):
+        ejecutor = self._ejecutor(hilos=1, verificar_tras=0.05)
+        abiertas = self._conexiones_abiertas()
+        asyncio.run(self._varias(ejecutor, 1))
+        time.sleep(0.1)
+        with mock.patch.object(self.backend, 'is_usable', return_value=False), \
+                self.assertLogs('gestion.bot.bd', 'WARNING'):
+            asyncio.run(self._varias(ejecutor, 1))
+        self.assertEqual(len(abiertas), 2)
+        self.assertEqual(ejecutor.estadisticas['descartadas'], 1)
+
+    def test_detener_cierra_las_conexiones_de_los_hilos(self):
+        ejecutor = self._ejecutor()
+        abiertas = self._conexiones_abiertas()
+        asyncio.run(self._varias(ejecutor, 4))
+        ejecutor.detener()
+        self.assertTrue(abiertas)
+        self.assertTrue(all(conexion.connection is None for conexion in abiertas))
+
+
+class EnBDSinEjecutorTests(TestCase):
+    async def test_equivale_a_sync_to_async(self):
+        self.assertIsNone(bd._ejecutor)
+        await Servicio.objects.acreate(nombre_servicio='Frenos', costo=100, duracion=60)
+        # Corre en el hilo de la prueba: ve los datos de su transacción
+        self.assertEqual(await en_bd(Servicio.objects.count)(), 1)
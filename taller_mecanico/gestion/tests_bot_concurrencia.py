@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from django.test import TestCase, override_settings
+from telegram import Update
+
+from gestion.bot.api_local import ServidorBotAPI, actualizacion_mensaje
+from gestion.bot.carga import SimulacionCarga
+from gestion.bot.concurrencia import ProcesadorPorChat
+from gestion.management.commands.run_telegram_bot import build_application
+from gestion.models import Reparacion, Servicio
+
+
+def _actualizacion(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id))
+
+
+class ProcesadorPorChatTests(TestCase):
+    async def test_orden_por_chat_y_limite_de_concurrencia(self):
+        procesador = ProcesadorPorChat(4)
+        procesados = {chat: [] for chat in range(10)}
+        activos = {'ahora': 0, 'maximo': 0}
+
+        async def manejar(chat, indice):
+            activos['ahora'] += 1
+            activos['maximo'] = max(activos['maximo'], activos['ahora'])
+            await asyncio.sleep(random.uniform(0, 0.005))
+            procesados[chat].append(indice)
+            activos['ahora'] -= 1
+
+        tareas = [
+            asyncio.create_task(procesador.process_update(_actualizacion(chat), manejar(chat, indice)))
+            for indice in range(5) for chat in range(10)
+        ]
+        await asyncio.gather(*tareas)
+        await procesador.esperar()
+
+        for chat, indices in procesados.items():
+            self.assertEqual(indices, list(range(5)), f'chat {chat} fuera de orden')
+        self.assertLessEqual(activos['maximo'], 4)
+        self.assertGreater(activos['maximo'], 1)
+
+    async def test_error_no_corta_la_cola_del_chat(self):
+        procesador = ProcesadorPorChat(2)
+        procesados = []
+
+        async def falla():
+            raise RuntimeError('falla')
+
+        async def manejar():
+            procesados.append('ok')
+
+        with self.assertLogs('gestion.bot.concurrencia', 'ERROR'):
+            await asyncio.gather(
+                procesador.process_update(_actualizacion(1), falla()),
+                procesador.process_update(_actualizacion(1), manejar()),
+            )
+            await procesador.esperar()
+        self.assertEqual(procesados, ['ok'])
+
+
+class CargaBotTests(TestCase):
+    """Muchos usuarios a la vez contra una Bot API local con latencia simulada."""
+
+    CHATS = 40
+    LATENCIA = 0.05
+
+    def setUp(self):
+        self.servidor = ServidorBotAPI(latencia=self.LATENCIA).iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url,
+            TELEGRAM_BOT_CONCURRENCIA=self.CHATS, TELEGRAM_BOT_PERSISTENCIA=False,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    async def test_conversaciones_en_paralelo_y_en_orden(self):
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        await aplicacion.start()
+        pasos = ['/start', '099123456', 'Ana Gomez']
+        comienzo = time.perf_counter()
+        try:
+            for texto in pasos:
+                for chat_id in range(1, self.CHATS + 1):
+                    await aplicacion.update_queue.put(
+                        Update.de_json(actualizacion_mensaje(chat_id, texto), aplicacion.bot)
+                    )
+            await aplicacion.update_queue.join()
+            await aplicacion.update_processor.esperar()
+            duracion = time.perf_counter() - comienzo
+        finally:
+            await aplicacion.stop()
+            await aplicacion.shutdown()
+
+        for chat_id in range(1, self.CHATS + 1):
+            textos = [mensaje['text'] for mensaje in self.servidor.mensajes(chat_id)]
+            self.assertEqual(len(textos), 3, f'chat {chat_id}: {textos}')
+            self.assertIn('Bienvenido al Taller', textos[0])
+            self.assertIn('Teléfono guardado', textos[1])
+            self.assertIn('Nombre guardado', textos[2])
+        # De a una actualización tardaría al menos CHATS * pasos * LATENCIA (6 s)
+        secuencial = self.CHATS * len(pasos) * self.LATENCIA
+        self.assertLess(duracion, secuencial / 3)
+
+
+class SimulacionCargaTests(TestCase):
+    def setUp(self):
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        # Escrituras del estado muy seguidas, mientras las conversaciones avanzan
+        ajustes = override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url,
+            TELEGRAM_BOT_PERSISTENCIA=True, TELEGRAM_BOT_PERSISTENCIA_INTERVALO=0.01,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+
+    async def test_conversacion_completa_de_muchos_usuarios(self):
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        await aplicacion.start()
+        try:
+            resultado = await SimulacionCarga(aplicacion, self.servidor).ejecutar(15)
+        finally:
+            await aplicacion.stop()
+            await aplicacion.shutdown()
+
+        self.assertEqual(resultado['resultados'], {'reservada': 15})
+        self.assertEqual(resultado['actualizaciones'], 15 * 11)
+        self.assertEqual(set(resultado['latencias']), {
+            'start', 'telefono', 'nombre', 'marca', 'modelo', 'año', 'placa',
+            'servicio', 'fecha', 'hora', 'confirmacion',
+        })
+        self.assertEqual(await Reparacion.objects.acount(), 15)
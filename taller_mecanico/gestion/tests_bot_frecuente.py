@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from telegram import Update
+
+from gestion.bot.api_local import ServidorBotAPI, actualizacion_boton, actualizacion_contacto, actualizacion_mensaje
+from gestion.bot.frecuentes import cliente_frecuente_por_chat
+from gestion.management.commands.run_telegram_bot import build_application
+from gestion.models import Cliente, Reparacion, Servicio, Vehiculo
+
+
+class ClienteFrecuenteBotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url,
+            TELEGRAM_BOT_PERSISTENCIA=False, TELEFONO_CODIGO_PAIS='595',
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com', telegram_chat_id='5'
+        )
+        self.ka = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='FRE001')
+        self.gol = Vehiculo.objects.create(cliente=self.cliente, marca='VW', modelo='Gol', año=2018, placa='FRE002')
+        Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+
+    async def _conversar(self, chat_id, *pasos):
+        """Envía los pasos en orden: comandos, actualizaciones armadas o el prefijo del botón a pulsar."""
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        try:
+            for paso in pasos:
+                if isinstance(paso, dict):
+                    datos = paso
+                elif paso.startswith('/'):
+                    datos = actualizacion_mensaje(chat_id, paso)
+                else:
+                    [boton, *_] = [b for b in self.servidor.botones(chat_id) if b.startswith(paso)]
+                    datos = actualizacion_boton(chat_id, boton)
+                await aplicacion.process_update(Update.de_json(datos, aplicacion.bot))
+        finally:
+            await aplicacion.shutdown()
+
+    def test_vehiculos_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            frecuente = cliente_frecuente_por_chat(5)
+        self.assertEqual(frecuente['nombre'], 'Ana Gomez')
+        self.assertEqual([v['placa'] for v in frecuente['vehiculos']], ['FRE002', 'FRE001'])
+        self.assertIsNone(cliente_frecuente_por_chat(99))
+
+    async def test_chat_conocido_reserva_sin_reescribir_cliente_ni_vehiculo(self):
+        await self._conversar(5, '/start', f'vehicle_{self.ka.id}', 'service_', 'date_', 'time_', 'confirm_yes')
+
+        reparacion = await Reparacion.objects.aget()
+        self.assertEqual(reparacion.vehiculo_id, self.ka.id)
+        self.assertEqual(await Cliente.objects.acount(), 1)
+        await self.ka.arefresh_from_db()
+        self.assertEqual((self.ka.marca, self.ka.modelo, self.ka.año), ('Ford', 'Ka', 2015))
+        self.assertIn('CREADA CON ÉXITO', self.servidor.llamadas('editMessageText')[-1]['text'])
+
+    async def test_contacto_compartido_ofrece_los_vehiculos(self):
+        await self._conversar(8, '/start', actualizacion_contacto(8, '59599123456'))
+
+        self.assertEqual(self.servidor.botones(8), [f'vehicle_{self.gol.id}', f'vehicle_{self.ka.id}', 'vehicle_new'])
+        await self.cliente.arefresh_from_db()
+        self.assertEqual(self.cliente.telegram_chat_id, '8')
+
+    async def test_vehiculo_no_ofrecido_se_rechaza(self):
+        otro = await Cliente.objects.acreate(
+            nombre='Luis', apellido='Perez', telefono='098000000', direccion='Calle 2',
+            correo_electronico='luis@example.com'
+        )
+        ajeno = await Vehiculo.objects.acreate(cliente=otro, marca='Fiat', modelo='Uno', año=2010, placa='AJE001')
+        await self._conversar(5, '/start', actualizacion_boton(5, f'vehicle_{ajeno.id}'))
+
+        self.assertIn('no válido', self.servidor.llamadas('editMessageText')[-1]['text'])
+        self.assertIn(f'vehicle_{self.ka.id}', self.servidor.botones(5))
+
+    async def test_otro_vehiculo_pide_solo_los_datos_del_vehiculo(self):
+        textos = [actualizacion_mensaje(5, texto) for texto in ['Fiat', 'Uno', '2010', 'NUE001']]
+        await self._conversar(5, '/start', 'vehicle_new', *textos, 'service_', 'date_', 'time_', 'confirm_yes')
+
+        self.assertEqual(await Cliente.objects.acount(), 1)
+        reparacion = await Reparacion.objects.select_related('vehiculo').aget()
+        self.assertEqual((reparacion.vehiculo.placa, reparacion.vehiculo.cliente_id), ('NUE001', self.cliente.id))
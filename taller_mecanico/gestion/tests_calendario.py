@@ -0,0 +1,91 @@
+from datetime import time, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.db.models import F
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import calendario
+from gestion.models import Agenda, Cliente, Empleado, Reparacion, Servicio, Vehiculo, VersionCalendario
+
+
+class CalendarioFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='555', direccion='Calle 1', correo_electronico='ana@example.com'
+        )
+        self.otro = Cliente.objects.create(
+            nombre='Luis', apellido='Diaz', telefono='777', direccion='Calle 2', correo_electronico='luis@example.com'
+        )
+        self.mecanico = Empleado.objects.create(
+            nombre='Carlos', puesto='Mecánico', telefono='111', correo_electronico='carlos@example.com'
+        )
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=90)
+        self.vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        self.maniana = timezone.now().date() + timedelta(days=1)
+        self.cita = Agenda.objects.create(cliente=self.cliente, servicio=self.servicio, fecha=self.maniana, hora=time(10, 0))
+        Agenda.objects.create(cliente=self.otro, servicio=self.servicio, fecha=self.maniana, hora=time(11, 0))
+        self.reparacion = Reparacion.objects.create(
+            vehiculo=self.vehiculo, servicio=self.servicio, mecanico_asignado=self.mecanico,
+            fecha_programada=self.maniana, hora_programada=time(9, 0)
+        )
+
+    def test_token_invalido_devuelve_404(self):
+        resp = self.client.get(reverse('calendario_ics', kwargs={'token': 'no-valido'}))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_feed_agenda_completo(self):
+        resp = self.client.get(calendario.url_feed('agenda'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/calendar; charset=utf-8')
+        contenido = resp.content.decode()
+        self.assertIn('BEGIN:VCALENDAR', contenido)
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 3)
+        self.assertIn(f'UID:reparacion-{self.reparacion.id}@', contenido)
+
+    def test_feed_por_mecanico_y_por_cliente(self):
+        contenido = self.client.get(calendario.url_feed('mecanico', self.mecanico.id)).content.decode()
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 1)
+        contenido = self.client.get(calendario.url_feed('cliente', self.cliente.id)).content.decode()
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'UID:cita-{self.cita.id}@', contenido)
+
+    def test_etag_responde_304_con_una_consulta(self):
+        url = calendario.url_feed('agenda')
+        resp = self.client.get(url)
+        etag = resp['ETag']
+        self.assertTrue(resp.has_header('Last-Modified'))
+        with self.assertNumQueries(1):  # solo la versión
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_cambio_en_agenda_invalida_etag(self):
+        url = calendario.url_feed('agenda')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Agenda.objects.create(cliente=self.otro, servicio=self.servicio, fecha=self.maniana, hora=time(12, 0))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content.decode().count('BEGIN:VEVENT'), 4)
+
+    def test_error_al_incrementar_no_afecta_el_cambio(self):
+        def bloqueada():
+            raise OperationalError('database table is locked')
+
+        with mock.patch('gestion.calendario._incrementar_version', bloqueada), \
+                self.assertLogs('django.test', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            cita = Agenda.objects.create(cliente=self.otro, servicio=self.servicio,
+                                         fecha=self.maniana, hora=time(12, 0))
+        self.assertTrue(Agenda.objects.filter(pk=cita.pk).exists())
+
+    def test_cambio_desde_otro_proceso_invalida_etag(self):
+        url = calendario.url_feed('agenda')
+        etag = self.client.get(url)['ETag']
+        # Otro proceso (el bot, un comando) incrementa la versión: la caché local no interviene
+        VersionCalendario.objects.update(numero=F('numero') + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from gestion import catalogo
+from gestion.forms import CitaForm, ReparacionForm
+from gestion.models import Servicio
+
+
+class CatalogoServiciosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.frenos = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.aceite = Servicio.objects.create(nombre_servicio='Aceite', costo=50, duracion=30)
+
+    def test_se_carga_una_vez_por_version(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([s.nombre_servicio for s in catalogo.servicios()], ['Aceite', 'Frenos'])
+        with self.assertNumQueries(0):
+            catalogo.servicios()
+            self.assertEqual(catalogo.obtener_servicio(str(self.frenos.id)).costo, 100)
+            self.assertEqual(catalogo.nombres_servicios()[self.aceite.id], 'Aceite')
+
+    def test_guardar_y_eliminar_invalidan(self):
+        catalogo.servicios()
+        self.frenos.costo = 120
+        with self.captureOnCommitCallbacks(execute=True):
+            self.frenos.save()
+        self.assertEqual(catalogo.obtener_servicio(self.frenos.id).costo, 120)
+
+        self.aceite.delete()
+        self.assertEqual([s.nombre_servicio for s in catalogo.servicios()], ['Frenos'])
+
+    def test_servicio_inexistente(self):
+        for valor in [999, 'abc', None]:
+            with self.assertRaises(Servicio.DoesNotExist):
+                catalogo.obtener_servicio(valor)
+
+    def test_formularios_no_consultan_servicios(self):
+        catalogo.servicios()
+        formulario = ReparacionForm()
+        with self.assertNumQueries(0):
+            opciones = [opcion.choice_label for opcion in formulario['servicio']]
+        self.assertEqual(opciones, ['---------', 'Aceite', 'Frenos'])
+        with self.assertNumQueries(0):
+            self.assertIn('Frenos', str(CitaForm()['servicio']))
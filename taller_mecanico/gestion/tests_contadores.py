@@ -0,0 +1,130 @@
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import archivo, contadores
+from gestion.models import Cliente, Reparacion, Servicio, Vehiculo
+
+User = get_user_model()
+migracion = import_module('gestion.migrations.0024_contadores_cliente')
+
+
+class ContadoresClienteTests(TestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com',
+        )
+        self.otro = Cliente.objects.create(
+            nombre='Luis', apellido='Perez', telefono='099654321', direccion='Calle 2',
+            correo_electronico='luis@example.com',
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='CON001')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.aceite = Servicio.objects.create(nombre_servicio='Aceite', costo=40, duracion=30)
+
+    def _contadores(self, cliente=None):
+        cliente = Cliente.objects.get(pk=(cliente or self.cliente).pk)
+        return cliente.num_vehiculos, cliente.num_reparaciones, cliente.total_facturado
+
+    def test_reparaciones_actualizan_los_contadores(self):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio)
+        self.assertEqual(self._contadores(), (1, 1, 0))
+        self.assertEqual(Cliente.objects.get(pk=self.cliente.pk).ultima_visita, reparacion.fecha_ingreso)
+
+        reparacion.estado_reparacion = 'completada'
+        reparacion.save()
+        self.assertEqual(self._contadores(), (1, 1, 100))
+        reparacion.servicio = self.aceite
+        reparacion.save(update_fields=['servicio'])
+        self.assertEqual(self._contadores(), (1, 1, 40))
+        reparacion.save(update_fields=['notas'])
+        self.assertEqual(self._contadores(), (1, 1, 40))
+
+        # Reparación diferida: se recalcula el cliente
+        diferida = Reparacion.objects.only('id', 'vehiculo').get(pk=reparacion.pk)
+        diferida.estado_reparacion = 'cancelada'
+        diferida.save()
+        self.assertEqual(self._contadores(), (1, 1, 0))
+
+        otro_vehiculo = Vehiculo.objects.create(cliente=self.otro, marca='Fiat', modelo='Uno', año=2010, placa='CON002')
+        reparacion.refresh_from_db()
+        reparacion.vehiculo = otro_vehiculo
+        reparacion.estado_reparacion = 'completada'
+        reparacion.save()
+        self.assertEqual((self._contadores(), self._contadores(self.otro)), ((1, 0, 0), (1, 1, 40)))
+
+        reparacion.delete()
+        self.assertEqual(self._contadores(self.otro), (1, 0, 0))
+        self.assertIsNone(Cliente.objects.get(pk=self.otro.pk).ultima_visita)
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_vehiculos_y_cambio_de_duenio(self):
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='completada')
+        self.vehiculo.cliente = self.otro
+        self.vehiculo.save()
+        self.assertEqual((self._contadores(), self._contadores(self.otro)), ((0, 0, 0), (1, 1, 100)))
+
+        self.vehiculo.delete()
+        self.assertEqual(self._contadores(self.otro), (0, 0, 0))
+
+    def test_guardar_el_cliente_no_pisa_los_contadores(self):
+        cliente = Cliente.objects.get(pk=self.cliente.pk)  # leído antes de la reparación
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='completada')
+        cliente.direccion = 'Calle 3'
+        cliente.save()
+        self.assertEqual(self._contadores(), (1, 1, 100))
+
+    def test_archivar_no_descuenta(self):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='completada')
+        hace_dos_años = timezone.now() - timedelta(days=730)
+        Reparacion.objects.filter(pk=reparacion.pk).update(fecha_ingreso=hace_dos_años, fecha_salida=hace_dos_años)
+        archivo.archivar()
+
+        self.assertFalse(Reparacion.objects.exists())
+        self.assertEqual(self._contadores(), (1, 1, 100))
+
+    def test_comando_detecta_y_repara_diferencias(self):
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='completada')
+        Cliente.objects.filter(pk=self.cliente.pk).update(num_vehiculos=5, total_facturado=0, ultima_visita=None)
+
+        salida = StringIO()
+        call_command('verificar_contadores_clientes', stdout=salida)
+        self.assertIn('1 cliente(s) con diferencias', salida.getvalue())
+        self.assertEqual(self._contadores(), (5, 1, 0))
+
+        call_command('verificar_contadores_clientes', '--reparar', stdout=salida)
+        self.assertEqual(self._contadores(), (1, 1, Decimal('100')))
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_migracion_calcula_los_contadores(self):
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='completada')
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.aceite)
+        Cliente.objects.update(num_vehiculos=0, num_reparaciones=0, total_facturado=0, ultima_visita=None)
+
+        migracion.calcular_contadores(apps, None)
+
+        self.assertEqual(self._contadores(), (1, 2, 100))
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_listado_en_una_consulta(self):
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='completada')
+        User.objects.create_user(username='jefe', password='secret')
+        self.client.login(username='jefe', password='secret')
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('clientes-lista'))
+        self.assertContains(respuesta, '$100')
+        negocio = [c['sql'] for c in consultas if 'gestion_' in c['sql'] and 'gestion_userprofile' not in c['sql']]
+        self.assertEqual(len(negocio), 1)
+        self.assertNotIn('gestion_vehiculo', negocio[0])
@@ -0,0 +1,82 @@
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import disponibilidad
+from gestion.forms import CitaForm
+from gestion.models import Agenda, Cliente, Reparacion, Servicio, Vehiculo
+
+
+class DisponibilidadTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='tester', password='secret')
+        self.client.login(username='tester', password='secret')
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='555', direccion='Calle 1', correo_electronico='ana@example.com'
+        )
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        self.maniana = timezone.localdate() + timedelta(days=1)
+        self.cita = Agenda.objects.create(cliente=self.cliente, servicio=self.servicio, fecha=self.maniana, hora=time(10, 0))
+        Reparacion.objects.create(
+            vehiculo=self.vehiculo, servicio=self.servicio, fecha_programada=self.maniana, hora_programada=time(9, 0)
+        )
+        # Una reparación completada no ocupa horario
+        Reparacion.objects.create(
+            vehiculo=self.vehiculo, servicio=self.servicio, fecha_programada=self.maniana,
+            hora_programada=time(11, 0), estado_reparacion='completada'
+        )
+
+    def test_horas_libres_excluye_citas_y_reparaciones(self):
+        horas = disponibilidad.horas_libres(self.maniana)
+        self.assertNotIn(time(9, 0), horas)
+        self.assertNotIn(time(10, 0), horas)
+        self.assertIn(time(11, 0), horas)
+        self.assertEqual(len(horas), len(disponibilidad.horarios_del_dia()) - 2)
+
+    def test_mes_completo_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            dias = disponibilidad.disponibilidad_mes(self.maniana.year, self.maniana.month)
+        dia = next(d for d in dias if d['fecha'] == self.maniana)
+        self.assertEqual(dia['libres'], len(disponibilidad.horarios_del_dia()) - 2)
+        self.assertTrue(all(d['fecha'] >= timezone.localdate() for d in dias))
+
+    def test_api_mensual(self):
+        url = reverse('disponibilidad_mensual', kwargs={'año': self.maniana.year, 'mes': self.maniana.month})
+        data = self.client.get(url).json()
+        dia = next(d for d in data['dias'] if d['fecha'] == self.maniana.isoformat())
+        self.assertNotIn('10:00', dia['horas'])
+        resp = self.client.get(reverse('disponibilidad_mensual', kwargs={'año': 2030, 'mes': 13}))
+        self.assertEqual(resp.status_code, 400)
+        for año in (0, 10000):
+            resp = self.client.get(reverse('disponibilidad_mensual', kwargs={'año': año, 'mes': 1}))
+            self.assertEqual(resp.status_code, 400)
+
+    def test_api_dia_excluye_la_cita_editada(self):
+        url = reverse('obtener_horas_disponibles', kwargs={'fecha': self.maniana.isoformat()})
+        self.assertNotIn('10:00', self.client.get(url).json()['horas_disponibles'])
+        self.assertIn('10:00', self.client.get(url, {'excluir': self.cita.pk}).json()['horas_disponibles'])
+        self.assertEqual(self.client.get(url, {'excluir': 'x'}).status_code, 400)
+
+    def test_formulario_solo_ofrece_horas_libres(self):
+        opciones = [valor for valor, _ in CitaForm(initial={'fecha': self.maniana}).fields['hora'].choices]
+        self.assertNotIn('09:00', opciones)
+        self.assertNotIn('10:00', opciones)
+        opciones = [valor for valor, _ in CitaForm(instance=self.cita).fields['hora'].choices]
+        self.assertIn('10:00', opciones)
+        self.assertNotIn('09:00', opciones)
+
+    def test_fechas_con_lugar_omite_dias_llenos(self):
+        ocupadas = [
+            Agenda(cliente=self.cliente, servicio=self.servicio, fecha=self.maniana, hora=h)
+            for h in disponibilidad.horarios_del_dia()
+            if h not in (time(9, 0), time(10, 0))
+        ]
+        Agenda.objects.bulk_create(ocupadas)
+        fechas = [d['fecha'] for d in disponibilidad.fechas_con_lugar(3)]
+        self.assertNotIn(self.maniana, fechas)
+        self.assertEqual(len(fechas), 2)
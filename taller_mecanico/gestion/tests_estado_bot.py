@@ -0,0 +1,99 @@
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from telegram import Update
+
+from gestion.bot.api_local import ServidorBotAPI, actualizacion_contacto, actualizacion_mensaje
+from gestion.bot.estado import estado_para_chat
+from gestion.management.commands.run_telegram_bot import build_application
+from gestion.models import Cliente, Reparacion, Servicio, Vehiculo, normalizar_telefono
+
+
+@override_settings(TELEFONO_CODIGO_PAIS='595')
+class TelefonoNormalizadoTests(TestCase):
+    def test_formatos_equivalentes(self):
+        self.assertEqual(normalizar_telefono('099 123 456'), '59599123456')
+        self.assertEqual(normalizar_telefono('+595 99-123-456'), '59599123456')
+        self.assertEqual(normalizar_telefono('00595 99 123 456'), '59599123456')
+        self.assertEqual(normalizar_telefono('59599123456', internacional=True), '59599123456')
+        self.assertEqual(normalizar_telefono(''), '')
+
+    def test_otro_pais_no_coincide(self):
+        # Mismos 8 dígitos finales, distinto número
+        self.assertNotEqual(normalizar_telefono('+54 9 11 9912-3456'), normalizar_telefono('+598 99 123 456'))
+        self.assertNotEqual(normalizar_telefono('59899123456', internacional=True), normalizar_telefono('099 123 456'))
+
+    def test_se_actualiza_al_guardar(self):
+        cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099 123 456', direccion='Calle 1',
+            correo_electronico='ana@example.com'
+        )
+        self.assertEqual(cliente.telefono_normalizado, '59599123456')
+        cliente.telefono = '098 765 432'
+        cliente.save(update_fields=['telefono'])
+        self.assertEqual(Cliente.objects.get().telefono_normalizado, '59598765432')
+
+
+class EstadoBotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url,
+            TELEGRAM_BOT_PERSISTENCIA=False, TELEFONO_CODIGO_PAIS='595',
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com', telegram_chat_id='5'
+        )
+        vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='EST001')
+        servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        manana = timezone.now().date() + timedelta(days=1)
+        Reparacion.objects.create(vehiculo=vehiculo, servicio=servicio, estado_reparacion='en_progreso',
+                                  fecha_programada=manana, hora_programada=time(10, 0))
+        Reparacion.objects.create(vehiculo=vehiculo, servicio=servicio, estado_reparacion='completada')
+
+    async def _enviar(self, datos):
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        try:
+            await aplicacion.process_update(Update.de_json(datos, aplicacion.bot))
+        finally:
+            await aplicacion.shutdown()
+        return self.servidor.mensajes(datos['message']['chat']['id'])[-1]
+
+    async def test_chat_asociado_ve_sus_reparaciones_en_curso(self):
+        mensaje = await self._enviar(actualizacion_mensaje(5, '/estado'))
+        self.assertIn('Ford Ka (EST001) - Frenos', mensaje['text'])
+        self.assertIn('En Progreso', mensaje['text'])
+        self.assertNotIn('Completada', mensaje['text'])
+
+    def test_respuesta_en_cache(self):
+        with self.assertNumQueries(2):
+            texto = estado_para_chat(5)
+        with self.assertNumQueries(0):
+            self.assertEqual(estado_para_chat(5), texto)
+        self.assertIsNone(estado_para_chat(99))
+
+    async def test_chat_desconocido_pide_el_contacto(self):
+        mensaje = await self._enviar(actualizacion_mensaje(8, '/estado'))
+        [[boton]] = mensaje['reply_markup']['keyboard']
+        self.assertTrue(boton['request_contact'])
+
+    async def test_contacto_compartido_asocia_el_chat(self):
+        mensaje = await self._enviar(actualizacion_contacto(8, '59599123456'))
+        self.assertIn('Ford Ka (EST001)', mensaje['text'])
+        await self.cliente.arefresh_from_db()
+        self.assertEqual(self.cliente.telegram_chat_id, '8')
+
+    async def test_contacto_ajeno_se_rechaza(self):
+        mensaje = await self._enviar(actualizacion_contacto(8, '59599123456', user_id=77))
+        self.assertIn('propio contacto', mensaje['text'])
+        await self.cliente.arefresh_from_db()
+        self.assertEqual(self.cliente.telegram_chat_id, '5')
@@ -0,0 +1,131 @@
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import tiempos
+from gestion.models import Cliente, Empleado, Reparacion, ReparacionEvento, Servicio, Vehiculo
+from gestion.reservas import reservar_vehiculo_desde_bot
+
+User = get_user_model()
+
+
+class ReparacionEventoTests(TestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com',
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Ford', modelo='Ka', año=2015, placa='EVE001')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.reparacion = Reparacion.objects.create(
+            vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='en_progreso'
+        )
+
+    def _transiciones(self):
+        return list(self.reparacion.eventos.values_list('estado_anterior', 'estado_nuevo', 'origen'))
+
+    def test_save_registra_solo_los_cambios(self):
+        self.reparacion.condicion_vehiculo = 'malo'
+        self.reparacion.save()
+        self.reparacion.estado_reparacion = 'en_espera'
+        self.reparacion.save(update_fields=['condicion_vehiculo'])  # el estado no se guardó
+        self.reparacion.refresh_from_db()
+        self.reparacion.estado_reparacion = 'revision'
+        self.reparacion.save()
+        Reparacion.objects.defer('estado_reparacion').get(pk=self.reparacion.pk).save(update_fields=['notas'])
+
+        self.assertEqual(self._transiciones(), [('', 'en_progreso', 'sistema'), ('en_progreso', 'revision', 'sistema')])
+        with self.assertRaises(ValueError):
+            self.reparacion.eventos.first().save()
+
+    def test_vista_del_mecanico(self):
+        usuario = User.objects.create_user(username='mecanico', password='secret')
+        empleado = Empleado.objects.create(nombre='Mecánico', puesto='Mecánico', telefono='1',
+                                           correo_electronico='mecanico@example.com')
+        usuario.profile.es_mecanico = True
+        usuario.profile.empleado_relacionado = empleado
+        usuario.profile.save()
+        self.reparacion.mecanico_asignado = empleado
+        self.reparacion.save()
+        self.client.login(username='mecanico', password='secret')
+
+        self.client.post(reverse('gestionar_reparacion_mecanico', args=[self.reparacion.id]),
+                         {'estado_reparacion': 'en_espera'})
+
+        evento = self.reparacion.eventos.last()
+        self.assertEqual((evento.estado_anterior, evento.estado_nuevo, evento.origen, evento.usuario),
+                         ('en_progreso', 'en_espera', 'web', usuario))
+
+    def test_admin_list_editable_y_api(self):
+        admin = User.objects.create_superuser(username='admin', password='secret', email='admin@example.com')
+        self.client.login(username='admin', password='secret')
+        self.client.post(reverse('admin:gestion_reparacion_changelist'), {
+            'form-TOTAL_FORMS': '1', 'form-INITIAL_FORMS': '1',
+            'form-0-id': self.reparacion.id, 'form-0-estado_reparacion': 'revision',
+            'form-0-condicion_vehiculo': 'regular', '_save': 'Guardar',
+        })
+        self.client.patch(reverse('api-reparacion-detail', args=[self.reparacion.id]),
+                          {'estado_reparacion': 'completada'}, content_type='application/json')
+
+        self.assertEqual(self._transiciones()[1:], [('en_progreso', 'revision', 'admin'), ('revision', 'completada', 'api')])
+        self.assertEqual({evento.usuario for evento in self.reparacion.eventos.all()[1:]}, {admin})
+
+    def test_reserva_del_bot(self):
+        reparacion = reservar_vehiculo_desde_bot(self.vehiculo.id, self.servicio.id, date(2030, 1, 7), time(9, 0))
+        self.assertEqual(list(reparacion.eventos.values_list('estado_nuevo', 'origen')), [('pendiente', 'bot')])
+
+    def test_tiempo_por_estado_y_cuellos_de_botella(self):
+        ahora = timezone.now()
+        otra = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='pendiente')
+        ReparacionEvento.objects.all().delete()
+        ReparacionEvento.objects.bulk_create([
+            # Esperó 42 horas por repuestos y quedó en revisión hace 6 horas
+            ReparacionEvento(reparacion=self.reparacion, estado_nuevo='en_progreso', fecha=ahora - timedelta(days=3)),
+            ReparacionEvento(reparacion=self.reparacion, estado_nuevo='en_espera', fecha=ahora - timedelta(days=2)),
+            ReparacionEvento(reparacion=self.reparacion, estado_nuevo='revision', fecha=ahora - timedelta(hours=6)),
+            # Esperó 1 día por repuestos y se completó
+            ReparacionEvento(reparacion=otra, estado_nuevo='en_espera', fecha=ahora - timedelta(days=4)),
+            ReparacionEvento(reparacion=otra, estado_nuevo='completada', fecha=ahora - timedelta(days=3)),
+        ])
+
+        filas = {fila['estado']: fila for fila in tiempos.tiempo_por_estado()}
+        self.assertEqual(list(filas), ['en_progreso', 'en_espera', 'revision'])
+        espera = filas['en_espera']
+        self.assertEqual((espera['tramos'], espera['en_curso']), (2, 0))
+        self.assertAlmostEqual(espera['promedio'].total_seconds(), 33 * 3600, delta=60)  # (42 h + 24 h) / 2
+        self.assertAlmostEqual(espera['maximo'].total_seconds(), 42 * 3600, delta=60)
+        self.assertEqual(filas['revision']['en_curso'], 1)
+
+        recientes = tiempos.tiempo_por_estado(desde=ahora - timedelta(days=2, hours=1))
+        self.assertEqual([fila['estado'] for fila in recientes], ['en_espera', 'revision'])
+
+        [cuello] = tiempos.cuellos_de_botella()
+        self.assertEqual((cuello['reparacion'], cuello['estado']), (self.reparacion, 'revision'))
+        self.assertAlmostEqual(cuello['espera'].total_seconds(), 6 * 3600, delta=60)
+
+        respuesta = self.client.get(reverse('dashboard_reparaciones'))
+        self.assertEqual(respuesta.status_code, 302)  # requiere sesión
+        User.objects.create_user(username='jefe', password='secret')
+        self.client.login(username='jefe', password='secret')
+        self.assertContains(self.client.get(reverse('dashboard_reparaciones')), 'Cuellos de Botella')
+
+    def test_tiempos_sin_clientes_eliminados(self):
+        ahora = timezone.now()
+        cliente = Cliente.objects.create(nombre='Luis', apellido='Paz', telefono='1', direccion='Calle 2',
+                                         correo_electronico='luis@example.com')
+        vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Fiat', modelo='Uno', año=2010, placa='EVE002')
+        eliminada = Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio, estado_reparacion='en_espera')
+        ReparacionEvento.objects.all().delete()
+        ReparacionEvento.objects.bulk_create([
+            ReparacionEvento(reparacion=eliminada, estado_nuevo='en_espera', fecha=ahora - timedelta(days=9)),
+            ReparacionEvento(reparacion=self.reparacion, estado_nuevo='en_progreso', fecha=ahora - timedelta(days=1)),
+        ])
+        Cliente.todos.filter(pk=cliente.pk).update(eliminado=ahora)
+
+        # El límite se aplica después de descartar al cliente eliminado
+        [cuello] = tiempos.cuellos_de_botella(limite=1)
+        self.assertEqual(cuello['reparacion'], self.reparacion)
+        self.assertEqual([fila['estado'] for fila in tiempos.tiempo_por_estado()], ['en_progreso'])
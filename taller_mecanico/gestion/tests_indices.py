@@ -0,0 +1,153 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from gestion.bot.estado import ESTADOS_CERRADOS
+from gestion.models import (
+    Agenda, Cliente, Empleado, InspeccionVehiculo, NotaReparacion, Reparacion, Servicio, Tarea, Vehiculo,
+)
+from gestion.views import inicio_del_dia, rango_mes_actual
+
+# Índice del UniqueConstraint de Agenda según el motor
+AGENDA_HORARIO = ('agenda_horario_unico', 'sqlite_autoindex_gestion_agenda_1')
+
+
+class IndicesConsultasTests(TestCase):
+    """Las consultas frecuentes de los paneles, reportes y el bot usan un índice (EXPLAIN)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        if connection.vendor != 'postgresql':
+            return
+        # Con tablas vacías ya analizadas (autovacuum) todos los índices cuestan lo mismo y el plan
+        # depende del desempate: se carga un histórico típico (casi todo completado) y se analiza
+        cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='555', direccion='Calle 1', correo_electronico='ana@example.com'
+        )
+        vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        servicio = Servicio.objects.create(nombre_servicio='Aceite', costo=50, duracion=30)
+        mecanicos = Empleado.objects.bulk_create([
+            Empleado(nombre=f'Mecánico {i}', puesto='Mecánico', telefono=str(i), correo_electronico=f'm{i}@example.com')
+            for i in range(20)
+        ])
+        abiertas = {0: 'pendiente', 1: 'en_progreso', 2: 'en_espera', 3: 'cancelada'}
+        ahora = timezone.now()
+        Reparacion.objects.bulk_create([
+            Reparacion(
+                vehiculo=vehiculo, servicio=servicio, mecanico_asignado=mecanicos[i % 20],
+                estado_reparacion=abiertas.get(i % 100, 'completada'),
+                fecha_salida=None if i % 100 in abiertas else ahora,
+            )
+            for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE gestion_reparacion, gestion_vehiculo, gestion_cliente')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Con pocas filas PostgreSQL prefiere recorrerlas: se fuerza a elegir entre índices
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsaIndice(self, queryset, *indices):
+        plan = queryset.explain()
+        self.assertTrue(any(indice in plan for indice in indices), f'Ninguno de {indices} en:\n{plan}')
+
+    def test_paneles_por_estado(self):
+        self.assertUsaIndice(
+            Reparacion.objects.filter(estado_reparacion='en_progreso').order_by('-fecha_ingreso')[:5],
+            'reparacion_estado_ingreso_idx',
+        )
+        # Casi todo el histórico está completado: PostgreSQL puede recorrer el índice del mecánico
+        self.assertUsaIndice(
+            Reparacion.objects.filter(estado_reparacion='completada'),
+            'reparacion_estado_ingreso_idx', 'reparacion_mecanico_estado_idx',
+        )
+        self.assertUsaIndice(
+            Reparacion.objects.values('estado_reparacion').annotate(total=Count('id')).order_by(),
+            'reparacion_estado_ingreso_idx',
+        )
+        # Los dos índices cubren el filtro; PostgreSQL elige el del mecánico
+        self.assertUsaIndice(
+            Reparacion.objects.filter(estado_reparacion='pendiente', mecanico_asignado__isnull=True)
+            .order_by('fecha_ingreso')[:10],
+            'reparacion_estado_ingreso_idx', 'reparacion_mecanico_estado_idx',
+        )
+
+    def test_panel_del_mecanico(self):
+        inicio_mes, fin_mes = rango_mes_actual()
+        consultas = [
+            Reparacion.objects.filter(
+                mecanico_asignado=1, estado_reparacion__in=['en_progreso', 'pendiente', 'en_espera']
+            ).order_by('fecha_ingreso'),
+            Reparacion.objects.filter(
+                mecanico_asignado=1, estado_reparacion='completada',
+                fecha_salida__gte=inicio_mes, fecha_salida__lt=fin_mes,
+            ),
+            Reparacion.objects.filter(
+                mecanico_asignado=1, estado_reparacion='completada', fecha_salida__isnull=False
+            ).order_by('-fecha_salida')[:10],
+        ]
+        for consulta in consultas:
+            self.assertUsaIndice(consulta, 'reparacion_mecanico_estado_idx')
+        # Cargas de la asignación automática: el índice parcial del horario tiene las mismas filas
+        # (pendiente y en_progreso) y PostgreSQL a veces lo prefiere
+        self.assertUsaIndice(
+            Reparacion.objects.filter(
+                mecanico_asignado_id__in=[1, 2], estado_reparacion__in=['pendiente', 'en_progreso']
+            ).values('mecanico_asignado_id', 'fecha_programada').order_by(),
+            'reparacion_mecanico_estado_idx', 'reparacion_horario_unico',
+        )
+
+    def test_reportes_por_rango_de_ingreso(self):
+        self.assertUsaIndice(
+            Reparacion.objects.filter(
+                fecha_ingreso__gte=inicio_del_dia(date(2026, 1, 1)),
+                fecha_ingreso__lt=inicio_del_dia(date(2026, 2, 1)),
+            ),
+            'reparacion_ingreso_idx',
+        )
+        self.assertUsaIndice(Reparacion.objects.order_by('-fecha_ingreso')[:10], 'reparacion_ingreso_idx')
+
+    def test_horarios_ocupados(self):
+        self.assertUsaIndice(
+            Reparacion.objects.filter(
+                fecha_programada__range=(date(2026, 1, 1), date(2026, 1, 7)),
+                hora_programada__isnull=False,
+                estado_reparacion__in=Reparacion.ESTADOS_OCUPAN_HORARIO,
+            ),
+            'reparacion_horario_unico', 'reparacion_estado_ingreso_idx',
+        )
+        self.assertUsaIndice(Agenda.objects.filter(fecha=date(2026, 1, 1)).order_by('hora'), *AGENDA_HORARIO)
+        self.assertUsaIndice(
+            Agenda.objects.filter(fecha__gte=date(2026, 1, 1)).order_by('fecha', 'hora')[:10], *AGENDA_HORARIO
+        )
+
+    def test_tareas(self):
+        usuario = User.objects.create_user(username='mecanico')
+        self.assertUsaIndice(
+            Tarea.objects.filter(asignada_a=usuario, estado__in=['por_hacer', 'en_progreso']).order_by('fecha_limite'),
+            'tarea_asignada_estado_idx',
+        )
+        self.assertUsaIndice(
+            Tarea.objects.filter(asignada_a=usuario, estado='completada').order_by('-fecha_actualizacion')[:5],
+            'tarea_asignada_estado_idx',
+        )
+        self.assertUsaIndice(
+            Tarea.objects.filter(estado='por_hacer').order_by('-fecha_creacion')[:5], 'tarea_estado_creacion_idx'
+        )
+
+    def test_estado_en_el_bot(self):
+        self.assertUsaIndice(
+            Reparacion.objects.filter(vehiculo__cliente=1).exclude(estado_reparacion__in=ESTADOS_CERRADOS),
+            'gestion_reparacion_vehiculo_id',
+        )
+
+    def test_inspecciones(self):
+        self.assertUsaIndice(InspeccionVehiculo.objects.filter(reparacion=1)[:1], 'inspeccion_reparacion_idx')
+        self.assertUsaIndice(InspeccionVehiculo.objects.filter(vehiculo=1), 'inspeccion_vehiculo_idx')
+        self.assertUsaIndice(NotaReparacion.objects.filter(reparacion=1)[:10], 'notareparacion_reparacion_idx')
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from gestion.models import Cliente, Empleado, InspeccionVehiculo, Reparacion, Servicio, Vehiculo
+
+User = get_user_model()
+migracion = import_module('gestion.migrations.0020_inspeccion_vehiculo')
+
+
+class InspeccionVehiculoTests(TestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com',
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Ford', modelo='Ka', año=2015, placa='INS001')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.empleado = Empleado.objects.create(nombre='Mecánico', puesto='Mecánico', telefono='1',
+                                                correo_electronico='mecanico@example.com')
+        self.reparacion = Reparacion.objects.create(
+            vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='en_progreso',
+            mecanico_asignado=self.empleado,
+        )
+
+    def _entrar_como_mecanico(self):
+        usuario = User.objects.create_user(username='mecanico', password='secret')
+        usuario.profile.es_mecanico = True
+        usuario.profile.empleado_relacionado = self.empleado
+        usuario.profile.save()
+        self.client.login(username='mecanico', password='secret')
+        return reverse('gestionar_reparacion_mecanico', args=[self.reparacion.id])
+
+    def test_vista_guarda_y_muestra_la_ultima_inspeccion(self):
+        url = self._entrar_como_mecanico()
+        datos = {'estado_reparacion': 'en_progreso', 'kilometraje': '150.000',
+                 'nivel_combustible': '1/2', 'observaciones_vehiculo': 'Rayón en puerta'}
+        self.client.post(url, datos)
+        self.client.post(url, datos)  # sin cambios: no repite la inspección
+        self.client.post(url, {**datos, 'kilometraje': '150200', 'nivel_combustible': 'Otro'})
+
+        inspecciones = list(self.reparacion.inspecciones.all())
+        self.assertEqual([(i.kilometraje, i.nivel_combustible) for i in inspecciones], [(150200, ''), (150000, '1/2')])
+        self.assertEqual(inspecciones[0].vehiculo_id, self.vehiculo.id)
+        self.reparacion.refresh_from_db()
+        self.assertNotIn('Kilometraje', self.reparacion.notas or '')
+
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['kilometraje_actual'], 150200)
+        self.assertEqual(respuesta.context['observaciones_actual'], 'Rayón en puerta')
+
+    def test_migracion_extrae_las_notas(self):
+        self.reparacion.notas = (
+            "Kilometraje: 120.000 km\n"
+            "Nivel de combustible: 1/4\n"
+            "Observaciones del vehículo: Rayón en puerta\n"
+            "espejo roto\n"
+            "\n--- INFORME DE REPARACIÓN ---\nKilometraje revisado\n"
+            "\n\n--- Actualización 05/03/2026 14:30 ---\n"
+            "VIN actualizado: ABC123\n"
+            "Kilometraje: 120500 km"
+        )
+        self.reparacion.fecha_ingreso = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+        self.reparacion.save()
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio, notas='Solo un informe')
+
+        migracion.extraer_inspecciones(apps, None)
+
+        primera, segunda = InspeccionVehiculo.objects.order_by('fecha')
+        self.assertEqual((primera.kilometraje, primera.nivel_combustible), (120000, '1/4'))
+        self.assertEqual(primera.observaciones, 'Rayón en puerta\nespejo roto')
+        self.assertEqual(primera.fecha, self.reparacion.fecha_ingreso)
+        self.assertEqual((segunda.kilometraje, segunda.nivel_combustible, segunda.observaciones), (120500, '', ''))
+        self.assertEqual(segunda.fecha, datetime(2026, 3, 5, 14, 30, tzinfo=timezone.utc))
+        # Historial de kilometraje del vehículo
+        self.assertEqual(list(self.vehiculo.inspecciones.values_list('kilometraje', flat=True)), [120500, 120000])
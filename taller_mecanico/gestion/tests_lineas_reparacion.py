@@ -0,0 +1,172 @@
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import archivo, contadores
+from gestion.models import Cliente, LineaReparacion, Reparacion, ReparacionArchivada, Servicio, Vehiculo
+
+User = get_user_model()
+migracion = import_module('gestion.migrations.0026_lineas_reparacion')
+
+
+class LineasReparacionTests(TestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com',
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='LIN001')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.aceite = Servicio.objects.create(nombre_servicio='Aceite', costo=40, duracion=30)
+
+    def _total(self, reparacion):
+        return Reparacion.objects.values_list('total', flat=True).get(pk=reparacion.pk)
+
+    def _facturado(self):
+        return Cliente.objects.values_list('total_facturado', flat=True).get(pk=self.cliente.pk)
+
+    def test_linea_principal_y_repuestos(self):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio)
+        linea = reparacion.lineas.get()
+        self.assertEqual((linea.descripcion, linea.precio_unitario, linea.subtotal), ('Frenos', 100, 100))
+        self.assertEqual((self._total(reparacion), self._facturado()), (100, 0))
+
+        pastillas = LineaReparacion.objects.create(reparacion=reparacion, tipo='repuesto', descripcion='Pastillas',
+                                                   cantidad=2, precio_unitario=Decimal('35.50'))
+        self.assertEqual(self._total(reparacion), Decimal('171.00'))
+
+        reparacion.estado_reparacion = 'completada'
+        reparacion.save()
+        self.assertEqual(self._facturado(), Decimal('171.00'))
+
+        pastillas.cantidad = 1
+        pastillas.save()
+        self.assertEqual((self._total(reparacion), self._facturado()), (Decimal('135.50'), Decimal('135.50')))
+        pastillas.delete()
+        self.assertEqual((self._total(reparacion), self._facturado()), (100, 100))
+
+        # Cambiar el servicio cambia la línea principal al precio del nuevo
+        reparacion.servicio = self.aceite
+        reparacion.save(update_fields=['servicio'])
+        self.assertEqual(list(reparacion.lineas.values_list('descripcion', 'subtotal')), [('Aceite', 40)])
+        self.assertEqual((self._total(reparacion), self._facturado()), (40, 40))
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_cambiar_el_precio_no_reescribe_la_historia(self):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio,
+                                               estado_reparacion='completada')
+        self.servicio.costo = 150
+        self.servicio.save()
+
+        self.assertEqual(self._total(reparacion), 100)
+        self.assertEqual(archivo.ingresos_totales(), 100)
+        # Guardar la reparación leída antes no pisa el total
+        reparacion.notas = 'Entregado'
+        reparacion.save()
+        self.assertEqual(self._total(reparacion), 100)
+        self.assertEqual(self._facturado(), 100)
+
+    def test_ingresos_sin_unir_con_servicio(self):
+        Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio)
+        vieja = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.aceite, estado_reparacion='completada')
+        LineaReparacion.objects.create(reparacion=vieja, tipo='repuesto', descripcion='Filtro', precio_unitario=15)
+        hace_dos_años = timezone.now() - timedelta(days=730)
+        Reparacion.objects.filter(pk=vieja.pk).update(fecha_ingreso=hace_dos_años, fecha_salida=hace_dos_años)
+        archivo.archivar()
+
+        archivada = ReparacionArchivada.objects.get()
+        self.assertEqual(archivada.costo, 55)
+        self.assertEqual([linea['descripcion'] for linea in archivada.historial['lineas']], ['Aceite', 'Filtro'])
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(sum(mes['total'] for mes in archivo.ingresos_por_mes()), 155)
+        self.assertFalse(any('gestion_servicio' in consulta['sql'] for consulta in consultas))
+
+    def test_editar_con_lineas(self):
+        User.objects.create_user(username='jefe', password='secret')
+        self.client.login(username='jefe', password='secret')
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio)
+        linea = reparacion.lineas.get()
+        datos = {
+            'vehiculo': self.vehiculo.pk, 'servicio': self.servicio.pk, 'condicion_vehiculo': 'regular',
+            'estado_reparacion': 'en_progreso',
+            'lineas-TOTAL_FORMS': 2, 'lineas-INITIAL_FORMS': 1, 'lineas-MIN_NUM_FORMS': 0, 'lineas-MAX_NUM_FORMS': 1000,
+            'lineas-0-id': linea.pk, 'lineas-0-reparacion': reparacion.pk, 'lineas-0-tipo': 'servicio',
+            'lineas-0-servicio': self.servicio.pk, 'lineas-0-descripcion': 'Frenos', 'lineas-0-cantidad': 1,
+            'lineas-0-precio_unitario': 90,
+            'lineas-1-reparacion': reparacion.pk, 'lineas-1-tipo': 'repuesto', 'lineas-1-descripcion': 'Liquido',
+            'lineas-1-cantidad': 1, 'lineas-1-precio_unitario': '',
+        }
+        self.assertContains(self.client.get(reverse('editar_reparacion', args=[reparacion.pk])), 'Servicios y repuestos')
+
+        # Un repuesto sin precio no vale
+        respuesta = self.client.post(reverse('editar_reparacion', args=[reparacion.pk]), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self._total(reparacion), 100)
+
+        datos['lineas-1-precio_unitario'] = 12
+        respuesta = self.client.post(reverse('editar_reparacion', args=[reparacion.pk]), datos)
+        self.assertRedirects(respuesta, reverse('dashboard_reparaciones'))
+        self.assertEqual(self._total(reparacion), 102)
+
+    def test_cambiar_el_servicio_y_editar_la_linea_principal(self):
+        User.objects.create_user(username='jefe', password='secret')
+        self.client.login(username='jefe', password='secret')
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio,
+                                               estado_reparacion='completada')
+        linea = reparacion.lineas.get()
+        datos = {
+            'vehiculo': self.vehiculo.pk, 'servicio': self.aceite.pk, 'condicion_vehiculo': 'regular',
+            'estado_reparacion': 'completada',
+            'lineas-TOTAL_FORMS': 1, 'lineas-INITIAL_FORMS': 1, 'lineas-MIN_NUM_FORMS': 0, 'lineas-MAX_NUM_FORMS': 1000,
+            'lineas-0-id': linea.pk, 'lineas-0-reparacion': reparacion.pk, 'lineas-0-tipo': 'servicio',
+            'lineas-0-servicio': self.servicio.pk, 'lineas-0-descripcion': 'Frenos', 'lineas-0-cantidad': 1,
+            'lineas-0-precio_unitario': -5,
+        }
+        respuesta = self.client.post(reverse('editar_reparacion', args=[reparacion.pk]), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self._total(reparacion), 100)
+
+        # El signal cambia la línea al servicio nuevo y después el formset la guarda con lo editado
+        datos['lineas-0-precio_unitario'] = 90
+        respuesta = self.client.post(reverse('editar_reparacion', args=[reparacion.pk]), datos)
+        self.assertRedirects(respuesta, reverse('dashboard_reparaciones'))
+        self.assertEqual(list(reparacion.lineas.values_list('subtotal', flat=True)), [90])
+        self.assertEqual((self._total(reparacion), self._facturado()), (90, 90))
+        self.assertEqual(contadores.verificar_totales(), [])
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_comando_repara_el_total(self):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio,
+                                               estado_reparacion='completada')
+        LineaReparacion.objects.create(reparacion=reparacion, tipo='repuesto', descripcion='Filtro', precio_unitario=15)
+        Reparacion.objects.filter(pk=reparacion.pk).update(total=0)
+
+        salida = StringIO()
+        call_command('verificar_contadores_clientes', stdout=salida)
+        self.assertIn(f'Reparación {reparacion.pk}: total: 0.00 -> 115', salida.getvalue())
+        self.assertEqual(self._total(reparacion), 0)
+
+        call_command('verificar_contadores_clientes', '--reparar', stdout=salida)
+        self.assertEqual((self._total(reparacion), self._facturado()), (115, 115))
+        self.assertEqual(contadores.verificar_totales(), [])
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_migracion_crea_una_linea_por_reparacion(self):
+        reparacion = Reparacion.objects.create(vehiculo=self.vehiculo, servicio=self.servicio)
+        LineaReparacion.objects.all().delete()
+        Reparacion.objects.update(total=0)
+
+        migracion.crear_lineas(apps, None)
+
+        self.assertEqual(list(reparacion.lineas.values_list('servicio', 'precio_unitario')), [(self.servicio.pk, 100)])
+        self.assertEqual(self._total(reparacion), 100)
@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from telegram import Update
+
+from gestion.bot.api_local import ServidorBotAPI, actualizacion_mensaje
+from gestion.bot.carga import SimulacionCarga
+from gestion.bot.metricas import Histograma, instrumentar, metricas
+from gestion.management.commands.run_telegram_bot import build_application
+from gestion.models import Servicio
+
+User = get_user_model()
+
+
+class MetricasBotTests(TestCase):
+    def setUp(self):
+        metricas.reiniciar()
+        self.addCleanup(metricas.reiniciar)
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url,
+            TELEGRAM_BOT_PERSISTENCIA=False, TELEGRAM_BOT_METRICAS_ARCHIVO='',
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+
+    async def test_embudo_y_validaciones(self):
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        for texto in ['/start', '123', '099123456']:  # el segundo teléfono es inválido
+            await aplicacion.process_update(Update.de_json(actualizacion_mensaje(3, texto), aplicacion.bot))
+        await aplicacion.shutdown()
+
+        datos = metricas.instantanea()
+        self.assertEqual(datos['manejadores']['start_command']['latencia']['cuenta'], 1)
+        self.assertEqual(datos['manejadores']['get_phone']['latencia']['cuenta'], 2)
+        self.assertEqual(datos['embudo'], {'telefono': 1, 'nombre': 1})
+        self.assertEqual(datos['transiciones'], {'inicio -> telefono': 1, 'telefono -> nombre': 1})
+
+    async def test_conversacion_completa_mide_base_de_datos(self):
+        aplicacion = build_application()
+        await aplicacion.initialize()
+        await SimulacionCarga(aplicacion, self.servidor).ejecutar(2)
+        await aplicacion.shutdown()
+
+        datos = metricas.instantanea()
+        self.assertEqual(datos['contadores'], {'reservas_creadas': 2})
+        self.assertEqual(datos['embudo']['fin'], 2)
+        self.assertEqual(datos['manejadores']['get_phone']['consultas_promedio'], 0)
+        # El catálogo de servicios se carga una sola vez para los dos usuarios
+        self.assertEqual(datos['manejadores']['get_vehicle_plate']['consultas_promedio'], 0.5)
+        self.assertGreaterEqual(datos['manejadores']['confirm_appointment']['consultas_promedio'], 3)
+        self.assertGreater(datos['manejadores']['confirm_appointment']['bd_ms_total'], 0)
+
+    async def test_errores_por_manejador(self):
+        async def roto(update, context):
+            raise RuntimeError('falla')
+
+        manejador = SimpleNamespace(callback=roto)
+        instrumentar(manejador, 'telefono', {})
+        with self.assertRaises(RuntimeError):
+            await manejador.callback(None, None)
+        datos = metricas.instantanea()
+        self.assertEqual(datos['manejadores']['roto']['errores'], 1)
+        self.assertEqual(datos['embudo'], {})
+
+    def test_histograma(self):
+        histograma = Histograma()
+        for valor in [1, 2, 3, 40, 40, 40, 40, 40, 40, 900]:
+            histograma.observar(valor)
+        resumen = histograma.como_dict()
+        self.assertEqual(resumen['cuenta'], 10)
+        self.assertEqual(resumen['cubetas_ms']['5'], 3)
+        self.assertEqual(resumen['p50_ms'], 50)
+        self.assertEqual(resumen['p95_ms'], 1000)
+
+
+class MetricasVistaTests(TestCase):
+    def setUp(self):
+        metricas.reiniciar()
+        self.addCleanup(metricas.reiniciar)
+        self.url = reverse('telegram_metricas')
+
+    def test_requiere_jefe_o_encargado(self):
+        User.objects.create_user(username='mecanico', password='secret')
+        self.client.login(username='mecanico', password='secret')
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_lee_el_archivo_del_bot_en_polling(self):
+        User.objects.create_superuser(username='admin', password='secret')
+        self.client.login(username='admin', password='secret')
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'metricas.json')
+            with override_settings(TELEGRAM_BOT_METRICAS_ARCHIVO=archivo):
+                metricas.contar('reservas_creadas', 4)
+                metricas.guardar()
+                metricas.reiniciar()  # la vista corre en otro proceso
+                resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.content)['contadores'], {'reservas_creadas': 4})
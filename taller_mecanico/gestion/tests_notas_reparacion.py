@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from gestion.forms import ReparacionForm
+from gestion.models import Cliente, Empleado, NotaReparacion, Reparacion, Servicio, Vehiculo
+from gestion.views import NOTAS_POR_PAGINA
+
+User = get_user_model()
+migracion = import_module('gestion.migrations.0021_notas_reparacion')
+
+
+class NotaReparacionTests(TestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='099123456', direccion='Calle 1',
+            correo_electronico='ana@example.com',
+        )
+        self.vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Ford', modelo='Ka', año=2015, placa='NOT001')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.empleado = Empleado.objects.create(nombre='Mecánico', puesto='Mecánico', telefono='1',
+                                                correo_electronico='mecanico@example.com')
+        self.reparacion = Reparacion.objects.create(
+            vehiculo=self.vehiculo, servicio=self.servicio, estado_reparacion='en_progreso',
+            mecanico_asignado=self.empleado,
+        )
+        self.usuario = User.objects.create_user(username='mecanico', password='secret')
+        self.usuario.profile.es_mecanico = True
+        self.usuario.profile.empleado_relacionado = self.empleado
+        self.usuario.profile.save()
+        self.client.login(username='mecanico', password='secret')
+
+    def test_actualizacion_del_mecanico_agrega_notas(self):
+        url = reverse('gestionar_reparacion_mecanico', args=[self.reparacion.id])
+        self.client.post(url, {'estado_reparacion': 'en_progreso', 'vin_vehiculo': 'abc123', 'informe': 'Pastillas'})
+        self.client.post(url, {'estado_reparacion': 'en_progreso', 'informe': 'Discos'})
+
+        notas = list(self.reparacion.historial_notas.all())
+        self.assertEqual([(n.tipo, n.texto) for n in notas],
+                         [('informe', 'Discos'), ('informe', 'Pastillas'), ('vin', 'VIN actualizado: ABC123')])
+        self.assertTrue(all(n.autor_id == self.usuario.id for n in notas))
+        self.reparacion.refresh_from_db()
+        self.assertIsNone(self.reparacion.notas)
+
+    def test_historial_paginado(self):
+        NotaReparacion.objects.bulk_create([
+            NotaReparacion(reparacion=self.reparacion, texto=f'Nota {i}') for i in range(NOTAS_POR_PAGINA + 3)
+        ])
+        url = reverse('gestionar_reparacion_mecanico', args=[self.reparacion.id])
+        pagina = self.client.get(url, {'pagina_notas': 2}).context['notas_pagina']
+        self.assertEqual((pagina.number, len(pagina.object_list), pagina.paginator.num_pages), (2, 3, 2))
+
+    def test_notas_no_se_modifican(self):
+        nota = NotaReparacion.objects.create(reparacion=self.reparacion, texto='Original')
+        nota.texto = 'Cambiada'
+        with self.assertRaises(ValueError):
+            nota.save()
+
+    def test_formulario_agrega_nota(self):
+        datos = {'vehiculo': self.vehiculo.id, 'servicio': self.servicio.id, 'condicion_vehiculo': 'regular',
+                 'estado_reparacion': 'en_progreso', 'notas': 'Cliente espera en el taller'}
+        formulario = ReparacionForm(datos, instance=self.reparacion)
+        self.assertTrue(formulario.is_valid(), formulario.errors)
+        formulario.save()
+        formulario.guardar_nota(self.usuario)
+
+        nota = self.reparacion.historial_notas.get()
+        self.assertEqual((nota.tipo, nota.texto, nota.autor), ('observacion', 'Cliente espera en el taller', self.usuario))
+        self.reparacion.refresh_from_db()
+        self.assertIsNone(self.reparacion.notas)
+
+    def test_listados_no_cargan_las_notas_antiguas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('dashboard_mecanico'))
+        selects = [c['sql'] for c in consultas if c['sql'].startswith('SELECT') and 'gestion_reparacion' in c['sql']]
+        self.assertTrue(selects)
+        self.assertFalse([sql for sql in selects if '"gestion_reparacion"."notas"' in sql])
+
+    def test_migracion_copia_las_notas_antiguas(self):
+        self.reparacion.fecha_ingreso = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+        self.reparacion.notas = (
+            "Kilometraje: 120000 km\n"
+            "\n--- INFORME DE REPARACIÓN ---\nCambio de pastillas"
+            "\n\n--- Actualización 05/03/2026 14:30 ---\n"
+            "VIN actualizado: ABC123"
+        )
+        self.reparacion.save()
+
+        migracion.copiar_notas(apps, None)
+
+        primera, segunda = NotaReparacion.objects.order_by('creada')
+        self.assertEqual((primera.tipo, primera.creada), ('informe', self.reparacion.fecha_ingreso))
+        self.assertIn('Cambio de pastillas', primera.texto)
+        self.assertEqual((segunda.tipo, segunda.texto), ('observacion', 'VIN actualizado: ABC123'))
+        self.assertEqual(segunda.creada, datetime(2026, 3, 5, 14, 30, tzinfo=timezone.utc))
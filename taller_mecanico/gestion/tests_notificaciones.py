@@ -0,0 +1,146 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion.bot.api_local import ServidorBotAPI
+from gestion.models import Cliente, Empleado, Notificacion, Reparacion, Servicio, Vehiculo
+from gestion.notificaciones import (
+    ESPERA_BASE, MAX_INTENTOS, Despachador, despachar_notificaciones, encolar_aviso_estado,
+    reclamar_avisos,
+)
+
+User = get_user_model()
+
+
+class BandejaDeSalidaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.con_chat = self._reparacion('ana@example.com', chat_id='5', placa='NOT001')
+        self.con_correo = self._reparacion('luis@example.com', placa='NOT002')
+
+    def _reparacion(self, correo, chat_id='', placa='NOT000'):
+        cliente = Cliente.objects.create(
+            nombre='Cliente', apellido='Prueba', telefono='099123456', direccion='Calle 1',
+            correo_electronico=correo, telegram_chat_id=chat_id,
+        )
+        vehiculo = Vehiculo.objects.create(cliente=cliente, marca='Ford', modelo='Ka', año=2015, placa=placa)
+        return Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio, estado_reparacion='en_progreso')
+
+    def _completar(self, reparacion):
+        reparacion.estado_reparacion = 'completada'
+        reparacion.save()
+        return encolar_aviso_estado(reparacion)
+
+    async def _acompletar(self, reparacion):
+        return await sync_to_async(self._completar)(reparacion)
+
+    def test_vista_encola_sin_enviar(self):
+        usuario = User.objects.create_user(username='mecanico', password='secret')
+        empleado = Empleado.objects.create(nombre='Mecánico', puesto='Mecánico', telefono='1',
+                                           correo_electronico='mecanico@example.com')
+        usuario.profile.es_mecanico = True
+        usuario.profile.empleado_relacionado = empleado
+        usuario.profile.save()
+        self.con_chat.mecanico_asignado = empleado
+        self.con_chat.save()
+        self.client.login(username='mecanico', password='secret')
+
+        url = reverse('gestionar_reparacion_mecanico', args=[self.con_chat.id])
+        self.client.post(url, {'estado_reparacion': 'completada'})
+        self.client.post(url, {'estado_reparacion': 'completada'})
+
+        notificacion = Notificacion.objects.get()
+        self.assertEqual(notificacion.clave, f'reparacion-{self.con_chat.id}-completada')
+        self.assertEqual((notificacion.canal, notificacion.destino), ('telegram', '5'))
+        self.assertEqual(self.servidor.mensajes(), [])
+
+    def test_sin_canal_o_estado_no_avisado(self):
+        self.con_correo.vehiculo.cliente.correo_electronico = 'tmp_1@bot.local'
+        self.con_correo.vehiculo.cliente.save()
+        self.assertIsNone(self._completar(self.con_correo))
+        self.con_chat.estado_reparacion = 'en_espera'
+        self.assertIsNone(encolar_aviso_estado(self.con_chat))
+        self.assertFalse(Notificacion.objects.exists())
+
+    async def test_despacha_por_telegram_y_correo(self):
+        await self._acompletar(self.con_chat)
+        await self._acompletar(self.con_correo)
+
+        resumen = await despachar_notificaciones()
+
+        self.assertEqual(resumen, {'avisos': 2, 'enviadas': 2, 'fallidas': 0})
+        [mensaje] = self.servidor.mensajes(5)
+        self.assertIn('Ford Ka (NOT001)', mensaje['text'])
+        self.assertEqual(mail.outbox[0].to, ['luis@example.com'])
+        self.assertEqual(await Notificacion.objects.filter(estado='enviada').acount(), 2)
+        # Ya enviadas: la siguiente vuelta no repite nada
+        self.assertEqual((await despachar_notificaciones())['avisos'], 0)
+
+    async def test_reintento_con_espera_y_bloqueo_definitivo(self):
+        await self._acompletar(self.con_chat)
+        await self._acompletar(self.con_correo)
+        self.servidor.bloquear(5)
+
+        with mock.patch('gestion.notificaciones.EmailMessage.send', side_effect=OSError('SMTP caído')):
+            resumen = await despachar_notificaciones()
+
+        self.assertEqual(resumen['fallidas'], 2)
+        bloqueada = await Notificacion.objects.aget(canal='telegram')
+        self.assertEqual(bloqueada.estado, 'fallida')
+        correo = await Notificacion.objects.aget(canal='email')
+        self.assertEqual((correo.estado, correo.intentos), ('pendiente', 1))
+        self.assertGreater(correo.proximo_intento, timezone.now() + timedelta(seconds=ESPERA_BASE - 5))
+        # Todavía no toca reintentar
+        self.assertEqual((await Despachador().despachar_lote())['avisos'], 0)
+
+    def test_agota_los_intentos(self):
+        notificacion = self._completar(self.con_correo)
+        with mock.patch('gestion.notificaciones.EmailMessage.send', side_effect=OSError('SMTP caído')):
+            for _ in range(MAX_INTENTOS):
+                Notificacion.objects.update(proximo_intento=timezone.now())
+                async_to_sync(Despachador().despachar_lote)()
+        notificacion.refresh_from_db()
+        self.assertEqual((notificacion.estado, notificacion.intentos), ('fallida', MAX_INTENTOS))
+
+    async def test_dos_despachadores_a_la_vez(self):
+        await self._acompletar(self.con_chat)
+        await self._acompletar(self.con_correo)
+
+        resumenes = await asyncio.gather(despachar_notificaciones(), despachar_notificaciones(tamaño_lote=1))
+
+        self.assertEqual(sum(resumen['enviadas'] for resumen in resumenes), 2)
+        self.assertEqual(len(self.servidor.mensajes(5)), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_no_envia_avisos_reclamados_por_otro_despacho(self):
+        self._completar(self.con_chat)
+        [reclamada] = reclamar_avisos(10)  # otro proceso, todavía enviando
+        self.assertEqual(reclamada.estado, 'enviando')
+
+        self.assertEqual(async_to_sync(despachar_notificaciones)()['avisos'], 0)
+        # Reclamo abandonado: vencido su plazo se vuelve a tomar
+        Notificacion.objects.update(proximo_intento=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(async_to_sync(despachar_notificaciones)()['enviadas'], 1)
+        self.assertEqual(len(self.servidor.mensajes(5)), 1)
+
+    def test_lote_sin_correos_no_abre_smtp(self):
+        self._completar(self.con_chat)
+        with mock.patch('gestion.notificaciones.get_connection') as conexion:
+            resumen = async_to_sync(Despachador().despachar_lote)()
+        self.assertEqual(resumen['enviadas'], 1)
+        conexion.assert_not_called()
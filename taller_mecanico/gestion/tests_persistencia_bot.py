@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from telegram import Update
+
+from gestion.bot.api_local import ServidorBotAPI, actualizacion_mensaje
+from gestion.bot.persistencia import PersistenciaDjango, limpiar_estados_vencidos
+from gestion.management.commands.run_telegram_bot import build_application
+from gestion.models import EstadoBot
+
+
+class PersistenciaBotTests(TestCase):
+    def setUp(self):
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    async def _iniciar(self):
+        aplicacion = build_application(persistencia=PersistenciaDjango(update_interval=60))
+        await aplicacion.initialize()
+        return aplicacion
+
+    async def _procesar(self, aplicacion, chat_id, texto):
+        await aplicacion.process_update(Update.de_json(actualizacion_mensaje(chat_id, texto), aplicacion.bot))
+
+    def _ultimo_mensaje(self, chat_id):
+        return self.servidor.mensajes(chat_id)[-1]['text']
+
+    async def test_conversacion_sobrevive_al_reinicio(self):
+        aplicacion = await self._iniciar()
+        await self._procesar(aplicacion, 5, '/start')
+        await self._procesar(aplicacion, 5, '099123456')
+        await aplicacion.shutdown()  # guarda el estado pendiente
+
+        aplicacion = await self._iniciar()
+        await self._procesar(aplicacion, 5, 'Ana Gomez')
+        await aplicacion.shutdown()
+        self.assertIn('Nombre guardado: Ana Gomez', self._ultimo_mensaje(5))
+        datos = await sync_to_async(EstadoBot.objects.get)(tipo='usuario', clave='5')
+        self.assertEqual(datos.datos['phone'], '099123456')
+
+    async def test_dos_procesos_comparten_el_estado(self):
+        primero = await self._iniciar()
+        segundo = await self._iniciar()
+        await self._procesar(primero, 7, '/start')
+        await primero.update_persistence()
+        await primero.persistence.flush()
+
+        await self._procesar(segundo, 7, '099123456')
+        self.assertIn('Teléfono guardado', self._ultimo_mensaje(7))
+        await segundo.update_persistence()
+        await segundo.persistence.flush()
+
+        await self._procesar(primero, 7, 'Luis Diaz')
+        self.assertIn('Nombre guardado', self._ultimo_mensaje(7))
+        await primero.shutdown()
+        await segundo.shutdown()
+
+    async def test_escritura_propia_atrasada_no_pisa_la_memoria(self):
+        aplicacion = await self._iniciar()
+        await self._procesar(aplicacion, 11, '/start')
+        await self._procesar(aplicacion, 11, '099123456')
+        # Foto tomada antes del último paso que se guarda cuando el chat ya avanzó
+        await aplicacion.persistence.update_conversation('reserva', (11,), 0)
+        await aplicacion.persistence.flush()
+
+        await self._procesar(aplicacion, 11, 'Ana Gomez')
+        await aplicacion.shutdown()
+        self.assertIn('Nombre guardado: Ana Gomez', self._ultimo_mensaje(11))
+
+    async def test_escrituras_agrupadas(self):
+        aplicacion = await self._iniciar()
+        for chat_id in range(20, 30):
+            await self._procesar(aplicacion, chat_id, '/start')
+        self.assertEqual(await sync_to_async(EstadoBot.objects.count)(), 0)
+        await aplicacion.shutdown()
+        self.assertEqual(await sync_to_async(EstadoBot.objects.filter(tipo='conversacion').count)(), 10)
+
+    def test_limpieza_de_conversaciones_abandonadas(self):
+        viejo = timezone.now() - timedelta(hours=48)
+        EstadoBot.objects.create(tipo='conversacion', nombre='reserva', clave='[1]', datos=1, actualizado=viejo)
+        EstadoBot.objects.create(tipo='usuario', clave='1', datos={'phone': '1'}, actualizado=viejo)
+        EstadoBot.objects.create(tipo='conversacion', nombre='reserva', clave='[2]', datos=1)
+        self.assertEqual(limpiar_estados_vencidos(), 2)
+        self.assertEqual(list(EstadoBot.objects.values_list('clave', flat=True)), ['[2]'])
+
+    async def test_conversacion_vencida_no_se_retoma(self):
+        await sync_to_async(EstadoBot.objects.create)(
+            tipo='conversacion', nombre='reserva', clave='[9]', datos=1,
+            actualizado=timezone.now() - timedelta(hours=48)
+        )
+        aplicacion = await self._iniciar()
+        await self._procesar(aplicacion, 9, 'Ana Gomez')
+        await aplicacion.shutdown()
+        self.assertEqual(self.servidor.mensajes(9), [])
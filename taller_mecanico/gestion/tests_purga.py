@@ -0,0 +1,158 @@
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import archivo
+from gestion.forms import ClienteForm, VehiculoForm
+from gestion.models import (
+    Agenda, Cliente, EliminacionCliente, HorarioReservado, NotaReparacion, Reparacion, ReparacionArchivada,
+    Servicio, Tarea, TareaHistorial, Vehiculo,
+)
+from gestion.purga import DURACION_RECLAMO, MENSAJE_PLACA_EN_PURGA, purgar_pendientes
+from gestion.reservas import reservar_cita
+
+User = get_user_model()
+
+
+class PurgaClientesTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='jefe', password='secret')
+        self.client.login(username='jefe', password='secret')
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.cliente = self._cliente('flota@example.com')
+        self.otro = self._cliente('otro@example.com')
+        Vehiculo.objects.create(cliente=self.otro, marca='Fiat', modelo='Uno', año=2010, placa='OTR001')
+
+    def _cliente(self, correo):
+        return Cliente.objects.create(nombre='Flota', apellido='SA', telefono='099123456', direccion='Calle 1',
+                                      correo_electronico=correo)
+
+    def _flota(self):
+        """3 vehículos con 2 reparaciones cada uno (una archivada), tareas y una cita."""
+        hace_dos_años = timezone.now() - timedelta(days=730)
+        for i in range(3):
+            vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa=f'FLO00{i}')
+            vieja = Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio, estado_reparacion='completada')
+            Reparacion.objects.filter(pk=vieja.pk).update(fecha_ingreso=hace_dos_años, fecha_salida=hace_dos_años)
+            reparacion = Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio)
+            NotaReparacion.objects.create(reparacion=reparacion, texto='Ruido')
+            tarea = Tarea.objects.create(titulo='Revisar', reparacion=reparacion, creada_por=self.usuario)
+            TareaHistorial.objects.create(tarea=tarea, usuario=self.usuario, accion='creada', descripcion='Nueva')
+        archivo.archivar()
+        Agenda.objects.create(cliente=self.cliente, servicio=self.servicio, fecha=date(2030, 1, 7), hora=time(9, 0))
+
+    def test_eliminar_oculta_sin_borrar(self):
+        self._flota()
+        respuesta = self.client.post(reverse('clientes-eliminar', args=[self.cliente.pk]))
+
+        self.assertRedirects(respuesta, reverse('clientes-lista'))
+        self.assertFalse(Cliente.objects.filter(pk=self.cliente.pk).exists())
+        self.assertIsNotNone(Cliente.todos.get(pk=self.cliente.pk).eliminado)
+        # Sus vehículos, reparaciones y citas también se ocultan; las abiertas se cancelan y la cita futura se borra
+        self.assertFalse(Vehiculo.objects.filter(cliente_id=self.cliente.pk).exists())
+        self.assertFalse(Reparacion.objects.filter(vehiculo__cliente_id=self.cliente.pk).exists())
+        self.assertEqual(set(Reparacion.todos.filter(vehiculo__cliente_id=self.cliente.pk)
+                             .values_list('estado_reparacion', flat=True)), {'cancelada'})
+        self.assertFalse(Agenda.todos.exists())
+        eliminacion = EliminacionCliente.objects.get()
+        self.assertEqual((eliminacion.estado, eliminacion.solicitada_por, eliminacion.nombre),
+                         ('pendiente', self.usuario, 'Flota SA'))
+        self.assertNotContains(self.client.get(reverse('clientes-lista')), 'flota@example.com')
+
+        # El correo queda libre para un cliente nuevo
+        formulario = ClienteForm({'nombre': 'Flota', 'apellido': 'SA', 'telefono': '1', 'direccion': 'Calle 2',
+                                  'correo_electronico': 'flota@example.com'})
+        self.assertTrue(formulario.is_valid(), formulario.errors)
+        formulario = ClienteForm({'nombre': 'Otro', 'apellido': 'SA', 'telefono': '1', 'direccion': 'Calle 2',
+                                  'correo_electronico': 'otro@example.com'})
+        self.assertFalse(formulario.is_valid())
+
+    def test_api_destroy(self):
+        respuesta = self.client.delete(reverse('cliente-detail', args=[self.cliente.pk]))
+        self.assertEqual(respuesta.status_code, 204)
+        self.assertTrue(Cliente.todos.filter(pk=self.cliente.pk).exists())
+        self.assertEqual(self.client.get(reverse('cliente-detail', args=[self.cliente.pk])).status_code, 404)
+
+        datos = {'nombre': 'Flota', 'apellido': 'SA', 'telefono': '1', 'direccion': 'Calle 2'}
+        respuesta = self.client.post(reverse('clientes-list-create'), {**datos, 'correo_electronico': 'flota@example.com'})
+        self.assertEqual(respuesta.status_code, 201)
+        respuesta = self.client.post(reverse('clientes-list-create'), {**datos, 'correo_electronico': 'otro@example.com'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_purga_por_lotes_con_avance(self):
+        self._flota()
+        self.client.post(reverse('clientes-eliminar', args=[self.cliente.pk]))
+        eliminacion = EliminacionCliente.objects.get()
+
+        avances = []
+        resumen = purgar_pendientes(tamaño_lote=2, progreso=lambda e: avances.append((e.procesados, e.total)))
+
+        self.assertEqual(resumen, {'completadas': 1, 'fallidas': 0})
+        # 3 reparaciones + 3 archivadas + 3 vehículos + el cliente, de a 2 (la cita futura se borró al eliminar)
+        self.assertEqual(avances, [(2, 10), (3, 10), (5, 10), (6, 10), (8, 10), (9, 10), (10, 10)])
+        eliminacion.refresh_from_db()
+        self.assertEqual((eliminacion.estado, eliminacion.progreso, eliminacion.cliente), ('completada', 100, None))
+        self.assertFalse(Cliente.todos.filter(pk=self.cliente.pk).exists())
+        self.assertFalse(Tarea.objects.exists())
+        self.assertFalse(TareaHistorial.objects.exists())
+        self.assertFalse(ReparacionArchivada.objects.exists())
+        self.assertEqual(list(Vehiculo.objects.values_list('placa', flat=True)), ['OTR001'])
+        self.assertEqual(Cliente.objects.get(pk=self.otro.pk).num_vehiculos, 1)
+
+    def test_reanuda_una_purga_fallida(self):
+        self._flota()
+        self.client.post(reverse('clientes-eliminar', args=[self.cliente.pk]))
+        Reparacion.todos.filter(vehiculo__cliente=self.cliente).delete()  # lo que borró la pasada anterior
+        EliminacionCliente.objects.update(estado='fallida', procesados=3, error='Se cortó la conexión')
+
+        salida = StringIO()
+        call_command('purgar_clientes', stdout=salida)
+
+        self.assertIn('Clientes purgados: 1 (0 con error)', salida.getvalue())
+        eliminacion = EliminacionCliente.objects.get()
+        self.assertEqual((eliminacion.estado, eliminacion.procesados, eliminacion.total, eliminacion.error),
+                         ('completada', 10, 10, ''))
+
+    def test_eliminar_libera_turnos_y_oculta_la_placa(self):
+        vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='FLO009')
+        Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio,
+                                  fecha_programada=date(2030, 1, 7), hora_programada=time(10, 0))
+        Agenda.objects.create(cliente=self.cliente, servicio=self.servicio, fecha=date(2030, 1, 7), hora=time(9, 0))
+        self.client.post(reverse('clientes-eliminar', args=[self.cliente.pk]))
+
+        self.assertFalse(HorarioReservado.objects.exists())
+        reservar_cita(self.otro, self.servicio, date(2030, 1, 7), time(9, 0))
+        reservar_cita(self.otro, self.servicio, date(2030, 1, 7), time(10, 0))
+
+        datos = {'cliente': self.otro.pk, 'marca': 'Ford', 'modelo': 'Ka', 'año': 2015, 'placa': 'FLO009'}
+        self.assertEqual(VehiculoForm(datos).errors['placa'], [MENSAJE_PLACA_EN_PURGA])
+        self.assertEqual(self.client.post(reverse('api-vehiculos-list-create'), datos).status_code, 400)
+
+    def test_no_toma_una_eliminacion_de_otro_proceso(self):
+        self.client.post(reverse('clientes-eliminar', args=[self.cliente.pk]))
+        self.client.post(reverse('clientes-eliminar', args=[self.otro.pk]))
+        # Otro proceso avanza la primera; la segunda la dejó colgada hace rato
+        EliminacionCliente.objects.filter(cliente=self.cliente).update(estado='en_curso', actualizada=timezone.now())
+        EliminacionCliente.objects.filter(cliente=self.otro).update(
+            estado='en_curso', actualizada=timezone.now() - DURACION_RECLAMO - timedelta(minutes=1),
+        )
+
+        self.assertEqual(purgar_pendientes(), {'completadas': 1, 'fallidas': 0})
+        self.assertTrue(Cliente.todos.filter(pk=self.cliente.pk).exists())
+        self.assertFalse(Cliente.todos.filter(pk=self.otro.pk).exists())
+
+    def test_relaciones_inversas_de_reparacion(self):
+        vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='FLO009')
+        reparacion = Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio)
+        Reparacion.objects.create(vehiculo=Vehiculo.objects.get(placa='OTR001'), servicio=self.servicio)
+        self.assertEqual(list(vehiculo.reparaciones.all()), [reparacion])
+        self.assertEqual(self.servicio.reparacion_set.count(), 2)
+
+        self.client.post(reverse('clientes-eliminar', args=[self.cliente.pk]))
+        self.assertEqual(self.servicio.reparacion_set.count(), 1)
+        self.assertFalse(self.cliente.vehiculos.exists())
@@ -0,0 +1,112 @@
+import time as reloj
+from datetime import time, timedelta
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from gestion.bot.api_local import ServidorBotAPI
+from gestion.models import Agenda, Cliente, Recordatorio, Reparacion, Servicio, Vehiculo
+from gestion.recordatorios import TokenBucket, despachar_recordatorios, recordatorios_pendientes
+
+
+class RecordatoriosTests(TestCase):
+    def setUp(self):
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        self.ajustes = override_settings(TELEGRAM_BOT_TOKEN='123:ABC', TELEGRAM_BOT_API_URL=self.servidor.base_url)
+        self.ajustes.enable()
+        self.addCleanup(self.ajustes.disable)
+
+        self.maniana = timezone.localdate() + timedelta(days=1)
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.ana = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='555', direccion='Calle 1',
+            correo_electronico='ana@example.com', telegram_chat_id='101'
+        )
+        self.luis = Cliente.objects.create(
+            nombre='Luis', apellido='Diaz', telefono='777', direccion='Calle 2',
+            correo_electronico='luis@example.com', telegram_chat_id='202'
+        )
+        sin_telegram = Cliente.objects.create(
+            nombre='Eva', apellido='Paz', telefono='999', direccion='Calle 3', correo_electronico='eva@example.com'
+        )
+        vehiculo = Vehiculo.objects.create(cliente=self.ana, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        Agenda.objects.create(cliente=self.ana, servicio=self.servicio, fecha=self.maniana, hora=time(10, 0))
+        Reparacion.objects.create(vehiculo=vehiculo, servicio=self.servicio,
+                                  fecha_programada=self.maniana, hora_programada=time(8, 0))
+        Agenda.objects.create(cliente=self.luis, servicio=self.servicio, fecha=self.maniana, hora=time(11, 0))
+        Agenda.objects.create(cliente=sin_telegram, servicio=self.servicio, fecha=self.maniana, hora=time(12, 0))
+        # Otro día: no se recuerda
+        Agenda.objects.create(cliente=self.luis, servicio=self.servicio,
+                              fecha=self.maniana + timedelta(days=1), hora=time(11, 0))
+
+    def _despachar(self, **opciones):
+        return async_to_sync(despachar_recordatorios)(self.maniana, **opciones)
+
+    def test_pendientes_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            pendientes = recordatorios_pendientes(self.maniana)
+        self.assertEqual(sorted(p['chat_id'] for p in pendientes), ['101', '101', '202'])
+
+    def test_un_mensaje_por_chat(self):
+        resumen = self._despachar()
+        self.assertEqual(resumen, {'chats': 2, 'eventos': 3, 'enviados': 2, 'fallidos': 0})
+        [mensaje] = self.servidor.mensajes(101)
+        self.assertIn('08:00 Reparación: Frenos - Ford Ka (AAA111)', mensaje['text'])
+        self.assertLess(mensaje['text'].index('08:00'), mensaje['text'].index('10:00'))
+        self.assertEqual(Recordatorio.objects.filter(estado='enviado').count(), 3)
+
+    def test_no_repite_recordatorios_enviados(self):
+        self._despachar()
+        resumen = self._despachar()
+        self.assertEqual(resumen['eventos'], 0)
+        self.assertEqual(len(self.servidor.mensajes()), 2)
+
+    def test_chat_bloqueado_se_registra_y_reintenta(self):
+        self.servidor.bloquear(202)
+        resumen = self._despachar()
+        self.assertEqual(resumen['fallidos'], 1)
+        fallido = Recordatorio.objects.get(chat_id='202')
+        self.assertEqual((fallido.estado, fallido.intentos), ('fallido', 1))
+        self.assertIn('Bloqueado', fallido.error)
+
+        self.servidor.bloqueados.clear()
+        self.assertEqual(self._despachar()['enviados'], 1)
+        fallido.refresh_from_db()
+        self.assertEqual((fallido.estado, fallido.intentos), ('enviado', 2))
+
+    def test_no_envia_eventos_reclamados_por_otro_proceso(self):
+        cita_luis = Agenda.objects.get(cliente=self.luis, fecha=self.maniana)
+        reclamo = Recordatorio.objects.create(tipo='cita', objeto_id=cita_luis.pk, fecha_evento=self.maniana,
+                                              chat_id='202', estado='enviando', intentos=0)
+        resumen = self._despachar()
+        self.assertEqual((resumen['chats'], resumen['eventos']), (1, 2))
+        self.assertEqual(self.servidor.mensajes(202), [])
+
+        # Un reclamo abandonado se vuelve a tomar
+        Recordatorio.objects.filter(pk=reclamo.pk).update(fecha_envio=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self._despachar()['enviados'], 1)
+        reclamo.refresh_from_db()
+        self.assertEqual((reclamo.estado, reclamo.intentos), ('enviado', 1))
+
+    def test_respeta_retry_after(self):
+        self.servidor.limitar(101, veces=1, retry_after=1)
+        inicio = reloj.monotonic()
+        resumen = self._despachar()
+        self.assertGreaterEqual(reloj.monotonic() - inicio, 1)
+        self.assertEqual(resumen['enviados'], 2)
+        self.assertEqual(len(self.servidor.mensajes(101)), 1)
+
+
+class TokenBucketTests(TestCase):
+    def test_limita_la_tasa(self):
+        async def consumir():
+            bucket = TokenBucket(tasa=20, capacidad=5)
+            inicio = reloj.monotonic()
+            for _ in range(15):
+                await bucket.adquirir()
+            return reloj.monotonic() - inicio
+
+        # 5 inmediatas + 10 a 20 por segundo = ~0.5 s
+        self.assertGreaterEqual(async_to_sync(consumir)(), 0.45)
@@ -0,0 +1,211 @@
+import threading
+from datetime import time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from gestion.bot.frecuentes import cliente_frecuente_por_chat
+from gestion.forms import CitaForm
+from gestion.models import Agenda, Cliente, HorarioReservado, Reparacion, Servicio, Vehiculo
+from gestion.reservas import (
+    HorarioNoDisponible, _con_reintentos, reservar_cita, reservar_desde_bot, reservar_reparacion,
+)
+
+
+class ReservaCitaTests(TestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nombre='Ana', apellido='Gomez', telefono='555', direccion='Calle 1', correo_electronico='ana@example.com'
+        )
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.fecha = timezone.now().date() + timedelta(days=1)
+
+    def test_reservar_cita_horario_ocupado(self):
+        reservar_cita(self.cliente, self.servicio, self.fecha, time(10, 0))
+        with self.assertRaises(HorarioNoDisponible):
+            reservar_cita(self.cliente, self.servicio, self.fecha, time(10, 0))
+        self.assertEqual(Agenda.objects.filter(fecha=self.fecha).count(), 1)
+
+    def test_formulario_rechaza_horario_ocupado(self):
+        Agenda.objects.create(cliente=self.cliente, servicio=self.servicio, fecha=self.fecha, hora=time(10, 0))
+        form = CitaForm(data={
+            'cliente': self.cliente.id,
+            'servicio': self.servicio.id,
+            'fecha': self.fecha.strftime('%Y-%m-%d'),
+            'hora': '10:00',
+        })
+        self.assertFalse(form.is_valid())
+
+    def test_reparacion_cancelada_libera_horario(self):
+        vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        campos = dict(vehiculo=vehiculo, servicio=self.servicio, fecha_programada=self.fecha, hora_programada=time(9, 0))
+        primera = reservar_reparacion(**campos)
+        with self.assertRaises(HorarioNoDisponible):
+            reservar_reparacion(**campos)
+        primera.estado_reparacion = 'cancelada'
+        primera.save()
+        reservar_reparacion(**campos)
+        self.assertEqual(Reparacion.objects.filter(fecha_programada=self.fecha).count(), 2)
+
+    def test_cita_y_reparacion_comparten_el_turno(self):
+        vehiculo = Vehiculo.objects.create(cliente=self.cliente, marca='Ford', modelo='Ka', año=2015, placa='AAA111')
+        cita = reservar_cita(self.cliente, self.servicio, self.fecha, time(9, 0))
+        with self.assertRaises(HorarioNoDisponible):
+            reservar_reparacion(vehiculo=vehiculo, servicio=self.servicio,
+                                fecha_programada=self.fecha, hora_programada=time(9, 0))
+
+        reparacion = reservar_reparacion(vehiculo=vehiculo, servicio=self.servicio,
+                                         fecha_programada=self.fecha, hora_programada=time(10, 0))
+        with self.assertRaises(HorarioNoDisponible):
+            reservar_cita(self.cliente, self.servicio, self.fecha, time(10, 0), cita=cita)
+        form = CitaForm(data={'cliente': self.cliente.id, 'servicio': self.servicio.id,
+                              'fecha': self.fecha.strftime('%Y-%m-%d'), 'hora': '10:00'})
+        self.assertIn('hora', form.errors)
+
+        # Al cancelarse la reparación el turno queda libre para una cita
+        reparacion.estado_reparacion = 'cancelada'
+        reparacion.save()
+        reservar_cita(self.cliente, self.servicio, self.fecha, time(10, 0), cita=cita)
+        self.assertEqual(list(HorarioReservado.objects.values_list('hora', 'cita', 'reparacion')),
+                         [(time(10, 0), cita.pk, None)])
+
+    def test_otros_errores_de_integridad_se_propagan(self):
+        def correo_repetido():
+            Cliente.objects.create(nombre='Otra', apellido='Ana', telefono='1', direccion='Calle',
+                                   correo_electronico='ana@example.com')
+
+        with self.assertRaises(IntegrityError) as error:
+            _con_reintentos(correo_repetido, 'ocupado', self.fecha, time(9, 0))
+        self.assertNotIsInstance(error.exception, HorarioNoDisponible)
+
+
+class ReservaBotTests(TestCase):
+    def setUp(self):
+        self.servicio = Servicio.objects.create(nombre_servicio='Frenos', costo=100, duracion=60)
+        self.fecha = timezone.now().date() + timedelta(days=1)
+
+    def _reservar(self, **cambios):
+        datos = dict(
+            nombre_completo='Ana Gomez', telefono='099123456', chat_id='42', marca='Ford',
+            modelo='Ka', año=2015, placa='BOT001', servicio_id=self.servicio.id,
+            fecha=self.fecha, hora=time(9, 0),
+        )
+        datos.update(cambios)
+        return reservar_desde_bot(**datos)
+
+    def test_crea_cliente_vehiculo_y_reparacion(self):
+        reparacion = self._reservar()
+        cliente = reparacion.vehiculo.cliente
+        self.assertEqual((cliente.nombre, cliente.apellido, cliente.telegram_chat_id), ('Ana', 'Gomez', '42'))
+        self.assertEqual(reparacion.vehiculo.placa, 'BOT001')
+        self.assertEqual(reparacion.estado_reparacion, 'pendiente')
+        self.assertEqual(reparacion.hora_programada, time(9, 0))
+
+    def test_reutiliza_el_cliente_del_chat(self):
+        self._reservar()
+        self._reservar(nombre_completo='Otro Nombre', hora=time(10, 0))
+        self.assertEqual(Cliente.objects.count(), 1)
+        self.assertEqual(Vehiculo.objects.count(), 1)
+        self.assertEqual(Cliente.objects.get().nombre, 'Ana')
+        self.assertEqual(Reparacion.objects.count(), 2)
+
+    def test_telefono_escrito_no_toma_un_cliente_ajeno(self):
+        ana = self._reservar().vehiculo.cliente
+        intruso = self._reservar(nombre_completo='Intruso X', chat_id='99', placa='BOT009', hora=time(10, 0))
+
+        ana.refresh_from_db()
+        self.assertEqual((ana.nombre, ana.telegram_chat_id), ('Ana', '42'))
+        self.assertNotEqual(intruso.vehiculo.cliente_id, ana.id)
+        vehiculos = cliente_frecuente_por_chat('99')['vehiculos']
+        self.assertEqual([v['placa'] for v in vehiculos], ['BOT009'])
+
+    def test_horario_ocupado_no_deja_registros_huerfanos(self):
+        self._reservar()
+        with self.assertRaises(HorarioNoDisponible):
+            self._reservar(telefono='099999999', chat_id='43', placa='BOT002')
+        self.assertFalse(Cliente.objects.filter(telefono='099999999').exists())
+        self.assertFalse(Vehiculo.objects.filter(placa='BOT002').exists())
+
+    def test_placa_de_otro_cliente(self):
+        self._reservar()
+        with self.assertRaises(ValidationError):
+            self._reservar(telefono='099999999', chat_id='43', hora=time(11, 0))
+        self.assertEqual(Reparacion.objects.count(), 1)
+        self.assertFalse(Cliente.objects.filter(telefono='099999999').exists())
+
+
+class ReservaConcurrenteTests(TransactionTestCase):
+    """Muchas reservas simultáneas sobre el mismo horario: solo una debe ganar."""
+
+    HILOS = 12
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nombre='Luis', apellido='Diaz', telefono='777', direccion='Calle 2', correo_electronico='luis@example.com'
+        )
+        self.servicio = Servicio.objects.create(nombre_servicio='Aceite', costo=50, duracion=30)
+        self.vehiculos = [
+            Vehiculo.objects.create(cliente=self.cliente, marca='Fiat', modelo='Uno', año=2010, placa=f'CON{i:03d}')
+            for i in range(self.HILOS)
+        ]
+        self.fecha = timezone.now().date() + timedelta(days=2)
+
+    def _disparar(self, reservar):
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+        bloqueo = threading.Lock()
+
+        def trabajador(indice):
+            try:
+                barrera.wait()
+                reservar(indice)
+                resultado = 'ok'
+            except HorarioNoDisponible:
+                resultado = 'ocupado'
+            except Exception as e:  # pragma: no cover - se reporta en la aserción
+                resultado = repr(e)
+            finally:
+                connection.close()
+            with bloqueo:
+                resultados.append(resultado)
+
+        hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def test_citas_simultaneas_mismo_horario(self):
+        resultados = self._disparar(
+            lambda i: reservar_cita(self.cliente, self.servicio, self.fecha, time(11, 0))
+        )
+        self.assertEqual(resultados.count('ok'), 1, resultados)
+        self.assertEqual(resultados.count('ocupado'), self.HILOS - 1, resultados)
+        self.assertEqual(Agenda.objects.filter(fecha=self.fecha, hora=time(11, 0)).count(), 1)
+
+    def test_reparaciones_simultaneas_mismo_horario(self):
+        resultados = self._disparar(
+            lambda i: reservar_reparacion(
+                vehiculo=self.vehiculos[i], servicio=self.servicio,
+                fecha_programada=self.fecha, hora_programada=time(12, 0)
+            )
+        )
+        self.assertEqual(resultados.count('ok'), 1, resultados)
+        self.assertEqual(resultados.count('ocupado'), self.HILOS - 1, resultados)
+        self.assertEqual(Reparacion.objects.filter(fecha_programada=self.fecha).count(), 1)
+
+    def test_citas_y_reparaciones_simultaneas_mismo_horario(self):
+        def reservar(i):
+            if i % 2:
+                return reservar_cita(self.cliente, self.servicio, self.fecha, time(13, 0))
+            return reservar_reparacion(vehiculo=self.vehiculos[i], servicio=self.servicio,
+                                       fecha_programada=self.fecha, hora_programada=time(13, 0))
+
+        resultados = self._disparar(reservar)
+        self.assertEqual(resultados.count('ok'), 1, resultados)
+        self.assertEqual(resultados.count('ocupado'), self.HILOS - 1, resultados)
+        self.assertEqual(Agenda.objects.filter(fecha=self.fecha).count()
+                         + Reparacion.objects.filter(fecha_programada=self.fecha).count(), 1)
@@ -0,0 +1,75 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gestion.bot import webhook
+from gestion.bot.api_local import ServidorBotAPI, actualizacion_mensaje
+
+SECRETO = 'secreto-de-prueba'
+
+
+class TelegramWebhookTests(TestCase):
+    def setUp(self):
+        self.servidor = ServidorBotAPI().iniciar()
+        self.addCleanup(self.servidor.detener)
+        ajustes = override_settings(
+            TELEGRAM_BOT_TOKEN='123:ABC',
+            TELEGRAM_BOT_API_URL=self.servidor.base_url,
+            TELEGRAM_BOT_WEBHOOK_SECRET=SECRETO,
+            TELEGRAM_BOT_WEBHOOK_URL='https://taller.example.com/telegram/webhook/',
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.url = reverse('telegram_webhook')
+
+    async def _enviar(self, actualizacion, secreto=SECRETO):
+        return await self.async_client.post(
+            self.url, data=json.dumps(actualizacion), content_type='application/json',
+            headers={webhook.CABECERA_SECRETO: secreto} if secreto else {},
+        )
+
+    async def test_rechaza_secreto_invalido(self):
+        resp = await self._enviar(actualizacion_mensaje(1, '/help'), secreto='otro')
+        self.assertEqual(resp.status_code, 403)
+        resp = await self._enviar(actualizacion_mensaje(1, '/help'), secreto=None)
+        self.assertEqual(resp.status_code, 403)
+
+    async def test_solo_post(self):
+        resp = await self.async_client.get(self.url)
+        self.assertEqual(resp.status_code, 405)
+
+    async def test_actualizacion_se_procesa(self):
+        try:
+            resp = await self._enviar(actualizacion_mensaje(42, '/start'))
+            self.assertEqual(resp.status_code, 200)
+            await webhook.esperar_procesamiento()
+        finally:
+            await webhook.detener_aplicacion()
+        [mensaje] = self.servidor.mensajes(42)
+        self.assertIn('Bienvenido al Taller', mensaje['text'])
+
+    async def test_cuerpo_invalido(self):
+        resp = await self.async_client.post(
+            self.url, data='no es json', content_type='application/json',
+            headers={webhook.CABECERA_SECRETO: SECRETO},
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    @override_settings(TELEGRAM_BOT_WEBHOOK_COLA=1)
+    async def test_cola_llena_pide_reintento(self):
+        try:
+            aplicacion = await webhook.obtener_aplicacion()
+            await aplicacion.stop()  # nadie consume la cola
+            self.assertEqual((await self._enviar(actualizacion_mensaje(7, '/help'))).status_code, 200)
+            self.assertEqual((await self._enviar(actualizacion_mensaje(7, '/help'))).status_code, 503)
+        finally:
+            aplicacion.update_queue.get_nowait()
+            await aplicacion.shutdown()
+            webhook._estado['aplicacion'] = None
+
+    async def test_registrar_webhook(self):
+        await webhook.registrar_webhook()
+        [llamada] = self.servidor.llamadas('setWebhook')
+        self.assertEqual(llamada['url'], 'https://taller.example.com/telegram/webhook/')
+        self.assertEqual(llamada['secret_token'], SECRETO)
@@ -0,0 +1,150 @@
+"""
+Tiempo en cada estado de las reparaciones
+
+Se calcula en SQL sobre ReparacionEvento con funciones de ventana:
+
+- tiempo_por_estado(): incluye las reparaciones archivadas (UNION ALL con
+  ReparacionEventoArchivado; los eventos de una reparación están todos en
+  una de las dos tablas). Cada evento abre un tramo que termina con el evento
+  siguiente de la misma reparación (LEAD ... OVER (PARTITION BY
+  reparacion_id ORDER BY fecha)); los tramos abiertos terminan ahora. Se
+  agrupa por estado: cantidad, promedio y máximo.
+- cuellos_de_botella(): último evento de cada reparación abierta
+  (ROW_NUMBER() ... = 1), ordenado por cuánto lleva en ese estado.
+
+Los estados cerrados (completada, cancelada) no se miden: su último tramo
+no termina nunca. Las dos consultas dejan afuera a los clientes eliminados
+que esperan la purga (_sin_cliente_eliminado), antes de agrupar o limitar.
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import (
+    Cliente, Reparacion, ReparacionEvento, ReparacionEventoArchivado, Vehiculo,
+)
+
+ESTADOS_CERRADOS = ('completada', 'cancelada')
+
+
+def _segundos(inicio, fin):
+    """Expresión SQL con los segundos entre dos columnas de fecha y hora."""
+    if connection.vendor == 'postgresql':
+        return f'EXTRACT(EPOCH FROM ({fin} - {inicio}))'
+    if connection.vendor == 'mysql':
+        return f'TIMESTAMPDIFF(MICROSECOND, {inicio}, {fin}) / 1000000'
+    return f'((julianday({fin}) - julianday({inicio})) * 86400)'
+
+
+def _fecha(valor):
+    return connection.ops.adapt_datetimefield_value(valor)
+
+
+def _sin_cliente_eliminado(modelo_evento):
+    """Condición SQL: el evento no es de una reparación de un cliente eliminado."""
+    reparacion = modelo_evento._meta.get_field('reparacion').related_model._meta.db_table
+    return f"""NOT EXISTS (
+                SELECT 1 FROM {reparacion} r
+                JOIN {Vehiculo._meta.db_table} v ON v.id = r.vehiculo_id
+                JOIN {Cliente._meta.db_table} c ON c.id = v.cliente_id
+                WHERE r.id = {modelo_evento._meta.db_table}.reparacion_id AND c.eliminado IS NOT NULL
+            )"""
+
+
+def tiempo_por_estado(desde=None, hasta=None):
+    """
+    Tiempo que pasan las reparaciones (vivas y archivadas) en cada estado abierto.
+
+    Args:
+        desde, hasta: solo los tramos que empezaron en [desde, hasta)
+
+    Returns:
+        lista de dicts {estado, etiqueta, tramos, en_curso, promedio, maximo}
+        en el orden de Reparacion.ESTADO_REPARACION (promedio y máximo como
+        timedelta)
+    """
+    ahora = timezone.now()
+    condiciones, parametros = [], [_fecha(ahora)]
+    if desde is not None:
+        condiciones.append('inicio >= %s')
+        parametros.append(_fecha(desde))
+    if hasta is not None:
+        condiciones.append('inicio < %s')
+        parametros.append(_fecha(hasta))
+    filtro = ''.join(f' AND {condicion}' for condicion in condiciones)
+    segundos = _segundos('inicio', 'fin')
+    sql = f"""
+        WITH eventos AS (
+            SELECT reparacion_id, id, estado_nuevo, fecha FROM {ReparacionEvento._meta.db_table}
+            WHERE {_sin_cliente_eliminado(ReparacionEvento)}
+            UNION ALL
+            SELECT reparacion_id, id, estado_nuevo, fecha FROM {ReparacionEventoArchivado._meta.db_table}
+            WHERE {_sin_cliente_eliminado(ReparacionEventoArchivado)}
+        ),
+        tramos AS (
+            SELECT estado_nuevo AS estado, fecha AS inicio,
+                   COALESCE(LEAD(fecha) OVER ventana, %s) AS fin,
+                   CASE WHEN LEAD(fecha) OVER ventana IS NULL THEN 1 ELSE 0 END AS en_curso
+            FROM eventos
+            WINDOW ventana AS (PARTITION BY reparacion_id ORDER BY fecha, id)
+        )
+        SELECT estado, COUNT(*), SUM(en_curso), AVG({segundos}), MAX({segundos})
+        FROM tramos
+        WHERE estado NOT IN ({', '.join(['%s'] * len(ESTADOS_CERRADOS))}){filtro}
+        GROUP BY estado
+    """
+    parametros[1:1] = ESTADOS_CERRADOS
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        filas = {fila[0]: fila[1:] for fila in cursor.fetchall()}
+
+    resultado = []
+    for estado, etiqueta in Reparacion.ESTADO_REPARACION:
+        if estado in filas:
+            tramos, en_curso, promedio, maximo = filas[estado]
+            resultado.append({
+                'estado': estado,
+                'etiqueta': etiqueta,
+                'tramos': tramos,
+                'en_curso': int(en_curso or 0),
+                'promedio': timedelta(seconds=round(float(promedio))),
+                'maximo': timedelta(seconds=round(float(maximo))),
+            })
+    return resultado
+
+
+def cuellos_de_botella(limite=10):
+    """
+    Reparaciones abiertas que más tiempo llevan en su estado actual.
+
+    Returns:
+        lista de dicts {reparacion, estado, espera} (espera como timedelta)
+    """
+    segundos = _segundos('fecha', '%s')
+    sql = f"""
+        WITH ultimos AS (
+            SELECT reparacion_id, estado_nuevo AS estado, fecha,
+                   ROW_NUMBER() OVER (PARTITION BY reparacion_id ORDER BY fecha DESC, id DESC) AS orden
+            FROM {ReparacionEvento._meta.db_table}
+            WHERE {_sin_cliente_eliminado(ReparacionEvento)}
+        )
+        SELECT reparacion_id, estado, {segundos}
+        FROM ultimos
+        WHERE orden = 1 AND estado NOT IN ({', '.join(['%s'] * len(ESTADOS_CERRADOS))})
+        ORDER BY fecha
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_fecha(timezone.now()), *ESTADOS_CERRADOS, limite])
+        filas = cursor.fetchall()
+
+    reparaciones = Reparacion.objects.select_related('vehiculo', 'servicio').defer('notas').in_bulk(
+        [reparacion_id for reparacion_id, _, _ in filas]
+    )
+    return [
+        {'reparacion': reparaciones[reparacion_id], 'estado': estado, 'espera': timedelta(seconds=round(float(espera)))}
+        for reparacion_id, estado, espera in filas
+        if reparacion_id in reparaciones
+    ]
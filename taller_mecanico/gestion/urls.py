@@ -132,6 +132,14 @@ urlpatterns = [
     path('citas/editar/<int:pk>/', views.editar_cita, name='editar_cita'),
     path('citas/eliminar/<int:pk>/', views.eliminar_cita, name='eliminar_cita'),
 
+    # Feeds iCalendar protegidos por token (agenda, mecánico, cliente)
+    path('calendario/<str:token>.ics', views.calendario_ics, name='calendario_ics'),
+    path('clientes/<int:pk>/calendario/', views.calendario_cliente, name='calendario_cliente'),
+
+    # Webhook del bot de Telegram (modo webhook, requiere servidor ASGI)
+    path('telegram/webhook/', views.telegram_webhook, name='telegram_webhook'),
+    path('telegram/metricas/', views.telegram_metricas, name='telegram_metricas'),
+
     # ========== GESTIÓN DE INVENTARIO ==========
     # Comentado temporalmente hasta que se implementen las vistas de inventario
     # path('inventario/', views.inventario_lista, name='inventario-lista'),
@@ -174,7 +182,8 @@ urlpatterns = [
     # path('citas/<int:pk>/eliminar/', views.eliminar_cita, name='eliminar_cita'),
 
     # API para horas disponibles de agenda
-    # path('api/agenda/horas-disponibles/<str:fecha>/', views.obtener_horas_disponibles, name='obtener_horas_disponibles'),
+    path('api/agenda/horas-disponibles/<str:fecha>/', views.obtener_horas_disponibles, name='obtener_horas_disponibles'),
+    path('api/agenda/disponibilidad/<int:año>/<int:mes>/', views.disponibilidad_mensual, name='disponibilidad_mensual'),
 
     # ========== INCLUSIÓN DE ROUTERS ==========
     # Incluye automáticamente las URLs generadas por el router para ViewSets
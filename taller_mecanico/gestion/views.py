@@ -8,11 +8,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.db import transaction
 from django.db.models import Q, Sum, F, Count, Case, When, Value, IntegerField
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import MAXYEAR, MINYEAR, timedelta, datetime
 from django.db.models.functions import TruncDay, TruncMonth, TruncYear
 from django.http import JsonResponse, HttpResponse, HttpResponseRedirect, Http404
 from django.template.loader import render_to_string
-from django.views.decorators.http import require_http_methods, require_POST
+from django.core.paginator import Paginator
+from django.views.decorators.http import require_http_methods, require_POST, condition
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
 import json
 from io import BytesIO
 import csv
@@ -24,12 +27,18 @@ from rest_framework.authentication import SessionAuthentication
 from django.contrib.auth import get_user_model, authenticate, login, logout
 from .models import (
     Cliente, Vehiculo, Servicio, Empleado, Reparacion, Tarea, 
-    TareaHistorial, Agenda  # Solo importar modelos definidos
+    TareaHistorial, Agenda, InspeccionVehiculo, NotaReparacion, LineaReparacion  # Solo importar modelos definidos
 )
 from .forms import (
     ClienteForm, VehiculoForm, ServicioForm, EmpleadoForm, 
-    ReparacionForm, TareaForm, CitaForm
+    ReparacionForm, LineaReparacionForm, TareaForm, CitaForm
 )
+from .reservas import HorarioNoDisponible, guardar_formulario_cita
+from .notificaciones import encolar_aviso_estado
+from .purga import eliminar_cliente
+from . import archivo, calendario, catalogo, disponibilidad, tiempos
+from .bot import webhook as telegram_bot_webhook
+from .bot.metricas import leer_metricas
 from .serializers import (
     ClienteSerializer, VehiculoSerializer, ServicioSerializer, 
     EmpleadoSerializer, ReparacionSerializer, AgendaSerializer, RegistroSerializer
@@ -88,6 +97,32 @@ def es_mecanico(user):
             
     return False
 
+
+def rango_mes_actual():
+    """
+    (inicio, fin) del mes actual en la zona horaria local.
+
+    Filtrar por rango (campo__gte/__lt) en lugar de __month/__year permite
+    usar los índices sobre la columna de fecha.
+    """
+    inicio = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    fin = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio, timezone.make_aware(fin.replace(tzinfo=None))
+
+
+NOTAS_POR_PAGINA = 10
+
+
+def pagina_notas(request, reparacion):
+    """Página del historial de notas de la reparación (parámetro ?pagina_notas=)."""
+    notas = reparacion.historial_notas.select_related('autor')
+    return Paginator(notas, NOTAS_POR_PAGINA).get_page(request.GET.get('pagina_notas'))
+
+
+def inicio_del_dia(fecha):
+    """Comienzo de `fecha` en la zona horaria local (reemplaza a campo__date en los filtros)."""
+    return timezone.make_aware(datetime.combine(fecha, datetime.min.time()))
+
 # ========== AUTENTICACIÓN Y DASHBOARD BÁSICOS ==========
 
 def login_view(request):
@@ -136,7 +171,15 @@ def logout_view(request):
 
 @login_required
 def perfil_view(request):
-    return render(request, 'auth/perfil.html', {'user': request.user})
+    # Enlaces de suscripción a calendarios según el rol del usuario
+    feeds_calendario = []
+    if es_jefe_o_encargado(request.user) or es_jefe(request.user) or es_encargado(request.user):
+        feeds_calendario.append(('Agenda completa del taller', calendario.url_feed('agenda')))
+    empleado = getattr(getattr(request.user, 'profile', None), 'empleado_relacionado', None)
+    if empleado and es_mecanico(request.user):
+        feeds_calendario.append(('Mis reparaciones asignadas', calendario.url_feed('mecanico', empleado.id)))
+    feeds_calendario = [(nombre, request.build_absolute_uri(url)) for nombre, url in feeds_calendario]
+    return render(request, 'auth/perfil.html', {'user': request.user, 'feeds_calendario': feeds_calendario})
 
 
 @login_required
@@ -306,7 +349,7 @@ def inicio(request):
     # Si no es ni jefe, ni encargado, ni mecánico, mostrar dashboard básico
     total_clientes = Cliente.objects.count()
     total_empleados = Empleado.objects.count()
-    total_servicios = Servicio.objects.count()
+    total_servicios = len(catalogo.servicios())
     total_vehiculos = Vehiculo.objects.count()
     reparaciones_pendientes = Reparacion.objects.filter(estado_reparacion='en_progreso').count()
     # citas_hoy = 0  # Comentado temporalmente hasta que se implemente el modelo Agenda
@@ -358,9 +401,13 @@ def agregar_cita(request):
     if request.method == 'POST':
         form = CitaForm(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Cita creada exitosamente.')
-            return redirect('lista_citas')
+            try:
+                guardar_formulario_cita(form)
+            except HorarioNoDisponible as e:
+                messages.error(request, e.message)
+            else:
+                messages.success(request, 'Cita creada exitosamente.')
+                return redirect('lista_citas')
     else:
         form = CitaForm()
     
@@ -405,9 +452,13 @@ def editar_cita(request, pk):
     if request.method == 'POST':
         form = CitaForm(request.POST, instance=cita)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Cita actualizada exitosamente.')
-            return redirect('detalle_cita', pk=pk)
+            try:
+                guardar_formulario_cita(form)
+            except HorarioNoDisponible as e:
+                messages.error(request, e.message)
+            else:
+                messages.success(request, 'Cita actualizada exitosamente.')
+                return redirect('detalle_cita', pk=pk)
     else:
         form = CitaForm(instance=cita)
     
@@ -442,6 +493,127 @@ def eliminar_cita(request, pk):
     return render(request, 'gestion/citas/eliminar_cita.html', context)
 
 
+# ========== DISPONIBILIDAD DE HORARIOS ==========
+
+@login_required
+@require_http_methods(["GET"])
+def obtener_horas_disponibles(request, fecha):
+    """
+    Horas libres para una fecha (YYYY-MM-DD).
+
+    Con ?excluir=<id de cita> no cuenta como ocupada la hora de esa cita
+    (para el formulario de edición).
+    """
+    try:
+        fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
+        excluir = int(request.GET['excluir']) if request.GET.get('excluir') else None
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+
+    horas = disponibilidad.horas_libres(fecha_obj, excluir_cita=excluir)
+    return JsonResponse({'horas_disponibles': [h.strftime('%H:%M') for h in horas]})
+
+
+@login_required
+@require_http_methods(["GET"])
+def disponibilidad_mensual(request, año, mes):
+    """
+    Turnos libres de cada día de un mes, en una sola consulta a la base de datos.
+
+    Formato: {'año', 'mes', 'dias': [{'fecha', 'libres', 'horas': [...]}, ...]}
+    """
+    if not 1 <= mes <= 12:
+        return JsonResponse({'error': 'Mes inválido'}, status=400)
+    if not MINYEAR <= año <= MAXYEAR:
+        return JsonResponse({'error': 'Año inválido'}, status=400)
+
+    dias = disponibilidad.disponibilidad_mes(año, mes)
+    return JsonResponse({
+        'año': año,
+        'mes': mes,
+        'dias': [
+            {
+                'fecha': dia['fecha'].isoformat(),
+                'libres': dia['libres'],
+                'horas': [h.strftime('%H:%M') for h in dia['horas']],
+            }
+            for dia in dias
+        ],
+    })
+
+
+# ========== FEEDS DE CALENDARIO (iCalendar) ==========
+
+def _alcance_feed(token):
+    """Decodifica el token del feed o responde 404 si no es válido."""
+    alcance = calendario.leer_token(token)
+    if alcance is None:
+        raise Http404('Calendario no encontrado')
+    return alcance
+
+
+def _version_feed(request):
+    """Versión de los calendarios, leída una sola vez por petición (ETag, Last-Modified y contenido)."""
+    if not hasattr(request, '_version_calendario'):
+        request._version_calendario = calendario.version_actual()
+    return request._version_calendario
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(
+    etag_func=lambda request, token: calendario.etag_feed(*_alcance_feed(token), _version_feed(request)),
+    last_modified_func=lambda request, token: calendario.ultima_modificacion(
+        *_alcance_feed(token), _version_feed(request)),
+)
+def calendario_ics(request, token):
+    """
+    Feed .ics protegido por token para suscribirse desde apps de calendario.
+
+    Responde 304 si el ETag/Last-Modified no cambió; en otro caso sirve el
+    contenido desde la caché del servidor.
+    """
+    tipo, objeto_id = _alcance_feed(token)
+    response = HttpResponse(calendario.obtener_ics(tipo, objeto_id, _version_feed(request)), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename=taller_{tipo}.ics'
+    patch_cache_control(response, private=True, max_age=300)
+    return response
+
+
+@login_required
+def calendario_cliente(request, pk):
+    """Redirige al feed .ics de un cliente para compartir el enlace con él."""
+    if not es_jefe_o_encargado(request.user):
+        messages.error(request, 'No tienes permiso para acceder a esta sección.')
+        return redirect('inicio')
+    cliente = get_object_or_404(Cliente, pk=pk)
+    return redirect(calendario.url_feed('cliente', cliente.id))
+
+
+# ========== BOT DE TELEGRAM ==========
+
+@csrf_exempt
+@require_POST
+async def telegram_webhook(request):
+    """
+    Recibe las actualizaciones de Telegram en modo webhook.
+
+    Solo encola la actualización (ver gestion/bot/webhook.py) y responde
+    enseguida; el procesamiento continúa en segundo plano.
+    """
+    codigo = await telegram_bot_webhook.recibir_actualizacion(
+        request.body, request.headers.get(telegram_bot_webhook.CABECERA_SECRETO)
+    )
+    return HttpResponse(status=codigo)
+
+
+@login_required
+def telegram_metricas(request):
+    """Latencia, tiempo de base de datos, errores y embudo de los manejadores del bot (JSON)."""
+    if not es_jefe_o_encargado(request.user):
+        return JsonResponse({'error': 'No tienes permiso para ver las métricas del bot'}, status=403)
+    return JsonResponse(leer_metricas(), json_dumps_params={'ensure_ascii': False})
+
+
 @login_required
 def dashboard_encargado(request):
     """
@@ -459,7 +631,7 @@ def dashboard_encargado(request):
     # Obtener reparaciones en progreso
     reparaciones_en_progreso = Reparacion.objects.filter(
         estado_reparacion='en_progreso'
-    ).select_related('vehiculo', 'vehiculo__cliente', 'servicio').order_by('-fecha_ingreso')[:5]
+    ).select_related('vehiculo', 'vehiculo__cliente', 'servicio').defer('notas').order_by('-fecha_ingreso')[:5]
     
     # Obtener citas de hoy
     citas_hoy = Agenda.objects.filter(fecha=hoy).select_related('cliente', 'servicio').order_by('hora')
@@ -501,8 +673,7 @@ def dashboard_mecanico(request):
     
     # Obtener fecha actual
     hoy = timezone.now().date()
-    mes_actual = timezone.now().month
-    año_actual = timezone.now().year
+    inicio_mes, fin_mes = rango_mes_actual()
     
     # Obtener el perfil de empleado del usuario actual
     empleado = None
@@ -521,20 +692,20 @@ def dashboard_mecanico(request):
         reparaciones_asignadas = Reparacion.objects.filter(
             mecanico_asignado=empleado,
             estado_reparacion__in=['en_progreso', 'pendiente', 'en_espera']
-        ).select_related('vehiculo__cliente', 'servicio').order_by('fecha_ingreso')
+        ).select_related('vehiculo__cliente', 'servicio').defer('notas').order_by('fecha_ingreso')
         
         # Reparaciones disponibles para tomar
         reparaciones_disponibles = Reparacion.objects.filter(
             estado_reparacion='pendiente',
             mecanico_asignado__isnull=True
-        ).select_related('vehiculo__cliente', 'servicio').order_by('fecha_ingreso')[:10]
+        ).select_related('vehiculo__cliente', 'servicio').defer('notas').order_by('fecha_ingreso')[:10]
         
         # Estadísticas del mes
         reparaciones_completadas_mes = Reparacion.objects.filter(
             mecanico_asignado=empleado,
             estado_reparacion='completada',
-            fecha_salida__month=mes_actual,
-            fecha_salida__year=año_actual
+            fecha_salida__gte=inicio_mes,
+            fecha_salida__lt=fin_mes
         ).count()
         
         reparaciones_en_progreso = reparaciones_asignadas.filter(
@@ -546,7 +717,7 @@ def dashboard_mecanico(request):
             mecanico_asignado=empleado,
             estado_reparacion='completada',
             fecha_salida__isnull=False
-        ).order_by('-fecha_salida')[:10]
+        ).only('fecha_ingreso', 'fecha_salida').order_by('-fecha_salida')[:10]
         
         if completadas.exists():
             duraciones = [(r.fecha_salida - r.fecha_ingreso).days for r in completadas if r.fecha_salida]
@@ -568,8 +739,8 @@ def dashboard_mecanico(request):
     tareas_completadas_mes = Tarea.objects.filter(
         asignada_a=request.user,
         estado='completada',
-        fecha_actualizacion__month=mes_actual,
-        fecha_actualizacion__year=año_actual
+        fecha_actualizacion__gte=inicio_mes,
+        fecha_actualizacion__lt=fin_mes
     ).count()
     
     # Tareas recientemente completadas
@@ -651,10 +822,19 @@ def gestionar_reparacion_mecanico(request, reparacion_id):
             vin_actualizado = True
             messages.success(request, f'VIN del vehículo actualizado: {vin_vehiculo}')
         
-        # Actualizar datos del vehículo extra
-        kilometraje = request.POST.get('kilometraje', '').strip()
+        # Datos del vehículo (se guardan como InspeccionVehiculo)
+        digitos_km = ''.join(c for c in request.POST.get('kilometraje', '') if c.isdigit())
+        kilometraje = int(digitos_km) if digitos_km else None
         nivel_combustible = request.POST.get('nivel_combustible', '').strip()
+        if nivel_combustible not in dict(InspeccionVehiculo.NIVELES_COMBUSTIBLE):
+            nivel_combustible = ''
         observaciones_vehiculo = request.POST.get('observaciones_vehiculo', '').strip()
+        ultima_inspeccion = reparacion.inspecciones.first()
+        nueva_inspeccion = (
+            (kilometraje is not None or nivel_combustible or observaciones_vehiculo)
+            and not (ultima_inspeccion
+                     and ultima_inspeccion.mismos_datos(kilometraje, nivel_combustible, observaciones_vehiculo))
+        )
         
         # Actualizar condición y estado de reparación
         condicion_vehiculo = request.POST.get('condicion_vehiculo', reparacion.condicion_vehiculo)
@@ -663,53 +843,48 @@ def gestionar_reparacion_mecanico(request, reparacion_id):
         # Actualizar informe de reparación
         informe = request.POST.get('informe', '').strip()
         
-        # Construir las notas completas
-        notas_completas = []
+        # Notas nuevas del historial (se insertan, no se reescribe Reparacion.notas)
+        notas_nuevas = []
         if vin_actualizado:
-            notas_completas.append(f"VIN actualizado: {vin_vehiculo}")
-        if kilometraje:
-            notas_completas.append(f"Kilometraje: {kilometraje} km")
-        if nivel_combustible:
-            notas_completas.append(f"Nivel de combustible: {nivel_combustible}")
-        if observaciones_vehiculo:
-            notas_completas.append(f"Observaciones del vehículo: {observaciones_vehiculo}")
+            notas_nuevas.append(NotaReparacion(tipo='vin', texto=f"VIN actualizado: {vin_vehiculo}"))
         if informe:
-            notas_completas.append(f"\n--- INFORME DE REPARACIÓN ---\n{informe}")
+            notas_nuevas.append(NotaReparacion(tipo='informe', texto=informe))
         
         # Actualizar la reparación
+        estado_anterior = reparacion.estado_reparacion
         reparacion.condicion_vehiculo = condicion_vehiculo
         reparacion.estado_reparacion = estado_reparacion
         
-        # Combinar notas antiguas con nuevas si existen
-        if notas_completas:
-            nuevas_notas = "\n".join(notas_completas)
-            if reparacion.notas:
-                reparacion.notas += f"\n\n--- Actualización {timezone.now().strftime('%d/%m/%Y %H:%M')} ---\n{nuevas_notas}"
-            else:
-                reparacion.notas = nuevas_notas
-        
         # Si se completa la reparación, establecer fecha de salida
         if estado_reparacion == 'completada' and not reparacion.fecha_salida:
             reparacion.fecha_salida = timezone.now()
         
-        reparacion.save()
+        # El aviso al cliente se encola en la misma transacción; lo envía
+        # despachar_notificaciones, la petición no espera a Telegram ni al correo
+        with transaction.atomic():
+            reparacion.save(update_fields=['condicion_vehiculo', 'estado_reparacion', 'fecha_salida'])
+            for nota in notas_nuevas:
+                nota.reparacion, nota.autor = reparacion, request.user
+            NotaReparacion.objects.bulk_create(notas_nuevas)
+            if nueva_inspeccion:
+                InspeccionVehiculo.objects.create(
+                    reparacion=reparacion, vehiculo_id=reparacion.vehiculo_id, kilometraje=kilometraje,
+                    nivel_combustible=nivel_combustible, observaciones=observaciones_vehiculo,
+                )
+            if estado_reparacion != estado_anterior:
+                encolar_aviso_estado(reparacion)
         messages.success(request, 'Reparación actualizada correctamente.')
         return redirect('gestionar_reparacion_mecanico', reparacion_id=reparacion.id)
     
-    # Extraer información de las notas si existen
+    # Datos vigentes del vehículo: la última inspección de la reparación
+    inspeccion = reparacion.inspecciones.first()
     kilometraje_actual = ''
     nivel_combustible_actual = ''
     observaciones_actual = ''
-    
-    if reparacion.notas:
-        # Intentar extraer info de las notas
-        for linea in reparacion.notas.split('\n'):
-            if 'Kilometraje:' in linea:
-                kilometraje_actual = linea.split('Kilometraje:')[1].strip().replace(' km', '')
-            elif 'Nivel de combustible:' in linea:
-                nivel_combustible_actual = linea.split('Nivel de combustible:')[1].strip()
-            elif 'Observaciones del vehículo:' in linea:
-                observaciones_actual = linea.split('Observaciones del vehículo:')[1].strip()
+    if inspeccion:
+        kilometraje_actual = inspeccion.kilometraje if inspeccion.kilometraje is not None else ''
+        nivel_combustible_actual = inspeccion.nivel_combustible
+        observaciones_actual = inspeccion.observaciones
     
     context = {
         'titulo': f'Gestionar Reparación #{reparacion.id}',
@@ -720,6 +895,7 @@ def gestionar_reparacion_mecanico(request, reparacion_id):
         'kilometraje_actual': kilometraje_actual,
         'nivel_combustible_actual': nivel_combustible_actual,
         'observaciones_actual': observaciones_actual,
+        'notas_pagina': pagina_notas(request, reparacion),
         'condicion_opciones': Reparacion.CONDICION_OPCIONES,
         'estado_opciones': Reparacion.ESTADO_REPARACION,
     }
@@ -760,12 +936,14 @@ def dashboard_jefe(request):
 
     total_clientes = Cliente.objects.count()
     total_vehiculos = Vehiculo.objects.count()
-    total_reparaciones = Reparacion.objects.count()
-    total_servicios = Servicio.objects.count()
-    reparaciones_pendientes = Reparacion.objects.filter(
-        estado_reparacion__in=['pendiente', 'en_progreso', 'en_espera', 'revision']
-    ).count()
-    reparaciones_completadas = Reparacion.objects.filter(estado_reparacion='completada').count()
+    # Por estado, vivas y archivadas (el archivo solo tiene completadas y canceladas)
+    por_estado = archivo.reparaciones_por_estado()
+    total_reparaciones = sum(por_estado.values())
+    total_servicios = len(catalogo.servicios())
+    reparaciones_pendientes = sum(
+        por_estado.get(estado, 0) for estado in ['pendiente', 'en_progreso', 'en_espera', 'revision']
+    )
+    reparaciones_completadas = por_estado.get('completada', 0)
     citas_hoy_count = Agenda.objects.filter(fecha=hoy).count()
     clientes_nuevos_este_mes = Cliente.objects.filter(
         fecha_registro__year=hoy.year,
@@ -787,23 +965,17 @@ def dashboard_jefe(request):
         'completada': 'Completada',
         'cancelada': 'Cancelada',
     }
-    rep_estados_qs = Reparacion.objects.values('estado_reparacion').annotate(total=Count('id'))
     reparaciones_por_estado = [
         {
-            'estado': estado_map.get(item['estado_reparacion'], item['estado_reparacion']),
-            'total': item['total']
+            'estado': estado_map.get(estado, estado),
+            'total': total
         }
-        for item in rep_estados_qs
+        for estado, total in por_estado.items()
     ]
 
-    # Ingresos mensuales (suma de costo del servicio por mes) - últimos 12 meses
-    ingresos_qs = (Reparacion.objects
-                   .annotate(m=TruncMonth('fecha_ingreso'))
-                   .values('m')
-                   .annotate(total=Sum('servicio__costo'))
-                   .order_by('m'))
-    ingresos_totales_agg = Reparacion.objects.aggregate(total=Sum('servicio__costo'))
-    ingresos_totales = float(ingresos_totales_agg['total'] or 0)
+    # Ingresos mensuales (suma de costo del servicio por mes, incluye el archivo) - últimos 12 meses
+    ingresos_qs = archivo.ingresos_por_mes()
+    ingresos_totales = float(archivo.ingresos_totales())
     
     # Procesar datos de ingresos
     meses_all = []
@@ -819,19 +991,12 @@ def dashboard_jefe(request):
     total_ingresos_mensuales = sum(ingresos) if ingresos else 0.0
     promedio_mensual = (total_ingresos_mensuales / len(ingresos)) if ingresos else 0.0
 
-    # Tiempo promedio de reparación (en días) para completadas
-    completadas = Reparacion.objects.filter(fecha_salida__isnull=False)
-    if completadas.exists():
-        duraciones = [(r.fecha_salida - r.fecha_ingreso).days for r in completadas]
-        avg_days = sum(duraciones) / len(duraciones) if duraciones else 0
-        # Representar como timedelta
-        from datetime import timedelta as _td
-        tiempo_promedio = _td(days=int(round(avg_days)))
-    else:
-        tiempo_promedio = None
+    # Tiempo promedio de reparación (en días) de las que ya salieron, incluye el archivo
+    promedio = archivo.duracion_promedio()
+    tiempo_promedio = timedelta(days=round(promedio / timedelta(days=1))) if promedio is not None else None
 
     # Listas para secciones
-    reparaciones_recientes = Reparacion.objects.select_related('vehiculo', 'servicio').order_by('-fecha_ingreso')[:10]
+    reparaciones_recientes = Reparacion.objects.select_related('vehiculo', 'servicio').defer('notas').order_by('-fecha_ingreso')[:10]
     citas_proximas = Agenda.objects.select_related('cliente', 'servicio').filter(fecha__gte=hoy).order_by('fecha', 'hora')[:10]
 
     # Empleados destacados por registros (últimos 30 días)
@@ -882,13 +1047,15 @@ def dashboard_jefe(request):
 def dashboard_reparaciones(request):
     hoy = timezone.now()
 
-    total_reparaciones = Reparacion.objects.count()
-    reparaciones_completadas = Reparacion.objects.filter(estado_reparacion='completada').count()
-    reparaciones_en_progreso = Reparacion.objects.filter(estado_reparacion='en_progreso').count()
-    reparaciones_pendientes = Reparacion.objects.filter(estado_reparacion='pendiente').count()
-    reparaciones_en_espera = Reparacion.objects.filter(estado_reparacion='en_espera').count()
-    reparaciones_revision = Reparacion.objects.filter(estado_reparacion='revision').count()
-    reparaciones_canceladas = Reparacion.objects.filter(estado_reparacion='cancelada').count()
+    # Vivas y archivadas, en una consulta por tabla
+    por_estado = archivo.reparaciones_por_estado()
+    total_reparaciones = sum(por_estado.values())
+    reparaciones_completadas = por_estado.get('completada', 0)
+    reparaciones_en_progreso = por_estado.get('en_progreso', 0)
+    reparaciones_pendientes = por_estado.get('pendiente', 0)
+    reparaciones_en_espera = por_estado.get('en_espera', 0)
+    reparaciones_revision = por_estado.get('revision', 0)
+    reparaciones_canceladas = por_estado.get('cancelada', 0)
 
     # Dict para el gráfico del template
     reparaciones_por_estado = {
@@ -900,18 +1067,16 @@ def dashboard_reparaciones(request):
         'Cancelada': reparaciones_canceladas,
     }
 
-    # Servicios más solicitados
-    servicios_qs = (Reparacion.objects
-                    .values('servicio__nombre_servicio')
-                    .annotate(total=Count('id'))
-                    .order_by('-total')[:5])
+    # Servicios más solicitados, vivas y archivadas (los nombres salen del catálogo en memoria)
+    nombres = catalogo.nombres_servicios()
     servicios_mas_solicitados = [
-        {'nombre': s['servicio__nombre_servicio'], 'total': s['total']}
-        for s in servicios_qs
+        {'nombre': nombres.get(s['servicio_id']), 'total': s['total']}
+        for s in archivo.servicios_mas_solicitados(5)
     ]
 
     ultimas_reparaciones = (Reparacion.objects
                             .select_related('vehiculo', 'servicio', 'vehiculo__cliente')
+                            .defer('notas')
                             .order_by('-fecha_ingreso')[:10])
 
     context = {
@@ -923,6 +1088,9 @@ def dashboard_reparaciones(request):
         'reparaciones_por_estado': reparaciones_por_estado,
         'servicios_mas_solicitados': servicios_mas_solicitados,
         'ultimas_reparaciones': ultimas_reparaciones,
+        # Desde el registro de eventos de estado (gestion/tiempos.py)
+        'tiempo_por_estado': tiempos.tiempo_por_estado(),
+        'cuellos_de_botella': tiempos.cuellos_de_botella(),
     }
     return render(request, 'gestion/dashboard_reparaciones.html', context)
 
@@ -942,6 +1110,7 @@ def crear_reparacion(request):
                 reparacion.estado_reparacion = 'pendiente'
             # Guardar la reparación con los valores por defecto si es necesario
             reparacion.save()
+            form.guardar_nota(request.user)
             messages.success(request, 'Reparación creada correctamente.')
             return redirect('dashboard_reparaciones')
         else:
@@ -960,15 +1129,27 @@ def crear_reparacion(request):
 def editar_reparacion(request, pk):
     reparacion = get_object_or_404(Reparacion, pk=pk)
     titulo = 'Editar Reparación'
+    # Servicios y repuestos cobrados; el precio queda fijo al guardar la línea
+    LineaFormSet = inlineformset_factory(Reparacion, LineaReparacion, form=LineaReparacionForm, extra=1, can_delete=True)
     if request.method == 'POST':
         form = ReparacionForm(request.POST, instance=reparacion)
-        if form.is_valid():
-            form.save()
+        # Sin las líneas en el POST (formularios viejos) solo se edita la reparación
+        formset = None
+        if 'lineas-TOTAL_FORMS' in request.POST:
+            formset = LineaFormSet(request.POST, instance=reparacion, prefix='lineas')
+        if form.is_valid() and (formset is None or formset.is_valid()):
+            # La reparación, sus líneas y el total se guardan juntos o no se guardan
+            with transaction.atomic():
+                form.save()
+                if formset is not None:
+                    formset.save()
+                form.guardar_nota(request.user)
             messages.success(request, 'Reparación actualizada correctamente.')
             return redirect('dashboard_reparaciones')
     else:
         form = ReparacionForm(instance=reparacion)
-    return render(request, 'gestion/reparacion_form.html', {'form': form, 'titulo': titulo})
+        formset = LineaFormSet(instance=reparacion, prefix='lineas')
+    return render(request, 'gestion/reparacion_form.html', {'form': form, 'formset': formset, 'titulo': titulo})
 
 
 @login_required
@@ -988,29 +1169,26 @@ def reportes_ingresos(request):
     fecha_desde_str = request.GET.get('fecha_desde')
     fecha_hasta_str = request.GET.get('fecha_hasta')
 
-    reparaciones = Reparacion.objects.all()
+    filtros = {}
     fecha_desde = None
     fecha_hasta = None
     if fecha_desde_str:
         try:
             from datetime import datetime as _dt
             fecha_desde = _dt.strptime(fecha_desde_str, '%Y-%m-%d').date()
-            reparaciones = reparaciones.filter(fecha_ingreso__date__gte=fecha_desde)
+            filtros['fecha_ingreso__gte'] = inicio_del_dia(fecha_desde)
         except Exception:
             fecha_desde = None
     if fecha_hasta_str:
         try:
             from datetime import datetime as _dt
             fecha_hasta = _dt.strptime(fecha_hasta_str, '%Y-%m-%d').date()
-            reparaciones = reparaciones.filter(fecha_ingreso__date__lte=fecha_hasta)
+            filtros['fecha_ingreso__lt'] = inicio_del_dia(fecha_hasta + timedelta(days=1))
         except Exception:
             fecha_hasta = None
 
-    ingresos_qs = (reparaciones
-                   .annotate(m=TruncMonth('fecha_ingreso'))
-                   .values('m')
-                   .annotate(total=Sum('servicio__costo'), cantidad=Count('id'))
-                   .order_by('m'))
+    # Reparaciones vivas y archivadas
+    ingresos_qs = archivo.ingresos_por_mes(**filtros)
 
     meses_all = [item['m'].strftime('%b %Y') if item['m'] else '' for item in ingresos_qs]
     ingresos_all = [float(item['total']) if item['total'] is not None else 0.0 for item in ingresos_qs]
@@ -1051,32 +1229,25 @@ def reportes_ingresos(request):
 def exportar_ingresos_excel(request):
     fecha_desde_str = request.GET.get('fecha_desde')
     fecha_hasta_str = request.GET.get('fecha_hasta')
-    reparaciones = Reparacion.objects.all()
+    filtros = {}
     
     # Aplicar filtros de fecha si existen
     if fecha_desde_str:
         try:
             fecha_desde = datetime.strptime(fecha_desde_str, '%Y-%m-%d').date()
-            reparaciones = reparaciones.filter(fecha_ingreso__date__gte=fecha_desde)
+            filtros['fecha_ingreso__gte'] = inicio_del_dia(fecha_desde)
         except ValueError:
             pass
     
     if fecha_hasta_str:
         try:
             fecha_hasta = datetime.strptime(fecha_hasta_str, '%Y-%m-%d').date()
-            reparaciones = reparaciones.filter(fecha_ingreso__date__lte=fecha_hasta)
+            filtros['fecha_ingreso__lt'] = inicio_del_dia(fecha_hasta + timedelta(days=1))
         except ValueError:
             pass
 
-    # Obtener datos para el reporte
-    ingresos_qs = (reparaciones
-                  .annotate(m=TruncMonth('fecha_ingreso'))
-                  .values('m')
-                  .annotate(
-                      total=Sum('servicio__costo'),
-                      cantidad=Count('id')
-                  )
-                  .order_by('m'))
+    # Obtener datos para el reporte (reparaciones vivas y archivadas)
+    ingresos_qs = archivo.ingresos_por_mes(**filtros)
     
     # Verificar si hay datos para exportar
     if not ingresos_qs:
@@ -1335,7 +1506,10 @@ def exportar_ingresos_excel(request):
 
 @login_required
 def clientes_lista(request):
-    clientes = Cliente.objects.prefetch_related('vehiculos').order_by('nombre', 'apellido')
+    # Una sola consulta: los totales están guardados en el cliente (ver gestion/contadores.py)
+    clientes = Cliente.objects.only(
+        'nombre', 'apellido', 'telefono', 'direccion', 'correo_electronico', *Cliente.CONTADORES
+    ).order_by('nombre', 'apellido')
     return render(request, 'clientes_lista.html', {'clientes': clientes})
 
 
@@ -1381,7 +1555,8 @@ def clientes_editar(request, pk):
 def clientes_eliminar(request, pk):
     cliente = get_object_or_404(Cliente, pk=pk)
     if request.method == 'POST':
-        cliente.delete()
+        # Se oculta al momento; los datos se borran en segundo plano (purgar_clientes)
+        eliminar_cliente(cliente, request.user)
         messages.success(request, 'Cliente eliminado correctamente.')
         return redirect('clientes-lista')
     return render(request, 'clientes_confirm_delete.html', {'cliente': cliente})
@@ -1436,7 +1611,7 @@ def empleados_eliminar(request, pk):
 
 @login_required
 def servicios_lista(request):
-    servicios = Servicio.objects.all().order_by('nombre_servicio')
+    servicios = catalogo.servicios()
     return render(request, 'servicios_lista.html', {'servicios': servicios})
 
 
@@ -1532,6 +1707,10 @@ class ClienteRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
 
+    def perform_destroy(self, instance):
+        # Igual que clientes_eliminar: se oculta y se purga en segundo plano
+        eliminar_cliente(instance, self.request.user)
+
 
 # Empleado
 class EmpleadoListCreate(generics.ListCreateAPIView):
@@ -1644,13 +1823,13 @@ def listar_reparaciones_disponibles(request):
     reparaciones = Reparacion.objects.filter(
         Q(mecanico_asignado__isnull=True, estado_reparacion='pendiente') |
         Q(mecanico_asignado__usuario=request.user)
-    ).order_by('fecha_ingreso')
+    ).defer('notas').order_by('fecha_ingreso')
     
     # Obtener las reparaciones asignadas al usuario actual
     mis_reparaciones = Reparacion.objects.filter(
         mecanico_asignado__usuario=request.user,
         estado_reparacion='en_progreso'
-    ).order_by('fecha_ingreso')
+    ).defer('notas').order_by('fecha_ingreso')
     
     return render(request, 'gestion/reparaciones_disponibles.html', {
         'reparaciones': reparaciones,
@@ -1708,6 +1887,7 @@ def detalle_reparacion(request, pk):
         'reparacion': reparacion,
         'tareas': tareas,
         'historial': historial[:10],  # Mostrar solo los 10 registros más recientes
+        'notas_pagina': pagina_notas(request, reparacion),
         'tarea_form': tarea_form,
         'titulo': f'Reparación #{reparacion.id} - {reparacion.vehiculo}'
     })
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taller_mecanico.settings')
 
 application = get_asgi_application()
+
+# El bot en modo webhook corre dentro de este proceso: sus consultas usan un
+# pool de hilos acotado con conexiones administradas (ver gestion/bot/bd.py)
+from gestion.bot.bd import iniciar_ejecutor_bd  # noqa: E402
+
+iniciar_ejecutor_bd()
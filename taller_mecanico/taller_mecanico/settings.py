@@ -3,7 +3,7 @@ Configuración del proyecto Taller Mecánico
 
 Este archivo contiene toda la configuración del proyecto Django:
 
-- Configuración de base de datos (SQLite por defecto)
+- Configuración de base de datos (SQLite por defecto, PostgreSQL o MySQL por variables de entorno)
 - Aplicaciones instaladas (Django apps + app personalizada)
 - Configuración de archivos estáticos y de medios
 - Configuración de autenticación y permisos
@@ -13,7 +13,7 @@ Este archivo contiene toda la configuración del proyecto Django:
 - URLs de redirección de login/logout
 
 El proyecto está configurado para:
-- Usar SQLite como base de datos (ideal para desarrollo)
+- Usar SQLite como base de datos salvo que se defina DB_ENGINE (ver .env.example)
 - Servir archivos estáticos en modo DEBUG
 - Usar autenticación personalizada del taller
 - Soporte para archivos de medios (imágenes, documentos)
@@ -60,6 +60,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',            # Headers comunes
     'django.middleware.csrf.CsrfViewMiddleware',           # Protección CSRF
     'django.contrib.auth.middleware.AuthenticationMiddleware', # Autenticación
+    'gestion.eventos.OrigenCambiosMiddleware',               # Origen de los cambios de estado
     'django.contrib.messages.middleware.MessageMiddleware',  # Mensajes
     'django.middleware.clickjacking.XFrameOptionsMiddleware', # Anti-clickjacking
 ]
@@ -91,13 +92,55 @@ TEMPLATES = [
 WSGI_APPLICATION = 'taller_mecanico.wsgi.application'
 
 # ========== CONFIGURACIÓN DE BASE DE DATOS ==========
-# Base de datos SQLite (ideal para desarrollo)
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',  # Archivo de base de datos
+# Se elige con DB_ENGINE (ver .env.example):
+# - sqlite (por defecto): archivo db.sqlite3, ideal para desarrollo
+# - postgresql: producción; un solo escritor de SQLite no alcanza para
+#   muchos usuarios a la vez
+# - mysql: MariaDB/MySQL (requiere mysqlclient)
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),  # Archivo de base de datos
+        }
     }
-}
+elif DB_ENGINE in ('postgresql', 'mysql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': f'django.db.backends.{DB_ENGINE}',
+            'NAME': config('DB_NAME', default='taller_mecanico'),
+            'USER': config('DB_USER', default='taller'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432' if DB_ENGINE == 'postgresql' else '3306'),
+            # Conexiones persistentes: segundos que se reutiliza una conexión (0 = una por petición)
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            # Antes de reutilizarla se comprueba que siga viva (reinicios del servidor, cortes)
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            'OPTIONS': {},
+            'TEST': {'NAME': config('DB_TEST_NAME', default=None)},
+        }
+    }
+    if DB_ENGINE == 'postgresql':
+        DATABASES['default']['OPTIONS']['connect_timeout'] = config('DB_CONNECT_TIMEOUT', default=5, cast=int)
+        # Pool de conexiones de psycopg 3 (psycopg[pool]). Reemplaza a las
+        # conexiones persistentes: Django exige CONN_MAX_AGE = 0 con pool.
+        if config('DB_POOL', default=False, cast=bool):
+            DATABASES['default']['CONN_MAX_AGE'] = 0
+            DATABASES['default']['OPTIONS']['pool'] = {
+                'min_size': config('DB_POOL_MIN', default=2, cast=int),
+                # Por proceso: procesos del servidor x DB_POOL_MAX < max_connections de PostgreSQL
+                'max_size': config('DB_POOL_MAX', default=10, cast=int),
+                # Segundos que espera una petición a que se libere una conexión
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+            }
+    else:
+        DATABASES['default']['OPTIONS']['init_command'] = "SET sql_mode='STRICT_TRANS_TABLES'"
+else:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f"DB_ENGINE desconocido: {DB_ENGINE!r} (sqlite, postgresql o mysql)")
 
 # ========== VALIDACIÓN DE CONTRASEÑAS ==========
 # Validadores de contraseña para mayor seguridad
@@ -167,11 +210,85 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# ========== ASIGNACIÓN AUTOMÁTICA DE REPARACIONES ==========
+# Si está activo, cada reparación pendiente nueva se asigna al mecánico con
+# menor carga (ver gestion/asignacion.py). También puede ejecutarse en lote:
+#   python manage.py asignar_reparaciones
+ASIGNACION_AUTOMATICA_REPARACIONES = config('ASIGNACION_AUTOMATICA_REPARACIONES', default=False, cast=bool)
+
+# ========== TELÉFONOS ==========
+# Código de país que se antepone a los teléfonos escritos sin él (099 123 456)
+# para compararlos con los contactos de Telegram (ver normalizar_telefono)
+TELEFONO_CODIGO_PAIS = config('TELEFONO_CODIGO_PAIS', default='595')
+
+# ========== CATÁLOGO DE SERVICIOS ==========
+# Cada proceso guarda en memoria el catálogo de servicios y lo recarga cuando
+# cambia la versión que guarda la caché (ver gestion/catalogo.py). Con una
+# caché por proceso (LocMem) los demás procesos ven los cambios a lo sumo
+# después de estos segundos.
+CATALOGO_SERVICIOS_SEGUNDOS = config('CATALOGO_SERVICIOS_SEGUNDOS', default=300, cast=int)
+
 # ========== CONFIGURACIÓN DEL BOT DE TELEGRAM ==========
 # Token del bot de Telegram (obtener de @BotFather)
 # Se carga desde variables de entorno (.env file) para seguridad
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 
+# Modo de recepción de actualizaciones: 'polling' (desarrollo) o 'webhook'
+TELEGRAM_BOT_MODO = config('TELEGRAM_BOT_MODO', default='polling')
+
 # Configuración adicional para webhooks (opcional)
+# URL pública que apunta a /telegram/webhook/ de esta aplicación (ASGI)
 TELEGRAM_BOT_WEBHOOK_URL = config('TELEGRAM_BOT_WEBHOOK_URL', default='')
 TELEGRAM_BOT_WEBHOOK_PORT = config('TELEGRAM_BOT_WEBHOOK_PORT', default=8443, cast=int)
+# Telegram la envía en la cabecera X-Telegram-Bot-Api-Secret-Token
+TELEGRAM_BOT_WEBHOOK_SECRET = config('TELEGRAM_BOT_WEBHOOK_SECRET', default='')
+# Máximo de actualizaciones en cola; si se llena se responde 503 y Telegram reintenta
+TELEGRAM_BOT_WEBHOOK_COLA = config('TELEGRAM_BOT_WEBHOOK_COLA', default=1000, cast=int)
+
+# Estado de las conversaciones del bot guardado en la base de datos
+# (sobrevive a reinicios y se comparte entre procesos del bot)
+TELEGRAM_BOT_PERSISTENCIA = config('TELEGRAM_BOT_PERSISTENCIA', default=True, cast=bool)
+# Segundos entre escrituras agrupadas del estado
+TELEGRAM_BOT_PERSISTENCIA_INTERVALO = config('TELEGRAM_BOT_PERSISTENCIA_INTERVALO', default=2, cast=float)
+# Horas sin actividad tras las que se descarta una conversación abandonada
+TELEGRAM_BOT_ESTADO_TTL_HORAS = config('TELEGRAM_BOT_ESTADO_TTL_HORAS', default=24, cast=int)
+
+# Chats que el bot atiende al mismo tiempo (los mensajes de cada chat se
+# procesan en orden); 1 = de a una actualización
+TELEGRAM_BOT_CONCURRENCIA = config('TELEGRAM_BOT_CONCURRENCIA', default=64, cast=int)
+
+# Consultas del bot: hilos (= conexiones máximas), edad en segundos tras la que
+# se recicla una conexión y segundos sin uso tras los que se verifica antes de
+# usarla (ver gestion/bot/bd.py)
+TELEGRAM_BOT_BD_HILOS = config('TELEGRAM_BOT_BD_HILOS', default=4, cast=int)
+TELEGRAM_BOT_BD_EDAD_MAXIMA = config('TELEGRAM_BOT_BD_EDAD_MAXIMA', default=600, cast=int)
+TELEGRAM_BOT_BD_VERIFICAR_TRAS = config('TELEGRAM_BOT_BD_VERIFICAR_TRAS', default=30, cast=int)
+
+# Métricas de los manejadores del bot (ver gestion/bot/metricas.py y /telegram/metricas/)
+TELEGRAM_BOT_METRICAS = config('TELEGRAM_BOT_METRICAS', default=True, cast=bool)
+# En modo polling el bot guarda las métricas en este archivo (vacío = no se guardan)
+TELEGRAM_BOT_METRICAS_ARCHIVO = config('TELEGRAM_BOT_METRICAS_ARCHIVO', default='')
+TELEGRAM_BOT_METRICAS_INTERVALO = config('TELEGRAM_BOT_METRICAS_INTERVALO', default=30, cast=float)
+
+# Segundos que se reutiliza la respuesta de /estado de cada chat
+TELEGRAM_BOT_ESTADO_CACHE_SEGUNDOS = config('TELEGRAM_BOT_ESTADO_CACHE_SEGUNDOS', default=60, cast=int)
+
+# URL base de la Bot API (se cambia para apuntar a un servidor local en pruebas)
+TELEGRAM_BOT_API_URL = config('TELEGRAM_BOT_API_URL', default='https://api.telegram.org/bot')
+
+# Recordatorios del día siguiente (python manage.py enviar_recordatorios)
+# Telegram admite ~30 mensajes por segundo en total: se deja margen
+TELEGRAM_RECORDATORIOS_POR_SEGUNDO = config('TELEGRAM_RECORDATORIOS_POR_SEGUNDO', default=25, cast=float)
+TELEGRAM_RECORDATORIOS_CONCURRENCIA = config('TELEGRAM_RECORDATORIOS_CONCURRENCIA', default=10, cast=int)
+
+# ========== ARCHIVO DE REPARACIONES ==========
+# Reparaciones cerradas y tareas completadas más antiguas que este horizonte
+# pasan a las tablas de archivo (python manage.py archivar_reparaciones)
+ARCHIVO_HORIZONTE_DIAS = config('ARCHIVO_HORIZONTE_DIAS', default=365, cast=int)
+# Reparaciones por transacción
+ARCHIVO_TAMAÑO_LOTE = config('ARCHIVO_TAMANO_LOTE', default=500, cast=int)
+
+# ========== ELIMINACIÓN DE CLIENTES ==========
+# Los clientes eliminados se ocultan al momento y sus datos se borran en
+# segundo plano (python manage.py purgar_clientes): filas por transacción
+CLIENTES_PURGA_TAMAÑO_LOTE = config('CLIENTES_PURGA_TAMANO_LOTE', default=200, cast=int)